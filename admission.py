@@ -0,0 +1,125 @@
+"""Admission control for expensive tool calls.
+
+When upstreams slow down, assessments take longer and new calls arrive faster
+than old ones finish. Rather than letting them all pile up until every client
+times out, at most max_in_flight calls run at once and up to max_queue more
+wait, first come first served, for at most max_queue_wait seconds. Anything
+beyond that is rejected straight away with Overloaded, which clients can retry.
+Shedding early keeps latency acceptable for the calls that are accepted.
+
+Metrics per gate name:
+    <name>.admitted, <name>.rejected_queue_full, <name>.rejected_timeout counters
+    <name>.in_flight, <name>.queue_depth gauges
+    <name>.queue_wait timing: time admitted calls spent queued
+"""
+
+import asyncio
+import contextlib
+import time
+from typing import AsyncIterator
+
+import metrics
+
+DEFAULT_MAX_IN_FLIGHT = 16
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_MAX_QUEUE_WAIT = 2.0
+
+
+class Overloaded(RuntimeError):
+    """Raised when a call is shed. Safe to retry after retry_after seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Gate:
+    """Bounds concurrent calls, with a short first-come-first-served queue.
+
+    Calls wait on the event loop, so queued calls hold no worker threads.
+
+    Args:
+        name: Prefix for the gate's metrics
+        max_in_flight: Calls allowed to run at once
+        max_queue: Calls allowed to wait for a slot
+        max_queue_wait: Seconds a call may wait before it is rejected
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        max_queue_wait: float = DEFAULT_MAX_QUEUE_WAIT,
+    ):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        # asyncio.Semaphore wakes waiters in the order they arrived
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._in_flight = 0
+        self._queued = 0
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge(f'{self.name}.in_flight', self._in_flight)
+        metrics.set_gauge(f'{self.name}.queue_depth', self._queued)
+
+    def _reject(self, reason: str) -> Overloaded:
+        metrics.increment(f'{self.name}.rejected_{reason.replace(" ", "_")}')
+        retry_after = self.max_queue_wait
+        return Overloaded(
+            f'Server overloaded ({reason}), retry in {retry_after:g}s', retry_after
+        )
+
+    async def acquire(self, timeout: float | None = None) -> None:
+        """Wait for a slot.
+
+        Args:
+            timeout: Seconds to wait at most, if less than max_queue_wait
+
+        Raises:
+            Overloaded: If the queue is full or no slot frees up in time
+        """
+        max_wait = self.max_queue_wait
+        if timeout is not None:
+            max_wait = max(min(max_wait, timeout), 0.0)
+        started = time.monotonic()
+        if self._slots.locked():
+            if self._queued >= self.max_queue:
+                raise self._reject('queue full')
+            self._queued += 1
+            self._update_gauges()
+            try:
+                async with asyncio.timeout(max_wait):
+                    await self._slots.acquire()
+            except TimeoutError:
+                raise self._reject('timeout') from None
+            finally:
+                self._queued -= 1
+                self._update_gauges()
+        else:
+            await self._slots.acquire()
+        self._in_flight += 1
+        metrics.increment(f'{self.name}.admitted')
+        metrics.observe(f'{self.name}.queue_wait', time.monotonic() - started)
+        self._update_gauges()
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._update_gauges()
+        self._slots.release()
+
+    @contextlib.asynccontextmanager
+    async def admitted(self, timeout: float | None = None) -> AsyncIterator[None]:
+        """Hold a slot for the duration of a call.
+
+        Args:
+            timeout: Seconds to wait at most, e.g. what is left of the call's
+                deadline
+        """
+        await self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
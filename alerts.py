@@ -0,0 +1,314 @@
+"""Official weather alerts along a route.
+
+Warnings such as winter storms, dense fog or flash floods come as polygons in
+CAP (XML) or GeoJSON files, e.g. mirrored from the NWS alerts API into a local
+directory. Set SAFE_TRAVELS_ALERTS to that directory and every waypoint is
+checked against the alerts in effect at its arrival time.
+
+Alert polygons are indexed in buckets of BUCKET_DEG degrees covering their
+bounding boxes, so a point is only tested against the few polygons whose box
+contains it. The directory is rescanned at most every REFRESH_SECONDS, and only
+files that were added, changed or removed since are re-read.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import Iterable, NamedTuple
+
+import dateutil.parser
+
+BUCKET_DEG = 0.5
+REFRESH_SECONDS = 5.0
+# CAP severities, most severe first
+SEVERITIES = ('Extreme', 'Severe', 'Moderate', 'Minor', 'Unknown')
+_CAP_NS = {'cap': 'urn:oasis:names:tc:emergency:cap:1.2'}
+
+# A polygon is a list of rings of (lat, lon) points: the outline, then any holes
+Polygon = list[list[tuple[float, float]]]
+
+
+class Alert(NamedTuple):
+    id: str
+    event: str
+    severity: str
+    headline: str | None
+    onset: datetime | None
+    expires: datetime | None
+    polygons: list[Polygon]
+    # south, west, north, east
+    bbox: tuple[float, float, float, float]
+
+    def active(self, when: datetime) -> bool:
+        return (self.onset is None or self.onset <= when) and (
+            self.expires is None or when < self.expires
+        )
+
+    def contains(self, lat: float, lon: float) -> bool:
+        south, west, north, east = self.bbox
+        if not (south <= lat <= north and west <= lon <= east):
+            return False
+        return any(_in_polygon(lat, lon, polygon) for polygon in self.polygons)
+
+    def summary(self) -> dict:
+        return {
+            'event': self.event,
+            'severity': self.severity,
+            'headline': self.headline,
+            'onset': self.onset.isoformat() if self.onset else None,
+            'expires': self.expires.isoformat() if self.expires else None,
+        }
+
+
+def _in_ring(lat: float, lon: float, ring: list[tuple[float, float]]) -> bool:
+    """Ray casting test of a point against one ring."""
+    inside = False
+    lat_j, lon_j = ring[-1]
+    for lat_i, lon_i in ring:
+        if (lat_i > lat) != (lat_j > lat):
+            crossing = lon_i + (lon_j - lon_i) * (lat - lat_i) / (lat_j - lat_i)
+            if lon < crossing:
+                inside = not inside
+        lat_j, lon_j = lat_i, lon_i
+    return inside
+
+
+def _in_polygon(lat: float, lon: float, polygon: Polygon) -> bool:
+    outline, *holes = polygon
+    return _in_ring(lat, lon, outline) and not any(
+        _in_ring(lat, lon, hole) for hole in holes
+    )
+
+
+def _parse_time(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    parsed = dateutil.parser.parse(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _make_alert(
+    alert_id: str,
+    event: str,
+    severity: str | None,
+    headline: str | None,
+    onset: str | None,
+    expires: str | None,
+    polygons: list[Polygon],
+) -> Alert | None:
+    polygons = [polygon for polygon in polygons if polygon and len(polygon[0]) >= 3]
+    if not polygons:
+        return None
+    points = [point for polygon in polygons for point in polygon[0]]
+    return Alert(
+        id=alert_id,
+        event=event,
+        severity=severity if severity in SEVERITIES else 'Unknown',
+        headline=headline,
+        onset=_parse_time(onset),
+        expires=_parse_time(expires),
+        polygons=polygons,
+        bbox=(
+            min(lat for lat, _ in points),
+            min(lon for _, lon in points),
+            max(lat for lat, _ in points),
+            max(lon for _, lon in points),
+        ),
+    )
+
+
+def parse_geojson(text: str, source: str = '') -> list[Alert]:
+    """Alerts from a GeoJSON Feature or FeatureCollection (NWS alert style)."""
+    data = json.loads(text)
+    features = data['features'] if data.get('type') == 'FeatureCollection' else [data]
+    alerts = []
+    for n, feature in enumerate(features):
+        geometry = feature.get('geometry') or {}
+        props = feature.get('properties') or {}
+        # GeoJSON positions are [lon, lat]
+        if geometry.get('type') == 'Polygon':
+            shapes = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiPolygon':
+            shapes = geometry['coordinates']
+        else:
+            continue
+        polygons = [
+            [[(lat, lon) for lon, lat, *_ in ring] for ring in shape]
+            for shape in shapes
+        ]
+        alert = _make_alert(
+            str(feature.get('id') or props.get('id') or f'{source}#{n}'),
+            props.get('event', 'Alert'),
+            props.get('severity'),
+            props.get('headline'),
+            props.get('onset') or props.get('effective'),
+            props.get('ends') or props.get('expires'),
+            polygons,
+        )
+        if alert is not None:
+            alerts.append(alert)
+    return alerts
+
+
+def parse_cap(text: str, source: str = '') -> list[Alert]:
+    """Alerts from a CAP 1.2 document, one per info block with polygons."""
+    root = ET.fromstring(text)
+    identifier = root.findtext('cap:identifier', source, _CAP_NS)
+    alerts = []
+    for n, info in enumerate(root.findall('cap:info', _CAP_NS)):
+        polygons = []
+        for area in info.findall('cap:area', _CAP_NS):
+            for polygon in area.findall('cap:polygon', _CAP_NS):
+                # "lat,lon lat,lon ..."
+                ring = [
+                    tuple(float(v) for v in pair.split(','))
+                    for pair in (polygon.text or '').split()
+                ]
+                polygons.append([ring])
+        alert = _make_alert(
+            f'{identifier}#{n}',
+            info.findtext('cap:event', 'Alert', _CAP_NS),
+            info.findtext('cap:severity', None, _CAP_NS),
+            info.findtext('cap:headline', None, _CAP_NS),
+            info.findtext('cap:onset', None, _CAP_NS)
+            or info.findtext('cap:effective', None, _CAP_NS),
+            info.findtext('cap:expires', None, _CAP_NS),
+            polygons,
+        )
+        if alert is not None:
+            alerts.append(alert)
+    return alerts
+
+
+def _bucket_range(bbox: tuple[float, float, float, float]) -> Iterable[tuple[int, int]]:
+    south, west, north, east = (math.floor(edge / BUCKET_DEG) for edge in bbox)
+    for i in range(south, north + 1):
+        for j in range(west, east + 1):
+            yield i, j
+
+
+class AlertIndex:
+    """Alert polygons from a directory of CAP and GeoJSON files."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._files: dict[str, tuple[float, list[Alert]]] = {}
+        # Rebuilt by refresh() and swapped in whole, so queries need no lock
+        self._buckets: dict[tuple[int, int], tuple[Alert, ...]] = {}
+        self._scanned_at = -math.inf
+
+    @staticmethod
+    def _add(buckets: dict, alerts: list[Alert]) -> None:
+        added: dict[tuple[int, int], list[Alert]] = {}
+        for alert in alerts:
+            for cell in _bucket_range(alert.bbox):
+                added.setdefault(cell, []).append(alert)
+        for cell, new in added.items():
+            buckets[cell] = (*buckets.get(cell, ()), *new)
+
+    @staticmethod
+    def _remove(buckets: dict, alerts: list[Alert]) -> None:
+        removed = {id(alert) for alert in alerts}
+        cells = {cell for alert in alerts for cell in _bucket_range(alert.bbox)}
+        for cell in cells:
+            bucket = tuple(a for a in buckets[cell] if id(a) not in removed)
+            if bucket:
+                buckets[cell] = bucket
+            else:
+                del buckets[cell]
+
+    def refresh(self, force: bool = False) -> None:
+        """Re-read files added, changed or removed since the last scan.
+
+        Unless forced, does nothing if the last scan was recent or another
+        thread is scanning, so queries never wait for a scan. If the directory
+        can't be read, the alerts already loaded stay in effect.
+        """
+        if not self._lock.acquire(blocking=force):
+            return
+        try:
+            now = time.monotonic()
+            if not force and now - self._scanned_at < REFRESH_SECONDS:
+                return
+            self._scanned_at = now
+
+            try:
+                entries = list(os.scandir(self.path))
+            except OSError:
+                return
+            # Changes go into a copy of the buckets, swapped in at the end
+            buckets = dict(self._buckets)
+            seen = set()
+            for entry in entries:
+                name = entry.name.lower()
+                if name.endswith(('.json', '.geojson')):
+                    parse = parse_geojson
+                elif name.endswith(('.xml', '.cap')):
+                    parse = parse_cap
+                else:
+                    continue
+                seen.add(entry.path)
+                old = self._files.get(entry.path)
+                try:
+                    mtime = entry.stat().st_mtime
+                    if old is not None and old[0] == mtime:
+                        continue
+                    with open(entry.path) as f:
+                        alerts = parse(f.read(), entry.name)
+                except (OSError, ValueError, KeyError, ET.ParseError):
+                    # Probably caught mid-write; retried on the next scan
+                    continue
+                if old is not None:
+                    self._remove(buckets, old[1])
+                self._files[entry.path] = (mtime, alerts)
+                self._add(buckets, alerts)
+
+            for path in self._files.keys() - seen:
+                self._remove(buckets, self._files.pop(path)[1])
+            self._buckets = buckets
+        finally:
+            self._lock.release()
+
+    def alerts_at(self, lat: float, lon: float, when: datetime) -> list[Alert]:
+        """Alerts in effect at a point and time, most severe first."""
+        self.refresh()
+        return self._lookup(self._buckets, lat, lon, when)
+
+    @staticmethod
+    def _lookup(buckets: dict, lat: float, lon: float, when: datetime) -> list[Alert]:
+        cell = (math.floor(lat / BUCKET_DEG), math.floor(lon / BUCKET_DEG))
+        found = [
+            alert
+            for alert in buckets.get(cell, ())
+            if alert.active(when) and alert.contains(lat, lon)
+        ]
+        found.sort(key=lambda alert: SEVERITIES.index(alert.severity))
+        return found
+
+    def corridor(
+        self, waypoints: list[tuple[float, float, datetime]]
+    ) -> list[list[Alert]]:
+        """Alerts in effect at each waypoint at its arrival time."""
+        self.refresh()
+        buckets = self._buckets
+        return [self._lookup(buckets, lat, lon, when) for lat, lon, when in waypoints]
+
+
+_indexes: dict[str, AlertIndex] = {}
+
+
+def default_alert_index() -> AlertIndex | None:
+    """The alert index for the directory in SAFE_TRAVELS_ALERTS, if any."""
+    path = os.environ.get('SAFE_TRAVELS_ALERTS')
+    if not path or not os.path.isdir(path):
+        return None
+    if path not in _indexes:
+        _indexes[path] = AlertIndex(path)
+    return _indexes[path]
@@ -0,0 +1,229 @@
+"""Local archive of fetched forecasts, routes and geocodes for backtesting.
+
+Set SAFE_TRAVELS_ARCHIVE to a directory and the server keeps a copy of every
+hourly forecast block, route and geocode it fetches, so past trips can later be
+replayed offline (see backtest.py).
+
+Forecasts are stored per forecast cell (forecast_cache.cell_key), one file per
+cell, as compressed columns: the epoch hour of each row as int64 and each
+Open-Meteo variable as float64 with NaN for missing values. A newer forecast of
+an hour replaces the older one only while the hour is still ahead, so an hour
+once passed keeps the last forecast issued before it, however often it is
+fetched again as history. Blocks fetched together are merged into each cell's
+file in one rewrite. Routes (just the polyline and duration) and geocodes are
+appended to gzipped JSONL files.
+"""
+
+import gzip
+import json
+import math
+import os
+import struct
+import threading
+import zlib
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from forecast_cache import cell_key
+
+_MAGIC = b'STARCH01'
+# magic, rows, columns
+_HEADER = struct.Struct('<8sII')
+# name, compressed size
+_COLUMN = struct.Struct('<32sI')
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_hour(label: str) -> int:
+    return int((datetime.fromisoformat(label) - _EPOCH) / timedelta(hours=1))
+
+
+def _hour_label(hour: int) -> str:
+    return (_EPOCH + timedelta(hours=hour)).strftime('%Y-%m-%dT%H:%M')
+
+
+def route_key(
+    origin: tuple[float, float], destination: tuple[float, float]
+) -> tuple[float, float, float, float]:
+    """Key of an archived route, with coordinates rounded to about 100 m."""
+    return (
+        round(origin[0], 3),
+        round(origin[1], 3),
+        round(destination[0], 3),
+        round(destination[1], 3),
+    )
+
+
+class Archive:
+    """A directory of archived forecasts, routes and geocodes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(path, 'forecasts'), exist_ok=True)
+
+    def _forecast_path(self, lat: float, lon: float) -> str:
+        i, j = cell_key(lat, lon)
+        return os.path.join(self.path, 'forecasts', f'{i}_{j}.col')
+
+    def get_forecast(self, lat: float, lon: float) -> dict | None:
+        """All archived hours of a location's cell as an Open-Meteo hourly block."""
+        return self._read_forecast(self._forecast_path(lat, lon))
+
+    def _read_forecast(self, path: str) -> dict | None:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        magic, rows, columns = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError(f'Not a forecast archive file: {path}')
+        offset = _HEADER.size
+        block = {}
+        for c in range(columns):
+            name, size = _COLUMN.unpack_from(data, offset)
+            offset += _COLUMN.size
+            values = array('q' if c == 0 else 'd')
+            values.frombytes(zlib.decompress(data[offset : offset + size]))
+            offset += size
+            if c == 0:
+                block['time'] = [_hour_label(hour) for hour in values]
+            else:
+                block[name.rstrip(b'\0').decode()] = [
+                    None if math.isnan(v) else v for v in values
+                ]
+        return block
+
+    def put_forecast(
+        self, lat: float, lon: float, hourly: dict, fetched_at: datetime
+    ) -> None:
+        """Merge a fetched hourly block into its cell's archive."""
+        self.put_forecasts([(lat, lon, hourly)], fetched_at)
+
+    def put_forecasts(
+        self, blocks: list[tuple[float, float, dict]], fetched_at: datetime
+    ) -> None:
+        """Merge hourly blocks fetched together into their cells' archives.
+
+        Args:
+            blocks: (lat, lon, hourly block) of each fetched location
+            fetched_at: When the blocks were fetched. Their hours before then
+                only fill gaps and never replace an archived forecast.
+        """
+        if fetched_at.tzinfo is not None:
+            fetched_at = fetched_at.astimezone(timezone.utc).replace(tzinfo=None)
+        first_ahead = math.ceil((fetched_at - _EPOCH) / timedelta(hours=1))
+
+        by_path: dict[str, list[dict]] = {}
+        for lat, lon, hourly in blocks:
+            by_path.setdefault(self._forecast_path(lat, lon), []).append(hourly)
+        with self._lock:
+            for path, hourlies in by_path.items():
+                self._merge_forecasts(path, hourlies, first_ahead)
+
+    def _merge_forecasts(
+        self, path: str, hourlies: list[dict], first_ahead: int
+    ) -> None:
+        rows: dict[int, dict] = {}
+        old = self._read_forecast(path)
+        if old is not None:
+            names = [name for name in old if name != 'time']
+            for idx, label in enumerate(old['time']):
+                rows[_epoch_hour(label)] = {name: old[name][idx] for name in names}
+        for block in hourlies:
+            names = [name for name in block if name != 'time']
+            for idx, label in enumerate(block['time']):
+                hour = _epoch_hour(label)
+                if hour < first_ahead and hour in rows:
+                    continue
+                rows.setdefault(hour, {}).update(
+                    (name, block[name][idx]) for name in names
+                )
+
+        hours = sorted(rows)
+        names = sorted({name for row in rows.values() for name in row})
+        columns = [array('q', hours).tobytes()]
+        for name in names:
+            values = (rows[hour].get(name) for hour in hours)
+            columns.append(
+                array('d', (math.nan if v is None else v for v in values)).tobytes()
+            )
+
+        with open(f'{path}.tmp', 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, len(hours), len(columns)))
+            for name, column in zip(['time', *names], columns):
+                compressed = zlib.compress(column)
+                f.write(_COLUMN.pack(name.encode(), len(compressed)))
+                f.write(compressed)
+        os.replace(f'{path}.tmp', path)
+
+    def _append(self, name: str, record: dict) -> None:
+        with self._lock:
+            with gzip.open(os.path.join(self.path, name), 'at') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def _read(self, name: str) -> list[dict]:
+        path = os.path.join(self.path, name)
+        if not os.path.exists(path):
+            return []
+        with gzip.open(path, 'rt') as f:
+            return [json.loads(line) for line in f]
+
+    def put_route(
+        self,
+        origin: tuple[float, float],
+        destination: tuple[float, float],
+        route: dict,
+    ) -> None:
+        first = route['routes'][0]
+        self._append(
+            'routes.jsonl.gz',
+            {
+                'origin': list(origin),
+                'destination': list(destination),
+                'fetched_at': datetime.now(timezone.utc).isoformat(),
+                'duration': first['duration'],
+                'polyline': first['polyline']['encodedPolyline'],
+            },
+        )
+
+    def put_geocode(self, address: str, coords: tuple[float, float]) -> None:
+        self._append(
+            'geocodes.jsonl.gz', {'address': address.strip().lower(), 'coords': coords}
+        )
+
+    def routes(self) -> dict[tuple, dict]:
+        """The latest archived route between each pair of points, in the shape
+        of a Routes API response."""
+        return {
+            route_key(record['origin'], record['destination']): {
+                'routes': [
+                    {
+                        'duration': record['duration'],
+                        'polyline': {'encodedPolyline': record['polyline']},
+                    }
+                ]
+            }
+            for record in self._read('routes.jsonl.gz')
+        }
+
+    def geocodes(self) -> dict[str, tuple[float, float]]:
+        return {
+            record['address']: tuple(record['coords'])
+            for record in self._read('geocodes.jsonl.gz')
+        }
+
+
+_archives: dict[str, Archive] = {}
+
+
+def default_archive() -> Archive | None:
+    """The archive configured by SAFE_TRAVELS_ARCHIVE, if any."""
+    path = os.environ.get('SAFE_TRAVELS_ARCHIVE')
+    if not path:
+        return None
+    if path not in _archives:
+        _archives[path] = Archive(path)
+    return _archives[path]
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Backtest danger scores against trips with known outcomes.
+
+Replays historical trips offline from a forecast archive (see archive.py) to
+tune the danger thresholds. Each trip is routed with its archived route,
+scored at its waypoints from the forecasts archived for its departure time and
+compared with whether it ended in a weather-related incident.
+
+Trips are replayed in chunks across a pool of worker processes. Within a chunk,
+the waypoints of all trips are scored in one pass over flat columns, the same
+path ensemble forecasts are scored with. The report has the distribution of
+trip danger scores, incidents by status, and a confusion matrix for each
+candidate threshold on a trip's worst danger score.
+
+Trips are JSONL or CSV with id, origin, destination, departure_time and
+incident (1 or true if the trip had an incident).
+
+Usage:
+    backtest.py ARCHIVE TRIPS [--workers 8] [--thresholds 2,5,10] [--output FILE]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator
+
+import polyline
+
+from archive import Archive, route_key
+from ensemble import score_columns
+from forecast_cache import cell_key
+from routing import (
+    DEFAULT_WAYPOINTS,
+    equidistant_indices,
+    get_route_duration_seconds,
+    parse_time,
+    waypoint_headings,
+    waypoint_times,
+)
+from solar import solar_positions
+from trips import read_trips
+from weather_scoring import (
+    _light_modifier,
+    danger_status,
+    running_sums,
+    weather_at_hour,
+)
+
+# Trips replayed per task
+CHUNK_SIZE = 500
+# Chunks submitted per worker ahead of the results being collected
+IN_FLIGHT_PER_WORKER = 2
+DEFAULT_THRESHOLDS = (2.0, 5.0, 10.0)
+STATUSES = ('SAFE', 'MODERATE', 'HAZARDOUS', 'EXTREME')
+
+# Archive opened by this process, with its routes and geocodes
+_state: dict = {}
+
+
+def _open(path: str) -> dict:
+    if _state.get('path') != path:
+        store = Archive(path)
+        _state.update(
+            path=path,
+            archive=store,
+            routes=store.routes(),
+            geocodes=store.geocodes(),
+            forecasts={},
+        )
+    return _state
+
+
+def is_incident(trip: dict) -> bool:
+    return str(trip.get('incident', '')).lower() in ('1', 'true', 'yes')
+
+
+def _archived_route(state: dict, trip: dict) -> dict | None:
+    origin = state['geocodes'].get(trip['origin'].strip().lower())
+    destination = state['geocodes'].get(trip['destination'].strip().lower())
+    if origin is None or destination is None:
+        return None
+    return state['routes'].get(route_key(origin, destination))
+
+
+def _archived_weather(
+    state: dict, lat: float, lon: float, when: datetime
+) -> dict | None:
+    """Weather record for a waypoint from the archive, or None if the archive
+    has no forecast for that hour."""
+    key = cell_key(lat, lon)
+    if key not in state['forecasts']:
+        hourly = state['archive'].get_forecast(lat, lon)
+        state['forecasts'][key] = hourly and (
+            hourly,
+            datetime.fromisoformat(hourly['time'][0]),
+            running_sums(hourly['rain']),
+            running_sums(hourly['snowfall']),
+        )
+    cached = state['forecasts'][key]
+    if cached is None:
+        return None
+    hourly, first, rain_sums, snow_sums = cached
+    idx = round((when.replace(tzinfo=None) - first) / timedelta(hours=1))
+    if not 0 <= idx < len(hourly['time']) or hourly['temperature_2m'][idx] is None:
+        return None
+    return weather_at_hour(hourly, idx, rain_sums, snow_sums)
+
+
+def replay_trips(
+    archive_path: str, trips: list[dict], waypoint_count: int = DEFAULT_WAYPOINTS
+) -> list[dict]:
+    """Score a chunk of trips from the archive.
+
+    Returns:
+        For each trip, its id, incident label and either its max_danger,
+        average_danger, coverage and status or an 'error'
+    """
+    state = _open(archive_path)
+    # Forecasts are kept only for the chunk, to bound worker memory
+    state['forecasts'].clear()
+
+    results = []
+    waypoint_counts = []
+    records = []
+    light = []
+    owners = []
+    for trip in trips:
+        result = {'id': trip['id'], 'incident': is_incident(trip)}
+        results.append(result)
+        waypoint_counts.append(0)
+        route = _archived_route(state, trip)
+        if route is None:
+            result['error'] = 'no archived route'
+            continue
+
+        points = polyline.decode(route['routes'][0]['polyline']['encodedPolyline'])
+        waypoint_indices = equidistant_indices(points, waypoint_count)
+        waypoint_coords = [points[i] for i in waypoint_indices]
+        waypoints = waypoint_times(
+            waypoint_coords,
+            parse_time(trip['departure_time']),
+            get_route_duration_seconds(route),
+        )
+        waypoint_counts[-1] = len(waypoints)
+        sun_positions = solar_positions(waypoints)
+        headings = waypoint_headings(points, waypoint_indices)
+        for (lat, lon, when), (elevation, azimuth), heading in zip(
+            waypoints, sun_positions, headings
+        ):
+            wd = _archived_weather(state, lat, lon, when)
+            if wd is not None:
+                records.append(wd)
+                light.append(_light_modifier(elevation, azimuth, heading))
+                owners.append(len(results) - 1)
+
+    scores_by_trip = defaultdict(list)
+    if records:
+        columns = {key: [wd[key] for wd in records] for key in records[0]}
+        scores = score_columns(columns, columns['condition'], light)
+        for owner, score in zip(owners, scores):
+            scores_by_trip[owner].append(score)
+
+    for i, result in enumerate(results):
+        scores = scores_by_trip.get(i)
+        if 'error' in result:
+            continue
+        if not scores:
+            result['error'] = 'no archived forecast'
+            continue
+        result['max_danger'] = round(max(scores), 2)
+        result['average_danger'] = round(sum(scores) / len(scores), 2)
+        result['coverage'] = round(len(scores) / waypoint_counts[i], 2)
+        result['status'] = danger_status(max(scores))
+    return results
+
+
+def _chunks(trips: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    chunk = []
+    for trip in trips:
+        chunk.append(trip)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def summarize(
+    results: Iterable[dict], thresholds: Iterable[float] = DEFAULT_THRESHOLDS
+) -> dict:
+    """Score distribution and confusion matrices of replayed trips."""
+    results = list(results)
+    replayed = [r for r in results if 'error' not in r]
+    histogram = Counter(min(int(r['max_danger']), 9) for r in replayed)
+    by_status = {status: {'incident': 0, 'no_incident': 0} for status in STATUSES}
+    for r in replayed:
+        by_status[r['status']]['incident' if r['incident'] else 'no_incident'] += 1
+
+    confusion = {}
+    for threshold in thresholds:
+        counts = Counter(
+            (r['max_danger'] >= threshold, r['incident']) for r in replayed
+        )
+        tp, fp = counts[True, True], counts[True, False]
+        fn, tn = counts[False, True], counts[False, False]
+        confusion[f'{threshold:g}'] = {
+            'true_positives': tp,
+            'false_positives': fp,
+            'false_negatives': fn,
+            'true_negatives': tn,
+            'precision': round(tp / (tp + fp), 3) if tp + fp else None,
+            'recall': round(tp / (tp + fn), 3) if tp + fn else None,
+            'false_alarm_rate': round(fp / (fp + tn), 3) if fp + tn else None,
+        }
+
+    scores = sorted(r['max_danger'] for r in replayed)
+    percentiles = {
+        f'p{q}': scores[min(len(scores) - 1, int(q / 100 * len(scores)))]
+        for q in (50, 90, 99)
+        if scores
+    }
+    return {
+        'trips': len(results),
+        'replayed': len(replayed),
+        'skipped': dict(Counter(r['error'] for r in results if 'error' in r)),
+        'incidents': sum(r['incident'] for r in replayed),
+        'max_danger_histogram': {f'{b}-{b + 1}': histogram[b] for b in range(10)},
+        'max_danger_percentiles': percentiles,
+        'status_by_incident': by_status,
+        'confusion_by_threshold': confusion,
+    }
+
+
+def run_backtest(
+    archive_path: str,
+    trips_path: str,
+    workers: int | None = None,
+    thresholds: Iterable[float] = DEFAULT_THRESHOLDS,
+    waypoint_count: int = DEFAULT_WAYPOINTS,
+    results_path: str | None = None,
+) -> dict:
+    """Replay every trip in a file and summarize the results.
+
+    Args:
+        archive_path: Archive directory written by the server
+        trips_path: JSONL or CSV file of labeled trips
+        workers: Worker processes (defaults to the CPU count); 0 replays in
+            this process
+        thresholds: Candidate thresholds on a trip's worst danger score
+        waypoint_count: Waypoints scored per trip
+        results_path: Optional JSONL file for the result of each trip
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = _chunks(read_trips(trips_path), CHUNK_SIZE)
+    results: list[dict] = []
+
+    if workers == 0:
+        for chunk in chunks:
+            results.extend(replay_trips(archive_path, chunk, waypoint_count))
+    else:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            # Submitted in order and collected in order, a few chunks ahead
+            in_flight: list[Future] = []
+            for chunk in chunks:
+                if len(in_flight) >= workers * IN_FLIGHT_PER_WORKER:
+                    results.extend(in_flight.pop(0).result())
+                in_flight.append(
+                    pool.submit(replay_trips, archive_path, chunk, waypoint_count)
+                )
+            for future in in_flight:
+                results.extend(future.result())
+
+    if results_path:
+        with open(results_path, 'w') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+    return summarize(results, thresholds)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('archive', help='Archive directory (SAFE_TRAVELS_ARCHIVE)')
+    parser.add_argument('trips', help='JSONL or CSV file of labeled trips')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument(
+        '--thresholds',
+        default=','.join(f'{t:g}' for t in DEFAULT_THRESHOLDS),
+        help='Comma-separated thresholds on the worst danger score',
+    )
+    parser.add_argument('--waypoints', type=int, default=DEFAULT_WAYPOINTS)
+    parser.add_argument('--results', help='JSONL file for per-trip results')
+    parser.add_argument('--output', help='Report file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    thresholds = [float(t) for t in args.thresholds.split(',') if t.strip()]
+    report = run_backtest(
+        args.archive,
+        args.trips,
+        args.workers,
+        thresholds,
+        args.waypoints,
+        args.results,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""Batch danger assessments for large trip files.
+
+Trips are streamed from a JSONL or CSV file and assessed in a pool of worker
+processes. Each worker keeps its own geocode, route and forecast caches for the
+whole run and shares memory-mapped data files (crash index, heatmap, road graph)
+with the others through the page cache. At most a few trips per worker are in
+flight at once, so memory stays bounded however large the input is.
+
+Results are written as they complete, to JSONL or, if the output path ends in
+.parquet, to a directory of Parquet part files. The output doubles as the
+checkpoint: rerunning the same command after a crash skips every trip already
+in it. Failed trips are reported on stderr and retried by the next run.
+
+Trips have an id (defaults to the line or row number), origin, destination and
+optional departure_time, arrival_time and safest_route. JSONL trips may instead
+have a list of stops, as for assess_itinerary.
+
+Usage:
+    safe-travels batch trips.jsonl results.jsonl [--workers 8] [--format summary]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Iterator
+
+from server import RESPONSE_FORMATS, assess_itinerary, assess_route_danger
+from trips import read_trips
+
+DEFAULT_FORMAT = 'summary'
+# Trips submitted per worker ahead of the results being written
+IN_FLIGHT_PER_WORKER = 4
+# Rows per Parquet part file
+PARQUET_ROWS_PER_FILE = 1000
+# Columns written to Parquet besides the full result as JSON
+PARQUET_COLUMNS = (
+    'id',
+    'status',
+    'average_danger',
+    'max_danger',
+    'coverage',
+    'complete',
+    'departure_time',
+    'arrival_time',
+    'duration_minutes',
+)
+
+
+def assess_trip(trip: dict, response_format: str = DEFAULT_FORMAT) -> dict:
+    """Assess one trip, returning the result with the trip's id."""
+    safest = str(trip.get('safest_route', '')).lower() in ('1', 'true', 'yes')
+    if 'stops' in trip:
+        result = asyncio.run(
+            assess_itinerary.fn(
+                stops=trip['stops'],
+                departure_time=trip.get('departure_time'),
+                safest_route=safest,
+                format=response_format,
+            )
+        )
+    else:
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin=trip['origin'],
+                destination=trip['destination'],
+                departure_time=trip.get('departure_time'),
+                arrival_time=trip.get('arrival_time'),
+                safest_route=safest,
+                format=response_format,
+            )
+        )
+    return {'id': trip['id'], **result}
+
+
+class JsonlWriter:
+    """Appends results to a JSONL file, one line per trip."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def completed_ids(self) -> set[str]:
+        """Ids already written, dropping a partial last line left by a crash."""
+        done: set[str] = set()
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, 'rb+') as f:
+            offset = 0
+            for line in f:
+                # A line cut off before its newline is partial even if it
+                # parses, and the next result would be appended to it
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('partial line')
+                    done.add(json.loads(line)['id'])
+                except (ValueError, KeyError):
+                    f.truncate(offset)
+                    break
+                offset += len(line)
+        return done
+
+    def __enter__(self) -> 'JsonlWriter':
+        self._file = open(self.path, 'a')
+        return self
+
+    def write(self, record: dict) -> None:
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def __exit__(self, *exc) -> None:
+        self._file.close()
+
+
+class ParquetWriter:
+    """Writes results to a directory of Parquet part files.
+
+    Each part is written atomically, so a crash loses at most the rows still
+    buffered, which the next run recomputes.
+    """
+
+    def __init__(self, path: str):
+        # Optional dependency, only needed for Parquet output
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self._rows: list[dict] = []
+
+    def _parts(self) -> list[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            os.path.join(self.path, name)
+            for name in os.listdir(self.path)
+            if name.endswith('.parquet')
+        )
+
+    def completed_ids(self) -> set[str]:
+        done: set[str] = set()
+        for part in self._parts():
+            done.update(self.pq.read_table(part, columns=['id'])['id'].to_pylist())
+        return done
+
+    def __enter__(self) -> 'ParquetWriter':
+        os.makedirs(self.path, exist_ok=True)
+        return self
+
+    def write(self, record: dict) -> None:
+        row = {column: record.get(column) for column in PARQUET_COLUMNS}
+        row['result'] = json.dumps(record)
+        self._rows.append(row)
+        if len(self._rows) >= PARQUET_ROWS_PER_FILE:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._rows:
+            return
+        part = os.path.join(self.path, f'part-{len(self._parts()):05d}.parquet')
+        self.pq.write_table(self.pa.Table.from_pylist(self._rows), f'{part}.tmp')
+        os.replace(f'{part}.tmp', part)
+        self._rows = []
+
+    def __exit__(self, *exc) -> None:
+        self.flush()
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    workers: int | None = None,
+    response_format: str = DEFAULT_FORMAT,
+) -> dict[str, int]:
+    """Assess every trip in a file that isn't already in the output.
+
+    Args:
+        input_path: JSONL or CSV file of trips
+        output_path: JSONL file, or a directory of Parquet parts if it ends in
+            .parquet
+        workers: Worker processes (defaults to the CPU count); 0 assesses trips
+            in this process
+        response_format: Response format of each result, as for
+            assess_route_danger
+
+    Returns:
+        Counts of trips completed, failed and skipped as already done
+    """
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError(f'Unknown format: {response_format}')
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    writer = (
+        ParquetWriter(output_path)
+        if output_path.endswith('.parquet')
+        else JsonlWriter(output_path)
+    )
+    done = writer.completed_ids()
+    counts = {'completed': 0, 'failed': 0, 'skipped': 0}
+
+    def pending_trips() -> Iterator[dict]:
+        for trip in read_trips(input_path):
+            if trip['id'] in done:
+                counts['skipped'] += 1
+            else:
+                yield trip
+
+    def record(trip_id: str, future: Future) -> None:
+        error = future.exception()
+        if error is None:
+            writer.write(future.result())
+            counts['completed'] += 1
+        else:
+            counts['failed'] += 1
+            print(f'Trip {trip_id} failed: {error!r}', file=sys.stderr)
+
+    with writer:
+        if workers == 0:
+            for trip in pending_trips():
+                future: Future = Future()
+                try:
+                    future.set_result(assess_trip(trip, response_format))
+                except Exception as e:
+                    future.set_exception(e)
+                record(trip['id'], future)
+            return counts
+
+        # Spawned rather than forked: the server's thread pools don't survive
+        # a fork
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            in_flight: dict[Future, str] = {}
+            for trip in pending_trips():
+                if len(in_flight) >= workers * IN_FLIGHT_PER_WORKER:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        record(in_flight.pop(future), future)
+                in_flight[pool.submit(assess_trip, trip, response_format)] = trip['id']
+            for future in list(in_flight):
+                record(in_flight.pop(future), future)
+
+    return counts
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog='safe-travels batch', description='Assess a file of trips'
+    )
+    parser.add_argument('input', help='JSONL or CSV file of trips')
+    parser.add_argument(
+        'output', help='JSONL file, or directory of Parquet parts if ending .parquet'
+    )
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--format', choices=RESPONSE_FORMATS, default=DEFAULT_FORMAT)
+    args = parser.parse_args(argv)
+
+    counts = run_batch(args.input, args.output, args.workers, args.format)
+    print(
+        f'{counts["completed"]} trips assessed, {counts["failed"]} failed, '
+        f'{counts["skipped"]} already done',
+        file=sys.stderr,
+    )
+    if counts['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""Entry point for the safe-travels command.
+
+With no arguments it runs the MCP server; `safe-travels batch ...` assesses a
+file of trips instead (see batch.py).
+"""
+
+import sys
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['batch']:
+        import batch
+
+        batch.main(argv[1:])
+    else:
+        from server import mcp
+
+        mcp.run()
+
+
+if __name__ == '__main__':
+    main()
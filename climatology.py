@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""Climatological weather for trips beyond the forecast horizon.
+
+Open-Meteo forecasts only reach about FORECAST_HORIZON_DAYS ahead. For later
+waypoints, the best guess is the weather typical of the place, day of year and
+hour. A climatology is a grid file (see gridfile.py) whose time axis is one
+leap year, CLIMATOLOGY_YEAR, in steps of a few hours. Each step holds, for
+every lattice cell, the mean of each weather variable over many years of
+history around that day and hour, and how often it rained, snowed or was foggy.
+Any date is looked up at the same day and hour of CLIMATOLOGY_YEAR.
+
+Build it once from the Open-Meteo historical weather API, then point
+SAFE_TRAVELS_CLIMATOLOGY at the file:
+
+Usage:
+    climatology.py OUTPUT SOUTH WEST NORTH EAST [--resolution 0.5] [--years 10]
+"""
+
+import argparse
+import math
+import os
+from array import array
+from datetime import date, datetime, timedelta, timezone
+
+import requests
+
+from gridfile import GridFile, load_grid, write_grid
+from weather_scoring import ACCUMULATION_WINDOWS
+
+HISTORY_URL = os.environ.get(
+    'SAFE_TRAVELS_HISTORY_URL', 'https://archive-api.open-meteo.com/v1/archive'
+)
+# Forecasts reach this far ahead; later waypoints use the climatology
+FORECAST_HORIZON_DAYS = 16
+# Leap year whose days and hours index the climatology
+CLIMATOLOGY_YEAR = 2024
+DEFAULT_RESOLUTION = 0.5
+DEFAULT_YEARS = 10
+DEFAULT_STEP_HOURS = 3
+# Days either side of each day averaged together, to smooth out single years
+SMOOTHING_DAYS = 7
+# Locations per historical API request
+FETCH_CHUNK_SIZE = 10
+
+# Weather record field and the Open-Meteo variable it is the mean of
+MEAN_VARIABLES = {
+    'temp_c': 'temperature_2m',
+    'wind_kph': 'wind_speed_10m',
+    'gust_kph': 'wind_gusts_10m',
+    'rain_mm': 'rain',
+    'snowfall_cm': 'snowfall',
+    'snow_depth_m': 'snow_depth',
+    'visibility_m': 'visibility',
+    'soil_temp_c': 'soil_temperature_0_to_7cm',
+    'dew_point_c': 'dew_point_2m',
+}
+# Share of hours with rain, snow or fog
+FREQUENCIES = ('p_rain', 'p_snow', 'p_fog')
+VARIABLES = (*MEAN_VARIABLES, *FREQUENCIES)
+WET_HOUR_MM = 0.1
+SNOWY_HOUR_CM = 0.1
+FOGGY_HOUR_M = 1000.0
+# How often a condition must occur to be the typical condition
+TYPICAL_FREQUENCY = 0.3
+
+_YEAR_START = datetime(CLIMATOLOGY_YEAR, 1, 1, tzinfo=timezone.utc)
+
+
+def beyond_horizon(when: datetime, now: datetime | None = None) -> bool:
+    """Whether a time is too far ahead to be forecast."""
+    now = now or datetime.now(timezone.utc)
+    return when > now + timedelta(days=FORECAST_HORIZON_DAYS)
+
+
+def _climate_time(when: datetime) -> datetime:
+    """The same day and hour in CLIMATOLOGY_YEAR."""
+    when = when.astimezone(timezone.utc) if when.tzinfo else when
+    return when.replace(year=CLIMATOLOGY_YEAR, tzinfo=timezone.utc)
+
+
+def _typical_condition(values: dict) -> str:
+    frequencies = [
+        (values['p_snow'], 'snowy'),
+        (values['p_rain'], 'rainy'),
+        (values['p_fog'], 'foggy'),
+    ]
+    frequency, condition = max((f or 0.0, c) for f, c in frequencies)
+    return condition if frequency >= TYPICAL_FREQUENCY else 'cloudy'
+
+
+def climatology_records(
+    grid: GridFile, waypoints: list[tuple[float, float, datetime]]
+) -> list[dict | None]:
+    """Typical weather records for waypoints at their arrival times.
+
+    Rolling accumulations assume the mean hourly rain and snowfall. Each record
+    has source 'climatology' and the frequency of rain, snow and fog.
+
+    Returns:
+        A record per waypoint, or None where the waypoint is outside the grid
+    """
+    last = grid.time_at(grid.nt - 1)
+    results = []
+    for lat, lon, arrival_time in waypoints:
+        values = grid.sample(
+            lat, lon, min(_climate_time(arrival_time), last), partial=True
+        )
+        if values is None or values['temp_c'] is None:
+            results.append(None)
+            continue
+        rain = values['rain_mm'] or 0.0
+        snowfall = values['snowfall_cm'] or 0.0
+        record = {
+            'lat': lat,
+            'lon': lon,
+            'arrival_time': arrival_time.isoformat(),
+            'source': 'climatology',
+            'temp_c': values['temp_c'],
+            'wind_kph': values['wind_kph'] or 0.0,
+            'gust_kph': values['gust_kph'] or 0.0,
+            'condition': _typical_condition(values),
+            # Open-Meteo snowfall is 0.7 cm per mm of water
+            'precipitation_mm': rain + snowfall / 0.7,
+            'rain_mm': rain,
+            'snowfall_cm': snowfall,
+            'snow_depth_m': values['snow_depth_m'] or 0.0,
+            'visibility_m': values['visibility_m'] or 10000.0,
+            'soil_temp_c': values['soil_temp_c'],
+            'dew_point_c': values['dew_point_c'],
+            **{name: round(values[name] or 0.0, 2) for name in FREQUENCIES},
+        }
+        for hours in ACCUMULATION_WINDOWS:
+            record[f'rain_{hours}h_mm'] = rain * hours
+            record[f'snowfall_{hours}h_cm'] = snowfall * hours
+        results.append(record)
+    return results
+
+
+def default_climatology() -> GridFile | None:
+    """The climatology configured by SAFE_TRAVELS_CLIMATOLOGY, if any."""
+    path = os.environ.get('SAFE_TRAVELS_CLIMATOLOGY')
+    if not path or not os.path.exists(path):
+        return None
+    return load_grid(path)
+
+
+def fetch_history(
+    coords: list[tuple[float, float]], start: date, end: date
+) -> list[dict]:
+    """Fetch hourly history for several locations in one request.
+
+    Returns:
+        The Open-Meteo `hourly` block for each location, in order
+    """
+    url = (
+        f'{HISTORY_URL}?'
+        f'latitude={",".join(str(c[0]) for c in coords)}'
+        f'&longitude={",".join(str(c[1]) for c in coords)}'
+        f'&hourly={",".join(MEAN_VARIABLES.values())}'
+        f'&start_date={start.isoformat()}&end_date={end.isoformat()}'
+    )
+    response = requests.get(url, timeout=300)
+    response.raise_for_status()
+    data = response.json()
+    if isinstance(data, dict) and 'hourly' in data:
+        data = [data]
+    return [d['hourly'] for d in data]
+
+
+def _hour_values(hourly: dict, idx: int) -> list[float | None]:
+    """Values of VARIABLES for one hour of history."""
+    values = {}
+    for field, variable in MEAN_VARIABLES.items():
+        series = hourly.get(variable) or []
+        values[field] = series[idx] if idx < len(series) else None
+    rain, snowfall, visibility = (
+        values['rain_mm'],
+        values['snowfall_cm'],
+        values['visibility_m'],
+    )
+    return [
+        *values.values(),
+        None if rain is None else float(rain >= WET_HOUR_MM),
+        None if snowfall is None else float(snowfall >= SNOWY_HOUR_CM),
+        None if visibility is None else float(visibility < FOGGY_HOUR_M),
+    ]
+
+
+def _smoothed_means(
+    sums: list[float], counts: list[int], steps_per_day: int
+) -> list[float]:
+    """Means over SMOOTHING_DAYS either side of each step, at the same time of
+    day and wrapping around the year, with NaN where there is no data."""
+    nt = len(sums)
+    days = nt // steps_per_day
+    means = [math.nan] * nt
+    for phase in range(steps_per_day):
+        day_sums = sums[phase::steps_per_day]
+        day_counts = counts[phase::steps_per_day]
+        window = range(-SMOOTHING_DAYS, SMOOTHING_DAYS + 1)
+        total = sum(day_sums[d % days] for d in window)
+        count = sum(day_counts[d % days] for d in window)
+        for day in range(days):
+            if count:
+                means[day * steps_per_day + phase] = total / count
+            # Slide the window forward a day
+            leaving = (day - SMOOTHING_DAYS) % days
+            entering = (day + SMOOTHING_DAYS + 1) % days
+            total += day_sums[entering] - day_sums[leaving]
+            count += day_counts[entering] - day_counts[leaving]
+    return means
+
+
+def build_climatology(
+    path: str,
+    south: float,
+    west: float,
+    north: float,
+    east: float,
+    resolution: float = DEFAULT_RESOLUTION,
+    years: int = DEFAULT_YEARS,
+    step_hours: int = DEFAULT_STEP_HOURS,
+    last_year: int | None = None,
+) -> None:
+    """Fetch history for a lattice and write its climatology.
+
+    Args:
+        path: Output grid file
+        south, west, north, east: Bounding box in degrees
+        resolution: Lattice spacing in degrees
+        years: Years of history averaged
+        step_hours: Hours per time step, a divisor of 24
+        last_year: Last full year of history (defaults to last year)
+    """
+    if 24 % step_hours:
+        raise ValueError(f'step_hours must divide 24, got {step_hours}')
+    if last_year is None:
+        last_year = datetime.now(timezone.utc).year - 1
+    steps_per_day = 24 // step_hours
+    nt = 366 * steps_per_day
+    nvars = len(VARIABLES)
+
+    nlat = int(math.floor((north - south) / resolution + 1e-9)) + 1
+    nlon = int(math.floor((east - west) / resolution + 1e-9)) + 1
+    coords = [
+        (round(south + i * resolution, 4), round(west + j * resolution, 4))
+        for i in range(nlat)
+        for j in range(nlon)
+    ]
+
+    # [step][lat][lon][variable]
+    grid = array('f', [math.nan]) * (nt * nlat * nlon * nvars)
+    for chunk_start in range(0, len(coords), FETCH_CHUNK_SIZE):
+        chunk = coords[chunk_start : chunk_start + FETCH_CHUNK_SIZE]
+        history = fetch_history(
+            chunk, date(last_year - years + 1, 1, 1), date(last_year, 12, 31)
+        )
+        for cell, hourly in enumerate(history, start=chunk_start):
+            sums = [[0.0] * nt for _ in VARIABLES]
+            counts = [[0] * nt for _ in VARIABLES]
+            for idx, label in enumerate(hourly['time']):
+                when = _climate_time(datetime.fromisoformat(label))
+                step = int((when - _YEAR_START) / timedelta(hours=step_hours))
+                for v, value in enumerate(_hour_values(hourly, idx)):
+                    if value is not None:
+                        sums[v][step] += value
+                        counts[v][step] += 1
+            for v in range(nvars):
+                means = _smoothed_means(sums[v], counts[v], steps_per_day)
+                for step, mean in enumerate(means):
+                    grid[(step * nlat * nlon + cell) * nvars + v] = mean
+
+    write_grid(
+        path,
+        south,
+        west,
+        resolution,
+        resolution,
+        nlat,
+        nlon,
+        _YEAR_START,
+        step_hours * 3600,
+        nt,
+        VARIABLES,
+        grid,
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build a weather climatology')
+    parser.add_argument('output')
+    parser.add_argument('south', type=float)
+    parser.add_argument('west', type=float)
+    parser.add_argument('north', type=float)
+    parser.add_argument('east', type=float)
+    parser.add_argument('--resolution', type=float, default=DEFAULT_RESOLUTION)
+    parser.add_argument('--years', type=int, default=DEFAULT_YEARS)
+    parser.add_argument('--step-hours', type=int, default=DEFAULT_STEP_HOURS)
+    args = parser.parse_args()
+
+    build_climatology(
+        args.output,
+        args.south,
+        args.west,
+        args.north,
+        args.east,
+        resolution=args.resolution,
+        years=args.years,
+        step_hours=args.step_hours,
+    )
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Historical crash hotspots along routes.
+
+Crash records (lat, lon, severity) are bucketed into fixed-size grid cells and
+stored sorted by cell key in flat packed arrays. A corridor query around a route
+only binary-searches the handful of cells each segment touches, and the packed
+file can be memory-mapped so every worker process shares one copy of the index.
+"""
+
+import bisect
+import csv
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+# Grid cell size in degrees (~1.1 km of latitude)
+CELL_DEG = 0.01
+# Default corridor half-width around the route in meters
+CORRIDOR_M = 250.0
+
+METERS_PER_DEG = 111320.0
+
+_MAGIC = b'STCRASH1'
+# magic, cell size in degrees, record count
+_HEADER = struct.Struct('<8sdQ')
+
+
+def _cell(lat: float, lon: float, cell_deg: float) -> Tuple[int, int]:
+    return int((lat + 90) // cell_deg), int((lon + 180) // cell_deg)
+
+
+def _cell_key(row: int, col: int, cell_deg: float) -> int:
+    return row * math.ceil(360 / cell_deg) + col
+
+
+class CrashIndex:
+    """Crash records sorted by grid cell for fast corridor lookups."""
+
+    def __init__(self, keys, lats, lons, severities, cell_deg: float = CELL_DEG):
+        self.keys = keys
+        self.lats = lats
+        self.lons = lons
+        self.severities = severities
+        self.cell_deg = cell_deg
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[Tuple[float, float, float]], cell_deg: float = CELL_DEG
+    ) -> 'CrashIndex':
+        """Build an index from (lat, lon, severity) records."""
+        keyed = sorted(
+            (_cell_key(*_cell(lat, lon, cell_deg), cell_deg), lat, lon, severity)
+            for lat, lon, severity in records
+        )
+        return cls(
+            array('q', (r[0] for r in keyed)),
+            array('f', (r[1] for r in keyed)),
+            array('f', (r[2] for r in keyed)),
+            array('f', (r[3] for r in keyed)),
+            cell_deg,
+        )
+
+    @classmethod
+    def from_file(cls, path: str, cell_deg: float = CELL_DEG) -> 'CrashIndex':
+        """Build an index from a CSV or Parquet file of crash records.
+
+        The file needs latitude and longitude columns (lat/latitude,
+        lon/lng/longitude) and may have a severity column, which defaults to 1.
+        """
+        if path.endswith('.parquet'):
+            # Optional dependency, only needed for Parquet input
+            import pyarrow.parquet as pq
+
+            rows = pq.read_table(path).to_pylist()
+        else:
+            with open(path, newline='') as f:
+                rows = list(csv.DictReader(f))
+
+        return cls.from_records((_parse_record(row) for row in rows), cell_deg)
+
+    def save(self, path: str) -> None:
+        """Write the index as a packed file that load() can memory-map."""
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, self.cell_deg, len(self)))
+            for arr in (self.keys, self.lats, self.lons, self.severities):
+                arr.tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> 'CrashIndex':
+        """Memory-map a packed index written by save()."""
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, cell_deg, count = _HEADER.unpack_from(buf)
+        if magic != _MAGIC:
+            raise ValueError(f'Not a crash index file: {path}')
+
+        view = memoryview(buf)
+        offset = _HEADER.size
+        keys = view[offset : offset + 8 * count].cast('q')
+        offset += 8 * count
+        columns = []
+        for _ in range(3):
+            columns.append(view[offset : offset + 4 * count].cast('f'))
+            offset += 4 * count
+
+        return cls(keys, *columns, cell_deg=cell_deg)
+
+    def _cell_range(self, row: int, col: int) -> Tuple[int, int]:
+        key = _cell_key(row, col, self.cell_deg)
+        lo = bisect.bisect_left(self.keys, key)
+        hi = bisect.bisect_right(self.keys, key, lo)
+        return lo, hi
+
+    def corridor_counts(
+        self, points: List[Tuple[float, float]], radius_m: float = CORRIDOR_M
+    ) -> List[Tuple[int, float]]:
+        """Count crashes within radius_m of each segment of a route.
+
+        Each crash is attributed to the first segment whose corridor contains
+        it, so totals across segments are not double counted.
+
+        Args:
+            points: Route polyline as (lat, lon) points
+            radius_m: Corridor half-width in meters
+
+        Returns:
+            List of (count, severity_sum) tuples, one per segment. A single
+            point route is treated as one zero-length segment.
+        """
+        if len(points) == 1:
+            points = [points[0], points[0]]
+
+        # Project each segment locally (equirectangular around its start) and
+        # collect the segments whose padded bounding box touches each cell
+        segments = []
+        cell_segments: dict[Tuple[int, int], List[int]] = {}
+        for s, ((lat0, lon0), (lat1, lon1)) in enumerate(zip(points, points[1:])):
+            kx = METERS_PER_DEG * math.cos(math.radians(lat0))
+            dx = (lon1 - lon0) * kx
+            dy = (lat1 - lat0) * METERS_PER_DEG
+            segments.append((lat0, lon0, kx, dx, dy, dx * dx + dy * dy))
+
+            pad_lat = radius_m / METERS_PER_DEG
+            pad_lon = radius_m / max(kx, 1.0)
+            row_lo, col_lo = _cell(
+                min(lat0, lat1) - pad_lat, min(lon0, lon1) - pad_lon, self.cell_deg
+            )
+            row_hi, col_hi = _cell(
+                max(lat0, lat1) + pad_lat, max(lon0, lon1) + pad_lon, self.cell_deg
+            )
+            for row in range(row_lo, row_hi + 1):
+                for col in range(col_lo, col_hi + 1):
+                    cell_segments.setdefault((row, col), []).append(s)
+
+        counts = [0] * len(segments)
+        severities = [0.0] * len(segments)
+        radius_sq = radius_m * radius_m
+        lats, lons = self.lats, self.lons
+
+        # Each cell is searched once; segment lists are in route order, so the
+        # first hit is the earliest segment passing the crash
+        for (row, col), candidates in cell_segments.items():
+            lo, hi = self._cell_range(row, col)
+            for i in range(lo, hi):
+                lat, lon = lats[i], lons[i]
+                for s in candidates:
+                    lat0, lon0, kx, dx, dy, seg_len_sq = segments[s]
+                    px = (lon - lon0) * kx
+                    py = (lat - lat0) * METERS_PER_DEG
+                    t = 0.0
+                    if seg_len_sq > 0:
+                        t = max(0.0, min(1.0, (px * dx + py * dy) / seg_len_sq))
+                    ex = px - t * dx
+                    ey = py - t * dy
+                    if ex * ex + ey * ey <= radius_sq:
+                        counts[s] += 1
+                        severities[s] += self.severities[i]
+                        break
+
+        return list(zip(counts, severities))
+
+
+def _parse_record(row: dict) -> Tuple[float, float, float]:
+    lat = row.get('lat', row.get('latitude'))
+    lon = row.get('lon', row.get('lng', row.get('longitude')))
+    if lat is None or lon is None:
+        raise ValueError(f'Crash record is missing coordinates: {row}')
+    severity = row.get('severity')
+    return (
+        float(lat),
+        float(lon),
+        float(severity) if severity not in (None, '') else 1.0,
+    )
+
+
+@lru_cache(maxsize=None)
+def load_crash_index(path: str) -> CrashIndex:
+    """Load a crash index once per process, building it if given raw records."""
+    if path.endswith(('.csv', '.parquet')):
+        return CrashIndex.from_file(path)
+    return CrashIndex.load(path)
+
+
+def default_crash_index() -> CrashIndex | None:
+    """The crash index configured by SAFE_TRAVELS_CRASH_INDEX, if any."""
+    path = os.environ.get('SAFE_TRAVELS_CRASH_INDEX')
+    if not path:
+        return None
+    return load_crash_index(path)
+
+
+if __name__ == '__main__':
+    # Usage: crash_history.py crashes.csv crashes.idx
+    CrashIndex.from_file(sys.argv[1]).save(sys.argv[2])
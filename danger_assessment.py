@@ -141,3 +141,103 @@ def black_ice_risk(
             risk += (3 - dew_spread) / 3  # Up to +1 for saturated air
 
     return min(risk, 5.0)
+
+
+def darkness_severity(sun_elevation: float) -> float:
+    """Compute severity from ambient light based on sun elevation.
+
+    Driving after dark reduces visibility and increases fatigue and wildlife
+    activity risks.
+
+    Args:
+        sun_elevation: Sun elevation above the horizon in degrees
+
+    Returns:
+        Severity score from 0-1.5
+    """
+    # Daylight: sun above the horizon = 0
+    # Civil twilight: 0 to -6 degrees = 0-1
+    # Night: below -6 degrees = 1.5
+    if sun_elevation >= 0:
+        return 0.0
+    elif sun_elevation >= -6:
+        return -sun_elevation / 6
+    else:
+        return 1.5
+
+
+def sun_glare_severity(
+    sun_elevation: float, sun_azimuth: float, heading: float
+) -> float:
+    """Compute severity from low sun shining into the driver's eyes.
+
+    Glare is worst when the sun is just above the horizon and directly ahead
+    of the direction of travel.
+
+    Args:
+        sun_elevation: Sun elevation above the horizon in degrees
+        sun_azimuth: Sun azimuth in degrees clockwise from north
+        heading: Direction of travel in degrees clockwise from north
+
+    Returns:
+        Severity score from 0-2
+    """
+    # Only a low sun (0-25 degrees) within 30 degrees of the heading blinds
+    if sun_elevation <= 0 or sun_elevation >= 25:
+        return 0.0
+
+    angle_off = abs((sun_azimuth - heading + 180) % 360 - 180)
+    if angle_off >= 30:
+        return 0.0
+
+    return 2 * (1 - sun_elevation / 25) * (1 - angle_off / 30)
+
+
+def road_residual_severity(
+    rain_6h_mm: float,
+    rain_12h_mm: float,
+    rain_24h_mm: float,
+    snowfall_6h_cm: float,
+    snowfall_12h_cm: float,
+    snowfall_24h_cm: float,
+    temp_c: float,
+) -> float:
+    """Compute severity from wet or snow-covered roads left by recent storms.
+
+    Accumulations are rolling totals over the hours before the arrival hour
+    (whose own precipitation is scored by precipitation_severity), so each
+    longer window includes the shorter ones. Older precipitation counts for less as
+    roads drain, dry and get plowed.
+
+    Args:
+        rain_6h_mm: Rain over the preceding 6 hours (mm)
+        rain_12h_mm: Rain over the preceding 12 hours (mm)
+        rain_24h_mm: Rain over the preceding 24 hours (mm)
+        snowfall_6h_cm: Snowfall over the preceding 6 hours (cm)
+        snowfall_12h_cm: Snowfall over the preceding 12 hours (cm)
+        snowfall_24h_cm: Snowfall over the preceding 24 hours (cm)
+        temp_c: Air temperature in Celsius at arrival
+
+    Returns:
+        Severity score from 0-3
+    """
+    # Weight each window slice by recency: last 6h full, 6-12h half, 12-24h quarter
+    recent_rain = (
+        rain_6h_mm + (rain_12h_mm - rain_6h_mm) / 2 + (rain_24h_mm - rain_12h_mm) / 4
+    )
+    recent_snow = (
+        snowfall_6h_cm
+        + (snowfall_12h_cm - snowfall_6h_cm) / 2
+        + (snowfall_24h_cm - snowfall_12h_cm) / 4
+    )
+
+    # Wet roads: 10mm of recent rain leaves roads fully wet = 1
+    wet_score = min(recent_rain / 10, 1.0)
+    # Standing water refreezes near or below freezing
+    if temp_c <= 2:
+        wet_score *= 2
+
+    # Snow-covered roads: 10cm of recent snow = 2
+    snow_score = min(recent_snow / 5, 2.0)
+
+    return min(wet_score + snow_score, 3.0)
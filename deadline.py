@@ -0,0 +1,44 @@
+"""Per-request time budgets.
+
+A Deadline is created when a tool call starts and handed to every stage, which
+sizes its upstream timeouts from the time that is left.
+"""
+
+import time
+
+# Time kept back for scoring and formatting the response, in seconds
+RESPONSE_MARGIN = 0.05
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a stage cannot start or finish within the time budget."""
+
+
+class Deadline:
+    """A point in time by which a request must be answered."""
+
+    def __init__(self, budget_ms: float):
+        self.expires_at = time.monotonic() + budget_ms / 1000
+
+    def remaining(self) -> float:
+        """Seconds left for upstream work, after the response margin."""
+        return self.expires_at - time.monotonic() - RESPONSE_MARGIN
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self) -> float:
+        """Timeout for the next upstream call.
+
+        Raises:
+            DeadlineExceeded: If there is no time left for it.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded('Deadline exceeded')
+        return remaining
+
+
+def timeout_for(deadline: Deadline | None) -> float | None:
+    """Upstream timeout for an optional deadline (None means no timeout)."""
+    return deadline.timeout() if deadline is not None else None
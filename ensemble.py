@@ -0,0 +1,189 @@
+"""Ensemble forecasts and the probability of dangerous conditions.
+
+A single deterministic forecast hides how uncertain it is, which matters most
+for marginal events such as snow near freezing. Open-Meteo's ensemble API
+returns every member of an ensemble model (30-50 of them) for each location.
+All members for all waypoints of a route are laid out as one flat
+members x waypoints array per variable, member-major, and each cell is scored
+like a weather record of the deterministic forecast. The share of members at or
+above a status threshold is the probability of that status at each waypoint.
+Cells without a temperature, as at the end of a model's horizon, are left out.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import requests
+
+from hedging import hedged_call
+from weather_scoring import ACCUMULATION_WINDOWS, weather_components
+
+ENSEMBLE_URL = os.environ.get(
+    'SAFE_TRAVELS_ENSEMBLE_URL', 'https://ensemble-api.open-meteo.com/v1/ensemble'
+)
+ENSEMBLE_MODEL = os.environ.get('SAFE_TRAVELS_ENSEMBLE_MODEL', 'gfs_seamless')
+# Open-Meteo variable and default for missing values of each weather field
+ENSEMBLE_VARIABLES = {
+    'temp_c': ('temperature_2m', None),
+    'wind_kph': ('wind_speed_10m', 0.0),
+    'gust_kph': ('wind_gusts_10m', 0.0),
+    'weather_code': ('weather_code', 0),
+    'rain_mm': ('rain', 0.0),
+    'snowfall_cm': ('snowfall', 0.0),
+    'visibility_m': ('visibility', 10000.0),
+    'soil_temp_c': ('soil_temperature_0_to_10cm', None),
+    'dew_point_c': ('dew_point_2m', None),
+}
+# Lowest danger scores of the HAZARDOUS and EXTREME statuses
+HAZARD_THRESHOLDS = {'hazardous': 5.0, 'extreme': 10.0}
+
+
+def fetch_ensemble_forecasts(
+    coords: list[tuple[float, float]],
+    start: datetime,
+    end: datetime,
+    timeout: float | None = None,
+) -> list[dict]:
+    """Fetch hourly ensemble series for several locations in one request.
+
+    Returns:
+        The Open-Meteo `hourly` block for each location, in order. Each variable
+        has a series for the control run (e.g. `temperature_2m`) and one per
+        perturbed member (`temperature_2m_member01`, ...).
+    """
+    variables = ','.join(variable for variable, _ in ENSEMBLE_VARIABLES.values())
+    url = (
+        f'{ENSEMBLE_URL}?'
+        f'latitude={",".join(str(c[0]) for c in coords)}'
+        f'&longitude={",".join(str(c[1]) for c in coords)}'
+        f'&hourly={variables}&models={ENSEMBLE_MODEL}'
+        f'&start_hour={start.strftime("%Y-%m-%dT%H:00")}'
+        f'&end_hour={end.strftime("%Y-%m-%dT%H:00")}'
+    )
+    response = hedged_call('open_meteo_ensemble', requests.get, url, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if isinstance(data, dict) and 'hourly' in data:
+        data = [data]
+    return [d['hourly'] for d in data]
+
+
+def member_keys(hourly: dict, variable: str) -> list[str]:
+    """Keys of a variable's series in an hourly block, control run first."""
+    members = sorted(key for key in hourly if key.startswith(f'{variable}_member'))
+    return [variable, *members]
+
+
+def hour_index(hourly: dict, when: datetime) -> int:
+    """Index of the hour in an hourly block closest to a time (UTC)."""
+    first = datetime.fromisoformat(hourly['time'][0])
+    offset = (when.replace(tzinfo=None) - first) / timedelta(hours=1)
+    return min(max(round(offset), 0), len(hourly['time']) - 1)
+
+
+def member_columns(blocks: list[dict], indices: list[int]) -> dict[str, list]:
+    """Weather fields of every member at every waypoint.
+
+    Args:
+        blocks: Ensemble hourly block of each waypoint's location
+        indices: Hour index of each waypoint's arrival in its block
+
+    Returns:
+        Flat member-major columns keyed like weather records (value for member
+        m at waypoint w at m * len(blocks) + w), including rolling rain and
+        snowfall accumulations
+    """
+    keys = {
+        variable: member_keys(blocks[0], variable)
+        for variable, _ in ENSEMBLE_VARIABLES.values()
+    }
+    members = len(keys['temperature_2m'])
+    cells = [(member, w) for member in range(members) for w in range(len(blocks))]
+
+    def series(variable: str, member: int, w: int) -> list:
+        names = keys[variable]
+        # Some variables have fewer members, or only the control run
+        if member >= len(names):
+            return []
+        return blocks[w].get(names[member], [])
+
+    columns: dict[str, list] = {}
+    for field, (variable, default) in ENSEMBLE_VARIABLES.items():
+        column = []
+        for member, w in cells:
+            values = series(variable, member, w)
+            value = values[indices[w]] if indices[w] < len(values) else None
+            column.append(default if value is None else value)
+        columns[field] = column
+
+    longest = max(ACCUMULATION_WINDOWS)
+    for variable, unit in (('rain', 'mm'), ('snowfall', 'cm')):
+        windows = {hours: [] for hours in ACCUMULATION_WINDOWS}
+        for member, w in cells:
+            # The hours before the waypoint's, as in weather_at_hour()
+            end = indices[w]
+            recent = [
+                v or 0.0
+                for v in series(variable, member, w)[max(0, end - longest) : end]
+            ]
+            for hours, column in windows.items():
+                column.append(sum(recent[-hours:]))
+        for hours, column in windows.items():
+            columns[f'{variable}_{hours}h_{unit}'] = column
+    return columns
+
+
+def score_columns(
+    columns: dict[str, list], conditions: list[str], light: list[float]
+) -> list[float | None]:
+    """Danger scores for a flat members x waypoints array.
+
+    Args:
+        columns: Member-major columns from member_columns()
+        conditions: Weather condition of each cell
+        light: Light modifier of each waypoint, the same for all members
+
+    Returns:
+        The score of each cell, or None where its temperature is missing
+    """
+    scores: list[float | None] = []
+    for cell, condition in enumerate(conditions):
+        record = {key: values[cell] for key, values in columns.items()}
+        if record['temp_c'] is None:
+            scores.append(None)
+            continue
+        record['condition'] = condition
+        danger = sum(weather_components(record)) + light[cell % len(light)]
+        scores.append(min(danger, 10.0))
+    return scores
+
+
+def exceedance(
+    scores: list[float | None], waypoints: int, threshold: float
+) -> tuple[list[float | None], float | None]:
+    """Probability of reaching a danger score threshold.
+
+    Returns:
+        (probability at each waypoint, probability anywhere along the route),
+        as the fraction of the members scored there at or above the threshold,
+        or None where no member could be scored
+    """
+    members = len(scores) // waypoints
+
+    def share(hits: list[bool]) -> float | None:
+        return sum(hits) / len(hits) if hits else None
+
+    per_waypoint = [
+        share(
+            [score >= threshold for score in scores[w::waypoints] if score is not None]
+        )
+        for w in range(waypoints)
+    ]
+    reached = []
+    for m in range(members):
+        scored = [
+            s for s in scores[m * waypoints : (m + 1) * waypoints] if s is not None
+        ]
+        if scored:
+            reached.append(max(scored) >= threshold)
+    return per_waypoint, share(reached)
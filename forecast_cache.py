@@ -0,0 +1,84 @@
+"""Bounded in-memory cache of hourly forecast series.
+
+Fetched Open-Meteo hourly blocks are kept per forecast cell (coordinates rounded
+to CELL_DEG, finer than the forecast models resolve) for TTL_SECONDS, so that
+later requests for nearby waypoints can be answered without an upstream call,
+or degraded gracefully when the upstream is too slow. Each block keeps the
+location it was fetched for, for lookups that need exactly that location.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+CELL_DEG = 0.05
+# Forecast models are re-run hourly
+TTL_SECONDS = 3600
+MAX_CELLS = 20000
+
+_lock = threading.Lock()
+# Cell -> (time stored, location fetched for, hourly block)
+_blocks: OrderedDict[tuple[int, int], tuple[float, tuple[float, float], dict]] = (
+    OrderedDict()
+)
+
+
+def cell_key(lat: float, lon: float) -> tuple[int, int]:
+    return round(lat / CELL_DEG), round(lon / CELL_DEG)
+
+
+def put(lat: float, lon: float, hourly: dict) -> None:
+    """Store the hourly block fetched for a location."""
+    key = cell_key(lat, lon)
+    with _lock:
+        _blocks[key] = (time.monotonic(), (lat, lon), hourly)
+        _blocks.move_to_end(key)
+        while len(_blocks) > MAX_CELLS:
+            _blocks.popitem(last=False)
+
+
+def get(
+    lat: float,
+    lon: float,
+    when: datetime,
+    history_hours: int = 0,
+    exact: bool = False,
+) -> dict | None:
+    """The cached hourly block for a location if it is fresh and covers `when`.
+
+    `when` is compared with the block's (UTC) hour labels, ignoring tzinfo.
+
+    Args:
+        history_hours: Hours before `when` the block must also cover
+        exact: Only answer with a block fetched for this very location, not
+            one for elsewhere in its cell
+    """
+    key = cell_key(lat, lon)
+    with _lock:
+        entry = _blocks.get(key)
+        if entry is None:
+            return None
+        stored_at, location, hourly = entry
+        if time.monotonic() - stored_at > TTL_SECONDS:
+            del _blocks[key]
+            return None
+        if exact and location != (lat, lon):
+            return None
+        _blocks.move_to_end(key)
+
+    times = hourly['time']
+    when = when.replace(tzinfo=None)
+    first = datetime.fromisoformat(times[0])
+    last = datetime.fromisoformat(times[-1])
+    slack = timedelta(minutes=30)
+    if not first - slack <= when - timedelta(hours=history_hours):
+        return None
+    if when > last + slack:
+        return None
+    return hourly
+
+
+def clear() -> None:
+    with _lock:
+        _blocks.clear()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""Offline reverse geocoding of waypoints.
+
+A gazetteer of named places (towns, passes, landmarks) and of points sampled
+along named roads labels each waypoint with the nearest of each, so an
+assessment can say "I-70 near Vail Pass" without calling a geocoding API.
+
+Like the crash index, each layer is sorted by grid cell key into flat packed
+arrays that can be memory-mapped. A nearest-neighbor query binary-searches the
+query's cell, then rings of cells around it, stopping once no unsearched cell
+can hold anything closer than the best match so far.
+"""
+
+import bisect
+import csv
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from typing import Iterable, NamedTuple
+
+# Cell size in degrees: places are sparse, road points dense
+PLACE_CELL_DEG = 0.1
+ROAD_CELL_DEG = 0.01
+# Farthest a waypoint can be from a labeled place or road, in meters
+MAX_PLACE_M = 50_000.0
+MAX_ROAD_M = 1_000.0
+
+METERS_PER_DEG = 111320.0
+
+_MAGIC = b'STGAZ001'
+# magic, place cell size, road cell size, places, road points, name bytes
+_HEADER = struct.Struct('<8sddQQQ')
+
+
+def _cell(lat: float, lon: float, cell_deg: float) -> tuple[int, int]:
+    return int((lat + 90) // cell_deg), int((lon + 180) // cell_deg)
+
+
+def _cell_key(row: int, col: int, cell_deg: float) -> int:
+    return row * math.ceil(360 / cell_deg) + col
+
+
+class Layer(NamedTuple):
+    """Named points sorted by grid cell key."""
+
+    keys: array
+    lats: array
+    lons: array
+    # Index of each point's name in the gazetteer's names
+    names: array
+    cell_deg: float
+
+    @classmethod
+    def build(
+        cls, points: Iterable[tuple[float, float, int]], cell_deg: float
+    ) -> 'Layer':
+        keyed = sorted(
+            (_cell_key(*_cell(lat, lon, cell_deg), cell_deg), lat, lon, name)
+            for lat, lon, name in points
+        )
+        return cls(
+            array('q', (r[0] for r in keyed)),
+            array('f', (r[1] for r in keyed)),
+            array('f', (r[2] for r in keyed)),
+            array('I', (r[3] for r in keyed)),
+            cell_deg,
+        )
+
+    def nearest(self, lat: float, lon: float, max_m: float) -> tuple[int, float] | None:
+        """Closest point within max_m meters.
+
+        Returns:
+            (point index, distance in meters), or None if nothing is in range
+        """
+        kx = METERS_PER_DEG * math.cos(math.radians(lat))
+        # Narrowest side of a cell, the least distance gained per ring
+        cell_m = self.cell_deg * min(kx, METERS_PER_DEG)
+        row, col = _cell(lat, lon, self.cell_deg)
+        cols = _cell_key(1, 0, self.cell_deg)
+        keys, lats, lons = self.keys, self.lats, self.lons
+        best, best_sq = -1, max_m * max_m
+
+        # Cells in ring n are at least n - 1 whole cells away
+        for ring in range(int(max_m / cell_m) + 2):
+            if ring > 1 and ((ring - 1) * cell_m) ** 2 > best_sq:
+                break
+            # Keys of a row are contiguous, so the top and bottom rows of the
+            # ring are one range each and the rows between add two cells
+            spans = [(row - ring, col - ring, col + ring)]
+            if ring:
+                spans.append((row + ring, col - ring, col + ring))
+                for r in range(row - ring + 1, row + ring):
+                    spans.append((r, col - ring, col - ring))
+                    spans.append((r, col + ring, col + ring))
+            for r, first, last in spans:
+                lo = bisect.bisect_left(keys, r * cols + first)
+                hi = bisect.bisect_right(keys, r * cols + last, lo)
+                for i in range(lo, hi):
+                    dx = (lons[i] - lon) * kx
+                    dy = (lats[i] - lat) * METERS_PER_DEG
+                    d_sq = dx * dx + dy * dy
+                    if d_sq < best_sq:
+                        best, best_sq = i, d_sq
+        if best < 0:
+            return None
+        return best, math.sqrt(best_sq)
+
+
+class Gazetteer:
+    """Named places and roads for labeling waypoints."""
+
+    def __init__(self, names: list[str], places: Layer, roads: Layer):
+        self.names = names
+        self.places = places
+        self.roads = roads
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[tuple[str, float, float, str]]
+    ) -> 'Gazetteer':
+        """Build a gazetteer from (name, lat, lon, kind) records, where kind is
+        'place' or 'road'."""
+        names: dict[str, int] = {}
+        layers: dict[str, list[tuple[float, float, int]]] = {
+            'place': [],
+            'road': [],
+        }
+        for name, lat, lon, kind in records:
+            if kind not in layers:
+                raise ValueError(f'Unknown gazetteer kind: {kind}')
+            name_id = names.setdefault(name, len(names))
+            layers[kind].append((lat, lon, name_id))
+        return cls(
+            list(names),
+            Layer.build(layers['place'], PLACE_CELL_DEG),
+            Layer.build(layers['road'], ROAD_CELL_DEG),
+        )
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'Gazetteer':
+        """Build a gazetteer from a CSV file with name, lat, lon and optional
+        kind columns (kind defaults to place).
+
+        Roads are given as points along them, e.g. the nodes of OpenStreetMap
+        ways, one row per point.
+        """
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        return cls.from_records(
+            (
+                row['name'],
+                float(row['lat']),
+                float(row['lon']),
+                row.get('kind') or 'place',
+            )
+            for row in rows
+        )
+
+    def save(self, path: str) -> None:
+        """Write the gazetteer as a packed file that load() can memory-map."""
+        names = '\n'.join(self.names).encode()
+        with open(path, 'wb') as f:
+            f.write(
+                _HEADER.pack(
+                    _MAGIC,
+                    self.places.cell_deg,
+                    self.roads.cell_deg,
+                    len(self.places.keys),
+                    len(self.roads.keys),
+                    len(names),
+                )
+            )
+            # Padded so the arrays that follow stay 8-byte aligned
+            f.write(names + bytes(-len(names) % 8))
+            for layer in (self.places, self.roads):
+                for arr in layer[:4]:
+                    arr.tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> 'Gazetteer':
+        """Memory-map a packed gazetteer written by save()."""
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, place_deg, road_deg, n_places, n_roads, n_bytes = _HEADER.unpack_from(
+            buf
+        )
+        if magic != _MAGIC:
+            raise ValueError(f'Not a gazetteer file: {path}')
+
+        offset = _HEADER.size
+        names = bytes(buf[offset : offset + n_bytes]).decode().split('\n')
+        offset += n_bytes + -n_bytes % 8
+        view = memoryview(buf)
+        layers = []
+        for count, cell_deg in ((n_places, place_deg), (n_roads, road_deg)):
+            columns = []
+            for typecode, size in (('q', 8), ('f', 4), ('f', 4), ('I', 4)):
+                columns.append(view[offset : offset + size * count].cast(typecode))
+                offset += size * count
+            layers.append(Layer(*columns, cell_deg))
+        return cls(names, *layers)
+
+    def label(self, coords: list[tuple[float, float]]) -> list[dict]:
+        """Nearest place and road of each point.
+
+        Returns:
+            For each point, 'place' and 'place_distance_km' (None if no place is
+            within MAX_PLACE_M) and 'road' (None if no road is within
+            MAX_ROAD_M)
+        """
+        labels = []
+        for lat, lon in coords:
+            place = self.places.nearest(lat, lon, MAX_PLACE_M)
+            road = self.roads.nearest(lat, lon, MAX_ROAD_M)
+            labels.append(
+                {
+                    'place': self.names[self.places.names[place[0]]] if place else None,
+                    'place_distance_km': round(place[1] / 1000, 1) if place else None,
+                    'road': self.names[self.roads.names[road[0]]] if road else None,
+                }
+            )
+        return labels
+
+
+@lru_cache(maxsize=None)
+def load_gazetteer(path: str) -> Gazetteer:
+    """Load a gazetteer once per process, building it if given a CSV file."""
+    if path.endswith('.csv'):
+        return Gazetteer.from_csv(path)
+    return Gazetteer.load(path)
+
+
+def default_gazetteer() -> Gazetteer | None:
+    """The gazetteer configured by SAFE_TRAVELS_GAZETTEER, if any."""
+    path = os.environ.get('SAFE_TRAVELS_GAZETTEER')
+    if not path:
+        return None
+    return load_gazetteer(path)
+
+
+if __name__ == '__main__':
+    # Usage: gazetteer.py places.csv gazetteer.idx
+    Gazetteer.from_csv(sys.argv[1]).save(sys.argv[2])
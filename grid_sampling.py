@@ -0,0 +1,83 @@
+"""Weather for waypoints interpolated from a coarse lattice of forecast points.
+
+Forecast models resolve weather on grids of roughly 2-11 km, so fetching a
+separate forecast for every waypoint of a densely sampled route mostly fetches
+the same model cells again. Instead, each waypoint is mapped to the four
+corners of the lattice cell around it, only the distinct corners are fetched,
+and each waypoint's hourly series is blended from its corners with bilinear
+weights. The blend is done over whole hourly series at once, and records for the
+hours either side of an arrival time are then interpolated linearly in time.
+"""
+
+import math
+from typing import Any
+
+# Lattice spacing in degrees (about 11 km north-south)
+DEFAULT_SPACING_DEG = 0.1
+# Hourly variables that are categories rather than quantities
+CATEGORICAL_VARIABLES = ('time', 'weather_code')
+
+
+def lattice_point(i: int, j: int, spacing: float) -> tuple[float, float]:
+    """Coordinates of lattice index (i, j), rounded to keep keys stable."""
+    return round(i * spacing, 6), round(j * spacing, 6)
+
+
+def lattice_corners(
+    lat: float, lon: float, spacing: float = DEFAULT_SPACING_DEG
+) -> list[tuple[tuple[int, int], float]]:
+    """The lattice corners around a point with their bilinear weights.
+
+    Corners with zero weight (when the point lies on a lattice line) are left
+    out, so a point exactly on a lattice point needs only that one.
+    """
+    fi, fj = lat / spacing, lon / spacing
+    i0, j0 = math.floor(fi), math.floor(fj)
+    wi, wj = fi - i0, fj - j0
+    corners = []
+    for di, w_i in ((0, 1 - wi), (1, wi)):
+        for dj, w_j in ((0, 1 - wj), (1, wj)):
+            weight = w_i * w_j
+            if weight > 1e-9:
+                corners.append(((i0 + di, j0 + dj), weight))
+    return corners
+
+
+def blend_hourly(blocks: list[dict], weights: list[float]) -> dict:
+    """Weighted average of hourly blocks covering the same hours.
+
+    Missing (None) values are skipped and the remaining weights renormalized.
+    Categorical variables are taken from the most heavily weighted block.
+    """
+    heaviest = blocks[max(range(len(blocks)), key=weights.__getitem__)]
+    blended: dict[str, Any] = {name: heaviest[name] for name in CATEGORICAL_VARIABLES}
+    for name in heaviest:
+        if name in CATEGORICAL_VARIABLES:
+            continue
+        series = []
+        for values in zip(*(block[name] for block in blocks)):
+            total = weights_sum = 0.0
+            for value, weight in zip(values, weights):
+                if value is not None:
+                    total += value * weight
+                    weights_sum += weight
+            series.append(total / weights_sum if weights_sum else None)
+        blended[name] = series
+    return blended
+
+
+def interpolate_records(before: dict, after: dict, fraction: float) -> dict:
+    """Linear interpolation between two weather records.
+
+    Numeric fields are interpolated; anything else (e.g. the condition) comes
+    from the nearer record.
+    """
+    nearer = before if fraction < 0.5 else after
+    result = {}
+    for name, value in nearer.items():
+        a, b = before.get(name), after.get(name)
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            result[name] = a + (b - a) * fraction
+        else:
+            result[name] = value
+    return result
@@ -0,0 +1,244 @@
+"""Memory-mapped lattice files of hourly values.
+
+A grid file holds float32 values for a regular lat/lon lattice over evenly
+spaced time steps, for one or more named variables. It starts with a small
+fixed header followed by the variable names and the values laid out as
+[time][lat][lon][variable], so all variables of one cell and hour are adjacent.
+Missing values are stored as NaN.
+"""
+
+import math
+import mmap
+import os
+import struct
+from array import array
+from datetime import datetime, timezone
+from typing import Iterable, Sequence
+
+_MAGIC = b'STGRID01'
+# magic, lat0, lon0, dlat, dlon, nlat, nlon, t0 (epoch s), dt (s), nt, nvars
+_HEADER = struct.Struct('<8sddddIIqIII')
+_NAME = struct.Struct('<32s')
+_EDGE_TOLERANCE = 1e-6
+
+
+def _epoch(when: datetime) -> float:
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+class GridFile:
+    """A lattice of hourly values, usually memory-mapped from disk."""
+
+    def __init__(
+        self,
+        lat0: float,
+        lon0: float,
+        dlat: float,
+        dlon: float,
+        nlat: int,
+        nlon: int,
+        t0: datetime,
+        dt_seconds: int,
+        nt: int,
+        variables: Sequence[str],
+        values,
+    ):
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.dlat = dlat
+        self.dlon = dlon
+        self.nlat = nlat
+        self.nlon = nlon
+        self.t0 = t0
+        self.dt_seconds = dt_seconds
+        self.nt = nt
+        self.variables = tuple(variables)
+        self.values = values
+        self._t0_epoch = _epoch(t0)
+
+    @classmethod
+    def open(cls, path: str) -> 'GridFile':
+        """Memory-map a grid file written by write_grid()."""
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        fields = _HEADER.unpack_from(buf)
+        if fields[0] != _MAGIC:
+            raise ValueError(f'Not a grid file: {path}')
+        _, lat0, lon0, dlat, dlon, nlat, nlon, t0, dt, nt, nvars = fields
+
+        offset = _HEADER.size
+        variables = []
+        for _ in range(nvars):
+            (name,) = _NAME.unpack_from(buf, offset)
+            variables.append(name.rstrip(b'\0').decode())
+            offset += _NAME.size
+
+        count = nt * nlat * nlon * nvars
+        values = memoryview(buf)[offset : offset + 4 * count].cast('f')
+        return cls(
+            lat0,
+            lon0,
+            dlat,
+            dlon,
+            nlat,
+            nlon,
+            datetime.fromtimestamp(t0, timezone.utc),
+            dt,
+            nt,
+            variables,
+            values,
+        )
+
+    @property
+    def lat1(self) -> float:
+        return self.lat0 + (self.nlat - 1) * self.dlat
+
+    @property
+    def lon1(self) -> float:
+        return self.lon0 + (self.nlon - 1) * self.dlon
+
+    def time_at(self, step: int) -> datetime:
+        return datetime.fromtimestamp(
+            self._t0_epoch + step * self.dt_seconds, timezone.utc
+        )
+
+    def _fractional_index(
+        self, lat: float, lon: float, when: datetime
+    ) -> tuple[float, float, float] | None:
+        index = (
+            (lat - self.lat0) / self.dlat,
+            (lon - self.lon0) / self.dlon,
+            (_epoch(when) - self._t0_epoch) / self.dt_seconds,
+        )
+        clamped = []
+        for f, n in zip(index, (self.nlat, self.nlon, self.nt)):
+            # Allow for rounding error on the lattice edges
+            if not -_EDGE_TOLERANCE <= f <= n - 1 + _EDGE_TOLERANCE:
+                return None
+            clamped.append(min(max(f, 0.0), n - 1))
+        return clamped[0], clamped[1], clamped[2]
+
+    def contains(self, lat: float, lon: float, when: datetime) -> bool:
+        return self._fractional_index(lat, lon, when) is not None
+
+    def value(self, step: int, i: int, j: int, variable: int = 0) -> float:
+        """Raw value at a lattice index."""
+        nvars = len(self.variables)
+        return self.values[((step * self.nlat + i) * self.nlon + j) * nvars + variable]
+
+    def sample(
+        self, lat: float, lon: float, when: datetime, partial: bool = False
+    ) -> dict[str, float | None] | None:
+        """Interpolate every variable in space and time at a point.
+
+        Uses trilinear interpolation over the surrounding lattice cells and
+        hours, skipping missing corners.
+
+        Args:
+            partial: Give None for variables whose surrounding values are all
+                missing, rather than no result at all
+
+        Returns:
+            Mapping of variable name to value, or None if the point or time is
+            outside the grid or all surrounding values of a variable are
+            missing.
+        """
+        index = self._fractional_index(lat, lon, when)
+        if index is None:
+            return None
+        fi, fj, ft = index
+
+        # Lower corner of the surrounding cell, clamped so the far edge works
+        s0 = min(int(ft), self.nt - 2) if self.nt > 1 else 0
+        i0 = min(int(fi), self.nlat - 2) if self.nlat > 1 else 0
+        j0 = min(int(fj), self.nlon - 2) if self.nlon > 1 else 0
+        ws, wi, wj = ft - s0, fi - i0, fj - j0
+
+        corners = []
+        for ds, w_s in ((0, 1 - ws), (1, ws)):
+            for di, w_i in ((0, 1 - wi), (1, wi)):
+                for dj, w_j in ((0, 1 - wj), (1, wj)):
+                    weight = w_s * w_i * w_j
+                    if weight > 0:
+                        corners.append((s0 + ds, i0 + di, j0 + dj, weight))
+
+        result = {}
+        for v, name in enumerate(self.variables):
+            total = 0.0
+            weights = 0.0
+            for step, i, j, weight in corners:
+                x = self.value(step, i, j, v)
+                if not math.isnan(x):
+                    total += x * weight
+                    weights += weight
+            if weights == 0:
+                if not partial:
+                    return None
+                result[name] = None
+            else:
+                result[name] = total / weights
+
+        return result
+
+
+def write_grid(
+    path: str,
+    lat0: float,
+    lon0: float,
+    dlat: float,
+    dlon: float,
+    nlat: int,
+    nlon: int,
+    t0: datetime,
+    dt_seconds: int,
+    nt: int,
+    variables: Sequence[str],
+    values: Iterable[float],
+) -> None:
+    """Write a grid file, replacing any existing file atomically.
+
+    Args:
+        values: nt * nlat * nlon * len(variables) values laid out as
+            [time][lat][lon][variable]
+    """
+    data = values if isinstance(values, array) else array('f', values)
+    expected = nt * nlat * nlon * len(variables)
+    if len(data) != expected:
+        raise ValueError(f'Expected {expected} grid values, got {len(data)}')
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(
+            _HEADER.pack(
+                _MAGIC,
+                lat0,
+                lon0,
+                dlat,
+                dlon,
+                nlat,
+                nlon,
+                int(_epoch(t0)),
+                dt_seconds,
+                nt,
+                len(variables),
+            )
+        )
+        for name in variables:
+            f.write(_NAME.pack(name.encode()))
+        data.tofile(f)
+    os.replace(tmp_path, path)
+
+
+_open_grids: dict[str, tuple[float, GridFile]] = {}
+
+
+def load_grid(path: str) -> GridFile:
+    """Open a grid file once per process, reopening it when it is replaced."""
+    mtime = os.stat(path).st_mtime
+    cached = _open_grids.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = _open_grids[path] = (mtime, GridFile.open(path))
+    return cached[1]
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Precompute a regional danger heatmap for fast route assessments.
+
+Run this as a background job shortly after each forecast run (e.g. hourly from
+cron). It fetches hourly forecasts for a regular lattice over the service area,
+scores every cell and hour and writes the scores to a memory-mapped grid file.
+Point SAFE_TRAVELS_HEATMAP at that file and assess_route_danger samples it for
+waypoints inside the grid instead of fetching their weather.
+
+Usage:
+    heatmap.py OUTPUT SOUTH WEST NORTH EAST [--resolution 0.1] [--hours 48]
+"""
+
+import argparse
+import math
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from gridfile import write_grid
+from weather_providers import fetch_hourly_forecasts
+from weather_scoring import (
+    PRECIP_HISTORY_HOURS,
+    running_sums,
+    score_weather,
+    weather_at_hour,
+)
+
+DEFAULT_RESOLUTION = 0.1
+DEFAULT_HOURS = 48
+# Lattice points per Open-Meteo request
+FETCH_CHUNK_SIZE = 100
+
+
+def build_heatmap(
+    path: str,
+    south: float,
+    west: float,
+    north: float,
+    east: float,
+    resolution: float = DEFAULT_RESOLUTION,
+    hours: int = DEFAULT_HOURS,
+    start: datetime | None = None,
+) -> None:
+    """Fetch, score and write a danger heatmap for a bounding box.
+
+    Args:
+        path: Output grid file
+        south, west, north, east: Bounding box of the service area in degrees
+        resolution: Lattice spacing in degrees
+        hours: Number of forecast hours to cover
+        start: First hour to cover (defaults to the current hour, UTC)
+    """
+    if start is None:
+        start = datetime.now(timezone.utc)
+    elif start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    start = start.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+    nlat = int(math.floor((north - south) / resolution + 1e-9)) + 1
+    nlon = int(math.floor((east - west) / resolution + 1e-9)) + 1
+    coords = [
+        (round(south + i * resolution, 4), round(west + j * resolution, 4))
+        for i in range(nlat)
+        for j in range(nlon)
+    ]
+
+    # [hour][lat][lon], missing values stay NaN
+    scores = array('f', [math.nan]) * (hours * nlat * nlon)
+    first_hour = start.strftime('%Y-%m-%dT%H:00')
+
+    for chunk_start in range(0, len(coords), FETCH_CHUNK_SIZE):
+        chunk = coords[chunk_start : chunk_start + FETCH_CHUNK_SIZE]
+        forecasts = fetch_hourly_forecasts(
+            chunk,
+            start - timedelta(hours=PRECIP_HISTORY_HOURS),
+            start + timedelta(hours=hours - 1),
+        )
+        for cell, hourly in enumerate(forecasts, start=chunk_start):
+            if first_hour not in hourly['time']:
+                continue
+            offset = hourly['time'].index(first_hour)
+            rain_sums = running_sums(hourly['rain'])
+            snow_sums = running_sums(hourly['snowfall'])
+            for step in range(min(hours, len(hourly['time']) - offset)):
+                wd = weather_at_hour(hourly, offset + step, rain_sums, snow_sums)
+                if wd['temp_c'] is None:
+                    continue
+                scores[step * nlat * nlon + cell] = score_weather(wd)
+
+    write_grid(
+        path,
+        south,
+        west,
+        resolution,
+        resolution,
+        nlat,
+        nlon,
+        start,
+        3600,
+        hours,
+        ['danger_score'],
+        scores,
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute a danger heatmap')
+    parser.add_argument('output')
+    parser.add_argument('south', type=float)
+    parser.add_argument('west', type=float)
+    parser.add_argument('north', type=float)
+    parser.add_argument('east', type=float)
+    parser.add_argument('--resolution', type=float, default=DEFAULT_RESOLUTION)
+    parser.add_argument('--hours', type=int, default=DEFAULT_HOURS)
+    args = parser.parse_args()
+
+    build_heatmap(
+        args.output,
+        args.south,
+        args.west,
+        args.north,
+        args.east,
+        resolution=args.resolution,
+        hours=args.hours,
+    )
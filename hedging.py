@@ -0,0 +1,175 @@
+"""Hedged upstream requests to cut tail latency.
+
+If an upstream call has not returned after an adaptive delay (a high percentile
+of that upstream's recent latencies), a duplicate is fired and whichever answers
+first wins. A per-upstream budget caps hedges at a small fraction of requests so
+load never grows by more than a few percent.
+
+Metrics per upstream name:
+    <name>.requests, <name>.hedges, <name>.hedge_wins counters
+    <name>.hedge_pool_full counter: calls made unhedged, or not hedged, because
+        every hedging worker was busy
+    <name>.hedge_saved_seconds counter: time saved when the hedge won
+    <name>.hedge_rate gauge: hedges / requests
+    <name> timing: latency of primary requests
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+import metrics
+
+# Latency percentile after which a request is hedged
+HEDGE_PERCENTILE = 0.95
+# Never hedge sooner than this, in seconds
+MIN_HEDGE_DELAY = 0.05
+# Latency samples required before hedging starts
+MIN_SAMPLES = 20
+# Fraction of requests that may be hedged
+HEDGE_BUDGET = 0.05
+# Unused hedge budget that can accumulate for bursts
+MAX_BUDGET_TOKENS = 10.0
+
+MAX_WORKERS = 32
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='hedge')
+# A call only goes to the executor with a worker reserved for it, so it never
+# queues behind others
+_slots = threading.BoundedSemaphore(MAX_WORKERS)
+_budget_lock = threading.Lock()
+_budget_tokens: dict[str, float] = {}
+
+
+def hedge_delay(name: str) -> float | None:
+    """Seconds to wait before hedging, or None while still warming up."""
+    if metrics.sample_count(name) < MIN_SAMPLES:
+        return None
+    return max(MIN_HEDGE_DELAY, metrics.percentile(name, HEDGE_PERCENTILE))
+
+
+def _earn_budget(name: str) -> None:
+    with _budget_lock:
+        tokens = _budget_tokens.get(name, 0.0) + HEDGE_BUDGET
+        _budget_tokens[name] = min(tokens, MAX_BUDGET_TOKENS)
+
+
+def _spend_budget(name: str) -> bool:
+    with _budget_lock:
+        if _budget_tokens.get(name, 0.0) < 1:
+            return False
+        _budget_tokens[name] -= 1
+        return True
+
+
+def _submit(call: Callable) -> Future | None:
+    """Run a call on a reserved worker, or None if every worker is busy."""
+    if not _slots.acquire(blocking=False):
+        return None
+    future = _executor.submit(call)
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def _timed(
+    name: str, fn: Callable, args: tuple, kwargs: dict, started: threading.Event
+) -> Callable:
+    def call() -> tuple[Any, float]:
+        started.set()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs), time.perf_counter()
+        finally:
+            metrics.observe(name, time.perf_counter() - start)
+
+    return call
+
+
+def hedged_call(name: str, fn: Callable, *args, **kwargs) -> Any:
+    """Call fn(*args, **kwargs), hedging it if it is slow.
+
+    Args:
+        name: Upstream name, used for latency tracking, budget and metrics
+        fn: Idempotent call to make (e.g. requests.get)
+
+    Returns:
+        The result of whichever call finished first. If both calls fail, the
+        primary call's exception is raised.
+    """
+    metrics.increment(f'{name}.requests')
+    _update_hedge_rate(name)
+    _earn_budget(name)
+
+    delay = hedge_delay(name)
+    started = threading.Event()
+    primary = None
+    if delay is not None:
+        primary = _submit(_timed(name, fn, args, kwargs, started))
+        if primary is None:
+            metrics.increment(f'{name}.hedge_pool_full')
+    if primary is None:
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            metrics.observe(name, time.perf_counter() - start)
+
+    # The delay runs from when the call starts, which its reserved worker does
+    # straight away: the latencies it comes from don't include that either
+    started.wait()
+    done, _ = wait([primary], timeout=delay)
+    if done or not _spend_budget(name):
+        return primary.result()[0]
+
+    # The hedge's latency is not recorded, so it doesn't skew the threshold
+    hedge = _submit(lambda: (fn(*args, **kwargs), time.perf_counter()))
+    if hedge is None:
+        metrics.increment(f'{name}.hedge_pool_full')
+        with _budget_lock:
+            _budget_tokens[name] += 1
+        return primary.result()[0]
+    metrics.increment(f'{name}.hedges')
+    _update_hedge_rate(name)
+
+    pending = {primary, hedge}
+    winner: Future | None = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                winner = future
+                break
+        if winner is not None:
+            break
+
+    if winner is None:
+        return primary.result()[0]
+
+    # Requests in flight can't be aborted; cancel() only stops calls that
+    # haven't started, and the loser's result is discarded
+    for future in pending:
+        future.cancel()
+
+    result, finished_at = winner.result()
+    if winner is hedge:
+        metrics.increment(f'{name}.hedge_wins')
+        primary.add_done_callback(lambda f: _record_saving(name, f, finished_at))
+    return result
+
+
+def _record_saving(name: str, primary: Future, hedge_finished_at: float) -> None:
+    if primary.cancelled() or primary.exception() is not None:
+        return
+    _, primary_finished_at = primary.result()
+    metrics.increment(
+        f'{name}.hedge_saved_seconds', max(0.0, primary_finished_at - hedge_finished_at)
+    )
+
+
+def _update_hedge_rate(name: str) -> None:
+    requests = metrics.counter(f'{name}.requests')
+    if requests:
+        metrics.set_gauge(
+            f'{name}.hedge_rate', metrics.counter(f'{name}.hedges') / requests
+        )
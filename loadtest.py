@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""Load test the MCP server over its streamable-HTTP transport.
+
+Starts server.py in a subprocess with the streamable-HTTP transport, pointing
+its Google and Open-Meteo calls at a local stand-in that answers with synthetic
+data after a configurable latency. Many concurrent MCP client sessions then call
+assess_route_danger and derive_route in a configurable mix, and the run is
+summarized as throughput, latency percentiles and error rate per tool, along
+with the server's resident memory over time.
+
+Usage:
+    loadtest.py [--clients 20] [--duration 60] [--upstream-latency 0.05] [--json]
+        [--mix assess_route_danger=3,derive_route=1]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import polyline
+from fastmcp import Client
+
+from road_graph import haversine_m
+
+DEFAULT_CLIENTS = 20
+DEFAULT_DURATION = 60
+DEFAULT_MIX = 'assess_route_danger=3,derive_route=1'
+DEFAULT_UPSTREAM_LATENCY = 0.05
+# Seconds between server memory samples
+RSS_INTERVAL = 1.0
+# Points on each synthetic route polyline
+ROUTE_POINTS = 50
+# Synthetic travel speed for route durations
+ROUTE_SPEED_KPH = 80
+
+CITIES = (
+    'Denver, CO',
+    'Boulder, CO',
+    'Vail, CO',
+    'Grand Junction, CO',
+    'Colorado Springs, CO',
+    'Grayson, GA',
+    'Dahlonega, GA',
+    'Atlanta, GA',
+    'Salt Lake City, UT',
+    'Cheyenne, WY',
+)
+
+
+def city_coordinates(address: str) -> tuple[float, float]:
+    """Deterministic stand-in coordinates for an address, in the contiguous US."""
+    digest = hashlib.sha256(address.encode()).digest()
+    lat = 30 + digest[0] / 255 * 15
+    lon = -120 + digest[1] / 255 * 40
+    return round(lat, 4), round(lon, 4)
+
+
+def synthetic_hourly(lat: float, start: datetime, end: datetime) -> dict:
+    """An Open-Meteo hourly block with plausible winter weather."""
+    hours = int((end - start).total_seconds() // 3600) + 1
+    times = [start + timedelta(hours=h) for h in range(hours)]
+    temps = [
+        round(25 - (lat - 30) - 6 * math.cos((t.hour - 3) / 24 * 2 * math.pi), 1)
+        for t in times
+    ]
+    return {
+        'time': [t.strftime('%Y-%m-%dT%H:00') for t in times],
+        'temperature_2m': temps,
+        'wind_speed_10m': [15.0] * hours,
+        'wind_gusts_10m': [25.0] * hours,
+        'weather_code': [71 if temp < 0 else 3 for temp in temps],
+        'precipitation': [0.2] * hours,
+        'rain': [0.0 if temp < 0 else 0.2 for temp in temps],
+        'snowfall': [0.2 if temp < 0 else 0.0 for temp in temps],
+        'snow_depth': [0.0] * hours,
+        'visibility': [8000.0] * hours,
+        'soil_temperature_0cm': [temp - 1 for temp in temps],
+        'dew_point_2m': [temp - 3 for temp in temps],
+    }
+
+
+def synthetic_route(
+    origin: tuple[float, float], destination: tuple[float, float]
+) -> dict:
+    """A Routes API response for a straight road between two points."""
+    points = [
+        (
+            origin[0] + (destination[0] - origin[0]) * k / (ROUTE_POINTS - 1),
+            origin[1] + (destination[1] - origin[1]) * k / (ROUTE_POINTS - 1),
+        )
+        for k in range(ROUTE_POINTS)
+    ]
+    distance = haversine_m(*origin, *destination)
+    return {
+        'routes': [
+            {
+                'duration': f'{round(distance / (ROUTE_SPEED_KPH / 3.6))}s',
+                'distanceMeters': round(distance),
+                'polyline': {'encodedPolyline': polyline.encode(points)},
+            }
+        ]
+    }
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    def _reply(self, body) -> None:
+        time.sleep(self.server.latency * random.uniform(0.5, 1.5))
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == '/geocode':
+            lat, lng = city_coordinates(query['address'][0])
+            self._reply(
+                {'results': [{'geometry': {'location': {'lat': lat, 'lng': lng}}}]}
+            )
+        elif url.path == '/forecast':
+            lats = [float(x) for x in query['latitude'][0].split(',')]
+            start = datetime.fromisoformat(query['start_hour'][0])
+            end = datetime.fromisoformat(query['end_hour'][0])
+            blocks = [{'hourly': synthetic_hourly(lat, start, end)} for lat in lats]
+            self._reply(blocks[0] if len(blocks) == 1 else blocks)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/routes':
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        origin = body['origin']['location']['latLng']
+        destination = body['destination']['location']['latLng']
+        self._reply(
+            synthetic_route(
+                (origin['latitude'], origin['longitude']),
+                (destination['latitude'], destination['longitude']),
+            )
+        )
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInUpstream:
+    """Local stand-in for the Geocoding, Routes and Open-Meteo APIs."""
+
+    def __init__(self, latency: float = DEFAULT_UPSTREAM_LATENCY):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _StandInHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}'
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self) -> 'StandInUpstream':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def environment(self) -> dict[str, str]:
+        """Environment variables pointing the server at the stand-in."""
+        return {
+            'GOOGLE_MAPS_API_KEY': 'load-test',
+            'SAFE_TRAVELS_GEOCODE_URL': f'{self.url}/geocode',
+            'SAFE_TRAVELS_ROUTES_URL': f'{self.url}/routes',
+            'SAFE_TRAVELS_OPEN_METEO_URL': f'{self.url}/forecast',
+        }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(
+    env: dict[str, str], port: int, timeout: float = 30
+) -> subprocess.Popen:
+    """Start server.py with the streamable-HTTP transport and wait until it listens."""
+    code = (
+        'import server; '
+        f"server.mcp.run(transport='streamable-http', host='127.0.0.1', port={port}, "
+        'show_banner=False)'
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-c', code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    give_up = time.monotonic() + timeout
+    while time.monotonic() < give_up:
+        if process.poll() is not None:
+            raise RuntimeError('Server exited during startup')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'Server did not listen on port {port}')
+
+
+def rss_bytes(pid: int) -> int | None:
+    """Resident memory of a process (Linux only), or None if unknown."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """Parse "tool=weight,tool=weight" into a weight per tool."""
+    weights = {}
+    for part in mix.split(','):
+        tool, _, weight = part.partition('=')
+        weights[tool.strip()] = float(weight) if weight else 1.0
+    return weights
+
+
+def tool_arguments(tool: str, rng: random.Random) -> dict:
+    origin, destination = rng.sample(CITIES, 2)
+    arguments = {'origin': origin, 'destination': destination}
+    if tool == 'assess_route_danger':
+        departure = datetime.now() + timedelta(hours=rng.randint(0, 24))
+        arguments['departure_time'] = departure.strftime('%Y-%m-%dT%H:00:00')
+    return arguments
+
+
+async def _client_session(
+    url: str,
+    mix: dict[str, float],
+    stop_at: float,
+    samples: list[tuple[str, float, bool]],
+    seed: int,
+) -> None:
+    rng = random.Random(seed)
+    tools, weights = list(mix), list(mix.values())
+    async with Client(url) as client:
+        while time.monotonic() < stop_at:
+            tool = rng.choices(tools, weights)[0]
+            start = time.perf_counter()
+            try:
+                await client.call_tool(tool, tool_arguments(tool, rng))
+                ok = True
+            except Exception:
+                ok = False
+            samples.append((tool, time.perf_counter() - start, ok))
+
+
+async def _sample_rss(
+    pid: int, start: float, stop_at: float, rss: list[tuple[float, int]]
+) -> None:
+    while time.monotonic() < stop_at:
+        value = rss_bytes(pid)
+        if value is not None:
+            rss.append((round(time.monotonic() - start, 1), value))
+        await asyncio.sleep(RSS_INTERVAL)
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(samples: list[tuple[str, float, bool]], elapsed: float) -> dict:
+    """Throughput, latency percentiles (ms) and error rate, per tool and overall."""
+
+    def stats(rows: list[tuple[str, float, bool]]) -> dict:
+        latencies = sorted(latency for _, latency, _ in rows)
+        errors = sum(1 for _, _, ok in rows if not ok)
+        result = {
+            'requests': len(rows),
+            'errors': errors,
+            'error_rate': round(errors / len(rows), 4) if rows else 0.0,
+            'throughput_rps': round(len(rows) / elapsed, 2) if elapsed else 0.0,
+        }
+        if latencies:
+            for q in (0.5, 0.95, 0.99):
+                result[f'p{round(q * 100)}_ms'] = round(
+                    _percentile(latencies, q) * 1000, 1
+                )
+        return result
+
+    by_tool: dict[str, list] = {}
+    for row in samples:
+        by_tool.setdefault(row[0], []).append(row)
+    return {
+        'overall': stats(samples),
+        'tools': {tool: stats(rows) for tool, rows in sorted(by_tool.items())},
+    }
+
+
+async def run_load(
+    url: str,
+    pid: int,
+    clients: int = DEFAULT_CLIENTS,
+    duration: float = DEFAULT_DURATION,
+    mix: dict[str, float] | None = None,
+) -> dict:
+    """Drive a running server with concurrent client sessions.
+
+    Args:
+        url: MCP endpoint of the server (e.g. http://127.0.0.1:8000/mcp)
+        pid: Server process ID, for memory sampling
+        clients: Number of concurrent client sessions
+        duration: Seconds to keep issuing calls
+        mix: Relative weight of each tool in the call mix
+
+    Returns:
+        summarize() output plus the run parameters and (seconds, bytes) samples
+        of server RSS
+    """
+    mix = mix or parse_mix(DEFAULT_MIX)
+    samples: list[tuple[str, float, bool]] = []
+    rss: list[tuple[float, int]] = []
+    start = time.monotonic()
+    stop_at = start + duration
+    await asyncio.gather(
+        _sample_rss(pid, start, stop_at, rss),
+        *(_client_session(url, mix, stop_at, samples, seed) for seed in range(clients)),
+    )
+    elapsed = time.monotonic() - start
+
+    report = summarize(samples, elapsed)
+    report['clients'] = clients
+    report['duration_s'] = round(elapsed, 1)
+    report['rss_bytes'] = rss
+    return report
+
+
+def load_test(
+    clients: int = DEFAULT_CLIENTS,
+    duration: float = DEFAULT_DURATION,
+    mix: dict[str, float] | None = None,
+    upstream_latency: float = DEFAULT_UPSTREAM_LATENCY,
+) -> dict:
+    """Start the stand-in upstream and the server, run the load and stop both."""
+    port = _free_port()
+    with StandInUpstream(upstream_latency) as upstream:
+        server = start_server(upstream.environment(), port)
+        try:
+            return asyncio.run(
+                run_load(
+                    f'http://127.0.0.1:{port}/mcp', server.pid, clients, duration, mix
+                )
+            )
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+
+def _print_report(report: dict) -> None:
+    print(f'{report["clients"]} clients for {report["duration_s"]}s')
+    print(
+        f'{"tool":<22}{"requests":>10}{"rps":>9}{"p50 ms":>9}{"p95 ms":>9}'
+        f'{"p99 ms":>9}{"errors":>8}'
+    )
+    rows = [*report['tools'].items(), ('overall', report['overall'])]
+    for tool, stats in rows:
+        print(
+            f'{tool:<22}{stats["requests"]:>10}{stats["throughput_rps"]:>9}'
+            f'{stats.get("p50_ms", "-"):>9}{stats.get("p95_ms", "-"):>9}'
+            f'{stats.get("p99_ms", "-"):>9}{stats["error_rate"]:>8.1%}'
+        )
+    if report['rss_bytes']:
+        print(
+            'server RSS (MB): '
+            + ' '.join(
+                f'{seconds:g}s={value / 2**20:.0f}'
+                for seconds, value in report['rss_bytes']
+            )
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the MCP server')
+    parser.add_argument('--clients', type=int, default=DEFAULT_CLIENTS)
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION)
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument(
+        '--upstream-latency', type=float, default=DEFAULT_UPSTREAM_LATENCY
+    )
+    parser.add_argument('--json', action='store_true', help='Print the raw report')
+    args = parser.parse_args()
+
+    report = load_test(
+        clients=args.clients,
+        duration=args.duration,
+        mix=parse_mix(args.mix),
+        upstream_latency=args.upstream_latency,
+    )
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
@@ -0,0 +1,89 @@
+"""In-process server metrics.
+
+Counters, gauges and recent latency samples, kept in memory and exported as a
+plain dict by the get_metrics tool. All functions are thread-safe.
+"""
+
+import threading
+from collections import deque
+
+# Latency samples kept per timing for percentile estimates
+TIMING_WINDOW = 1000
+
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_gauges: dict[str, float] = {}
+_timings: dict[str, deque] = {}
+
+
+def increment(name: str, value: float = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def counter(name: str) -> float:
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def set_gauge(name: str, value: float) -> None:
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, seconds: float) -> None:
+    """Record a latency sample."""
+    with _lock:
+        samples = _timings.get(name)
+        if samples is None:
+            samples = _timings[name] = deque(maxlen=TIMING_WINDOW)
+        samples.append(seconds)
+
+
+def _percentile(sorted_samples: list[float], q: float) -> float:
+    index = min(len(sorted_samples) - 1, int(q * len(sorted_samples)))
+    return sorted_samples[index]
+
+
+def percentile(name: str, q: float) -> float | None:
+    """The q-quantile (0-1) of recent samples, or None if there are none."""
+    with _lock:
+        samples = sorted(_timings.get(name, ()))
+    if not samples:
+        return None
+    return _percentile(samples, q)
+
+
+def sample_count(name: str) -> int:
+    with _lock:
+        return len(_timings.get(name, ()))
+
+
+def snapshot() -> dict:
+    """All metrics, with latency percentiles in milliseconds."""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        timings = {name: sorted(samples) for name, samples in _timings.items()}
+
+    return {
+        'counters': counters,
+        'gauges': gauges,
+        'timings_ms': {
+            name: {
+                'count': len(samples),
+                'p50': round(_percentile(samples, 0.5) * 1000, 1),
+                'p95': round(_percentile(samples, 0.95) * 1000, 1),
+                'p99': round(_percentile(samples, 0.99) * 1000, 1),
+            }
+            for name, samples in timings.items()
+            if samples
+        },
+    }
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
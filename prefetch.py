@@ -0,0 +1,167 @@
+"""Predictive prefetch of frequently queried corridors.
+
+Queries are very repetitive: the same origin and destination at the same hour
+of the day. Every assessment is recorded in a small in-memory query log, and
+corridors queried at least HOT_MIN_QUERIES times within QUERY_WINDOW are hot.
+Shortly after each hourly forecast update, a background thread warms the
+geocode, route and forecast caches for hot corridors departing within the next
+PREFETCH_LEAD, so the first assessment of the morning commute is a cache hit.
+
+Warming is paced so that upstream requests (live traffic included) stay under
+SAFE_TRAVELS_PREFETCH_RATE requests per second. Set SAFE_TRAVELS_PREFETCH=1 to
+enable it.
+"""
+
+import os
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from typing import Callable, NamedTuple
+
+import metrics
+
+QUERY_LOG_SIZE = 10000
+QUERY_WINDOW = timedelta(days=7)
+HOT_MIN_QUERIES = 3
+MAX_HOT_CORRIDORS = 20
+# How far ahead of a corridor's usual departure hour it is warmed
+PREFETCH_LEAD = timedelta(hours=2)
+# Minutes past the hour to prefetch, once the hourly forecast update is out
+PREFETCH_MINUTE = 10
+# Upstream requests per second allowed while prefetching
+DEFAULT_RATE = 1.0
+UPSTREAM_COUNTERS = (
+    'google_geocode.requests',
+    'google_routes.requests',
+    'open_meteo.requests',
+)
+
+
+class Corridor(NamedTuple):
+    origin: str
+    destination: str
+    hour: int  # departure hour of day, UTC
+    safest: bool
+
+
+_lock = threading.Lock()
+_queries: deque[tuple[datetime, Corridor]] = deque(maxlen=QUERY_LOG_SIZE)
+
+
+def enabled() -> bool:
+    return bool(os.environ.get('SAFE_TRAVELS_PREFETCH'))
+
+
+def record_query(
+    origin: str,
+    destination: str,
+    departure: datetime,
+    safest: bool = False,
+    now: datetime | None = None,
+) -> None:
+    """Log an assessment of a corridor departing at `departure`."""
+    corridor = Corridor(
+        origin.strip(),
+        destination.strip(),
+        departure.astimezone(timezone.utc).hour,
+        safest,
+    )
+    with _lock:
+        _queries.append((now or datetime.now(timezone.utc), corridor))
+
+
+def hot_corridors(now: datetime | None = None) -> list[tuple[Corridor, int]]:
+    """Corridors queried often enough recently, with their query counts."""
+    since = (now or datetime.now(timezone.utc)) - QUERY_WINDOW
+    with _lock:
+        counts = Counter(corridor for at, corridor in _queries if at >= since)
+    return [
+        (corridor, count)
+        for corridor, count in counts.most_common(MAX_HOT_CORRIDORS)
+        if count >= HOT_MIN_QUERIES
+    ]
+
+
+def next_departure(hour: int, now: datetime) -> datetime:
+    """Start of the next occurrence of an hour of day (UTC), or of the current
+    hour if it is that hour now."""
+    now = now.astimezone(timezone.utc)
+    departure = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if departure + timedelta(hours=1) <= now:
+        departure += timedelta(days=1)
+    return departure
+
+
+def _upstream_requests() -> float:
+    return sum(metrics.counter(name) for name in UPSTREAM_COUNTERS)
+
+
+class Prefetcher:
+    """Warms caches for hot corridors on an hourly schedule.
+
+    Args:
+        warm: Called with (origin, destination, departure, safest) to warm the
+            caches for one corridor
+        rate: Upstream requests per second to stay under
+    """
+
+    def __init__(
+        self,
+        warm: Callable[[str, str, datetime, bool], None],
+        rate: float = DEFAULT_RATE,
+    ):
+        self.warm = warm
+        self.rate = rate
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def run_once(self, now: datetime | None = None) -> int:
+        """Warm every hot corridor departing soon. Returns how many were warmed."""
+        now = now or datetime.now(timezone.utc)
+        warmed = 0
+        for corridor, _ in hot_corridors(now):
+            departure = next_departure(corridor.hour, now)
+            if departure - now > PREFETCH_LEAD:
+                continue
+
+            before = _upstream_requests()
+            started = time.monotonic()
+            try:
+                self.warm(
+                    corridor.origin, corridor.destination, departure, corridor.safest
+                )
+                warmed += 1
+                metrics.increment('prefetch.corridors')
+            except Exception:
+                metrics.increment('prefetch.errors')
+
+            # Spread the requests just made over the time the rate allows
+            spent = _upstream_requests() - before
+            pause = spent / self.rate - (time.monotonic() - started)
+            if pause > 0:
+                time.sleep(pause)
+        return warmed
+
+    def _loop(self) -> None:
+        while True:
+            now = datetime.now(timezone.utc)
+            next_run = now.replace(minute=PREFETCH_MINUTE, second=0, microsecond=0)
+            if next_run <= now:
+                next_run += timedelta(hours=1)
+            time.sleep((next_run - now).total_seconds())
+            self.run_once()
+
+    def start(self) -> None:
+        """Start the background schedule, if it isn't running already."""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name='prefetch', daemon=True
+                )
+                self._thread.start()
+
+
+def clear() -> None:
+    with _lock:
+        _queries.clear()
@@ -0,0 +1,195 @@
+"""Opt-in profiling of slow tool calls.
+
+Set SAFE_TRAVELS_PROFILE_MS to a latency threshold in milliseconds and every
+profiled tool call is watched by a low-rate stack sampler. Calls slower than the
+threshold keep their profile in a bounded ring buffer: per-stage timings, the
+sampled stacks in collapsed format (one "frame;frame;frame count" line per
+stack, ready for flamegraph.pl or speedscope) and, if
+SAFE_TRAVELS_PROFILE_ALLOCATIONS is set, memory allocated during the call as
+tracked by tracemalloc. Faster calls are discarded.
+
+The sampler only looks at the threads of calls in flight, every
+SAMPLE_INTERVAL seconds, so the overhead is small enough to leave on.
+tracemalloc slows every allocation in the process and is off unless asked for.
+"""
+
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.01
+# Slow-call profiles kept
+PROFILE_BUFFER_SIZE = 50
+# Innermost frames kept per sampled stack
+MAX_STACK_DEPTH = 64
+# Allocation sites reported per profile
+TOP_ALLOCATIONS = 10
+
+
+class _Profile:
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.thread_id = threading.get_ident()
+        self.started_at = datetime.now(timezone.utc)
+        self.start = self.last_mark = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.stacks: Counter = Counter()
+
+
+_current: ContextVar[_Profile | None] = ContextVar('profile', default=None)
+_lock = threading.Lock()
+_active: set[_Profile] = set()
+_profiles: deque = deque(maxlen=PROFILE_BUFFER_SIZE)
+_sampler: threading.Thread | None = None
+_wake = threading.Event()
+
+
+def threshold_seconds() -> float | None:
+    """The configured slow-call threshold, or None if profiling is off."""
+    value = os.environ.get('SAFE_TRAVELS_PROFILE_MS')
+    return float(value) / 1000 if value else None
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f'{module}:{code.co_name}'
+
+
+def _sample_loop() -> None:
+    while True:
+        _wake.wait()
+        frames = sys._current_frames()
+        # Under the lock, so finished calls never see their stacks change
+        with _lock:
+            if not _active:
+                _wake.clear()
+            for profile in _active:
+                frame = frames.get(profile.thread_id)
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    profile.stacks[';'.join(reversed(stack))] += 1
+        del frames
+        time.sleep(SAMPLE_INTERVAL)
+
+
+def _start_sampling(profile: _Profile) -> None:
+    global _sampler
+    with _lock:
+        _active.add(profile)
+        if _sampler is None:
+            _sampler = threading.Thread(
+                target=_sample_loop, name='profiler', daemon=True
+            )
+            _sampler.start()
+    _wake.set()
+
+
+def _stop_sampling(profile: _Profile) -> None:
+    with _lock:
+        _active.discard(profile)
+
+
+def mark(stage: str) -> None:
+    """Record the time since the previous mark as a stage of the current call.
+
+    Does nothing outside a profiled call.
+    """
+    profile = _current.get()
+    if profile is None:
+        return
+    now = time.perf_counter()
+    profile.stages[stage] = profile.stages.get(stage, 0.0) + now - profile.last_mark
+    profile.last_mark = now
+
+
+def _allocation_summary(start_bytes: int) -> dict:
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    )
+    return {
+        # Process-wide, so concurrent calls are included
+        'net_bytes': current - start_bytes,
+        'peak_bytes': peak - start_bytes,
+        'top_sites': [
+            {
+                'site': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+                'bytes': stat.size,
+                'count': stat.count,
+            }
+            for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+        ],
+    }
+
+
+def profiled(fn: Callable) -> Callable:
+    """Profile calls to a tool function when profiling is enabled."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        threshold = threshold_seconds()
+        if threshold is None:
+            return fn(*args, **kwargs)
+
+        track_allocations = bool(os.environ.get('SAFE_TRAVELS_PROFILE_ALLOCATIONS'))
+        if track_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            start_bytes = tracemalloc.get_traced_memory()[0]
+
+        # Tools run their body in a worker thread, as a private function
+        profile = _Profile(fn.__name__.lstrip('_'))
+        token = _current.set(profile)
+        _start_sampling(profile)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _stop_sampling(profile)
+            _current.reset(token)
+            elapsed = time.perf_counter() - profile.start
+            if elapsed >= threshold:
+                record = {
+                    'tool': profile.tool,
+                    'started_at': profile.started_at.isoformat(),
+                    'duration_ms': round(elapsed * 1000, 1),
+                    'stages_ms': {
+                        name: round(seconds * 1000, 1)
+                        for name, seconds in profile.stages.items()
+                    },
+                    'samples': sum(profile.stacks.values()),
+                    'collapsed_stacks': '\n'.join(
+                        f'{stack} {count}'
+                        for stack, count in profile.stacks.most_common()
+                    ),
+                }
+                if track_allocations:
+                    record['allocations'] = _allocation_summary(start_bytes)
+                with _lock:
+                    _profiles.append(record)
+
+    return wrapper
+
+
+def slow_profiles(limit: int | None = None) -> list[dict]:
+    """Kept profiles, newest first."""
+    with _lock:
+        profiles = list(reversed(_profiles))
+    return profiles[:limit] if limit is not None else profiles
+
+
+def clear() -> None:
+    with _lock:
+        _profiles.clear()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""Local road-graph routing as an alternative to the Google Routes API.
+
+The road network (e.g. preprocessed from an OSM extract) is held in compressed
+sparse row (CSR) arrays: for node n, its outgoing edges are
+targets[offsets[n]:offsets[n + 1]], with matching lengths and speeds. Shortest
+paths by travel time are found with A*, optionally inflating edge costs by the
+forecast danger along them to find the safest route rather than the fastest.
+
+Nodes are also bucketed into grid cells: the file holds the sorted keys of the
+occupied cells, with offsets into the node indices ordered by cell, so the
+nearest node to a coordinate is found by binary search without building
+anything per process. The packed graph file can be memory-mapped so worker
+processes share it. Build one from CSV extracts with:
+    road_graph.py nodes.csv edges.csv graph.bin
+"""
+
+import bisect
+import csv
+import heapq
+import math
+import mmap
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from typing import Any, Callable, List, Tuple
+
+import polyline
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEG = 111320.0
+# Node lookup bucket size in degrees
+NODE_CELL_DEG = 0.01
+_NODE_CELL_COLS = math.ceil(360 / NODE_CELL_DEG)
+# Farthest a coordinate may be from the nearest node to be routed from it
+MAX_SNAP_M = 10000.0
+# Up to how many times slower a maximally dangerous edge is considered
+DEFAULT_DANGER_WEIGHT = 1.0
+
+_MAGIC = b'STGRAPH2'
+# magic, node count, edge count, occupied cell count
+_HEADER = struct.Struct('<8sQQQ')
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _cell(lat: float, lon: float) -> Tuple[int, int]:
+    return int((lat + 90) // NODE_CELL_DEG), int((lon + 180) // NODE_CELL_DEG)
+
+
+def _cell_key(row: int, col: int) -> int:
+    return row * _NODE_CELL_COLS + col
+
+
+class RoadGraph:
+    """Directed road graph in CSR form, with its nodes indexed by grid cell."""
+
+    def __init__(
+        self,
+        lats,
+        lons,
+        offsets,
+        targets,
+        lengths_m,
+        speeds_kph,
+        cell_keys,
+        cell_offsets,
+        cell_nodes,
+    ):
+        self.lats = lats
+        self.lons = lons
+        self.offsets = offsets
+        self.targets = targets
+        self.lengths_m = lengths_m
+        self.speeds_kph = speeds_kph
+        # Nodes in cell cell_keys[i] are cell_nodes[cell_offsets[i]:cell_offsets[i + 1]]
+        self.cell_keys = cell_keys
+        self.cell_offsets = cell_offsets
+        self.cell_nodes = cell_nodes
+        # Zero-speed edges are impassable; a graph of only those has no routes
+        self.max_speed_mps = (max(speeds_kph, default=0.0) or 1.0) / 3.6
+
+    @property
+    def node_count(self) -> int:
+        return len(self.lats)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    @classmethod
+    def from_edges(
+        cls,
+        nodes: List[Tuple[float, float]],
+        edges: List[Tuple[int, int, float, float]],
+    ) -> 'RoadGraph':
+        """Build a graph from node coordinates and directed edges.
+
+        Args:
+            nodes: (lat, lon) for each node index
+            edges: (source, target, length_m, speed_kph) tuples
+        """
+        edges = sorted(edges)
+        offsets = array('q', [0]) * (len(nodes) + 1)
+        for source, _, _, _ in edges:
+            offsets[source + 1] += 1
+        for n in range(len(nodes)):
+            offsets[n + 1] += offsets[n]
+
+        by_cell = sorted(
+            (_cell_key(*_cell(lat, lon)), n) for n, (lat, lon) in enumerate(nodes)
+        )
+        cell_keys = array('q')
+        cell_offsets = array('q')
+        for i, (key, _) in enumerate(by_cell):
+            if not cell_keys or cell_keys[-1] != key:
+                cell_keys.append(key)
+                cell_offsets.append(i)
+        cell_offsets.append(len(by_cell))
+
+        return cls(
+            array('d', (lat for lat, _ in nodes)),
+            array('d', (lon for _, lon in nodes)),
+            offsets,
+            array('q', (e[1] for e in edges)),
+            array('f', (e[2] for e in edges)),
+            array('f', (e[3] for e in edges)),
+            cell_keys,
+            cell_offsets,
+            array('q', (n for _, n in by_cell)),
+        )
+
+    @classmethod
+    def from_csv(cls, nodes_path: str, edges_path: str) -> 'RoadGraph':
+        """Build a graph from CSV extracts.
+
+        nodes.csv has id, lat, lon columns. edges.csv has source, target,
+        length_m, speed_kph and an optional oneway column; edges are two-way
+        unless oneway is 1/true/yes.
+        """
+        index: dict[str, int] = {}
+        nodes = []
+        with open(nodes_path, newline='') as f:
+            for row in csv.DictReader(f):
+                index[row['id']] = len(nodes)
+                nodes.append((float(row['lat']), float(row['lon'])))
+
+        edges = []
+        with open(edges_path, newline='') as f:
+            for row in csv.DictReader(f):
+                source, target = index[row['source']], index[row['target']]
+                length, speed = float(row['length_m']), float(row['speed_kph'])
+                edges.append((source, target, length, speed))
+                if row.get('oneway', '').lower() not in ('1', 'true', 'yes'):
+                    edges.append((target, source, length, speed))
+
+        return cls.from_edges(nodes, edges)
+
+    def save(self, path: str) -> None:
+        """Write the graph as a packed file that load() can memory-map."""
+        with open(path, 'wb') as f:
+            f.write(
+                _HEADER.pack(
+                    _MAGIC, self.node_count, self.edge_count, len(self.cell_keys)
+                )
+            )
+            for arr in (
+                self.lats,
+                self.lons,
+                self.offsets,
+                self.targets,
+                self.lengths_m,
+                self.speeds_kph,
+                self.cell_keys,
+                self.cell_offsets,
+                self.cell_nodes,
+            ):
+                arr.tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> 'RoadGraph':
+        """Memory-map a packed graph written by save()."""
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, nodes, edges, cells = _HEADER.unpack_from(buf)
+        if magic != _MAGIC:
+            raise ValueError(
+                f'Not a road graph file (or an older one to rebuild): {path}'
+            )
+
+        view = memoryview(buf)
+        offset = _HEADER.size
+        columns = []
+        for fmt, count in (
+            ('d', nodes),
+            ('d', nodes),
+            ('q', nodes + 1),
+            ('q', edges),
+            ('f', edges),
+            ('f', edges),
+            ('q', cells),
+            ('q', cells + 1),
+            ('q', nodes),
+        ):
+            size = struct.calcsize(fmt) * count
+            columns.append(view[offset : offset + size].cast(fmt))
+            offset += size
+
+        return cls(*columns)
+
+    def _cell_nodes(self, row: int, col: int):
+        key = _cell_key(row, col)
+        i = bisect.bisect_left(self.cell_keys, key)
+        if i == len(self.cell_keys) or self.cell_keys[i] != key:
+            return ()
+        return self.cell_nodes[self.cell_offsets[i] : self.cell_offsets[i + 1]]
+
+    def nearest_node(self, lat: float, lon: float, max_m: float = MAX_SNAP_M) -> int:
+        """Index of the node closest to a coordinate.
+
+        Raises:
+            ValueError: If no node is within max_m meters.
+        """
+        if self.node_count == 0:
+            raise ValueError('Road graph has no nodes')
+
+        row, col = _cell(lat, lon)
+        kx = METERS_PER_DEG * math.cos(math.radians(lat))
+        # Narrowest side of a cell, the least distance gained per ring
+        cell_m = NODE_CELL_DEG * min(kx, METERS_PER_DEG)
+        best, best_dist = -1, math.inf
+        # Search rings of cells outwards until no unsearched cell can hold a
+        # closer node. Cells in ring n are at least n - 1 whole cells away.
+        for ring in range(int(max_m / cell_m) + 2):
+            if ring > 1 and (ring - 1) * cell_m > best_dist:
+                break
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if max(abs(r - row), abs(c - col)) != ring:
+                        continue
+                    for n in self._cell_nodes(r, c):
+                        d = haversine_m(lat, lon, self.lats[n], self.lons[n])
+                        if d < best_dist:
+                            best, best_dist = n, d
+        if best_dist > max_m:
+            raise ValueError(
+                f'No road within {max_m / 1000:g} km of ({lat:.5f}, {lon:.5f})'
+            )
+        return best
+
+    def shortest_path(
+        self,
+        source: int,
+        target: int,
+        node_danger: Callable[[int], float] | None = None,
+        danger_weight: float = DEFAULT_DANGER_WEIGHT,
+    ) -> Tuple[List[int], float, float]:
+        """A* search for the quickest (or safest) path between two nodes.
+
+        Args:
+            source: Start node index
+            target: End node index
+            node_danger: Optional danger score (0-10) of a node. Entering a node
+                with danger d multiplies that edge's travel time by
+                1 + danger_weight * d / 10 for path selection.
+            danger_weight: How strongly danger is traded against travel time
+
+        Returns:
+            (nodes, distance_m, duration_s) along the path. Distance and duration
+            are actual travel figures, without danger inflation.
+
+        Raises:
+            ValueError: If the target is unreachable from the source.
+        """
+        lats, lons = self.lats, self.lons
+        offsets, targets = self.offsets, self.targets
+        lengths, speeds = self.lengths_m, self.speeds_kph
+        target_lat, target_lon = lats[target], lons[target]
+        max_speed = self.max_speed_mps
+
+        def heuristic(n: int) -> float:
+            # Travel time at top speed is a lower bound on any path cost
+            return haversine_m(lats[n], lons[n], target_lat, target_lon) / max_speed
+
+        best_cost = {source: 0.0}
+        previous: dict[int, int] = {}
+        edge_into: dict[int, int] = {}
+        queue = [(heuristic(source), 0.0, source)]
+
+        while queue:
+            _, cost, node = heapq.heappop(queue)
+            if node == target:
+                break
+            if cost > best_cost[node]:
+                continue
+            for e in range(offsets[node], offsets[node + 1]):
+                nxt = targets[e]
+                if speeds[e] <= 0:
+                    continue
+                edge_time = lengths[e] / (speeds[e] / 3.6)
+                if node_danger is not None:
+                    edge_time *= 1 + danger_weight * node_danger(nxt) / 10
+                new_cost = cost + edge_time
+                if new_cost < best_cost.get(nxt, math.inf):
+                    best_cost[nxt] = new_cost
+                    previous[nxt] = node
+                    edge_into[nxt] = e
+                    heapq.heappush(queue, (new_cost + heuristic(nxt), new_cost, nxt))
+        else:
+            raise ValueError(f'No path from node {source} to node {target}')
+
+        path = [target]
+        distance = duration = 0.0
+        while path[-1] != source:
+            e = edge_into[path[-1]]
+            distance += lengths[e]
+            duration += lengths[e] / (speeds[e] / 3.6)
+            path.append(previous[path[-1]])
+        path.reverse()
+
+        return path, distance, duration
+
+    def route(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        danger: Callable[[float, float], float | None] | None = None,
+        danger_weight: float = DEFAULT_DANGER_WEIGHT,
+    ) -> dict[str, Any]:
+        """Route between two coordinates.
+
+        Args:
+            origin: (lat, lon) of the start
+            destination: (lat, lon) of the end
+            danger: Optional danger score (0-10) at a coordinate, or None where
+                unknown, used to prefer safer roads
+            danger_weight: How strongly danger is traded against travel time
+
+        Returns:
+            A response shaped like the Google Routes API computeRoutes response,
+            with duration, distanceMeters and an encoded polyline.
+        """
+        source = self.nearest_node(*origin)
+        target = self.nearest_node(*destination)
+
+        node_danger = None
+        if danger is not None:
+            cache: dict[int, float] = {}
+
+            def node_danger(n: int) -> float:
+                if n not in cache:
+                    cache[n] = danger(self.lats[n], self.lons[n]) or 0.0
+                return cache[n]
+
+        path, distance, duration = self.shortest_path(
+            source, target, node_danger, danger_weight
+        )
+        points = [(self.lats[n], self.lons[n]) for n in path]
+
+        return {
+            'routes': [
+                {
+                    'duration': f'{round(duration)}s',
+                    'distanceMeters': round(distance),
+                    'polyline': {'encodedPolyline': polyline.encode(points)},
+                }
+            ]
+        }
+
+
+@lru_cache(maxsize=None)
+def load_road_graph(path: str) -> RoadGraph:
+    """Load a packed road graph once per process."""
+    return RoadGraph.load(path)
+
+
+if __name__ == '__main__':
+    RoadGraph.from_csv(sys.argv[1], sys.argv[2]).save(sys.argv[3])
@@ -0,0 +1,85 @@
+"""Bounded in-memory caches of geocodes and routes.
+
+Addresses rarely move, so geocodes are kept for a long time. Traffic-aware
+routes depend on the departure time, so they are cached per departure hour for
+ROUTE_TTL_SECONDS, which keeps them about as fresh as the forecasts they are
+scored against.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Hashable
+
+GEOCODE_TTL_SECONDS = 30 * 24 * 3600
+ROUTE_TTL_SECONDS = 3600
+MAX_GEOCODES = 10000
+MAX_ROUTES = 2000
+
+
+class _TTLCache:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_geocodes = _TTLCache(GEOCODE_TTL_SECONDS, MAX_GEOCODES)
+_routes = _TTLCache(ROUTE_TTL_SECONDS, MAX_ROUTES)
+
+
+def get_geocode(address: str) -> tuple[float, float] | None:
+    return _geocodes.get(address.strip().lower())
+
+
+def put_geocode(address: str, coords: tuple[float, float]) -> None:
+    _geocodes.put(address.strip().lower(), coords)
+
+
+def route_key(
+    origin: tuple[float, float],
+    destination: tuple[float, float],
+    departure: datetime,
+    safest: bool = False,
+) -> tuple:
+    """Cache key for a route departing within a given hour (UTC)."""
+    hour = departure.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return origin, destination, hour, safest
+
+
+def get_route(key: tuple) -> dict | None:
+    return _routes.get(key)
+
+
+def put_route(key: tuple, route: dict) -> None:
+    _routes.put(key, route)
+
+
+def clear() -> None:
+    _geocodes.clear()
+    _routes.clear()
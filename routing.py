@@ -1,15 +1,34 @@
 #!/usr/bin/env python3
+import math
 import os
+from datetime import datetime, timedelta, timezone
 from typing import Any, List, Tuple
 
 import dateutil
 import requests
 
+import metrics
+from gridfile import load_grid
+from hedging import hedged_call
+from road_graph import load_road_graph
 
-def get_lat_long(city_name: str) -> Tuple[float, float]:
-    url = 'https://maps.googleapis.com/maps/api/geocode/json'
+# Upstream endpoints, overridable to point at a stand-in (e.g. for load tests)
+GEOCODE_URL = os.environ.get(
+    'SAFE_TRAVELS_GEOCODE_URL', 'https://maps.googleapis.com/maps/api/geocode/json'
+)
+ROUTES_URL = os.environ.get(
+    'SAFE_TRAVELS_ROUTES_URL',
+    'https://routes.googleapis.com/directions/v2:computeRoutes',
+)
+# Waypoints assessed along a route by default
+DEFAULT_WAYPOINTS = 10
+
+
+def get_lat_long(city_name: str, timeout: float | None = None) -> Tuple[float, float]:
+    url = GEOCODE_URL
     params = {'address': city_name, 'key': os.environ['GOOGLE_MAPS_API_KEY']}
-    response = requests.get(url, params=params)
+    metrics.increment('google_geocode.requests')
+    response = requests.get(url, params=params, timeout=timeout)
     response.raise_for_status()
     data = response.json()
 
@@ -50,13 +69,27 @@ def ensure_rfc3339_format(date_str: str) -> str:
         )
 
 
-def compute_route(
+def parse_time(value: str) -> datetime:
+    """Parse a time string, assuming UTC if it has no timezone."""
+    parsed = dateutil.parser.parse(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def compute_google_route(
     origin: Tuple[float, float],
     destination: Tuple[float, float],
     departure_time: str | None = None,
     arrival_time: str | None = None,
+    safest: bool = False,
+    timeout: float | None = None,
 ) -> dict[str, Any]:
-    url = 'https://routes.googleapis.com/directions/v2:computeRoutes'
+    """Compute a traffic-aware route with the Google Routes API.
+
+    The API has no notion of weather danger, so `safest` is ignored.
+    """
+    url = ROUTES_URL
 
     headers = {
         'Content-Type': 'application/json',
@@ -94,12 +127,85 @@ def compute_route(
     elif arrival_time:
         data['arrivalTime'] = ensure_rfc3339_format(arrival_time)
 
-    response = requests.post(url, headers=headers, json=data)
+    response = hedged_call(
+        'google_routes', requests.post, url, headers=headers, json=data, timeout=timeout
+    )
     response.raise_for_status()
 
     return response.json()
 
 
+def compute_local_route(
+    origin: Tuple[float, float],
+    destination: Tuple[float, float],
+    departure_time: str | None = None,
+    arrival_time: str | None = None,
+    safest: bool = False,
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    """Compute a route on the local road graph in SAFE_TRAVELS_ROAD_GRAPH.
+
+    Travel times come from edge speeds, so there is no traffic awareness and
+    arrival_time does not change the route. With `safest`, edges are penalized
+    by the danger sampled from the heatmap in SAFE_TRAVELS_HEATMAP at the
+    departure time (or now), where it covers them. Routing is local, so
+    `timeout` is not needed.
+    """
+    graph = load_road_graph(os.environ['SAFE_TRAVELS_ROAD_GRAPH'])
+
+    danger = None
+    heatmap_path = os.environ.get('SAFE_TRAVELS_HEATMAP')
+    if safest and heatmap_path and os.path.exists(heatmap_path):
+        heatmap = load_grid(heatmap_path)
+        if departure_time:
+            when = dateutil.parser.parse(ensure_rfc3339_format(departure_time))
+        else:
+            when = datetime.now(timezone.utc)
+
+        def danger(lat: float, lon: float) -> float | None:
+            sample = heatmap.sample(lat, lon, when)
+            return sample['danger_score'] if sample else None
+
+    return graph.route(origin, destination, danger)
+
+
+# Routing backends by name, selected with SAFE_TRAVELS_ROUTING
+ROUTING_BACKENDS = {
+    'google': compute_google_route,
+    'local': compute_local_route,
+}
+
+
+def compute_route(
+    origin: Tuple[float, float],
+    destination: Tuple[float, float],
+    departure_time: str | None = None,
+    arrival_time: str | None = None,
+    safest: bool = False,
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    """Compute a route with the configured routing backend.
+
+    Every backend returns a Google Routes API shaped response with the route
+    duration, distance and encoded polyline.
+
+    Args:
+        origin: (lat, lon) of the start
+        destination: (lat, lon) of the end
+        departure_time: Optional departure time in a parseable format
+        arrival_time: Optional arrival time in a parseable format
+        safest: Prefer the route with the least forecast danger over the
+            quickest one, where the backend supports it
+        timeout: Optional timeout in seconds for upstream calls
+    """
+    backend = os.environ.get('SAFE_TRAVELS_ROUTING', 'google')
+    if backend not in ROUTING_BACKENDS:
+        raise ValueError(f'Unknown routing backend: {backend}')
+    return ROUTING_BACKENDS[backend](
+        origin, destination, departure_time, arrival_time, safest, timeout=timeout
+    )
+
+
 def get_route_duration_seconds(route_response: dict[str, Any]) -> int:
     """Extract route duration in seconds from a Google Routes API response.
 
@@ -109,15 +215,88 @@ def get_route_duration_seconds(route_response: dict[str, Any]) -> int:
     return int(duration_str.rstrip('s'))
 
 
+def equidistant_indices(points: List[Tuple[float, float]], n: int = 10) -> List[int]:
+    """Indices of n equidistant points in a list of points."""
+    if n <= 0:
+        raise ValueError('Number of points must be greater than 0')
+    step = max(1, len(points) // n)
+
+    return list(range(0, len(points), step))
+
+
 def pick_equidistant_points(
     points: List[Tuple[float, float]], n: int = 10
 ) -> List[Tuple[float, float]]:
     """Pick n equidistant points from a list of points."""
-    if n <= 0:
-        raise ValueError('Number of points must be greater than 0')
-    step = max(1, len(points) // n)
+    return [points[i] for i in equidistant_indices(points, n)]
+
+
+def initial_bearing(start: Tuple[float, float], end: Tuple[float, float]) -> float:
+    """Compass bearing in degrees (0 = north, clockwise) from start to end."""
+    lat1, lon1 = math.radians(start[0]), math.radians(start[1])
+    lat2, lon2 = math.radians(end[0]), math.radians(end[1])
+    d_lon = lon2 - lon1
+    x = math.sin(d_lon) * math.cos(lat2)
+    y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(
+        d_lon
+    )
+    return (math.degrees(math.atan2(x, y)) + 360) % 360
+
+
+def route_headings(points: List[Tuple[float, float]]) -> List[float]:
+    """Travel heading at each point of a route.
+
+    Each point takes the bearing towards the next point; the final point keeps
+    the heading of the last leg. A single-point route has heading 0.
+    """
+    if len(points) < 2:
+        return [0.0] * len(points)
+    headings = [
+        initial_bearing(points[i], points[i + 1]) for i in range(len(points) - 1)
+    ]
+    headings.append(headings[-1])
+    return headings
+
+
+def waypoint_headings(
+    points: List[Tuple[float, float]], indices: List[int]
+) -> List[float]:
+    """Travel heading at waypoints picked from a route's polyline.
+
+    Each waypoint takes the bearing of the polyline segment leaving it (for the
+    final point, the one arriving at it), skipping repeated points, so the
+    heading follows the road rather than the chord to the next waypoint.
+    """
+    headings = []
+    for i in indices:
+        j = i + 1
+        while j < len(points) and points[j] == points[i]:
+            j += 1
+        if j < len(points):
+            headings.append(initial_bearing(points[i], points[j]))
+            continue
+        k = i - 1
+        while k >= 0 and points[k] == points[i]:
+            k -= 1
+        headings.append(initial_bearing(points[k], points[i]) if k >= 0 else 0.0)
+    return headings
+
 
-    return [points[i] for i in range(0, len(points), step)]
+def waypoint_times(
+    waypoint_coords: list[tuple[float, float]],
+    start_time: datetime,
+    duration_seconds: float,
+) -> list[tuple[float, float, datetime]]:
+    """Expected arrival time (in UTC) at each waypoint, interpolated linearly."""
+    start_time = start_time.astimezone(timezone.utc)
+    num_waypoints = len(waypoint_coords)
+    waypoints_with_times = []
+    for i, (lat, lon) in enumerate(waypoint_coords):
+        # Fraction of trip completed at this waypoint
+        fraction = i / (num_waypoints - 1) if num_waypoints > 1 else 0
+        waypoint_time = start_time + timedelta(seconds=duration_seconds * fraction)
+        waypoints_with_times.append((lat, lon, waypoint_time))
+    return waypoints_with_times
 
 
 if __name__ == '__main__':
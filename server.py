@@ -1,151 +1,444 @@
 #!/usr/bin/env python3
 """Safe Travels MCP Server - Exposes route derivation and danger assessment tools."""
 
+import functools
+import math
+import os
+import threading
+from bisect import bisect_right
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator
 
-import dateutil.parser
+import anyio.to_thread
 import polyline
 import requests
 from fastmcp import FastMCP
-
-from danger_assessment import (
-    black_ice_risk,
-    precipitation_severity,
-    temperature_severity,
-    visibility_severity,
-    weather_conditions_severity,
-    wind_severity,
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+
+import admission
+import archive
+import forecast_cache
+import metrics
+import prefetch
+import profiling
+import route_cache
+import sessions
+import vehicles
+from alerts import SEVERITIES, default_alert_index
+from climatology import (
+    FORECAST_HORIZON_DAYS,
+    beyond_horizon,
+    climatology_records,
+    default_climatology,
+)
+from crash_history import default_crash_index
+from deadline import Deadline, DeadlineExceeded, timeout_for
+from ensemble import (
+    HAZARD_THRESHOLDS,
+    exceedance,
+    fetch_ensemble_forecasts,
+    hour_index,
+    member_columns,
+    score_columns,
+)
+from gazetteer import default_gazetteer
+from grid_sampling import (
+    DEFAULT_SPACING_DEG,
+    blend_hourly,
+    interpolate_records,
+    lattice_corners,
+    lattice_point,
 )
+from gridfile import load_grid
+from road_graph import haversine_m
 from routing import (
+    DEFAULT_WAYPOINTS,
     compute_route,
+    equidistant_indices,
     get_lat_long,
     get_route_duration_seconds,
+    parse_time,
     pick_equidistant_points,
+    waypoint_headings,
+    waypoint_times,
+)
+from solar import solar_positions
+from tiles import default_tile_server
+from weather_providers import fetch_hourly_forecasts
+from weather_scoring import (
+    PRECIP_HISTORY_HOURS,
+    _light_modifier,
+    danger_status,
+    running_sums,
+    weather_at_hour,
+    weather_code_to_condition,
+    weather_components,
 )
 
+# Waypoints per Open-Meteo request, normally and when racing a deadline
+WEATHER_CHUNK_SIZE = 50
+DEADLINE_CHUNK_SIZE = 5
+
+_fetch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='weather')
+# Geocoding and routing of itinerary legs
+_route_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='route')
+# Writes to the backtesting archive, off the request path. When the disk falls
+# behind by ARCHIVE_QUEUE_SIZE writes, further ones are dropped.
+_archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='archive')
+ARCHIVE_QUEUE_SIZE = 64
+_archive_slots = threading.BoundedSemaphore(ARCHIVE_QUEUE_SIZE)
+# How long dashboards may reuse a danger tile; heatmaps are rebuilt hourly
+TILE_MAX_AGE_SECONDS = 300
+# Average speed assumed when estimating when later itinerary legs depart
+ITINERARY_ESTIMATE_SPEED_KPH = 80
+# Most a road is assumed to be longer than the straight line, when estimating
+# how long a trip can take before its route is known
+SPECULATION_DETOUR = 2.0
+
+
+def _archive(method: str, *args) -> None:
+    """Copy fetched data to the archive configured by SAFE_TRAVELS_ARCHIVE."""
+    store = archive.default_archive()
+    if store is None:
+        return
+    if not _archive_slots.acquire(blocking=False):
+        metrics.increment('archive.dropped')
+        return
+    future = _archive_executor.submit(getattr(store, method), *args)
+    future.add_done_callback(lambda _: _archive_slots.release())
+
+
+def _archive_forecasts(
+    coords: list[tuple[float, float]], blocks: list[dict], fetched_at: datetime
+) -> None:
+    """Archive the hourly blocks of one fetch, in one write."""
+    _archive(
+        'put_forecasts',
+        [(lat, lon, hourly) for (lat, lon), hourly in zip(coords, blocks)],
+        fetched_at,
+    )
 
-def weather_code_to_condition(code: int) -> str:
-    """Map Open-Meteo weather codes to condition strings."""
-    if code in [0, 1]:
-        return 'sunny'
-    if code in [2, 3]:
-        return 'cloudy'
-    if code in [45, 48]:
-        return 'foggy'
-    if code in [51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82]:
-        return 'rainy'
-    if code in [71, 73, 75, 77, 85, 86]:
-        return 'snowy'
-    if code == 95:
-        return 'stormy'
-    if code in [96, 99]:
-        return 'hail'
-    return 'cloudy'
 
+def _weather_record(
+    lat: float, lon: float, arrival_time: datetime, hourly: dict
+) -> dict:
+    """Weather record for a waypoint from its location's hourly block."""
+    # Find the closest hour in the forecast
+    times = [datetime.fromisoformat(t) for t in hourly['time']]
+    closest_idx = min(
+        range(len(times)),
+        key=lambda j: abs(
+            (times[j] - arrival_time.replace(tzinfo=None)).total_seconds()
+        ),
+    )
 
-def fetch_weather_for_waypoints(
-    waypoints: list[tuple[float, float, datetime]],
-) -> list[dict]:
-    """Fetch forecast weather for waypoints at their expected arrival times.
+    return {
+        'lat': lat,
+        'lon': lon,
+        'arrival_time': arrival_time.isoformat(),
+        **weather_at_hour(
+            hourly,
+            closest_idx,
+            running_sums(hourly['rain']),
+            running_sums(hourly['snowfall']),
+        ),
+    }
+
+
+def _cached_weather(
+    lat: float, lon: float, arrival_time: datetime, history_hours: int = 0
+) -> dict | None:
+    """Weather record for a waypoint from the forecast cache, if it has one."""
+    hourly = forecast_cache.get(lat, lon, arrival_time, history_hours)
+    if hourly is None:
+        return None
+    return {**_weather_record(lat, lon, arrival_time, hourly), 'source': 'cache'}
 
-    Args:
-        waypoints: List of (lat, lon, arrival_time) tuples
-    """
-    lats = ','.join(str(wp[0]) for wp in waypoints)
-    lons = ','.join(str(wp[1]) for wp in waypoints)
 
+def _fetch_weather_chunk(
+    waypoints: list[tuple[float, float, datetime]],
+    deadline: Deadline | None = None,
+) -> list[dict]:
     # Determine time range needed for forecast
     timestamps = [wp[2] for wp in waypoints]
     min_time = min(timestamps)
     max_time = max(timestamps)
 
-    # Format for Open-Meteo API (ISO8601)
-    start_hour = min_time.strftime('%Y-%m-%dT%H:00')
-    end_hour = (max_time + timedelta(hours=1)).strftime('%Y-%m-%dT%H:00')
-
-    url = (
-        f'https://api.open-meteo.com/v1/forecast?'
-        f'latitude={lats}&longitude={lons}'
-        f'&hourly=temperature_2m,wind_speed_10m,wind_gusts_10m,weather_code,'
-        f'precipitation,rain,snowfall,snow_depth,visibility,'
-        f'soil_temperature_0cm,dew_point_2m'
-        f'&start_hour={start_hour}&end_hour={end_hour}'
+    fetched_at = datetime.now(timezone.utc)
+    coords = [(wp[0], wp[1]) for wp in waypoints]
+    data = fetch_hourly_forecasts(
+        coords,
+        min_time - timedelta(hours=PRECIP_HISTORY_HOURS),
+        max_time + timedelta(hours=1),
+        timeout=timeout_for(deadline),
     )
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
+    _archive_forecasts(coords, data, fetched_at)
 
-    # Handle single vs multiple waypoints (API returns dict vs list)
-    if isinstance(data, dict) and 'hourly' in data:
-        data = [data]
+    results = []
+    for (lat, lon, arrival_time), hourly in zip(waypoints, data):
+        forecast_cache.put(lat, lon, hourly)
+        results.append(_weather_record(lat, lon, arrival_time, hourly))
+    return results
+
+
+def _fetch_in_chunks(
+    fetch: Callable[[list, Deadline | None], list],
+    items: list,
+    deadline: Deadline | None = None,
+) -> list[tuple[list, list | None]]:
+    """Run fetch(chunk, deadline) over items in chunks.
+
+    Without a deadline, chunks of WEATHER_CHUNK_SIZE are fetched one after
+    another. With one, smaller chunks are fetched concurrently and those that
+    fail or haven't landed when it expires are given as None.
 
+    Returns:
+        (chunk, its result or None) for each chunk, in order
+    """
+    if deadline is None:
+        return [
+            (chunk, fetch(chunk, None))
+            for chunk in (
+                items[start : start + WEATHER_CHUNK_SIZE]
+                for start in range(0, len(items), WEATHER_CHUNK_SIZE)
+            )
+        ]
+
+    chunks = [
+        items[start : start + DEADLINE_CHUNK_SIZE]
+        for start in range(0, len(items), DEADLINE_CHUNK_SIZE)
+    ]
+    futures = [_fetch_executor.submit(fetch, chunk, deadline) for chunk in chunks]
+    wait(futures, timeout=max(0.0, deadline.remaining()))
+    return [
+        (chunk, future.result())
+        if future.done() and future.exception() is None
+        else (chunk, None)
+        for chunk, future in zip(chunks, futures)
+    ]
+
+
+def _fetch_live_weather(
+    waypoints: list[tuple[float, float, datetime]],
+    deadline: Deadline | None = None,
+) -> list[dict | None]:
     results = []
-    for i, (lat, lon, arrival_time) in enumerate(waypoints):
-        hourly = data[i]['hourly']
-        # Find the closest hour in the forecast
-        times = [datetime.fromisoformat(t) for t in hourly['time']]
-        closest_idx = min(
-            range(len(times)),
-            key=lambda j: abs(
-                (times[j] - arrival_time.replace(tzinfo=None)).total_seconds()
-            ),
-        )
+    for chunk, records in _fetch_in_chunks(_fetch_weather_chunk, waypoints, deadline):
+        if records is None:
+            # Late chunks still fill the cache for later requests when they land
+            metrics.increment('weather.degraded_chunks')
+            records = [_cached_weather(*wp) for wp in chunk]
+        results.extend(records)
+    return results
 
-        results.append(
-            {
-                'lat': lat,
-                'lon': lon,
-                'arrival_time': arrival_time.isoformat(),
-                'temp_c': hourly['temperature_2m'][closest_idx],
-                'wind_kph': hourly['wind_speed_10m'][closest_idx],
-                'gust_kph': hourly['wind_gusts_10m'][closest_idx],
-                'condition': weather_code_to_condition(
-                    hourly['weather_code'][closest_idx]
-                ),
-                'precipitation_mm': hourly['precipitation'][closest_idx] or 0.0,
-                'rain_mm': hourly['rain'][closest_idx] or 0.0,
-                'snowfall_cm': hourly['snowfall'][closest_idx] or 0.0,
-                'snow_depth_m': hourly['snow_depth'][closest_idx] or 0.0,
-                'visibility_m': hourly['visibility'][closest_idx] or 10000.0,
-                'soil_temp_c': hourly['soil_temperature_0cm'][closest_idx],
-                'dew_point_c': hourly['dew_point_2m'][closest_idx],
-            }
+
+def _interpolated_record(
+    lat: float, lon: float, arrival_time: datetime, hourly: dict
+) -> dict:
+    """Weather record for a waypoint, interpolated between the hours either side
+    of its arrival time."""
+    times = [datetime.fromisoformat(t) for t in hourly['time']]
+    when = arrival_time.replace(tzinfo=None)
+    rain_sums = running_sums(hourly['rain'])
+    snow_sums = running_sums(hourly['snowfall'])
+
+    before = min(max(bisect_right(times, when) - 1, 0), len(times) - 1)
+    after = min(before + 1, len(times) - 1)
+    span = (times[after] - times[before]).total_seconds()
+    fraction = (
+        min(max((when - times[before]).total_seconds() / span, 0.0), 1.0)
+        if span
+        else 0.0
+    )
+
+    return {
+        'lat': lat,
+        'lon': lon,
+        'arrival_time': arrival_time.isoformat(),
+        **interpolate_records(
+            weather_at_hour(hourly, before, rain_sums, snow_sums),
+            weather_at_hour(hourly, after, rain_sums, snow_sums),
+            fraction,
+        ),
+    }
+
+
+def _hours_between(hourly: dict, first: str, last: str) -> dict | None:
+    """The part of an hourly block from hour label `first` to `last`."""
+    try:
+        start = hourly['time'].index(first)
+        end = hourly['time'].index(last) + 1
+    except ValueError:
+        return None
+    return {name: values[start:end] for name, values in hourly.items()}
+
+
+def _fetch_grid_weather(
+    waypoints: list[tuple[float, float, datetime]],
+    deadline: Deadline | None = None,
+) -> list[dict | None]:
+    """Weather for waypoints interpolated from the lattice points around them.
+
+    Only the distinct lattice points are fetched (or taken from the forecast
+    cache, when it holds a block fetched for that very point), in concurrent
+    requests.
+
+    Raises:
+        ValueError: If SAFE_TRAVELS_WEATHER_GRID_DEG is finer than the forecast
+            cache cells, which could then hold only one of two corners.
+    """
+    spacing = float(
+        os.environ.get('SAFE_TRAVELS_WEATHER_GRID_DEG', DEFAULT_SPACING_DEG)
+    )
+    if spacing < forecast_cache.CELL_DEG:
+        raise ValueError(
+            f'SAFE_TRAVELS_WEATHER_GRID_DEG must be at least '
+            f'{forecast_cache.CELL_DEG} degrees, got {spacing}'
+        )
+    corners_by_waypoint = [
+        lattice_corners(lat, lon, spacing) for lat, lon, _ in waypoints
+    ]
+    timestamps = [wp[2] for wp in waypoints]
+    start = min(timestamps) - timedelta(hours=PRECIP_HISTORY_HOURS)
+    end = max(timestamps) + timedelta(hours=1)
+    first_hour = start.strftime('%Y-%m-%dT%H:00')
+    last_hour = end.strftime('%Y-%m-%dT%H:00')
+    history_hours = math.ceil((max(timestamps) - start).total_seconds() / 3600)
+
+    blocks = {}
+    missing = []
+    for corner in dict.fromkeys(
+        c for corners in corners_by_waypoint for c, _ in corners
+    ):
+        hourly = forecast_cache.get(
+            *lattice_point(*corner, spacing),
+            max(timestamps),
+            history_hours,
+            exact=True,
         )
+        hourly = _hours_between(hourly, first_hour, last_hour) if hourly else None
+        if hourly is None:
+            missing.append(corner)
+        else:
+            blocks[corner] = hourly
+    metrics.increment('forecast_cache.hits', len(blocks))
+    metrics.increment('forecast_cache.misses', len(missing))
+
+    def fetch(chunk: list[tuple[int, int]]) -> list[dict]:
+        return fetch_hourly_forecasts(
+            [lattice_point(*corner, spacing) for corner in chunk],
+            start,
+            end,
+            timeout=timeout_for(deadline),
+        )
+
+    chunks = [
+        missing[k : k + WEATHER_CHUNK_SIZE]
+        for k in range(0, len(missing), WEATHER_CHUNK_SIZE)
+    ]
+    fetched_at = datetime.now(timezone.utc)
+    futures = [_fetch_executor.submit(fetch, chunk) for chunk in chunks]
+    wait(futures, timeout=max(0.0, deadline.remaining()) if deadline else None)
+    for chunk, future in zip(chunks, futures):
+        if deadline is not None and (
+            not future.done() or future.exception() is not None
+        ):
+            metrics.increment('weather.degraded_chunks')
+            continue
+        coords = [lattice_point(*corner, spacing) for corner in chunk]
+        _archive_forecasts(coords, future.result(), fetched_at)
+        for corner, (lat, lon), hourly in zip(chunk, coords, future.result()):
+            forecast_cache.put(lat, lon, hourly)
+            hourly = _hours_between(hourly, first_hour, last_hour)
+            if hourly is not None:
+                blocks[corner] = hourly
 
+    results = []
+    for (lat, lon, arrival_time), corners in zip(waypoints, corners_by_waypoint):
+        available = [(blocks[c], weight) for c, weight in corners if c in blocks]
+        if not available:
+            results.append(None)
+            continue
+        hourly = blend_hourly([b for b, _ in available], [w for _, w in available])
+        results.append(_interpolated_record(lat, lon, arrival_time, hourly))
     return results
 
 
-def _compute_danger_score(
-    temp_c: float,
-    wind_kph: float,
-    condition: str,
-    gust_kph: float = 0.0,
-    rain_mm: float = 0.0,
-    snowfall_cm: float = 0.0,
-    visibility_m: float = 10000.0,
-    soil_temp_c: float | None = None,
-    dew_point_c: float | None = None,
-) -> float:
-    """Compute danger score from weather conditions."""
-    weather_modifier = weather_conditions_severity.get(condition.lower(), 0.0)
-    temp_modifier = temperature_severity(temp_c)
-    wind_modifier = wind_severity(wind_kph)
-    gust_modifier = wind_severity(gust_kph)
-    precip_modifier = precipitation_severity(rain_mm, snowfall_cm)
-    vis_modifier = visibility_severity(visibility_m)
-    ice_modifier = black_ice_risk(temp_c, soil_temp_c, dew_point_c)
-
-    max_wind_modifier = max(gust_modifier, wind_modifier)
-
-    return min(
-        weather_modifier
-        + temp_modifier
-        + max_wind_modifier
-        + precip_modifier
-        + vis_modifier
-        + ice_modifier,
-        10.0,
-    )
+def fetch_weather_for_waypoints(
+    waypoints: list[tuple[float, float, datetime]],
+    deadline: Deadline | None = None,
+) -> list[dict | None]:
+    """Fetch forecast weather for waypoints at their expected arrival times.
+
+    With a climatology configured (SAFE_TRAVELS_CLIMATOLOGY), waypoints beyond
+    the forecast horizon get the typical weather for their place and time
+    instead (with source 'climatology'), looked up locally. Otherwise they are
+    requested like the rest.
+
+    Waypoints whose forecast cell is in the forecast cache, with enough history
+    for rolling accumulations, are answered from it (with source 'cache').
+    For the rest, the preceding PRECIP_HISTORY_HOURS are requested in the same
+    call so that rolling rain and snowfall accumulations can be computed for
+    each waypoint without a separate historical request.
+
+    With a deadline, waypoints are fetched in small concurrent chunks. Chunks
+    that fail or don't arrive in time are answered from whatever the forecast
+    cache has, and are None otherwise.
+
+    With SAFE_TRAVELS_WEATHER_SAMPLING=grid, forecasts are fetched for the
+    distinct points of a coarse lattice (SAFE_TRAVELS_WEATHER_GRID_DEG apart)
+    around the waypoints instead, and interpolated to each waypoint in space and
+    time.
+
+    Args:
+        waypoints: List of (lat, lon, arrival_time) tuples
+        deadline: Optional time budget for the upstream calls
+    """
+    climatology = default_climatology()
+    beyond = set()
+    if climatology is not None:
+        beyond = {i for i, wp in enumerate(waypoints) if beyond_horizon(wp[2])}
+    if not beyond:
+        return _fetch_forecast_weather(waypoints, deadline)
+
+    metrics.increment('weather.climatology', len(beyond))
+    far = [wp for i, wp in enumerate(waypoints) if i in beyond]
+    near = [wp for i, wp in enumerate(waypoints) if i not in beyond]
+    far_weather = iter(climatology_records(climatology, far))
+    near_weather = iter(_fetch_forecast_weather(near, deadline) if near else [])
+    return [
+        next(far_weather) if i in beyond else next(near_weather)
+        for i in range(len(waypoints))
+    ]
+
+
+def _fetch_forecast_weather(
+    waypoints: list[tuple[float, float, datetime]],
+    deadline: Deadline | None = None,
+) -> list[dict | None]:
+    if os.environ.get('SAFE_TRAVELS_WEATHER_SAMPLING') == 'grid':
+        return _fetch_grid_weather(waypoints, deadline)
+
+    results = [
+        _cached_weather(lat, lon, arrival_time, PRECIP_HISTORY_HOURS)
+        for lat, lon, arrival_time in waypoints
+    ]
+    missing = [i for i, record in enumerate(results) if record is None]
+    metrics.increment('forecast_cache.hits', len(waypoints) - len(missing))
+    metrics.increment('forecast_cache.misses', len(missing))
+
+    if missing:
+        live = _fetch_live_weather([waypoints[i] for i in missing], deadline)
+        for i, record in zip(missing, live):
+            results[i] = record
+    return results
+
+
+def _waypoint_count() -> int:
+    return int(os.environ.get('SAFE_TRAVELS_WAYPOINTS', DEFAULT_WAYPOINTS))
 
 
 def _c_to_f(c: float) -> float:
@@ -206,15 +499,802 @@ def _fmt_depth(m: float) -> str:
         return f"{inches:.1f} in ({m:.2f} m)"
 
 
+# Weather fields of waypoint results: name, weather record key, unit and
+# human-readable formatter
+WEATHER_FIELDS = (
+    ('temperature', 'temp_c', 'degC', _fmt_temp),
+    ('wind_speed', 'wind_kph', 'km/h', _fmt_speed),
+    ('wind_gusts', 'gust_kph', 'km/h', _fmt_speed),
+    ('rainfall', 'rain_mm', 'mm', _fmt_rain),
+    ('snowfall', 'snowfall_cm', 'cm', _fmt_snow),
+    ('visibility', 'visibility_m', 'm', _fmt_visibility),
+    ('snow_depth', 'snow_depth_m', 'm', _fmt_depth),
+    ('rainfall_24h', 'rain_24h_mm', 'mm', _fmt_rain),
+    ('snowfall_24h', 'snowfall_24h_cm', 'cm', _fmt_snow),
+)
+COMPACT_UNITS = {
+    'lat': 'deg',
+    'lon': 'deg',
+    'sun_elevation': 'deg',
+    'danger_score': '0-10',
+    'p_hazardous': '0-1',
+    'p_extreme': '0-1',
+    'vehicle_scores': '0-10',
+    **{name: unit for name, _, unit, _ in WEATHER_FIELDS},
+}
+RESPONSE_FORMATS = ('full', 'compact', 'summary')
+# Most dangerous waypoints listed in summary responses
+WORST_SEGMENTS = 3
+
+
+def _full_waypoint(record: dict) -> dict:
+    result = {key: record[key] for key in ('lat', 'lon', 'arrival_time', 'source')}
+    wd = record['weather']
+    if wd is not None:
+        for name, key, _, fmt in WEATHER_FIELDS:
+            result[name] = fmt(wd.get(key, 0.0))
+            if name == 'wind_gusts':
+                result['condition'] = wd['condition']
+    result.update(
+        (key, value)
+        for key, value in record.items()
+        if key not in result and key != 'weather'
+    )
+    return result
+
+
+def _compact_waypoints(records: list[dict]) -> dict[str, list]:
+    columns = {
+        key: [record[key] for record in records]
+        for key in (
+            'lat',
+            'lon',
+            'arrival_time',
+            'source',
+            'daylight',
+            'sun_elevation',
+            'danger_score',
+        )
+    }
+    weather = [record['weather'] for record in records]
+    columns['condition'] = [wd['condition'] if wd else None for wd in weather]
+    for name, key, _, _ in WEATHER_FIELDS:
+        values = [wd.get(key, 0.0) if wd else None for wd in weather]
+        columns[name] = [round(v, 2) if v is not None else None for v in values]
+    for key in (
+        'place',
+        'place_distance_km',
+        'road',
+        'historical_crashes',
+        'historical_crash_severity',
+        *(f'p_{status}' for status in HAZARD_THRESHOLDS),
+    ):
+        if records and key in records[0]:
+            columns[key] = [record[key] for record in records]
+    if any('alerts' in record for record in records):
+        columns['alerts'] = [record.get('alerts', []) for record in records]
+    if records and 'vehicle_scores' in records[0]:
+        columns['vehicle_scores'] = {
+            name: [record['vehicle_scores'][name] for record in records]
+            for name in records[0]['vehicle_scores']
+        }
+    return columns
+
+
+def _worst_segments(records: list[dict]) -> list[dict]:
+    scored = [
+        (i, record)
+        for i, record in enumerate(records)
+        if record['danger_score'] is not None
+    ]
+    scored.sort(key=lambda item: item[1]['danger_score'], reverse=True)
+    return [
+        {
+            'waypoint': i,
+            'lat': record['lat'],
+            'lon': record['lon'],
+            'arrival_time': record['arrival_time'],
+            'danger_score': record['danger_score'],
+            'condition': record['weather']['condition'] if record['weather'] else None,
+            'daylight': record['daylight'],
+            **{
+                key: record[key]
+                for key in (
+                    'place',
+                    'road',
+                    *(f'p_{status}' for status in HAZARD_THRESHOLDS),
+                    'vehicle_scores',
+                )
+                if key in record
+            },
+        }
+        for i, record in scored[:WORST_SEGMENTS]
+    ]
+
+
+def _render_waypoints(records: list[dict], response_format: str) -> dict:
+    """Waypoint output in a response format.
+
+    full: one dict per waypoint with human-readable values
+    compact: one list per field, numbers in the units given under 'units'
+    summary: only the most dangerous waypoints, under 'worst_segments'
+    """
+    if response_format == 'full':
+        return {'waypoints': [_full_waypoint(record) for record in records]}
+    if response_format == 'compact':
+        return {'waypoints': _compact_waypoints(records), 'units': COMPACT_UNITS}
+    if response_format == 'summary':
+        return {'worst_segments': _worst_segments(records)}
+    raise ValueError(
+        f'Unknown format: {response_format} (expected one of {RESPONSE_FORMATS})'
+    )
+
+
+def _crash_history_by_waypoint(
+    points: list[tuple[float, float]], waypoint_indices: list[int]
+) -> list[tuple[int, float]] | None:
+    """Historical crash counts for the stretch of route after each waypoint.
+
+    Args:
+        points: Route polyline
+        waypoint_indices: Index of each waypoint in the polyline
+
+    Returns None when no crash index is configured.
+    """
+    index = default_crash_index()
+    if index is None:
+        return None
+
+    per_segment = index.corridor_counts(points)
+
+    # Polyline segments from one waypoint up to the next belong to its stretch.
+    # Waypoints go by index, since a route can pass the same point twice
+    starts = list(waypoint_indices)
+    ends = starts[1:] + [len(per_segment)]
+
+    results = []
+    for start, end in zip(starts, ends):
+        stretch = per_segment[start : max(start + 1, end)]
+        results.append(
+            (sum(count for count, _ in stretch), sum(sev for _, sev in stretch))
+        )
+    return results
+
+
+def _label_waypoints(
+    waypoint_results: list[dict], waypoint_coords: list[tuple[float, float]]
+) -> None:
+    """Name the nearest place and road of each waypoint, if a gazetteer is
+    configured."""
+    gazetteer = default_gazetteer()
+    if gazetteer is None:
+        return
+    for record, label in zip(waypoint_results, gazetteer.label(waypoint_coords)):
+        record.update(label)
+
+
+def _sample_heatmap(
+    waypoints: list[tuple[float, float, datetime]],
+) -> list[float | None]:
+    """Precomputed danger score for each waypoint, or None where not covered.
+
+    Uses the heatmap grid configured by SAFE_TRAVELS_HEATMAP, if any.
+    """
+    path = os.environ.get('SAFE_TRAVELS_HEATMAP')
+    if not path or not os.path.exists(path):
+        return [None] * len(waypoints)
+
+    heatmap = load_grid(path)
+    scores = []
+    for lat, lon, when in waypoints:
+        sample = heatmap.sample(lat, lon, when)
+        scores.append(sample['danger_score'] if sample else None)
+    return scores
+
+
+def _daylight_phase(sun_elevation: float) -> str:
+    if sun_elevation >= 0:
+        return 'day'
+    elif sun_elevation >= -6:
+        return 'twilight'
+    else:
+        return 'night'
+
+
+def _geocode(address: str, deadline: Deadline | None = None) -> tuple[float, float]:
+    """Coordinates of an address, from the geocode cache where possible."""
+    coords = route_cache.get_geocode(address)
+    if coords is None:
+        coords = get_lat_long(address, timeout=timeout_for(deadline))
+        route_cache.put_geocode(address, coords)
+        _archive('put_geocode', address, coords)
+    return coords
+
+
+def _cached_route(
+    origin_coords: tuple[float, float],
+    destination_coords: tuple[float, float],
+    departure_time: str | None,
+    arrival_time: str | None,
+    safest: bool = False,
+    deadline: Deadline | None = None,
+) -> dict:
+    """Route between two points, from the route cache where possible.
+
+    Routes are cached per departure hour; routes planned by arrival time are
+    always computed.
+    """
+    if arrival_time and not departure_time:
+        route = compute_route(
+            origin_coords,
+            destination_coords,
+            departure_time,
+            arrival_time,
+            safest,
+            timeout=timeout_for(deadline),
+        )
+        _archive('put_route', origin_coords, destination_coords, route)
+        return route
+
+    departure = (
+        parse_time(departure_time) if departure_time else datetime.now(timezone.utc)
+    )
+    key = route_cache.route_key(origin_coords, destination_coords, departure, safest)
+    route = route_cache.get_route(key)
+    if route is None:
+        route = compute_route(
+            origin_coords,
+            destination_coords,
+            departure_time,
+            arrival_time,
+            safest,
+            timeout=timeout_for(deadline),
+        )
+        route_cache.put_route(key, route)
+        _archive('put_route', origin_coords, destination_coords, route)
+    return route
+
+
+def _score_waypoints(
+    waypoints_with_times: list[tuple[float, float, datetime]],
+    sun_positions: list[tuple[float, float]],
+    headings: list[float],
+    crash_history: list[tuple[int, float]] | None,
+    heatmap_scores: list[float | None],
+    live_weather: Iterator[dict | None],
+    vehicle_profiles: list[str] | None = None,
+) -> tuple[list[dict], list[float], dict[str, list[float]]]:
+    """Assess danger at each waypoint.
+
+    Args:
+        live_weather: Weather records, in order, for the waypoints without a
+            heatmap score (None where the weather is unavailable)
+        vehicle_profiles: Also score each waypoint for these vehicle profiles
+            (see vehicles.py), under 'vehicle_scores'
+
+    Returns:
+        (waypoint results, danger scores of the waypoints that could be scored,
+        the same for each vehicle profile). Waypoint results keep the raw
+        weather record under 'weather' for _render_waypoints() to format.
+    """
+    waypoint_results = []
+    danger_scores = []
+    components = []
+
+    for i, (lat, lon, waypoint_time) in enumerate(waypoints_with_times):
+        sun_elevation, sun_azimuth = sun_positions[i]
+        heading = headings[i]
+
+        wd = next(live_weather) if heatmap_scores[i] is None else None
+        if wd is not None:
+            components.append(
+                weather_components(
+                    wd,
+                    sun_elevation=sun_elevation,
+                    sun_azimuth=sun_azimuth,
+                    heading=heading,
+                )
+            )
+            danger_score = min(sum(components[-1]), 10.0)
+            waypoint_result = {
+                'lat': wd['lat'],
+                'lon': wd['lon'],
+                'arrival_time': wd['arrival_time'],
+                'source': wd.get('source', 'forecast'),
+                'weather': wd,
+            }
+        elif heatmap_scores[i] is not None:
+            # Heatmap scores exclude light, which depends on the travel heading
+            danger_score = min(
+                heatmap_scores[i]
+                + _light_modifier(sun_elevation, sun_azimuth, heading),
+                10.0,
+            )
+            waypoint_result = {
+                'lat': lat,
+                'lon': lon,
+                'arrival_time': waypoint_time.isoformat(),
+                'source': 'heatmap',
+                'weather': None,
+            }
+        else:
+            # Weather didn't arrive within the deadline and wasn't cached
+            danger_score = None
+            waypoint_result = {
+                'lat': lat,
+                'lon': lon,
+                'arrival_time': waypoint_time.isoformat(),
+                'source': 'unavailable',
+                'weather': None,
+            }
+
+        waypoint_result['daylight'] = _daylight_phase(sun_elevation)
+        waypoint_result['sun_elevation'] = round(sun_elevation, 1)
+        waypoint_result['danger_score'] = (
+            round(danger_score, 2) if danger_score is not None else None
+        )
+        if danger_score is not None:
+            danger_scores.append(danger_score)
+        if crash_history is not None:
+            crash_count, crash_severity = crash_history[i]
+            waypoint_result['historical_crashes'] = crash_count
+            waypoint_result['historical_crash_severity'] = round(crash_severity, 1)
+        waypoint_results.append(waypoint_result)
+
+    vehicle_scores = {}
+    if vehicle_profiles:
+        vehicle_scores = _score_vehicles(waypoint_results, components, vehicle_profiles)
+    return waypoint_results, danger_scores, vehicle_scores
+
+
+def _score_vehicles(
+    waypoint_results: list[dict],
+    components: list[list[float]],
+    vehicle_profiles: list[str],
+) -> dict[str, list[float]]:
+    """Score waypoints for several vehicle profiles in one matrix product.
+
+    Args:
+        components: Danger components of the waypoints scored from weather
+            records, in order
+
+    Returns:
+        Scores of the waypoints scored from weather records, by profile
+
+    Heatmap scores can't be split into components, so heatmap waypoints have
+    no vehicle scores and count against each profile's coverage.
+    """
+    matrix = vehicles.score_matrix(components, vehicles.weight_matrix(vehicle_profiles))
+    scores = iter(matrix)
+    for record in waypoint_results:
+        if record['weather'] is not None:
+            row = [round(score, 2) for score in next(scores)]
+        else:
+            row = [None] * len(vehicle_profiles)
+        record['vehicle_scores'] = dict(zip(vehicle_profiles, row))
+    return {name: [row[j] for row in matrix] for j, name in enumerate(vehicle_profiles)}
+
+
+def _vehicle_assessments(
+    vehicle_scores: dict[str, list[float]], waypoint_count: int
+) -> dict[str, dict]:
+    """Overall assessment of a route for each vehicle profile."""
+    return {
+        name: _overall_assessment(scores, waypoint_count)
+        for name, scores in vehicle_scores.items()
+    }
+
+
+def _overall_assessment(danger_scores: list[float], waypoint_count: int) -> dict:
+    """Average and worst danger, coverage and status over scored waypoints."""
+    coverage = len(danger_scores) / waypoint_count
+    if danger_scores:
+        avg_danger = round(sum(danger_scores) / len(danger_scores), 2)
+        max_danger = round(max(danger_scores), 2)
+        # Rounding could lift a score just under a threshold over it
+        status = danger_status(max(danger_scores))
+        # Unscored stretches may hide danger, so a partial answer is never SAFE
+        if coverage < 1 and status == 'SAFE':
+            status = 'MODERATE'
+    else:
+        avg_danger = max_danger = None
+        status = 'UNKNOWN'
+
+    return {
+        'average_danger': avg_danger,
+        'max_danger': max_danger,
+        'coverage': round(coverage, 2),
+        'complete': coverage == 1,
+        'status': status,
+    }
+
+
+# Alert severities that make a route at least HAZARDOUS, whatever the forecast
+ESCALATING_SEVERITIES = ('Extreme', 'Severe')
+
+
+def _route_alerts(
+    waypoints_with_times: list[tuple[float, float, datetime]],
+    waypoint_results: list[dict],
+) -> list[dict] | None:
+    """Official alerts in effect along a route.
+
+    Each waypoint result under an alert gets the alert events under 'alerts'.
+
+    Returns:
+        The distinct alerts with the indices of the waypoints they cover, most
+        severe first, or None when no alerts directory is configured
+    """
+    index = default_alert_index()
+    if index is None:
+        return None
+    route_alerts: dict[str, dict] = {}
+    for i, (record, found) in enumerate(
+        zip(waypoint_results, index.corridor(waypoints_with_times))
+    ):
+        if found:
+            record['alerts'] = [alert.event for alert in found]
+        for alert in found:
+            summary = route_alerts.setdefault(
+                alert.id, {**alert.summary(), 'waypoints': []}
+            )
+            summary['waypoints'].append(i)
+    return sorted(
+        route_alerts.values(), key=lambda alert: SEVERITIES.index(alert['severity'])
+    )
+
+
+def _add_route_alerts(
+    assessment: dict,
+    waypoints_with_times: list[tuple[float, float, datetime]],
+    waypoint_results: list[dict],
+) -> None:
+    """Add the official alerts along a route to its assessment.
+
+    Official warnings outrank the forecast score, so a Severe or Extreme alert
+    makes the status at least HAZARDOUS.
+    """
+    alerts = _route_alerts(waypoints_with_times, waypoint_results)
+    if alerts is None:
+        return
+    assessment['alerts'] = alerts
+    if assessment['status'] in ('SAFE', 'MODERATE', 'UNKNOWN') and any(
+        alert['severity'] in ESCALATING_SEVERITIES for alert in alerts
+    ):
+        assessment['status'] = 'HAZARDOUS'
+    profiling.mark('alerts')
+
+
+def _hazard_probabilities(
+    waypoints_with_times: list[tuple[float, float, datetime]],
+    sun_positions: list[tuple[float, float]],
+    headings: list[float],
+    deadline: Deadline | None = None,
+) -> tuple[dict, dict[str, list[float]]] | None:
+    """Probabilities of HAZARDOUS and EXTREME danger from ensemble forecasts.
+
+    Every member of the ensemble is scored at every waypoint in one pass over a
+    members x waypoints array. Probabilities are None where no member has a
+    temperature.
+
+    Returns:
+        (route-wide result with the number of members and the probability of
+        each status anywhere on the route, probabilities at each waypoint by
+        key), or None if the ensemble didn't arrive within the deadline
+    """
+    timestamps = [wp[2] for wp in waypoints_with_times]
+    blocks = []
+    try:
+        for start in range(0, len(waypoints_with_times), WEATHER_CHUNK_SIZE):
+            chunk = waypoints_with_times[start : start + WEATHER_CHUNK_SIZE]
+            blocks.extend(
+                fetch_ensemble_forecasts(
+                    [(lat, lon) for lat, lon, _ in chunk],
+                    min(timestamps) - timedelta(hours=PRECIP_HISTORY_HOURS),
+                    max(timestamps) + timedelta(hours=1),
+                    timeout=timeout_for(deadline),
+                )
+            )
+    except (DeadlineExceeded, requests.Timeout):
+        metrics.increment('ensemble.deadline_exceeded')
+        return None
+
+    columns = member_columns(
+        blocks,
+        [hour_index(block, t) for block, t in zip(blocks, timestamps)],
+    )
+    # Few distinct codes occur, so map each once
+    conditions = {
+        code: weather_code_to_condition(code) for code in set(columns['weather_code'])
+    }
+    light = [
+        _light_modifier(sun_elevation, sun_azimuth, heading)
+        for (sun_elevation, sun_azimuth), heading in zip(sun_positions, headings)
+    ]
+    scores = score_columns(
+        columns, [conditions[code] for code in columns['weather_code']], light
+    )
+
+    waypoint_count = len(waypoints_with_times)
+    route = {'ensemble_members': len(scores) // waypoint_count}
+    per_waypoint = {}
+    for status, threshold in HAZARD_THRESHOLDS.items():
+        at_waypoints, anywhere = exceedance(scores, waypoint_count, threshold)
+        per_waypoint[f'p_{status}'] = [
+            round(p, 3) if p is not None else None for p in at_waypoints
+        ]
+        route[f'p_{status}'] = round(anywhere, 3) if anywhere is not None else None
+    return route, per_waypoint
+
+
+def _speculate_weather(
+    origin_coords: tuple[float, float],
+    destination_coords: tuple[float, float],
+    departure_time: str | None,
+    arrival_time: str | None,
+    safest: bool = False,
+    deadline: Deadline | None = None,
+) -> tuple[Future, set[tuple[int, int]]] | None:
+    """Start fetching forecasts along the straight line between two points, to
+    overlap with computing the route between them.
+
+    The forecasts cover the longest the trip could plausibly take and go into
+    the forecast cache, where waypoints of the actual route in the same
+    forecast cells find them. Nothing is speculated unless
+    SAFE_TRAVELS_SPECULATIVE_WEATHER is set, when the route is already cached
+    (there is no routing latency to hide), in grid sampling mode, or beyond the
+    forecast horizon.
+
+    Returns:
+        (future of the fetch, forecast cells being fetched), or None
+    """
+    if not os.environ.get('SAFE_TRAVELS_SPECULATIVE_WEATHER'):
+        return None
+    if os.environ.get('SAFE_TRAVELS_WEATHER_SAMPLING') == 'grid':
+        return None
+
+    distance_km = haversine_m(*origin_coords, *destination_coords) / 1000
+    longest = timedelta(
+        hours=SPECULATION_DETOUR * distance_km / ITINERARY_ESTIMATE_SPEED_KPH + 1
+    )
+    if arrival_time and not departure_time:
+        last = parse_time(arrival_time)
+        first = last - longest
+    else:
+        first = (
+            parse_time(departure_time) if departure_time else datetime.now(timezone.utc)
+        )
+        last = first + longest
+        key = route_cache.route_key(origin_coords, destination_coords, first, safest)
+        if route_cache.get_route(key) is not None:
+            return None
+    if beyond_horizon(last):
+        return None
+    start = first - timedelta(hours=PRECIP_HISTORY_HOURS)
+    history_hours = math.ceil((last - start).total_seconds() / 3600)
+
+    # Sample the line about a forecast cell apart, so that a road along it
+    # finds its cells, within one request
+    degrees = max(
+        abs(destination_coords[0] - origin_coords[0]),
+        abs(destination_coords[1] - origin_coords[1]),
+    )
+    count = min(math.ceil(degrees / forecast_cache.CELL_DEG) + 1, WEATHER_CHUNK_SIZE)
+    count = max(count, 2)
+    cells = {}
+    for i in range(count):
+        fraction = i / (count - 1)
+        lat = origin_coords[0] + (destination_coords[0] - origin_coords[0]) * fraction
+        lon = origin_coords[1] + (destination_coords[1] - origin_coords[1]) * fraction
+        cell = forecast_cache.cell_key(lat, lon)
+        if cell not in cells and not forecast_cache.get(lat, lon, last, history_hours):
+            cells[cell] = (lat, lon)
+    if not cells:
+        return None
+
+    def fetch(coords: list[tuple[float, float]]) -> None:
+        fetched_at = datetime.now(timezone.utc)
+        blocks = fetch_hourly_forecasts(
+            coords, start, last + timedelta(hours=1), timeout=timeout_for(deadline)
+        )
+        _archive_forecasts(coords, blocks, fetched_at)
+        for (lat, lon), hourly in zip(coords, blocks):
+            forecast_cache.put(lat, lon, hourly)
+
+    metrics.increment('speculation.cells', len(cells))
+    return _fetch_executor.submit(fetch, list(cells.values())), set(cells)
+
+
+def _fetch_with_speculation(
+    waypoints: list[tuple[float, float, datetime]],
+    speculation: tuple[Future, set[tuple[int, int]]] | None,
+    deadline: Deadline | None = None,
+) -> list[dict | None]:
+    """Weather for waypoints, as fetch_weather_for_waypoints(), taking those in
+    speculatively fetched cells from the speculation.
+
+    The other waypoints are fetched while the speculation finishes. Speculated
+    cells off the route are left unused in the cache.
+    """
+    if speculation is None:
+        return fetch_weather_for_waypoints(waypoints, deadline)
+    future, cells = speculation
+    waypoint_cells = [forecast_cache.cell_key(lat, lon) for lat, lon, _ in waypoints]
+    speculated = [i for i, cell in enumerate(waypoint_cells) if cell in cells]
+    others = [i for i, cell in enumerate(waypoint_cells) if cell not in cells]
+
+    results: list[dict | None] = [None] * len(waypoints)
+    if others:
+        fetched = fetch_weather_for_waypoints([waypoints[i] for i in others], deadline)
+        for i, record in zip(others, fetched):
+            results[i] = record
+    wait([future], timeout=max(0.0, deadline.remaining()) if deadline else None)
+    if not future.done() or future.exception() is not None:
+        metrics.increment('speculation.failed')
+    metrics.increment('speculation.hits', len(speculated))
+    metrics.increment(
+        'speculation.misses', len(cells - {waypoint_cells[i] for i in speculated})
+    )
+    # Answered from the cache if the speculation landed, fetched otherwise
+    if speculated:
+        fetched = fetch_weather_for_waypoints(
+            [waypoints[i] for i in speculated], deadline
+        )
+        for i, record in zip(speculated, fetched):
+            results[i] = record
+    return results
+
+
+def _session_forecasts(
+    waypoints_with_times: list[tuple[float, float, datetime]],
+    deadline: Deadline | None = None,
+) -> list[dict] | None:
+    """Hourly blocks for a session, covering each waypoint from
+    sessions.SHIFT_HOURS before the trip (plus the accumulation history) to
+    sessions.SHIFT_HOURS after it, as far as the forecast reaches.
+
+    The blocks go into the forecast cache, so the assessment that follows is
+    answered from them.
+
+    Returns:
+        A block per waypoint, or None if they didn't arrive within the deadline
+        or the trip is beyond the forecast horizon
+    """
+    timestamps = [wp[2] for wp in waypoints_with_times]
+    shift = timedelta(hours=sessions.SHIFT_HOURS)
+    start = min(timestamps) - shift - timedelta(hours=PRECIP_HISTORY_HOURS)
+    end = min(
+        max(timestamps) + shift + timedelta(hours=1),
+        datetime.now(timezone.utc) + timedelta(days=FORECAST_HORIZON_DAYS),
+    )
+    if end <= start:
+        return None
+    history_hours = math.ceil((end - start).total_seconds() / 3600)
+
+    blocks = [
+        forecast_cache.get(lat, lon, end, history_hours)
+        for lat, lon, _ in waypoints_with_times
+    ]
+    missing = [i for i, block in enumerate(blocks) if block is None]
+
+    def fetch(chunk: list[int], deadline: Deadline | None) -> list[dict]:
+        coords = [waypoints_with_times[i][:2] for i in chunk]
+        fetched_at = datetime.now(timezone.utc)
+        fetched = fetch_hourly_forecasts(
+            coords, start, end, timeout=timeout_for(deadline)
+        )
+        _archive_forecasts(coords, fetched, fetched_at)
+        for (lat, lon), hourly in zip(coords, fetched):
+            forecast_cache.put(lat, lon, hourly)
+        return fetched
+
+    try:
+        fetched = _fetch_in_chunks(fetch, missing, deadline)
+    except (DeadlineExceeded, requests.Timeout):
+        fetched = None
+    if fetched is None or any(hourly is None for _, hourly in fetched):
+        metrics.increment('sessions.deadline_exceeded')
+        return None
+    for chunk, chunk_blocks in fetched:
+        for i, hourly in zip(chunk, chunk_blocks):
+            blocks[i] = hourly
+    return blocks
+
+
+def _session_weather(
+    session: sessions.Session,
+    waypoints_with_times: list[tuple[float, float, datetime]],
+) -> list[dict | None]:
+    """Weather records for re-timed waypoints from a session's hourly blocks.
+
+    Waypoints beyond the forecast horizon use the climatology, if configured.
+    Waypoints moved outside the blocks are None.
+    """
+    climatology = default_climatology()
+    results = []
+    for (lat, lon, arrival_time), hourly in zip(
+        waypoints_with_times, session.forecasts
+    ):
+        if climatology is not None and beyond_horizon(arrival_time):
+            results.extend(climatology_records(climatology, [(lat, lon, arrival_time)]))
+            continue
+        # Waypoint times are UTC, like the block's hour labels
+        when = arrival_time.replace(tzinfo=None)
+        slack = timedelta(minutes=30)
+        first = datetime.fromisoformat(hourly['time'][0])
+        last = datetime.fromisoformat(hourly['time'][-1])
+        if first - slack <= when <= last + slack:
+            results.append(_weather_record(lat, lon, arrival_time, hourly))
+        else:
+            results.append(None)
+    return results
+
+
+def warm_corridor(
+    origin: str, destination: str, departure: datetime, safest: bool = False
+) -> None:
+    """Fill the geocode, route and forecast caches for a trip departing within
+    the hour starting at `departure`."""
+    origin_coords = _geocode(origin)
+    destination_coords = _geocode(destination)
+    # Traffic-aware routes can't depart in the past
+    route_departure = max(departure, datetime.now(timezone.utc))
+    route = _cached_route(
+        origin_coords, destination_coords, route_departure.isoformat(), None, safest
+    )
+
+    points = polyline.decode(route['routes'][0]['polyline']['encodedPolyline'])
+    waypoint_coords = pick_equidistant_points(points, _waypoint_count())
+    duration_seconds = get_route_duration_seconds(route)
+    # Waypoint times for leaving at the start and the end of the hour, so the
+    # fetched forecasts cover any departure within it
+    waypoints = waypoint_times(
+        waypoint_coords, departure, duration_seconds
+    ) + waypoint_times(
+        waypoint_coords, departure + timedelta(hours=1), duration_seconds
+    )
+    live_waypoints = [
+        wp for wp, score in zip(waypoints, _sample_heatmap(waypoints)) if score is None
+    ]
+    if live_waypoints:
+        fetch_weather_for_waypoints(live_waypoints)
+
+
+_prefetcher = prefetch.Prefetcher(
+    warm_corridor,
+    rate=float(os.environ.get('SAFE_TRAVELS_PREFETCH_RATE', prefetch.DEFAULT_RATE)),
+)
+
+# Shared by both assessment tools
+_assessments = admission.Gate(
+    'assessments',
+    max_in_flight=int(
+        os.environ.get('SAFE_TRAVELS_MAX_IN_FLIGHT', admission.DEFAULT_MAX_IN_FLIGHT)
+    ),
+    max_queue=int(
+        os.environ.get('SAFE_TRAVELS_MAX_QUEUE', admission.DEFAULT_MAX_QUEUE)
+    ),
+    max_queue_wait=float(
+        os.environ.get('SAFE_TRAVELS_MAX_QUEUE_WAIT', admission.DEFAULT_MAX_QUEUE_WAIT)
+    ),
+)
+
+
+def _admission_timeout(deadline: Deadline | None) -> float | None:
+    """Seconds a call may wait for admission within its deadline."""
+    return deadline.remaining() if deadline is not None else None
+
+
 mcp = FastMCP('safe-travels')
 
 
 @mcp.tool
-def derive_route(
+async def derive_route(
     origin: str,
     destination: str,
     departure_time: str | None = None,
     arrival_time: str | None = None,
+    safest_route: bool = False,
 ) -> list[tuple[float, float]]:
     """
     Derive a route between two cities.
@@ -224,30 +1304,85 @@ def derive_route(
         destination: Destination city (e.g. "Boulder, CO")
         departure_time: Optional departure time in RFC3339 or parseable format
         arrival_time: Optional arrival time in RFC3339 or parseable format
+        safest_route: Prefer the route with the least forecast danger over the
+            quickest one (local routing backend only)
 
     Returns:
         List of (latitude, longitude) tuples representing equidistant waypoints
         along the route
     """
-    origin_coords = get_lat_long(origin)
-    destination_coords = get_lat_long(destination)
+    return await anyio.to_thread.run_sync(
+        functools.partial(
+            _derive_route,
+            origin,
+            destination,
+            departure_time,
+            arrival_time,
+            safest_route,
+        )
+    )
+
 
-    route = compute_route(
-        origin_coords, destination_coords, departure_time, arrival_time
+@profiling.profiled
+def _derive_route(
+    origin: str,
+    destination: str,
+    departure_time: str | None,
+    arrival_time: str | None,
+    safest_route: bool,
+) -> list[tuple[float, float]]:
+    """Body of derive_route, run in a worker thread."""
+    origin_coords = _geocode(origin)
+    destination_coords = _geocode(destination)
+
+    route = _cached_route(
+        origin_coords, destination_coords, departure_time, arrival_time, safest_route
     )
 
     encoded_polyline = route['routes'][0]['polyline']['encodedPolyline']
     points = polyline.decode(encoded_polyline)
 
-    return pick_equidistant_points(points)
+    return pick_equidistant_points(points, _waypoint_count())
+
+
+@mcp.tool
+def get_metrics() -> dict:
+    """
+    Report server metrics: upstream request and hedging counters, gauges such
+    as hedge rates, and latency percentiles in milliseconds.
+    """
+    return metrics.snapshot()
+
+
+@mcp.tool
+def get_slow_profiles(limit: int = 10) -> list[dict]:
+    """
+    Report profiles of recent slow tool calls, newest first. Profiling is enabled
+    by setting SAFE_TRAVELS_PROFILE_MS to the latency threshold in milliseconds.
+
+    Args:
+        limit: Maximum number of profiles to return
+
+    Returns:
+        List of profiles, each with the tool name, start time, duration,
+        per-stage timings, sampled stacks in collapsed (flamegraph) format and,
+        if enabled, allocation statistics
+    """
+    return profiling.slow_profiles(limit)
 
 
 @mcp.tool
-def assess_route_danger(
+async def assess_route_danger(
     origin: str,
     destination: str,
     departure_time: str | None = None,
     arrival_time: str | None = None,
+    safest_route: bool = False,
+    deadline_ms: int | None = None,
+    format: str = 'full',
+    ensemble: bool = False,
+    session: bool = False,
+    vehicle_profiles: list[str] | None = None,
 ) -> dict:
     """
     Compute the danger assessment for an entire route, including weather conditions.
@@ -261,6 +1396,25 @@ def assess_route_danger(
         destination: Destination city (e.g. "Dahlonega, GA")
         departure_time: Optional departure time (e.g. "2026-01-23T07:00:00")
         arrival_time: Optional arrival time (e.g. "2026-01-23T10:00:00")
+        safest_route: Prefer the route with the least forecast danger over the
+            quickest one (local routing backend only)
+        deadline_ms: Optional time budget in milliseconds. When it runs short,
+            a partial assessment is returned instead of waiting: waypoints are
+            scored from cached forecasts where possible and the rest are
+            marked unavailable.
+        format: Response format. "full" gives a dict of human-readable values
+            per waypoint, "compact" gives one list of numbers per field with
+            their units under "units", and "summary" gives only the overall
+            assessment and the most dangerous waypoints ("worst_segments").
+        ensemble: Also score every member of an ensemble forecast and report
+            the probability of HAZARDOUS and EXTREME danger at each waypoint
+            (p_hazardous, p_extreme) and anywhere on the route.
+        session: Keep the route and its hourly forecasts in memory and return a
+            session_id, so rescore_session can answer follow-ups such as a
+            later departure without calling any upstream service.
+        vehicle_profiles: Also score the route for these classes of vehicle,
+            e.g. ["car", "truck", "motorcycle"], each weighing the parts of the
+            danger score differently (configurable, see vehicles.py)
 
     Returns:
         Dictionary containing:
@@ -269,32 +1423,114 @@ def assess_route_danger(
         - departure_time: When the trip starts
         - arrival_time: When the trip ends
         - waypoints: List of waypoint assessments with lat, lon, arrival_time,
-            weather, and danger score
+            weather, and danger score. With SAFE_TRAVELS_GAZETTEER set, also
+            the nearest named place (and its distance) and road.
         - average_danger: Average danger score across all waypoints
         - max_danger: Maximum danger score encountered
-        - status: Overall safety status (SAFE, MODERATE, HAZARDOUS, EXTREME)
+        - coverage: Fraction of waypoints that could be scored
+        - complete: Whether every waypoint was scored
+        - status: Overall safety status (SAFE, MODERATE, HAZARDOUS, EXTREME, or
+            UNKNOWN if nothing could be scored). A partial assessment is never
+            reported as SAFE.
+        - ensemble_members, p_hazardous, p_extreme: With ensemble, the number
+            of ensemble members and the probability of each status anywhere on
+            the route
+        - climatological: True if waypoints beyond the forecast horizon were
+            scored from typical weather rather than a forecast (their source
+            is 'climatology')
+        - alerts: With SAFE_TRAVELS_ALERTS set, official alerts in effect along
+            the route and the waypoints they cover. A Severe or Extreme alert
+            makes the status at least HAZARDOUS.
+        - session_id: With session, the handle for rescore_session (missing if
+            the forecasts didn't arrive within the deadline)
+        - vehicles: With vehicle_profiles, the average_danger, max_danger,
+            coverage, complete and status for each profile. Each waypoint has
+            its score for each profile under vehicle_scores.
     """
+    # Time spent waiting for admission counts against the budget
+    deadline = Deadline(deadline_ms) if deadline_ms is not None else None
+    async with _assessments.admitted(_admission_timeout(deadline)):
+        return await anyio.to_thread.run_sync(
+            functools.partial(
+                _assess_route_danger,
+                origin,
+                destination,
+                departure_time,
+                arrival_time,
+                safest_route,
+                deadline,
+                format,
+                ensemble,
+                session,
+                vehicle_profiles,
+            )
+        )
+
+
+@profiling.profiled
+def _assess_route_danger(
+    origin: str,
+    destination: str,
+    departure_time: str | None,
+    arrival_time: str | None,
+    safest_route: bool,
+    deadline: Deadline | None,
+    format: str,
+    ensemble: bool,
+    session: bool,
+    vehicle_profiles: list[str] | None,
+) -> dict:
+    """Body of assess_route_danger, run in a worker thread."""
+    if format not in RESPONSE_FORMATS:
+        raise ValueError(f'Unknown format: {format}')
+    if vehicle_profiles:
+        vehicles.check_profiles(vehicle_profiles)
+
     # Step 1: Derive the route
-    origin_coords = get_lat_long(origin)
-    destination_coords = get_lat_long(destination)
-    route = compute_route(
-        origin_coords, destination_coords, departure_time, arrival_time
-    )
+    try:
+        origin_coords = _geocode(origin, deadline)
+        destination_coords = _geocode(destination, deadline)
+        speculation = _speculate_weather(
+            origin_coords,
+            destination_coords,
+            departure_time,
+            arrival_time,
+            safest_route,
+            deadline,
+        )
+        route = _cached_route(
+            origin_coords,
+            destination_coords,
+            departure_time,
+            arrival_time,
+            safest_route,
+            deadline,
+        )
+    except (DeadlineExceeded, requests.Timeout):
+        # Without a route there is nothing to score
+        metrics.increment('assess.deadline_exceeded')
+        return {
+            'origin': origin,
+            'destination': destination,
+            'departure_time': None,
+            'arrival_time': None,
+            'duration_minutes': None,
+            **_render_waypoints([], format),
+            **_overall_assessment([], 1),
+        }
+    profiling.mark('route')
     encoded_polyline = route['routes'][0]['polyline']['encodedPolyline']
     points = polyline.decode(encoded_polyline)
-    waypoint_coords = pick_equidistant_points(points)
+    waypoint_indices = equidistant_indices(points, _waypoint_count())
+    waypoint_coords = [points[i] for i in waypoint_indices]
 
     # Step 2: Calculate departure time and waypoint arrival times
     duration_seconds = get_route_duration_seconds(route)
 
     if departure_time:
-        start_time = dateutil.parser.parse(departure_time)
-        if start_time.tzinfo is None:
-            start_time = start_time.replace(tzinfo=timezone.utc)
+        start_time = parse_time(departure_time)
     elif arrival_time:
-        end_time = dateutil.parser.parse(arrival_time)
-        if end_time.tzinfo is None:
-            end_time = end_time.replace(tzinfo=timezone.utc)
+        end_time = parse_time(arrival_time)
         start_time = end_time - timedelta(seconds=duration_seconds)
     else:
         start_time = datetime.now(timezone.utc)
@@ -302,76 +1538,442 @@ def assess_route_danger(
     end_time = start_time + timedelta(seconds=duration_seconds)
 
     # Calculate arrival time for each waypoint (linear interpolation)
-    num_waypoints = len(waypoint_coords)
-    waypoints_with_times = []
-    for i, (lat, lon) in enumerate(waypoint_coords):
-        # Fraction of trip completed at this waypoint
-        fraction = i / (num_waypoints - 1) if num_waypoints > 1 else 0
-        waypoint_time = start_time + timedelta(seconds=duration_seconds * fraction)
-        waypoints_with_times.append((lat, lon, waypoint_time))
-
-    # Step 3: Fetch weather for all waypoints at their arrival times
-    weather_data = fetch_weather_for_waypoints(waypoints_with_times)
+    waypoints_with_times = waypoint_times(waypoint_coords, start_time, duration_seconds)
+
+    if prefetch.enabled():
+        prefetch.record_query(origin, destination, start_time, safest_route)
+        _prefetcher.start()
+
+    # Sun position and travel heading are computed locally for light modifiers
+    sun_positions = solar_positions(waypoints_with_times)
+    headings = waypoint_headings(points, waypoint_indices)
+    profiling.mark('schedule')
+    crash_history = _crash_history_by_waypoint(points, waypoint_indices)
+    profiling.mark('crash_history')
+
+    # A session's wider forecasts also answer this assessment, from the cache
+    session_forecasts = None
+    if session:
+        session_forecasts = _session_forecasts(waypoints_with_times, deadline)
+        profiling.mark('session')
+
+    # Step 3: Score waypoints covered by the precomputed heatmap locally and
+    # fetch weather only for the rest, at their arrival times
+    heatmap_scores = _sample_heatmap(waypoints_with_times)
+    profiling.mark('heatmap')
+    live_waypoints = [
+        wp for wp, score in zip(waypoints_with_times, heatmap_scores) if score is None
+    ]
+    live_weather = iter(
+        _fetch_with_speculation(live_waypoints, speculation, deadline)
+        if live_waypoints
+        else []
+    )
+    profiling.mark('weather')
 
     # Step 4: Assess danger at each waypoint
-    waypoint_results = []
-    danger_scores = []
+    waypoint_results, danger_scores, vehicle_scores = _score_waypoints(
+        waypoints_with_times,
+        sun_positions,
+        headings,
+        crash_history,
+        heatmap_scores,
+        live_weather,
+        vehicle_profiles,
+    )
+    _label_waypoints(waypoint_results, waypoint_coords)
 
-    for wd in weather_data:
-        danger_score = _compute_danger_score(
-            temp_c=wd['temp_c'],
-            wind_kph=wd['wind_kph'],
-            condition=wd['condition'],
-            gust_kph=wd['gust_kph'],
-            rain_mm=wd['rain_mm'],
-            snowfall_cm=wd['snowfall_cm'],
-            visibility_m=wd['visibility_m'],
-            soil_temp_c=wd['soil_temp_c'],
-            dew_point_c=wd['dew_point_c'],
+    # Step 5: Compute overall assessment
+    assessment = _overall_assessment(danger_scores, len(waypoint_results))
+    if vehicle_profiles:
+        assessment['vehicles'] = _vehicle_assessments(
+            vehicle_scores, len(waypoint_results)
         )
+    if any(record['source'] == 'climatology' for record in waypoint_results):
+        assessment['climatological'] = True
+    profiling.mark('scoring')
 
-        danger_scores.append(danger_score)
-        waypoint_results.append(
-            {
-                'lat': wd['lat'],
-                'lon': wd['lon'],
-                'arrival_time': wd['arrival_time'],
-                'temperature': _fmt_temp(wd['temp_c']),
-                'wind_speed': _fmt_speed(wd['wind_kph']),
-                'wind_gusts': _fmt_speed(wd['gust_kph']),
-                'condition': wd['condition'],
-                'rainfall': _fmt_rain(wd['rain_mm']),
-                'snowfall': _fmt_snow(wd['snowfall_cm']),
-                'visibility': _fmt_visibility(wd['visibility_m']),
-                'snow_depth': _fmt_depth(wd['snow_depth_m']),
-                'danger_score': round(danger_score, 2),
-            }
+    if ensemble:
+        probabilities = _hazard_probabilities(
+            waypoints_with_times, sun_positions, headings, deadline
         )
+        if probabilities is not None:
+            route_probabilities, per_waypoint = probabilities
+            assessment.update(route_probabilities)
+            for key, values in per_waypoint.items():
+                for record, value in zip(waypoint_results, values):
+                    record[key] = value
+        profiling.mark('ensemble')
 
-    # Step 5: Compute overall assessment
-    avg_danger = sum(danger_scores) / len(danger_scores)
-    max_danger = max(danger_scores)
-
-    if max_danger < 2:
-        status = 'SAFE'
-    elif max_danger < 5:
-        status = 'MODERATE'
-    elif max_danger < 10:
-        status = 'HAZARDOUS'
-    else:
-        status = 'EXTREME'
+    _add_route_alerts(assessment, waypoints_with_times, waypoint_results)
 
-    return {
+    result = {
         'origin': origin,
         'destination': destination,
         'departure_time': start_time.isoformat(),
         'arrival_time': end_time.isoformat(),
         'duration_minutes': round(duration_seconds / 60),
-        'waypoints': waypoint_results,
-        'average_danger': round(avg_danger, 2),
-        'max_danger': round(max_danger, 2),
-        'status': status,
+        **_render_waypoints(waypoint_results, format),
+        **assessment,
+    }
+    if session_forecasts is not None:
+        result['session_id'] = sessions.create(
+            sessions.Session(
+                origin=origin,
+                destination=destination,
+                safest_route=safest_route,
+                points=points,
+                waypoint_coords=waypoint_coords,
+                waypoint_indices=waypoint_indices,
+                departure=start_time,
+                duration_seconds=duration_seconds,
+                forecasts=session_forecasts,
+                crash_history=crash_history,
+            )
+        )
+    return result
+
+
+@mcp.tool
+@profiling.profiled
+def rescore_session(
+    session_id: str,
+    departure_time: str | None = None,
+    arrival_time: str | None = None,
+    format: str = 'full',
+    vehicle_profiles: list[str] | None = None,
+) -> dict:
+    """
+    Re-assess the route of an earlier assessment for another departure or
+    arrival time, or other vehicles, from the forecasts it kept in memory.
+
+    Takes milliseconds, since nothing is geocoded, routed or fetched again. The
+    trip takes as long as it did in the original assessment, and can move up
+    to 12 hours either way; waypoints moved beyond the kept forecasts are
+    unavailable.
+
+    Args:
+        session_id: The session_id of an assess_route_danger call made with
+            session=True. Sessions expire 30 minutes after their last use.
+        departure_time: Optional new departure time (e.g. "2026-01-23T09:00:00")
+        arrival_time: Optional new arrival time, used if no departure time is
+            given. With neither, the original departure time is kept.
+        format: Response format, as for assess_route_danger
+        vehicle_profiles: Vehicle profiles to score for, as for
+            assess_route_danger
+
+    Returns:
+        Dictionary shaped like an assess_route_danger result, with the same
+        session_id
+    """
+    if format not in RESPONSE_FORMATS:
+        raise ValueError(f'Unknown format: {format}')
+    if vehicle_profiles:
+        vehicles.check_profiles(vehicle_profiles)
+    session = sessions.get(session_id)
+    if session is None:
+        raise ValueError(f'Unknown or expired session: {session_id}')
+
+    duration = timedelta(seconds=session.duration_seconds)
+    if departure_time:
+        start_time = parse_time(departure_time)
+    elif arrival_time:
+        start_time = parse_time(arrival_time) - duration
+    else:
+        start_time = session.departure
+    waypoints_with_times = waypoint_times(
+        session.waypoint_coords, start_time, session.duration_seconds
+    )
+
+    waypoint_results, danger_scores, vehicle_scores = _score_waypoints(
+        waypoints_with_times,
+        solar_positions(waypoints_with_times),
+        waypoint_headings(session.points, session.waypoint_indices),
+        session.crash_history,
+        [None] * len(waypoints_with_times),
+        iter(_session_weather(session, waypoints_with_times)),
+        vehicle_profiles,
+    )
+    _label_waypoints(waypoint_results, session.waypoint_coords)
+    assessment = _overall_assessment(danger_scores, len(waypoint_results))
+    if vehicle_profiles:
+        assessment['vehicles'] = _vehicle_assessments(
+            vehicle_scores, len(waypoint_results)
+        )
+    if any(record['source'] == 'climatology' for record in waypoint_results):
+        assessment['climatological'] = True
+    profiling.mark('scoring')
+
+    _add_route_alerts(assessment, waypoints_with_times, waypoint_results)
+
+    return {
+        'origin': session.origin,
+        'destination': session.destination,
+        'departure_time': start_time.isoformat(),
+        'arrival_time': (start_time + duration).isoformat(),
+        'duration_minutes': round(session.duration_seconds / 60),
+        **_render_waypoints(waypoint_results, format),
+        **assessment,
+        'session_id': session_id,
+    }
+
+
+@mcp.tool
+async def assess_itinerary(
+    stops: list[dict],
+    departure_time: str | None = None,
+    safest_route: bool = False,
+    deadline_ms: int | None = None,
+    format: str = 'full',
+) -> dict:
+    """
+    Compute the danger assessment for a trip with several stops.
+
+    All stops are geocoded and all legs are routed concurrently, and weather for
+    the waypoints of every leg is fetched together. Each leg departs from its
+    stop once the previous leg has arrived and the dwell time there has passed.
+
+    Args:
+        stops: Ordered stops, each a dict with a "location" (e.g. "Vail, CO") and
+            optional "dwell_minutes" spent there before continuing
+        departure_time: Optional departure time from the first stop (e.g.
+            "2026-01-23T07:00:00"), defaults to now
+        safest_route: Prefer the routes with the least forecast danger over the
+            quickest ones (local routing backend only)
+        deadline_ms: Optional time budget in milliseconds, as for
+            assess_route_danger
+        format: Response format for each leg's waypoints, as for
+            assess_route_danger
+
+    Returns:
+        Dictionary containing:
+        - stops: Each stop with its coordinates and arrival and departure times
+        - departure_time: When the trip starts
+        - arrival_time: When the trip ends
+        - duration_minutes: Total trip time, including time spent at stops
+        - legs: Assessment of each leg, shaped like an assess_route_danger result
+            (in compact format, the units are given once, at the top level)
+        - average_danger, max_danger, coverage, complete, status: Assessment of
+            the whole trip
+    """
+    # Time spent waiting for admission counts against the budget
+    deadline = Deadline(deadline_ms) if deadline_ms is not None else None
+    async with _assessments.admitted(_admission_timeout(deadline)):
+        return await anyio.to_thread.run_sync(
+            functools.partial(
+                _assess_itinerary,
+                stops,
+                departure_time,
+                safest_route,
+                deadline,
+                format,
+            )
+        )
+
+
+@profiling.profiled
+def _assess_itinerary(
+    stops: list[dict],
+    departure_time: str | None,
+    safest_route: bool,
+    deadline: Deadline | None,
+    format: str,
+) -> dict:
+    """Body of assess_itinerary, run in a worker thread."""
+    if len(stops) < 2:
+        raise ValueError('An itinerary needs at least two stops')
+    if format not in RESPONSE_FORMATS:
+        raise ValueError(f'Unknown format: {format}')
+    locations = [stop['location'] for stop in stops]
+    dwells = [timedelta(minutes=stop.get('dwell_minutes') or 0) for stop in stops]
+    start_time = (
+        parse_time(departure_time) if departure_time else datetime.now(timezone.utc)
+    )
+
+    # Step 1: Geocode the unique stops, then route every leg concurrently
+    try:
+        unique_locations = list(dict.fromkeys(locations))
+        coords = dict(
+            zip(
+                unique_locations,
+                _route_executor.map(
+                    lambda location: _geocode(location, deadline), unique_locations
+                ),
+            )
+        )
+
+        # Traffic-aware routing needs each leg's departure time before the
+        # earlier legs are routed, so it is estimated from straight-line distance
+        estimated_departures = []
+        clock = start_time
+        for i in range(len(stops) - 1):
+            clock += dwells[i] if i else timedelta(0)
+            estimated_departures.append(clock)
+            distance_km = (
+                haversine_m(*coords[locations[i]], *coords[locations[i + 1]]) / 1000
+            )
+            clock += timedelta(hours=distance_km / ITINERARY_ESTIMATE_SPEED_KPH)
+
+        routes = list(
+            _route_executor.map(
+                lambda i: _cached_route(
+                    coords[locations[i]],
+                    coords[locations[i + 1]],
+                    estimated_departures[i].isoformat(),
+                    None,
+                    safest_route,
+                    deadline,
+                ),
+                range(len(stops) - 1),
+            )
+        )
+    except (DeadlineExceeded, requests.Timeout):
+        metrics.increment('assess.deadline_exceeded')
+        return {
+            'stops': [{'location': location} for location in locations],
+            'departure_time': None,
+            'arrival_time': None,
+            'duration_minutes': None,
+            'legs': [],
+            **_overall_assessment([], 1),
+        }
+    profiling.mark('route')
+
+    # Step 2: Chain the legs' departure and waypoint arrival times
+    legs = []
+    clock = start_time
+    for i, route in enumerate(routes):
+        clock += dwells[i] if i else timedelta(0)
+        points = polyline.decode(route['routes'][0]['polyline']['encodedPolyline'])
+        waypoint_indices = equidistant_indices(points, _waypoint_count())
+        duration_seconds = get_route_duration_seconds(route)
+        legs.append(
+            {
+                'points': points,
+                'waypoint_indices': waypoint_indices,
+                'waypoints': waypoint_times(
+                    [points[i] for i in waypoint_indices],
+                    clock,
+                    duration_seconds,
+                ),
+                'departure': clock,
+                'duration_seconds': duration_seconds,
+            }
+        )
+        if prefetch.enabled():
+            prefetch.record_query(locations[i], locations[i + 1], clock, safest_route)
+        clock += timedelta(seconds=duration_seconds)
+    end_time = clock
+    if prefetch.enabled():
+        _prefetcher.start()
+
+    # Step 3: Fetch weather for the waypoints of all legs that the heatmap
+    # doesn't cover, in one merged set of requests
+    live_waypoints = []
+    for leg in legs:
+        leg['heatmap_scores'] = _sample_heatmap(leg['waypoints'])
+        live_waypoints.extend(
+            wp
+            for wp, score in zip(leg['waypoints'], leg['heatmap_scores'])
+            if score is None
+        )
+    live_weather = iter(
+        fetch_weather_for_waypoints(live_waypoints, deadline) if live_waypoints else []
+    )
+    profiling.mark('weather')
+
+    # Step 4: Assess each leg, then the whole trip
+    leg_results = []
+    all_scores = []
+    waypoint_count = 0
+    for i, leg in enumerate(legs):
+        waypoints_with_times = leg['waypoints']
+        waypoint_coords = [(lat, lon) for lat, lon, _ in waypoints_with_times]
+        waypoint_results, danger_scores, _ = _score_waypoints(
+            waypoints_with_times,
+            solar_positions(waypoints_with_times),
+            waypoint_headings(leg['points'], leg['waypoint_indices']),
+            _crash_history_by_waypoint(leg['points'], leg['waypoint_indices']),
+            leg['heatmap_scores'],
+            live_weather,
+        )
+        _label_waypoints(waypoint_results, waypoint_coords)
+        all_scores.extend(danger_scores)
+        waypoint_count += len(waypoint_results)
+        arrival = leg['departure'] + timedelta(seconds=leg['duration_seconds'])
+        leg_results.append(
+            {
+                'origin': locations[i],
+                'destination': locations[i + 1],
+                'departure_time': leg['departure'].isoformat(),
+                'arrival_time': arrival.isoformat(),
+                'duration_minutes': round(leg['duration_seconds'] / 60),
+                **_render_waypoints(waypoint_results, format),
+                **_overall_assessment(danger_scores, len(waypoint_results)),
+            }
+        )
+
+    stop_results = []
+    for i, location in enumerate(locations):
+        lat, lon = coords[location]
+        stop = {'location': location, 'lat': lat, 'lon': lon}
+        if i > 0:
+            stop['arrival_time'] = leg_results[i - 1]['arrival_time']
+        if i < len(legs):
+            stop['departure_time'] = leg_results[i]['departure_time']
+            if i > 0:
+                stop['dwell_minutes'] = round(dwells[i].total_seconds() / 60)
+        stop_results.append(stop)
+    profiling.mark('scoring')
+
+    result = {
+        'stops': stop_results,
+        'departure_time': start_time.isoformat(),
+        'arrival_time': end_time.isoformat(),
+        'duration_minutes': round((end_time - start_time).total_seconds() / 60),
+        'legs': leg_results,
+        **_overall_assessment(all_scores, waypoint_count),
     }
+    if format == 'compact':
+        for leg_result in leg_results:
+            result['units'] = leg_result.pop('units')
+    return result
+
+
+@mcp.custom_route('/tiles/{z:int}/{x:int}/{y:int}.{ext}', methods=['GET'])
+async def danger_tile(request: Request) -> Response:
+    """XYZ map tile of forecast danger, for dashboards (HTTP transports only).
+
+    Rendered from the heatmap configured by SAFE_TRAVELS_HEATMAP at the hour
+    nearest to the optional `time` query parameter (default now), as a PNG
+    (.png) or GeoJSON cells (.geojson). See tiles.py.
+    """
+    server = default_tile_server()
+    if server is None:
+        return PlainTextResponse('No heatmap configured', status_code=404)
+    params = request.path_params
+    try:
+        when = (
+            parse_time(request.query_params['time'])
+            if 'time' in request.query_params
+            else datetime.now(timezone.utc)
+        )
+        tile = await run_in_threadpool(
+            server.tile,
+            params['z'],
+            params['x'],
+            params['y'],
+            when,
+            params['ext'],
+        )
+    except (ValueError, OverflowError) as e:
+        return PlainTextResponse(str(e), status_code=400)
+    if tile is None:
+        return PlainTextResponse('Time outside the heatmap', status_code=404)
+    headers = {'Cache-Control': f'public, max-age={TILE_MAX_AGE_SECONDS}'}
+    if isinstance(tile, dict):
+        return JSONResponse(tile, headers=headers, media_type='application/geo+json')
+    return Response(tile, headers=headers, media_type='image/png')
 
 
 if __name__ == '__main__':
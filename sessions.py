@@ -0,0 +1,71 @@
+"""Assessment sessions for what-if follow-ups.
+
+An assessment made with a session keeps its route and the hourly forecasts of
+every waypoint over a window of SHIFT_HOURS either side of the trip. Follow-ups
+such as "what if I left two hours later?" are then re-timed and re-scored from
+memory, without geocoding, routing or fetching weather again. Sessions are
+kept for TTL_SECONDS after their last use, at most MAX_SESSIONS of them.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple
+
+TTL_SECONDS = 1800
+MAX_SESSIONS = 500
+# Hours a follow-up may move the trip earlier or later
+SHIFT_HOURS = 12
+
+
+class Session(NamedTuple):
+    origin: str
+    destination: str
+    safest_route: bool
+    # Decoded route polyline and the waypoints picked along it, with their
+    # indices in it
+    points: list[tuple[float, float]]
+    waypoint_coords: list[tuple[float, float]]
+    waypoint_indices: list[int]
+    departure: datetime
+    duration_seconds: int
+    # Open-Meteo hourly block of each waypoint
+    forecasts: list[dict]
+    crash_history: list[tuple[int, float]] | None
+
+
+_lock = threading.Lock()
+_sessions: OrderedDict[str, tuple[float, Session]] = OrderedDict()
+
+
+def create(session: Session) -> str:
+    """Store a session and return its id."""
+    session_id = secrets.token_urlsafe(12)
+    with _lock:
+        _sessions[session_id] = (time.monotonic(), session)
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+    return session_id
+
+
+def get(session_id: str) -> Session | None:
+    """The session with an id, if it hasn't expired. Using it renews it."""
+    with _lock:
+        entry = _sessions.get(session_id)
+        if entry is None:
+            return None
+        used_at, session = entry
+        now = time.monotonic()
+        if now - used_at > TTL_SECONDS:
+            del _sessions[session_id]
+            return None
+        _sessions[session_id] = (now, session)
+        _sessions.move_to_end(session_id)
+        return session
+
+
+def clear() -> None:
+    with _lock:
+        _sessions.clear()
@@ -0,0 +1,89 @@
+"""Local solar-position computation for waypoints along a route.
+
+Uses the NOAA general solar position approximation (accurate to a fraction of a
+degree), which is plenty for deciding whether it is dark or whether a low sun is
+in the driver's eyes, and needs no upstream calls.
+"""
+
+import calendar
+import math
+from datetime import datetime, timezone
+
+
+def _fractional_year(dt: datetime) -> float:
+    """Fractional year in radians for a UTC datetime."""
+    days_in_year = 366 if calendar.isleap(dt.year) else 365
+    day_of_year = dt.timetuple().tm_yday
+    return 2 * math.pi / days_in_year * (day_of_year - 1 + (dt.hour - 12) / 24)
+
+
+def solar_positions(
+    waypoints: list[tuple[float, float, datetime]],
+) -> list[tuple[float, float]]:
+    """Compute sun elevation and azimuth for each waypoint at its arrival time.
+
+    Args:
+        waypoints: List of (lat, lon, arrival_time) tuples. Naive datetimes are
+            treated as UTC.
+
+    Returns:
+        List of (elevation, azimuth) tuples in degrees. Elevation is above the
+        horizon (negative when the sun is down), azimuth is clockwise from north.
+    """
+    # Declination and the equation of time only depend on the date and hour,
+    # which are shared by most waypoints of a route.
+    orbit_terms: dict[tuple[int, int, int], tuple[float, float]] = {}
+    positions = []
+
+    for lat, lon, arrival_time in waypoints:
+        if arrival_time.tzinfo is None:
+            dt = arrival_time.replace(tzinfo=timezone.utc)
+        else:
+            dt = arrival_time.astimezone(timezone.utc)
+
+        key = (dt.year, dt.timetuple().tm_yday, dt.hour)
+        terms = orbit_terms.get(key)
+        if terms is None:
+            g = _fractional_year(dt)
+            eqtime = 229.18 * (
+                0.000075
+                + 0.001868 * math.cos(g)
+                - 0.032077 * math.sin(g)
+                - 0.014615 * math.cos(2 * g)
+                - 0.040849 * math.sin(2 * g)
+            )
+            decl = (
+                0.006918
+                - 0.399912 * math.cos(g)
+                + 0.070257 * math.sin(g)
+                - 0.006758 * math.cos(2 * g)
+                + 0.000907 * math.sin(2 * g)
+                - 0.002697 * math.cos(3 * g)
+                + 0.00148 * math.sin(3 * g)
+            )
+            terms = orbit_terms[key] = (eqtime, decl)
+        eqtime, decl = terms
+
+        # True solar time in minutes, then hour angle in radians
+        minutes = dt.hour * 60 + dt.minute + dt.second / 60
+        true_solar_time = minutes + eqtime + 4 * lon
+        hour_angle = math.radians(true_solar_time / 4 - 180)
+
+        phi = math.radians(lat)
+        cos_zenith = math.sin(phi) * math.sin(decl) + math.cos(phi) * math.cos(
+            decl
+        ) * math.cos(hour_angle)
+        cos_zenith = max(-1.0, min(1.0, cos_zenith))
+        elevation = 90 - math.degrees(math.acos(cos_zenith))
+
+        azimuth = math.degrees(
+            math.atan2(
+                math.sin(hour_angle),
+                math.cos(hour_angle) * math.sin(phi) - math.tan(decl) * math.cos(phi),
+            )
+        )
+        azimuth = (azimuth + 180) % 360
+
+        positions.append((elevation, azimuth))
+
+    return positions
@@ -0,0 +1,14 @@
+import pytest
+
+import forecast_cache
+import route_cache
+
+
+@pytest.fixture(autouse=True)
+def _empty_caches():
+    """Keep cached forecasts, geocodes and routes from leaking between tests."""
+    forecast_cache.clear()
+    route_cache.clear()
+    yield
+    forecast_cache.clear()
+    route_cache.clear()
@@ -0,0 +1,110 @@
+"""Tests for admission.py"""
+
+import asyncio
+import time
+
+import pytest
+
+import metrics
+from admission import Gate, Overloaded
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestGate:
+    """Tests for bounded admission."""
+
+    def test_admits_up_to_max_in_flight(self):
+        gate = Gate('test', max_in_flight=2, max_queue=0)
+
+        async def run():
+            await gate.acquire()
+            await gate.acquire()
+            assert metrics.snapshot()['gauges']['test.in_flight'] == 2
+
+            with pytest.raises(Overloaded) as excinfo:
+                await gate.acquire()
+            assert excinfo.value.retry_after == gate.max_queue_wait
+            assert metrics.counter('test.rejected_queue_full') == 1
+
+            gate.release()
+            await gate.acquire()
+
+        asyncio.run(run())
+        assert metrics.counter('test.admitted') == 3
+
+    def test_queued_call_runs_when_slot_frees(self):
+        gate = Gate('test', max_in_flight=1, max_queue=1, max_queue_wait=5)
+
+        async def hold():
+            async with gate.admitted():
+                await asyncio.sleep(0.05)
+
+        async def run():
+            holder = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+            await gate.acquire()
+            await holder
+
+        asyncio.run(run())
+        assert metrics.counter('test.admitted') == 2
+        assert metrics.sample_count('test.queue_wait') == 2
+        assert metrics.snapshot()['gauges']['test.queue_depth'] == 0
+
+    def test_queued_calls_run_in_arrival_order(self):
+        gate = Gate('test', max_in_flight=1, max_queue=5, max_queue_wait=5)
+        order = []
+
+        async def call(i):
+            async with gate.admitted():
+                order.append(i)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(call(i) for i in range(5)))
+
+        asyncio.run(run())
+        assert order == list(range(5))
+
+    def test_rejects_after_max_queue_wait(self):
+        gate = Gate('test', max_in_flight=1, max_queue=5, max_queue_wait=0.05)
+
+        async def run():
+            await gate.acquire()
+            with pytest.raises(Overloaded):
+                await gate.acquire()
+
+        started = time.monotonic()
+        asyncio.run(run())
+        assert time.monotonic() - started < 1
+        assert metrics.counter('test.rejected_timeout') == 1
+        assert metrics.snapshot()['gauges']['test.queue_depth'] == 0
+
+    def test_timeout_shortens_wait(self):
+        gate = Gate('test', max_in_flight=1, max_queue=5, max_queue_wait=10)
+
+        async def run():
+            await gate.acquire()
+            with pytest.raises(Overloaded):
+                await gate.acquire(timeout=0.05)
+
+        started = time.monotonic()
+        asyncio.run(run())
+        assert time.monotonic() - started < 1
+
+    def test_admitted_releases_on_error(self):
+        gate = Gate('test', max_in_flight=1, max_queue=0)
+
+        async def fail():
+            async with gate.admitted():
+                raise ValueError('boom')
+
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                asyncio.run(fail())
+        assert metrics.counter('test.rejected_queue_full') == 0
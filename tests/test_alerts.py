@@ -0,0 +1,237 @@
+"""Tests for alerts.py"""
+
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+import alerts
+from alerts import AlertIndex, parse_cap, parse_geojson
+
+NOON = datetime(2026, 1, 23, 12, tzinfo=timezone.utc)
+
+
+def square(south, west, north, east) -> list[list[float]]:
+    """GeoJSON ring ([lon, lat]) of a box."""
+    return [[west, south], [east, south], [east, north], [west, north], [west, south]]
+
+
+def feature(alert_id, rings, event='Winter Storm Warning', **properties) -> dict:
+    return {
+        'type': 'Feature',
+        'id': alert_id,
+        'geometry': {'type': 'Polygon', 'coordinates': rings},
+        'properties': {'event': event, 'severity': 'Severe', **properties},
+    }
+
+
+def write(path, *features) -> None:
+    path.write_text(
+        json.dumps({'type': 'FeatureCollection', 'features': list(features)})
+    )
+
+
+CAP = """<?xml version="1.0" encoding="UTF-8"?>
+<alert xmlns="urn:oasis:names:tc:emergency:cap:1.2">
+  <identifier>NWS-CAP-1</identifier>
+  <info>
+    <event>Dense Fog Advisory</event>
+    <severity>Minor</severity>
+    <headline>Dense fog until noon</headline>
+    <onset>2026-01-23T06:00:00-05:00</onset>
+    <expires>2026-01-23T12:00:00-05:00</expires>
+    <area>
+      <areaDesc>North Georgia</areaDesc>
+      <polygon>34.0,-84.5 34.0,-83.5 35.0,-83.5 35.0,-84.5 34.0,-84.5</polygon>
+    </area>
+  </info>
+</alert>
+"""
+
+
+class TestParsing:
+    """Tests for reading GeoJSON and CAP alerts."""
+
+    def test_geojson_polygon_with_hole(self):
+        rings = [square(34, -85, 36, -83), square(34.5, -84.5, 35.5, -83.5)]
+        (alert,) = parse_geojson(json.dumps(feature('a', rings)))
+
+        assert alert.bbox == (34, -85, 36, -83)
+        assert alert.contains(34.2, -84.0)
+        assert not alert.contains(35.0, -84.0)
+        assert not alert.contains(37.0, -84.0)
+
+    def test_geojson_multipolygon(self):
+        data = feature('a', [])
+        data['geometry'] = {
+            'type': 'MultiPolygon',
+            'coordinates': [[square(30, -90, 31, -89)], [square(40, -80, 41, -79)]],
+        }
+        (alert,) = parse_geojson(json.dumps(data))
+
+        assert alert.contains(30.5, -89.5)
+        assert alert.contains(40.5, -79.5)
+        assert not alert.contains(35.0, -85.0)
+
+    def test_geojson_skips_features_without_polygons(self):
+        data = feature('a', [])
+        data['geometry'] = None
+
+        assert parse_geojson(json.dumps(data)) == []
+
+    def test_cap(self):
+        (alert,) = parse_cap(CAP)
+
+        assert alert.id == 'NWS-CAP-1#0'
+        assert alert.event == 'Dense Fog Advisory'
+        assert alert.severity == 'Minor'
+        assert alert.contains(34.5, -84.0)
+        assert alert.active(datetime(2026, 1, 23, 16, tzinfo=timezone.utc))
+        assert not alert.active(datetime(2026, 1, 23, 17, tzinfo=timezone.utc))
+
+
+class TestAlertIndex:
+    """Tests for looking up alerts by point and time."""
+
+    def test_alerts_at_point_most_severe_first(self, tmp_path):
+        write(
+            tmp_path / 'a.json',
+            feature('minor', [square(34, -85, 35, -84)], severity='Minor'),
+            feature('extreme', [square(34, -85, 35, -84)], severity='Extreme'),
+            feature('elsewhere', [square(40, -85, 41, -84)]),
+        )
+        index = AlertIndex(str(tmp_path))
+
+        found = index.alerts_at(34.5, -84.5, NOON)
+
+        assert [alert.id for alert in found] == ['extreme', 'minor']
+        assert index.alerts_at(37.0, -84.5, NOON) == []
+
+    def test_only_active_alerts(self, tmp_path):
+        write(
+            tmp_path / 'a.json',
+            feature(
+                'later',
+                [square(34, -85, 35, -84)],
+                onset='2026-01-23T18:00:00Z',
+                ends='2026-01-24T06:00:00Z',
+            ),
+        )
+        index = AlertIndex(str(tmp_path))
+
+        assert index.alerts_at(34.5, -84.5, NOON) == []
+        evening = datetime(2026, 1, 23, 20, tzinfo=timezone.utc)
+        assert [a.id for a in index.alerts_at(34.5, -84.5, evening)] == ['later']
+
+    def test_refresh_picks_up_added_changed_and_removed_files(self, tmp_path):
+        write(tmp_path / 'a.json', feature('a', [square(34, -85, 35, -84)]))
+        index = AlertIndex(str(tmp_path))
+        assert len(index.alerts_at(34.5, -84.5, NOON)) == 1
+
+        (tmp_path / 'b.xml').write_text(CAP)
+        index.refresh(force=True)
+        assert (
+            len(
+                index.alerts_at(
+                    34.5, -84.3, datetime(2026, 1, 23, 14, tzinfo=timezone.utc)
+                )
+            )
+            == 2
+        )
+
+        write(tmp_path / 'a.json', feature('a', [square(40, -85, 41, -84)]))
+        os.utime(tmp_path / 'a.json', (time.time() + 10, time.time() + 10))
+        (tmp_path / 'b.xml').unlink()
+        index.refresh(force=True)
+        assert index.alerts_at(34.5, -84.5, NOON) == []
+        assert [a.id for a in index.alerts_at(40.5, -84.5, NOON)] == ['a']
+        # Buckets of the old polygons are dropped
+        assert all(i >= 80 for i, _ in index._buckets)
+
+    def test_queries_during_refresh_see_the_previous_alerts(self, tmp_path, mocker):
+        write(tmp_path / 'a.json', feature('a', [square(34, -85, 35, -84)]))
+        index = AlertIndex(str(tmp_path))
+        index.refresh(force=True)
+        write(tmp_path / 'a.json', feature('a', [square(34, -85, 35, -84)], event='X'))
+        os.utime(tmp_path / 'a.json', (time.time() + 10, time.time() + 10))
+
+        seen = []
+        add = AlertIndex._add
+
+        def query_then_add(*args):
+            seen.append([a.event for a in index.alerts_at(34.5, -84.5, NOON)])
+            add(*args)
+
+        mocker.patch.object(AlertIndex, '_add', side_effect=query_then_add)
+        index.refresh(force=True)
+
+        assert seen == [['Winter Storm Warning']]
+        assert [a.event for a in index.alerts_at(34.5, -84.5, NOON)] == ['X']
+
+    def test_unreadable_directory_keeps_the_alerts(self, tmp_path):
+        feeds = tmp_path / 'feeds'
+        feeds.mkdir()
+        write(feeds / 'a.json', feature('a', [square(34, -85, 35, -84)]))
+        index = AlertIndex(str(feeds))
+        index.refresh(force=True)
+
+        (feeds / 'a.json').unlink()
+        feeds.rmdir()
+        index.refresh(force=True)
+
+        assert len(index.alerts_at(34.5, -84.5, NOON)) == 1
+        assert AlertIndex(str(tmp_path / 'missing')).alerts_at(34.5, -84.5, NOON) == []
+
+    def test_unreadable_file_is_retried(self, tmp_path):
+        (tmp_path / 'a.json').write_text('{"type": "FeatureCo')
+        index = AlertIndex(str(tmp_path))
+        assert index.alerts_at(34.5, -84.5, NOON) == []
+
+        write(tmp_path / 'a.json', feature('a', [square(34, -85, 35, -84)]))
+        index.refresh(force=True)
+        assert len(index.alerts_at(34.5, -84.5, NOON)) == 1
+
+    def test_refresh_is_throttled(self, tmp_path, mocker):
+        index = AlertIndex(str(tmp_path))
+        index.refresh()
+        scandir = mocker.spy(alerts.os, 'scandir')
+
+        index.alerts_at(34.5, -84.5, NOON)
+
+        scandir.assert_not_called()
+
+    def test_corridor_across_many_alerts(self, tmp_path):
+        rng = random.Random(1)
+        features = []
+        for n in range(5000):
+            lat, lon = rng.uniform(25, 49), rng.uniform(-124, -67)
+            size = rng.uniform(0.05, 0.5)
+            features.append(feature(str(n), [square(lat, lon, lat + size, lon + size)]))
+        features.append(feature('route', [square(39.0, -106.5, 40.0, -104.5)]))
+        write(tmp_path / 'a.json', *features)
+        index = AlertIndex(str(tmp_path))
+        index.refresh(force=True)
+        waypoints = [(39.7, -105.0 - i * 0.01, NOON) for i in range(100)]
+
+        started = time.perf_counter()
+        found = index.corridor(waypoints)
+        elapsed = time.perf_counter() - started
+
+        assert all('route' in [a.id for a in alerts] for alerts in found)
+        assert elapsed < 0.05
+
+
+@pytest.fixture
+def no_default_indexes(monkeypatch):
+    monkeypatch.setattr(alerts, '_indexes', {})
+
+
+def test_default_alert_index(monkeypatch, tmp_path, no_default_indexes):
+    monkeypatch.delenv('SAFE_TRAVELS_ALERTS', raising=False)
+    assert alerts.default_alert_index() is None
+
+    monkeypatch.setenv('SAFE_TRAVELS_ALERTS', str(tmp_path))
+    assert alerts.default_alert_index() is alerts.default_alert_index()
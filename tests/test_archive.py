@@ -0,0 +1,112 @@
+"""Tests for archive.py"""
+
+import os
+from datetime import datetime, timezone
+
+import archive
+from archive import Archive
+
+# Before any hour of the test blocks
+ISSUED = datetime(2026, 1, 23, tzinfo=timezone.utc)
+
+
+def hourly_block(first_hour: int, temps: list) -> dict:
+    return {
+        'time': [f'2026-01-23T{first_hour + h:02d}:00' for h in range(len(temps))],
+        'temperature_2m': temps,
+        'snowfall': [0.0] * len(temps),
+    }
+
+
+class TestForecastArchive:
+    """Tests for archiving hourly forecast blocks."""
+
+    def test_round_trip_keeps_missing_values(self, tmp_path):
+        store = Archive(str(tmp_path))
+        store.put_forecast(39.74, -104.99, hourly_block(6, [1.5, None, -2.0]), ISSUED)
+
+        block = store.get_forecast(39.74, -104.99)
+        assert block['time'] == [
+            '2026-01-23T06:00',
+            '2026-01-23T07:00',
+            '2026-01-23T08:00',
+        ]
+        assert block['temperature_2m'] == [1.5, None, -2.0]
+        assert block['snowfall'] == [0.0, 0.0, 0.0]
+
+    def test_nearby_points_share_a_cell(self, tmp_path):
+        store = Archive(str(tmp_path))
+        store.put_forecast(39.74, -104.99, hourly_block(6, [1.0]), ISSUED)
+        assert store.get_forecast(39.741, -104.991) is not None
+        assert store.get_forecast(40.5, -104.99) is None
+
+    def test_newer_forecasts_replace_overlapping_hours(self, tmp_path):
+        store = Archive(str(tmp_path))
+        store.put_forecast(39.74, -104.99, hourly_block(6, [1.0, 2.0, 3.0]), ISSUED)
+        store.put_forecast(39.74, -104.99, hourly_block(8, [30.0, 40.0]), ISSUED)
+
+        block = store.get_forecast(39.74, -104.99)
+        assert block['time'][0] == '2026-01-23T06:00'
+        assert block['temperature_2m'] == [1.0, 2.0, 30.0, 40.0]
+        assert not any(
+            name.endswith('.tmp') for name in os.listdir(tmp_path / 'forecasts')
+        )
+
+    def test_hours_already_past_keep_their_forecast(self, tmp_path):
+        store = Archive(str(tmp_path))
+        store.put_forecast(39.74, -104.99, hourly_block(6, [1.0, 2.0, 3.0]), ISSUED)
+        # Fetched at 07:30 with history, an hour of which (08:00) is new
+        store.put_forecast(
+            39.74,
+            -104.99,
+            hourly_block(6, [10.0, 20.0, 30.0, 40.0]),
+            datetime(2026, 1, 23, 7, 30, tzinfo=timezone.utc),
+        )
+
+        block = store.get_forecast(39.74, -104.99)
+        assert block['temperature_2m'] == [1.0, 2.0, 30.0, 40.0]
+
+    def test_blocks_fetched_together_write_each_cell_once(self, tmp_path, mocker):
+        store = Archive(str(tmp_path))
+        replace = mocker.spy(os, 'replace')
+        store.put_forecasts(
+            [
+                (39.74, -104.99, hourly_block(6, [1.0])),
+                (39.741, -104.991, hourly_block(7, [2.0])),
+                (40.5, -104.99, hourly_block(6, [3.0])),
+            ],
+            ISSUED,
+        )
+
+        assert replace.call_count == 2
+        assert store.get_forecast(39.74, -104.99)['temperature_2m'] == [1.0, 2.0]
+
+
+class TestRouteArchive:
+    """Tests for archiving routes and geocodes."""
+
+    def test_latest_route_between_points(self, tmp_path):
+        store = Archive(str(tmp_path))
+        for duration in ('3600s', '4000s'):
+            store.put_route(
+                (39.7392, -104.9903),
+                (39.6403, -106.3742),
+                {
+                    'routes': [
+                        {'duration': duration, 'polyline': {'encodedPolyline': 'abc'}}
+                    ]
+                },
+            )
+        store.put_geocode(' Denver, CO', (39.7392, -104.9903))
+
+        routes = store.routes()
+        key = archive.route_key((39.7392, -104.9903), (39.6403, -106.3742))
+        assert routes[key]['routes'][0]['duration'] == '4000s'
+        assert store.geocodes() == {'denver, co': (39.7392, -104.9903)}
+
+    def test_default_archive_from_environment(self, tmp_path, monkeypatch):
+        monkeypatch.delenv('SAFE_TRAVELS_ARCHIVE', raising=False)
+        assert archive.default_archive() is None
+
+        monkeypatch.setenv('SAFE_TRAVELS_ARCHIVE', str(tmp_path))
+        assert archive.default_archive() is archive.default_archive()
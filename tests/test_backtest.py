@@ -0,0 +1,181 @@
+"""Tests for backtest.py"""
+
+import json
+from datetime import datetime, timezone
+
+import polyline
+import pytest
+
+import backtest
+from archive import Archive
+
+DENVER = (39.7392, -104.9903)
+VAIL = (39.6403, -106.3742)
+# When the archived forecasts were fetched, before any of their hours
+ISSUED = datetime(2026, 1, 22, tzinfo=timezone.utc)
+
+
+def hourly_block(hours: int, snowy: bool) -> dict:
+    """Hourly forecast block starting at 2026-01-23T00:00."""
+    return {
+        'time': [f'2026-01-{23 + h // 24}T{h % 24:02d}:00' for h in range(hours)],
+        'temperature_2m': [-3.0 if snowy else 12.0] * hours,
+        'wind_speed_10m': [10.0] * hours,
+        'wind_gusts_10m': [20.0] * hours,
+        'weather_code': [75 if snowy else 1] * hours,
+        'precipitation': [3.0 if snowy else 0.0] * hours,
+        'rain': [0.0] * hours,
+        'snowfall': [3.0 if snowy else 0.0] * hours,
+        'snow_depth': [0.1 if snowy else 0.0] * hours,
+        'visibility': [800.0 if snowy else 20000.0] * hours,
+        'soil_temperature_0cm': [-1.0 if snowy else 10.0] * hours,
+        'dew_point_2m': [-4.0 if snowy else 2.0] * hours,
+    }
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    """Archive with a Denver-Vail route: snowy on the 23rd, clear on the 24th."""
+    store = Archive(str(tmp_path / 'archive'))
+    points = [
+        (
+            DENVER[0] + (VAIL[0] - DENVER[0]) * i / 4,
+            DENVER[1] + (VAIL[1] - DENVER[1]) * i / 4,
+        )
+        for i in range(5)
+    ]
+    store.put_geocode('Denver, CO', DENVER)
+    store.put_geocode('Vail, CO', VAIL)
+    store.put_route(
+        DENVER,
+        VAIL,
+        {
+            'routes': [
+                {
+                    'duration': '7200s',
+                    'polyline': {'encodedPolyline': polyline.encode(points)},
+                }
+            ]
+        },
+    )
+    for lat, lon in points:
+        snowy = hourly_block(24, snowy=True)
+        clear = hourly_block(48, snowy=False)
+        store.put_forecast(
+            lat, lon, {key: values[24:] for key, values in clear.items()}, ISSUED
+        )
+        store.put_forecast(lat, lon, snowy, ISSUED)
+    return str(tmp_path / 'archive')
+
+
+@pytest.fixture
+def trips_path(tmp_path):
+    path = tmp_path / 'trips.jsonl'
+    trips = [
+        {'id': 'snow-crash', 'departure_time': '2026-01-23T10:00:00Z', 'incident': 1},
+        {'id': 'snow-ok', 'departure_time': '2026-01-23T12:00:00Z', 'incident': 0},
+        {'id': 'clear-ok', 'departure_time': '2026-01-24T10:00:00Z', 'incident': 0},
+        {'id': 'clear-crash', 'departure_time': '2026-01-24T12:00:00Z', 'incident': 1},
+        {'id': 'future', 'departure_time': '2026-02-01T10:00:00Z', 'incident': 0},
+    ]
+    path.write_text(
+        ''.join(
+            json.dumps({**trip, 'origin': 'Denver, CO', 'destination': 'vail, co'})
+            + '\n'
+            for trip in trips
+        )
+        + json.dumps(
+            {
+                'id': 'elsewhere',
+                'origin': 'Boulder, CO',
+                'destination': 'Vail, CO',
+                'departure_time': '2026-01-23T10:00:00Z',
+            }
+        )
+        + '\n'
+    )
+    return str(path)
+
+
+class TestReplayTrips:
+    """Tests for scoring trips from the archive."""
+
+    def test_scores_trips_from_archived_forecasts(self, archive_path, trips_path):
+        trips = list(backtest.read_trips(trips_path))
+        results = {r['id']: r for r in backtest.replay_trips(archive_path, trips)}
+
+        assert results['snow-crash']['status'] in ('HAZARDOUS', 'EXTREME')
+        assert results['snow-crash']['coverage'] == 1.0
+        assert results['clear-ok']['status'] in ('SAFE', 'MODERATE')
+        assert results['future']['error'] == 'no archived forecast'
+        assert results['elsewhere']['error'] == 'no archived route'
+        assert results['snow-crash']['incident'] is True
+
+    def test_matches_live_scoring(self, archive_path, trips_path, mocker):
+        from weather_scoring import score_weather
+
+        spy = mocker.spy(backtest, 'score_columns')
+        trips = list(backtest.read_trips(trips_path))[:1]
+        result = backtest.replay_trips(archive_path, trips)[0]
+
+        columns, conditions, light = spy.call_args.args
+        record = {key: values[0] for key, values in columns.items()}
+        assert spy.spy_return[0] == pytest.approx(
+            min(score_weather(record) + light[0], 10.0)
+        )
+        assert result['max_danger'] == round(max(spy.spy_return), 2)
+
+
+class TestSummarize:
+    """Tests for backtest reports."""
+
+    def test_confusion_by_threshold(self):
+        results = [
+            {'id': '1', 'incident': True, 'max_danger': 7.0, 'status': 'HAZARDOUS'},
+            {'id': '2', 'incident': False, 'max_danger': 6.0, 'status': 'HAZARDOUS'},
+            {'id': '3', 'incident': False, 'max_danger': 1.0, 'status': 'SAFE'},
+            {'id': '4', 'incident': True, 'max_danger': 3.0, 'status': 'MODERATE'},
+            {'id': '5', 'incident': False, 'error': 'no archived route'},
+        ]
+        report = backtest.summarize(results, thresholds=[5])
+
+        assert report['replayed'] == 4
+        assert report['skipped'] == {'no archived route': 1}
+        assert report['max_danger_histogram']['6-7'] == 1
+        assert report['status_by_incident']['HAZARDOUS'] == {
+            'incident': 1,
+            'no_incident': 1,
+        }
+        assert report['confusion_by_threshold']['5'] == {
+            'true_positives': 1,
+            'false_positives': 1,
+            'false_negatives': 1,
+            'true_negatives': 1,
+            'precision': 0.5,
+            'recall': 0.5,
+            'false_alarm_rate': 0.5,
+        }
+
+
+class TestRunBacktest:
+    """Tests for replaying a trips file."""
+
+    @pytest.mark.parametrize('workers', [0, 2])
+    def test_report(self, archive_path, trips_path, tmp_path, workers):
+        results_path = tmp_path / 'results.jsonl'
+        report = backtest.run_backtest(
+            archive_path,
+            trips_path,
+            workers=workers,
+            thresholds=[5],
+            results_path=str(results_path),
+        )
+
+        assert report['trips'] == 6
+        assert report['replayed'] == 4
+        assert report['incidents'] == 2
+        assert report['confusion_by_threshold']['5']['true_positives'] == 1
+        assert report['confusion_by_threshold']['5']['false_negatives'] == 1
+        ids = [json.loads(line)['id'] for line in results_path.read_text().splitlines()]
+        assert ids[0] == 'snow-crash'
+        assert len(ids) == 6
@@ -0,0 +1,152 @@
+"""Tests for batch.py"""
+
+import json
+
+import pytest
+
+import batch
+
+
+def fake_assess(trip, response_format):
+    if trip['origin'] == 'Nowhere':
+        raise ValueError('Could not geocode Nowhere')
+    return {'id': trip['id'], 'status': 'SAFE', 'format': response_format}
+
+
+def write_jsonl(path, records):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestAssessTrip:
+    """Tests for assessing a single trip."""
+
+    def test_route_trip(self, mocker):
+        assess = mocker.patch.object(
+            batch.assess_route_danger,
+            'fn',
+            new_callable=mocker.AsyncMock,
+            return_value={'status': 'SAFE'},
+        )
+        result = batch.assess_trip(
+            {'id': '1', 'origin': 'A', 'destination': 'B', 'safest_route': 'true'},
+            'compact',
+        )
+        assert result == {'id': '1', 'status': 'SAFE'}
+        assert assess.call_args.kwargs['safest_route'] is True
+        assert assess.call_args.kwargs['format'] == 'compact'
+
+    def test_trip_with_stops_is_an_itinerary(self, mocker):
+        assess = mocker.patch.object(
+            batch.assess_itinerary,
+            'fn',
+            new_callable=mocker.AsyncMock,
+            return_value={'status': 'SAFE'},
+        )
+        stops = [{'location': 'A'}, {'location': 'B'}]
+        batch.assess_trip({'id': '1', 'stops': stops})
+        assert assess.call_args.kwargs['stops'] == stops
+
+
+class TestRunBatch:
+    """Tests for running and resuming a batch."""
+
+    @pytest.fixture
+    def trips(self, tmp_path):
+        path = tmp_path / 'trips.jsonl'
+        write_jsonl(
+            path,
+            [
+                {'id': str(i), 'origin': 'Denver, CO', 'destination': 'Vail, CO'}
+                for i in range(5)
+            ],
+        )
+        return path
+
+    def test_writes_every_trip(self, mocker, tmp_path, trips):
+        mocker.patch('batch.assess_trip', side_effect=fake_assess)
+        output = tmp_path / 'results.jsonl'
+
+        counts = batch.run_batch(str(trips), str(output), workers=0)
+
+        assert counts == {'completed': 5, 'failed': 0, 'skipped': 0}
+        results = read_jsonl(output)
+        assert [r['id'] for r in results] == ['0', '1', '2', '3', '4']
+        assert results[0]['format'] == 'summary'
+
+    def test_resumes_after_interruption(self, mocker, tmp_path, trips):
+        assess = mocker.patch('batch.assess_trip', side_effect=fake_assess)
+        output = tmp_path / 'results.jsonl'
+        # Two trips finished, a third was cut off mid-write
+        output.write_text(
+            json.dumps({'id': '0', 'status': 'SAFE'})
+            + '\n'
+            + json.dumps({'id': '1', 'status': 'SAFE'})
+            + '\n{"id": "2", "sta'
+        )
+
+        counts = batch.run_batch(str(trips), str(output), workers=0)
+
+        assert counts == {'completed': 3, 'failed': 0, 'skipped': 2}
+        assert [call.args[0]['id'] for call in assess.call_args_list] == [
+            '2',
+            '3',
+            '4',
+        ]
+
+    def test_resumes_after_a_line_cut_off_before_its_newline(
+        self, mocker, tmp_path, trips
+    ):
+        mocker.patch('batch.assess_trip', side_effect=fake_assess)
+        output = tmp_path / 'results.jsonl'
+        output.write_text(
+            json.dumps({'id': '0', 'status': 'SAFE'})
+            + '\n'
+            + json.dumps({'id': '1', 'status': 'SAFE'})
+        )
+
+        counts = batch.run_batch(str(trips), str(output), workers=0)
+
+        assert counts == {'completed': 4, 'failed': 0, 'skipped': 1}
+        assert [r['id'] for r in read_jsonl(output)] == ['0', '1', '2', '3', '4']
+        assert [r['id'] for r in read_jsonl(output)] == ['0', '1', '2', '3', '4']
+
+    def test_failed_trips_are_retried_next_run(self, mocker, tmp_path):
+        trips = tmp_path / 'trips.jsonl'
+        write_jsonl(
+            trips,
+            [
+                {'origin': 'Denver, CO', 'destination': 'Vail, CO'},
+                {'origin': 'Nowhere', 'destination': 'Vail, CO'},
+            ],
+        )
+        assess = mocker.patch('batch.assess_trip', side_effect=fake_assess)
+        output = tmp_path / 'results.jsonl'
+
+        counts = batch.run_batch(str(trips), str(output), workers=0)
+        assert counts == {'completed': 1, 'failed': 1, 'skipped': 0}
+        assert [r['id'] for r in read_jsonl(output)] == ['1']
+
+        assess.reset_mock()
+        batch.run_batch(str(trips), str(output), workers=0)
+        assert [call.args[0]['id'] for call in assess.call_args_list] == ['2']
+
+    def test_process_pool_reports_worker_failures(self, tmp_path):
+        trips = tmp_path / 'trips.jsonl'
+        # No origin, so each worker fails before making any upstream requests
+        write_jsonl(trips, [{'destination': 'Vail, CO'}] * 3)
+        output = tmp_path / 'results.jsonl'
+
+        counts = batch.run_batch(str(trips), str(output), workers=2)
+
+        assert counts == {'completed': 0, 'failed': 3, 'skipped': 0}
+        assert output.read_text() == ''
+
+    def test_rejects_unknown_format(self, tmp_path, trips):
+        with pytest.raises(ValueError):
+            batch.run_batch(
+                str(trips), str(tmp_path / 'out.jsonl'), response_format='xml'
+            )
@@ -0,0 +1,143 @@
+"""Tests for climatology.py"""
+
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import climatology
+from climatology import (
+    VARIABLES,
+    beyond_horizon,
+    build_climatology,
+    climatology_records,
+)
+from gridfile import GridFile
+
+
+def _history(coords, start, end):
+    """Hourly history: snowing at -5°C in winter, dry at 25°C otherwise."""
+    hours = int((end - start).days + 1) * 24
+    first = datetime(start.year, start.month, start.day)
+    times = [first + timedelta(hours=h) for h in range(hours)]
+    winter = [t.month in (12, 1, 2) for t in times]
+    blocks = []
+    for lat, _ in coords:
+        blocks.append(
+            {
+                'time': [t.strftime('%Y-%m-%dT%H:%M') for t in times],
+                'temperature_2m': [-5.0 if w else 25.0 + lat - 39 for w in winter],
+                'wind_speed_10m': [20.0] * hours,
+                'wind_gusts_10m': [40.0] * hours,
+                'rain': [0.0] * hours,
+                'snowfall': [0.5 if w else 0.0 for w in winter],
+                'snow_depth': [0.2 if w else 0.0 for w in winter],
+                # No visibility in the history
+                'soil_temperature_0_to_7cm': [-2.0 if w else 20.0 for w in winter],
+                'dew_point_2m': [-6.0 if w else 10.0 for w in winter],
+            }
+        )
+    return blocks
+
+
+@pytest.fixture
+def climatology_path(mocker, tmp_path):
+    fetch = mocker.patch('climatology.fetch_history', side_effect=_history)
+    path = str(tmp_path / 'climatology.bin')
+    build_climatology(
+        path,
+        39.0,
+        -106.0,
+        40.0,
+        -105.0,
+        resolution=1.0,
+        years=1,
+        last_year=2023,
+        step_hours=6,
+    )
+    assert fetch.call_count == 1
+    return path
+
+
+class TestBuildClimatology:
+    """Tests for building a climatology from history."""
+
+    def test_grid_layout(self, climatology_path):
+        grid = GridFile.open(climatology_path)
+
+        assert grid.variables == VARIABLES
+        assert (grid.nlat, grid.nlon, grid.nt) == (2, 2, 366 * 4)
+        assert grid.t0 == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def test_means_and_frequencies(self, climatology_path):
+        grid = GridFile.open(climatology_path)
+
+        january = grid.sample(39.0, -106.0, datetime(2024, 1, 20, 6), partial=True)
+        assert january['temp_c'] == pytest.approx(-5.0)
+        assert january['p_snow'] == pytest.approx(1.0)
+        assert january['visibility_m'] is None
+
+        july = grid.sample(40.0, -106.0, datetime(2024, 7, 20, 6), partial=True)
+        assert july['temp_c'] == pytest.approx(26.0)
+        assert july['p_snow'] == 0.0
+
+    def test_smooths_across_days_and_year_end(self, climatology_path):
+        grid = GridFile.open(climatology_path)
+
+        # A week into March averages late February snow with dry March days
+        march = grid.sample(39.0, -106.0, datetime(2024, 3, 4, 12), partial=True)
+        assert 0 < march['p_snow'] < 1
+        # No 2023 history for February 29, filled from the days around it
+        leap_day = grid.sample(39.0, -106.0, datetime(2024, 2, 29), partial=True)
+        assert not math.isnan(leap_day['temp_c'])
+        new_year = grid.sample(39.0, -106.0, datetime(2024, 12, 31, 18), partial=True)
+        assert new_year['p_snow'] == pytest.approx(1.0)
+
+    def test_step_must_divide_a_day(self, tmp_path):
+        with pytest.raises(ValueError):
+            build_climatology(str(tmp_path / 'c.bin'), 39, -106, 40, -105, step_hours=5)
+
+
+class TestClimatologyRecords:
+    """Tests for typical weather at waypoints."""
+
+    def test_records_score_like_forecasts(self, climatology_path):
+        from weather_scoring import score_weather
+
+        grid = GridFile.open(climatology_path)
+        winter, summer = climatology_records(
+            grid,
+            [
+                (39.5, -105.5, datetime(2027, 1, 15, 8, tzinfo=timezone.utc)),
+                (39.5, -105.5, datetime(2027, 7, 15, 8, tzinfo=timezone.utc)),
+            ],
+        )
+
+        assert winter['source'] == 'climatology'
+        assert winter['condition'] == 'snowy'
+        assert winter['snowfall_24h_cm'] == pytest.approx(12.0)
+        assert winter['visibility_m'] == 10000.0
+        assert summer['condition'] == 'cloudy'
+        assert score_weather(winter) > score_weather(summer)
+
+    def test_outside_grid(self, climatology_path):
+        grid = GridFile.open(climatology_path)
+        when = datetime(2027, 1, 15, tzinfo=timezone.utc)
+
+        assert climatology_records(grid, [(45.0, -100.0, when)]) == [None]
+
+    def test_last_hours_of_the_year(self, climatology_path):
+        grid = GridFile.open(climatology_path)
+        when = datetime(2027, 12, 31, 23, tzinfo=timezone.utc)
+
+        (record,) = climatology_records(grid, [(39.5, -105.5, when)])
+        assert record['condition'] == 'snowy'
+
+
+def test_beyond_horizon():
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    assert not beyond_horizon(now + timedelta(days=10), now)
+    assert beyond_horizon(
+        now + timedelta(days=climatology.FORECAST_HORIZON_DAYS + 1), now
+    )
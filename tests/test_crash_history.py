@@ -0,0 +1,99 @@
+"""Tests for crash_history.py"""
+
+import pytest
+
+from crash_history import CrashIndex, default_crash_index, load_crash_index
+
+# A straight north-south route along longitude -84.0
+ROUTE = [(34.00, -84.0), (34.01, -84.0), (34.02, -84.0), (34.03, -84.0)]
+
+
+def _records():
+    return [
+        (34.005, -84.0, 1.0),  # on the first segment
+        (34.005, -84.001, 2.0),  # ~90 m off the first segment
+        (34.015, -84.0, 3.0),  # on the second segment
+        (34.020, -84.0, 1.0),  # on the vertex between segments 2 and 3
+        (34.025, -84.05, 5.0),  # ~4.6 km away from the route
+        (40.0, -105.0, 1.0),  # another state entirely
+    ]
+
+
+class TestCrashIndex:
+    """Tests for CrashIndex corridor lookups."""
+
+    def test_corridor_counts_per_segment(self):
+        index = CrashIndex.from_records(_records())
+        counts = index.corridor_counts(ROUTE, radius_m=250)
+        assert [count for count, _ in counts] == [2, 2, 0]
+        assert counts[0][1] == pytest.approx(3.0)
+        assert counts[1][1] == pytest.approx(4.0)
+
+    def test_vertex_crash_counted_once(self):
+        index = CrashIndex.from_records([(34.020, -84.0, 1.0)])
+        counts = index.corridor_counts(ROUTE, radius_m=250)
+        assert sum(count for count, _ in counts) == 1
+
+    def test_narrow_corridor_excludes_offset_crash(self):
+        index = CrashIndex.from_records(_records())
+        counts = index.corridor_counts(ROUTE, radius_m=50)
+        assert counts[0][0] == 1
+
+    def test_wide_corridor_reaches_distant_crash(self):
+        index = CrashIndex.from_records(_records())
+        counts = index.corridor_counts(ROUTE, radius_m=5000)
+        assert sum(count for count, _ in counts) == 5
+
+    def test_single_point_route(self):
+        index = CrashIndex.from_records(_records())
+        counts = index.corridor_counts([(34.005, -84.0)], radius_m=250)
+        assert counts == [(2, pytest.approx(3.0))]
+
+    def test_empty_index(self):
+        index = CrashIndex.from_records([])
+        assert index.corridor_counts(ROUTE) == [(0, 0.0)] * 3
+
+    def test_save_and_memory_map(self, tmp_path):
+        path = str(tmp_path / 'crashes.idx')
+        CrashIndex.from_records(_records()).save(path)
+
+        loaded = CrashIndex.load(path)
+        assert len(loaded) == 6
+        counts = loaded.corridor_counts(ROUTE, radius_m=250)
+        assert [count for count, _ in counts] == [2, 2, 0]
+
+    def test_load_rejects_other_files(self, tmp_path):
+        path = tmp_path / 'not_an_index.idx'
+        path.write_bytes(b'\0' * 64)
+        with pytest.raises(ValueError, match='Not a crash index'):
+            CrashIndex.load(str(path))
+
+    def test_from_csv(self, tmp_path):
+        path = tmp_path / 'crashes.csv'
+        path.write_text('latitude,longitude,severity\n34.005,-84.0,2\n34.015,-84.0,\n')
+        index = CrashIndex.from_file(str(path))
+        counts = index.corridor_counts(ROUTE, radius_m=250)
+        # Missing severity defaults to 1
+        assert counts[:2] == [(1, 2.0), (1, 1.0)]
+
+    def test_csv_without_coordinates_raises(self, tmp_path):
+        path = tmp_path / 'crashes.csv'
+        path.write_text('severity\n2\n')
+        with pytest.raises(ValueError, match='missing coordinates'):
+            CrashIndex.from_file(str(path))
+
+
+class TestDefaultCrashIndex:
+    """Tests for default_crash_index function."""
+
+    def test_none_without_configuration(self, monkeypatch):
+        monkeypatch.delenv('SAFE_TRAVELS_CRASH_INDEX', raising=False)
+        assert default_crash_index() is None
+
+    def test_loads_configured_index_once(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'crashes.idx')
+        CrashIndex.from_records(_records()).save(path)
+        monkeypatch.setenv('SAFE_TRAVELS_CRASH_INDEX', path)
+
+        assert default_crash_index() is default_crash_index()
+        load_crash_index.cache_clear()
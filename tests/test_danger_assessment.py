@@ -1,8 +1,13 @@
 """Tests for danger_assessment.py"""
 
+import pytest
+
 from danger_assessment import (
     black_ice_risk,
+    darkness_severity,
     precipitation_severity,
+    road_residual_severity,
+    sun_glare_severity,
     temperature_severity,
     visibility_severity,
     weather_conditions_severity,
@@ -213,3 +218,71 @@ class TestBlackIceRisk:
         # Even worst conditions shouldn't exceed 5
         result = black_ice_risk(1, -5, 1)
         assert result <= 5
+
+
+class TestDarknessSeverity:
+    """Tests for darkness_severity function."""
+
+    def test_daylight_no_severity(self):
+        assert darkness_severity(30) == 0
+        assert darkness_severity(0) == 0
+
+    def test_civil_twilight(self):
+        # Halfway through civil twilight
+        assert darkness_severity(-3) == pytest.approx(0.5)
+
+    def test_night(self):
+        assert darkness_severity(-20) == 1.5
+
+
+class TestSunGlareSeverity:
+    """Tests for sun_glare_severity function."""
+
+    def test_low_sun_straight_ahead(self):
+        # Sun just above the horizon, directly ahead
+        result = sun_glare_severity(1, 90, 90)
+        assert result > 1.5
+
+    def test_sun_behind_no_glare(self):
+        assert sun_glare_severity(5, 90, 270) == 0
+
+    def test_high_sun_no_glare(self):
+        assert sun_glare_severity(40, 180, 180) == 0
+
+    def test_sun_down_no_glare(self):
+        assert sun_glare_severity(-2, 90, 90) == 0
+
+    def test_wraps_around_north(self):
+        # Heading 355 and sun at 5 degrees are only 10 degrees apart
+        assert sun_glare_severity(5, 5, 355) > 0
+
+    def test_glare_capped_at_2(self):
+        assert sun_glare_severity(0.01, 90, 90) <= 2
+
+
+class TestRoadResidualSeverity:
+    """Tests for road_residual_severity function."""
+
+    def test_dry_history_no_severity(self):
+        assert road_residual_severity(0, 0, 0, 0, 0, 0, 10) == 0
+
+    def test_recent_rain_wets_roads(self):
+        result = road_residual_severity(5, 5, 5, 0, 0, 0, 10)
+        assert result == pytest.approx(0.5)
+
+    def test_older_rain_counts_less(self):
+        recent = road_residual_severity(5, 5, 5, 0, 0, 0, 10)
+        old = road_residual_severity(0, 0, 5, 0, 0, 0, 10)
+        assert 0 < old < recent
+
+    def test_wet_roads_worse_near_freezing(self):
+        warm = road_residual_severity(5, 5, 5, 0, 0, 0, 10)
+        cold = road_residual_severity(5, 5, 5, 0, 0, 0, 0)
+        assert cold == pytest.approx(warm * 2)
+
+    def test_recent_snow_covers_roads(self):
+        result = road_residual_severity(0, 0, 0, 5, 5, 5, -5)
+        assert result >= 1
+
+    def test_capped_at_3(self):
+        assert road_residual_severity(50, 50, 50, 30, 30, 30, -1) == 3.0
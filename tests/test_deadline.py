@@ -0,0 +1,33 @@
+"""Tests for deadline.py"""
+
+import pytest
+
+from deadline import Deadline, DeadlineExceeded, timeout_for
+
+
+class TestDeadline:
+    """Tests for Deadline."""
+
+    def test_remaining_keeps_response_margin(self):
+        deadline = Deadline(1000)
+        assert 0.9 < deadline.remaining() <= 0.95
+        assert not deadline.expired()
+
+    def test_timeout_raises_when_expired(self):
+        deadline = Deadline(0)
+        assert deadline.expired()
+        with pytest.raises(DeadlineExceeded):
+            deadline.timeout()
+
+    def test_deadline_exceeded_is_a_timeout(self):
+        assert issubclass(DeadlineExceeded, TimeoutError)
+
+
+class TestTimeoutFor:
+    """Tests for timeout_for."""
+
+    def test_no_deadline_means_no_timeout(self):
+        assert timeout_for(None) is None
+
+    def test_uses_remaining_time(self):
+        assert 0 < timeout_for(Deadline(500)) <= 0.45
@@ -0,0 +1,131 @@
+"""Tests for ensemble.py"""
+
+from ensemble import exceedance, hour_index, member_columns, member_keys, score_columns
+from weather_scoring import score_weather, weather_code_to_condition
+
+
+def ensemble_block(members: int, hours: int, **series) -> dict:
+    """Hourly block where member m of each variable is series[var](m, hour)."""
+    block = {'time': [f'2026-01-23T{h:02d}:00' for h in range(hours)]}
+    for variable, value in series.items():
+        for m in range(members):
+            key = variable if m == 0 else f'{variable}_member{m:02d}'
+            block[key] = [value(m, h) for h in range(hours)]
+    return block
+
+
+class TestMemberColumns:
+    """Tests for laying out members x waypoints arrays."""
+
+    def test_member_keys_start_with_control_run(self):
+        block = ensemble_block(3, 1, rain=lambda m, h: 0.0)
+        assert member_keys(block, 'rain') == ['rain', 'rain_member01', 'rain_member02']
+
+    def test_hour_index_clamps_to_block(self):
+        from datetime import datetime
+
+        block = ensemble_block(1, 6, rain=lambda m, h: 0.0)
+        assert hour_index(block, datetime(2026, 1, 23, 2, 20)) == 2
+        assert hour_index(block, datetime(2026, 1, 23, 2, 40)) == 3
+        assert hour_index(block, datetime(2026, 1, 24, 0, 0)) == 5
+
+    def test_columns_are_member_major(self):
+        blocks = [
+            ensemble_block(3, 4, temperature_2m=lambda m, h, w=w: w * 100 + m * 10 + h)
+            for w in range(2)
+        ]
+        columns = member_columns(blocks, [1, 3])
+
+        # member 0 at both waypoints, then member 1, then member 2
+        assert columns['temp_c'] == [1, 103, 11, 113, 21, 123]
+        # Variables missing from the feed get their defaults
+        assert columns['visibility_m'] == [10000.0] * 6
+        assert columns['soil_temp_c'] == [None] * 6
+
+    def test_accumulations_per_member(self):
+        blocks = [
+            ensemble_block(
+                2,
+                30,
+                temperature_2m=lambda m, h: 0.0,
+                snowfall=lambda m, h: float(m),
+                rain=lambda m, h: None,
+            )
+        ]
+        columns = member_columns(blocks, [29])
+
+        assert columns['snowfall_6h_cm'] == [0.0, 6.0]
+        assert columns['snowfall_24h_cm'] == [0.0, 24.0]
+        assert columns['rain_24h_mm'] == [0.0, 0.0]
+
+
+class TestScoreColumns:
+    """Tests for scoring a whole ensemble at once."""
+
+    def test_matches_scoring_each_record(self):
+        blocks = [
+            ensemble_block(
+                4,
+                30,
+                temperature_2m=lambda m, h, w=w: -4.0 + 3 * m + w,
+                wind_speed_10m=lambda m, h: 10.0 * m,
+                wind_gusts_10m=lambda m, h: 40.0 - 10 * m,
+                weather_code=lambda m, h: (0, 45, 63, 75)[m],
+                rain=lambda m, h: 0.5 * m,
+                snowfall=lambda m, h, w=w: 0.4 * w,
+                visibility=lambda m, h: 500.0 + 3000 * m,
+                dew_point_2m=lambda m, h: -5.0,
+            )
+            for w in range(3)
+        ]
+        columns = member_columns(blocks, [26, 27, 28])
+        conditions = [weather_code_to_condition(c) for c in columns['weather_code']]
+        light = [0.0, 1.5, 0.5]
+
+        scores = score_columns(columns, conditions, light)
+
+        for cell, score in enumerate(scores):
+            record = {key: values[cell] for key, values in columns.items()}
+            record['condition'] = conditions[cell]
+            # Night-time darkness severity of 1.5, twilight 0.5
+            elevation = {0.0: 10.0, 1.5: -10.0, 0.5: -3.0}[light[cell % 3]]
+            assert score == score_weather(record, sun_elevation=elevation)
+
+    def test_missing_temperature_is_not_scored(self):
+        blocks = [
+            ensemble_block(
+                2,
+                30,
+                temperature_2m=lambda m, h: None if m else -4.0,
+                weather_code=lambda m, h: 75,
+            )
+        ]
+        columns = member_columns(blocks, [26])
+        conditions = [weather_code_to_condition(c) for c in columns['weather_code']]
+
+        scores = score_columns(columns, conditions, [0.0])
+
+        assert scores[0] > 0
+        assert scores[1] is None
+
+
+class TestExceedance:
+    """Tests for hazard probabilities."""
+
+    def test_unscored_cells_are_left_out(self):
+        # 3 members x 2 waypoints, no member scored at the second waypoint
+        scores = [6.0, None, 1.0, None, None, None]
+        at_waypoints, anywhere = exceedance(scores, 2, 5.0)
+        assert at_waypoints == [0.5, None]
+        assert anywhere == 0.5
+
+    def test_per_waypoint_and_anywhere(self):
+        # 4 members x 2 waypoints, member-major
+        scores = [1.0, 6.0, 1.0, 2.0, 7.0, 1.0, 5.0, 10.0]
+        at_waypoints, anywhere = exceedance(scores, 2, 5.0)
+        assert at_waypoints == [0.5, 0.5]
+        assert anywhere == 0.75
+
+        at_waypoints, anywhere = exceedance(scores, 2, 10.0)
+        assert at_waypoints == [0.0, 0.25]
+        assert anywhere == 0.25
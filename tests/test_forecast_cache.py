@@ -0,0 +1,45 @@
+"""Tests for forecast_cache.py"""
+
+from datetime import datetime, timezone
+
+import forecast_cache
+
+HOURLY = {'time': ['2026-01-23T07:00', '2026-01-23T08:00']}
+
+
+class TestForecastCache:
+    """Tests for the hourly forecast cache."""
+
+    def test_nearby_points_share_a_cell(self):
+        forecast_cache.put(33.951, -83.981, HOURLY)
+        when = datetime(2026, 1, 23, 7, 30, tzinfo=timezone.utc)
+        assert forecast_cache.get(33.952, -83.979, when) is HOURLY
+        assert forecast_cache.get(34.5, -83.98, when) is None
+
+    def test_exact_lookup_needs_the_same_location(self):
+        forecast_cache.put(33.951, -83.981, HOURLY)
+        when = datetime(2026, 1, 23, 7, 30, tzinfo=timezone.utc)
+        assert forecast_cache.get(33.95, -83.98, when, exact=True) is None
+        assert forecast_cache.get(33.951, -83.981, when, exact=True) is HOURLY
+
+    def test_requires_covered_time(self):
+        forecast_cache.put(33.95, -83.98, HOURLY)
+        assert forecast_cache.get(33.95, -83.98, datetime(2026, 1, 23, 8, 20)) is HOURLY
+        assert forecast_cache.get(33.95, -83.98, datetime(2026, 1, 23, 9, 0)) is None
+
+    def test_expires_after_ttl(self, mocker):
+        forecast_cache.put(33.95, -83.98, HOURLY)
+        mocker.patch('forecast_cache.TTL_SECONDS', -1)
+        assert forecast_cache.get(33.95, -83.98, datetime(2026, 1, 23, 7)) is None
+
+    def test_evicts_least_recently_used(self, mocker):
+        mocker.patch('forecast_cache.MAX_CELLS', 2)
+        when = datetime(2026, 1, 23, 7)
+        forecast_cache.put(30.0, -80.0, HOURLY)
+        forecast_cache.put(31.0, -80.0, HOURLY)
+        forecast_cache.get(30.0, -80.0, when)
+        forecast_cache.put(32.0, -80.0, HOURLY)
+
+        assert forecast_cache.get(30.0, -80.0, when) is HOURLY
+        assert forecast_cache.get(31.0, -80.0, when) is None
+        assert forecast_cache.get(32.0, -80.0, when) is HOURLY
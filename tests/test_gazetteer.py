@@ -0,0 +1,128 @@
+"""Tests for gazetteer.py"""
+
+import math
+import random
+import time
+
+import pytest
+
+from gazetteer import (
+    METERS_PER_DEG,
+    Gazetteer,
+    default_gazetteer,
+    load_gazetteer,
+)
+
+RECORDS = [
+    ('Vail', 39.6403, -106.3742, 'place'),
+    ('Vail Pass', 39.5311, -106.2167, 'place'),
+    ('Copper Mountain', 39.5022, -106.1497, 'place'),
+    ('I-70', 39.5300, -106.2170, 'road'),
+    ('I-70', 39.6400, -106.3700, 'road'),
+    ('CO-91', 39.4900, -106.1500, 'road'),
+]
+
+
+def distance_m(a, b):
+    kx = METERS_PER_DEG * math.cos(math.radians(a[0]))
+    return math.hypot((a[1] - b[1]) * kx, (a[0] - b[0]) * METERS_PER_DEG)
+
+
+class TestGazetteer:
+    """Tests for labeling points with the nearest place and road."""
+
+    def test_labels_nearest_place_and_road(self):
+        gazetteer = Gazetteer.from_records(RECORDS)
+
+        labels = gazetteer.label([(39.532, -106.218), (39.639, -106.372)])
+
+        assert labels[0]['place'] == 'Vail Pass'
+        assert labels[0]['place_distance_km'] == pytest.approx(0.1, abs=0.1)
+        assert labels[0]['road'] == 'I-70'
+        assert labels[1]['place'] == 'Vail'
+
+    def test_nothing_in_range(self):
+        gazetteer = Gazetteer.from_records(RECORDS)
+
+        # ~11 km from Copper Mountain, far from any road point
+        (label,) = gazetteer.label([(39.6, -106.05)])
+        assert label['place'] == 'Copper Mountain'
+        assert label['road'] is None
+
+        (label,) = gazetteer.label([(45.0, -100.0)])
+        assert label == {'place': None, 'place_distance_km': None, 'road': None}
+
+    def test_empty(self):
+        gazetteer = Gazetteer.from_records([])
+
+        assert gazetteer.label([(39.5, -106.2)])[0]['place'] is None
+
+    def test_unknown_kind(self):
+        with pytest.raises(ValueError):
+            Gazetteer.from_records([('Vail', 39.64, -106.37, 'river')])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        places = [
+            (f'place {n}', rng.uniform(35, 45), rng.uniform(-110, -100), 'place')
+            for n in range(5000)
+        ]
+        gazetteer = Gazetteer.from_records(places)
+
+        for _ in range(200):
+            point = (rng.uniform(35, 45), rng.uniform(-110, -100))
+            (label,) = gazetteer.label([point])
+            distance, name = min(
+                (distance_m(point, (lat, lon)), name) for name, lat, lon, _ in places
+            )
+            assert label['place'] == name
+            assert label['place_distance_km'] == round(distance / 1000, 1)
+
+    def test_labels_a_route_quickly(self):
+        rng = random.Random(3)
+        records = [
+            (f'town {n}', rng.uniform(35, 45), rng.uniform(-110, -100), 'place')
+            for n in range(20000)
+        ] + [('I-70', 39.5, -110 + i * 0.0005, 'road') for i in range(20000)]
+        gazetteer = Gazetteer.from_records(records)
+        route = [(39.5, -109 + i * 0.1) for i in range(80)]
+
+        gazetteer.label(route)
+        started = time.perf_counter()
+        labels = gazetteer.label(route)
+        elapsed = time.perf_counter() - started
+
+        assert all(label['road'] == 'I-70' for label in labels)
+        assert elapsed < 0.05
+
+    def test_save_and_memory_map(self, tmp_path):
+        path = str(tmp_path / 'gazetteer.idx')
+        Gazetteer.from_records(RECORDS).save(path)
+
+        loaded = Gazetteer.load(path)
+
+        assert loaded.label([(39.532, -106.218)]) == Gazetteer.from_records(
+            RECORDS
+        ).label([(39.532, -106.218)])
+
+    def test_load_rejects_other_files(self, tmp_path):
+        path = tmp_path / 'other.idx'
+        path.write_bytes(b'\0' * 64)
+
+        with pytest.raises(ValueError):
+            Gazetteer.load(str(path))
+
+
+def test_default_gazetteer_from_csv(tmp_path, monkeypatch):
+    path = tmp_path / 'places.csv'
+    path.write_text(
+        'name,lat,lon,kind\nVail Pass,39.5311,-106.2167,\nI-70,39.5300,-106.2170,road\n'
+    )
+    monkeypatch.setenv('SAFE_TRAVELS_GAZETTEER', str(path))
+    load_gazetteer.cache_clear()
+
+    (label,) = default_gazetteer().label([(39.532, -106.218)])
+
+    assert label['place'] == 'Vail Pass'
+    assert label['road'] == 'I-70'
+    assert default_gazetteer() is default_gazetteer()
@@ -0,0 +1,55 @@
+"""Tests for grid_sampling.py"""
+
+import pytest
+
+from grid_sampling import (
+    blend_hourly,
+    interpolate_records,
+    lattice_corners,
+    lattice_point,
+)
+
+
+class TestLatticeCorners:
+    """Tests for lattice_corners."""
+
+    def test_bilinear_weights(self):
+        corners = dict(lattice_corners(33.925, -83.975, 0.1))
+
+        assert set(corners) == {(339, -840), (340, -840), (339, -839), (340, -839)}
+        assert sum(corners.values()) == pytest.approx(1.0)
+        assert corners[(339, -840)] == pytest.approx(0.75 * 0.75)
+        assert corners[(339, -839)] == pytest.approx(0.75 * 0.25)
+
+    def test_point_on_lattice_needs_one_corner(self):
+        ((corner, weight),) = lattice_corners(34.0, -84.0, 0.5)
+        assert lattice_point(*corner, 0.5) == (34.0, -84.0)
+        assert weight == pytest.approx(1.0)
+
+
+class TestBlendHourly:
+    """Tests for blend_hourly."""
+
+    def test_weighted_average_skips_missing_values(self):
+        blocks = [
+            {'time': ['t0', 't1'], 'weather_code': [0, 0], 'rain': [1.0, None]},
+            {'time': ['t0', 't1'], 'weather_code': [71, 71], 'rain': [3.0, 2.0]},
+        ]
+
+        blended = blend_hourly(blocks, [0.25, 0.75])
+
+        assert blended['rain'] == [pytest.approx(2.5), pytest.approx(2.0)]
+        # Categories come from the heaviest block
+        assert blended['weather_code'] == [71, 71]
+
+
+class TestInterpolateRecords:
+    """Tests for interpolate_records."""
+
+    def test_numbers_interpolate_and_categories_snap(self):
+        before = {'temp_c': 0.0, 'condition': 'cloudy', 'soil_temp_c': None}
+        after = {'temp_c': 4.0, 'condition': 'snowy', 'soil_temp_c': 1.0}
+
+        result = interpolate_records(before, after, 0.75)
+
+        assert result == {'temp_c': 3.0, 'condition': 'snowy', 'soil_temp_c': 1.0}
@@ -0,0 +1,95 @@
+"""Tests for gridfile.py"""
+
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from gridfile import GridFile, load_grid, write_grid
+
+T0 = datetime(2026, 1, 23, 6, 0, tzinfo=timezone.utc)
+
+
+def _write_ramp(path, nan_at=None):
+    # 2 hours x 2 lats x 3 lons, value = 100 * hour + 10 * lat index + lon index
+    values = []
+    for step in range(2):
+        for i in range(2):
+            for j in range(3):
+                values.extend([100 * step + 10 * i + j, -1.0])
+    if nan_at is not None:
+        values[nan_at] = math.nan
+    write_grid(
+        str(path), 34.0, -84.0, 0.1, 0.1, 2, 3, T0, 3600, 2, ['ramp', 'const'], values
+    )
+
+
+class TestGridFile:
+    """Tests for writing and sampling grid files."""
+
+    def test_round_trip_header(self, tmp_path):
+        _write_ramp(tmp_path / 'grid.bin')
+        grid = GridFile.open(str(tmp_path / 'grid.bin'))
+
+        assert grid.variables == ('ramp', 'const')
+        assert (grid.nlat, grid.nlon, grid.nt) == (2, 3, 2)
+        assert grid.t0 == T0
+        assert grid.lat1 == pytest.approx(34.1)
+        assert grid.lon1 == pytest.approx(-83.8)
+        assert grid.time_at(1) == T0 + timedelta(hours=1)
+
+    def test_sample_on_lattice_point(self, tmp_path):
+        _write_ramp(tmp_path / 'grid.bin')
+        grid = GridFile.open(str(tmp_path / 'grid.bin'))
+
+        sample = grid.sample(34.1, -83.9, T0 + timedelta(hours=1))
+        assert sample['ramp'] == pytest.approx(111)
+        assert sample['const'] == pytest.approx(-1)
+
+    def test_sample_interpolates_space_and_time(self, tmp_path):
+        _write_ramp(tmp_path / 'grid.bin')
+        grid = GridFile.open(str(tmp_path / 'grid.bin'))
+
+        sample = grid.sample(34.05, -83.85, T0 + timedelta(minutes=30))
+        assert sample['ramp'] == pytest.approx(50 + 5 + 1.5, abs=1e-3)
+
+    def test_sample_outside_grid(self, tmp_path):
+        _write_ramp(tmp_path / 'grid.bin')
+        grid = GridFile.open(str(tmp_path / 'grid.bin'))
+
+        assert grid.sample(35.0, -83.9, T0) is None
+        assert grid.sample(34.05, -83.9, T0 + timedelta(hours=2)) is None
+        assert not grid.contains(34.05, -83.9, T0 - timedelta(minutes=1))
+        assert grid.contains(34.05, -83.9, T0)
+
+    def test_sample_skips_missing_corners(self, tmp_path):
+        # Blank out the (hour 0, lat 0, lon 0) ramp value
+        _write_ramp(tmp_path / 'grid.bin', nan_at=0)
+        grid = GridFile.open(str(tmp_path / 'grid.bin'))
+
+        assert grid.sample(34.0, -84.0, T0) is None
+        sample = grid.sample(34.0, -83.95, T0)
+        assert sample['ramp'] == pytest.approx(1)
+
+    def test_write_rejects_wrong_size(self, tmp_path):
+        with pytest.raises(ValueError, match='Expected 4 grid values'):
+            write_grid(
+                str(tmp_path / 'grid.bin'), 0, 0, 1, 1, 2, 2, T0, 3600, 1, ['x'], [0]
+            )
+
+    def test_open_rejects_other_files(self, tmp_path):
+        path = tmp_path / 'grid.bin'
+        path.write_bytes(b'\0' * 128)
+        with pytest.raises(ValueError, match='Not a grid file'):
+            GridFile.open(str(path))
+
+    def test_load_grid_reopens_replaced_file(self, tmp_path):
+        path = tmp_path / 'grid.bin'
+        write_grid(str(path), 0, 0, 1, 1, 1, 1, T0, 3600, 1, ['x'], [1.0])
+        first = load_grid(str(path))
+        assert load_grid(str(path)) is first
+
+        write_grid(str(path), 0, 0, 1, 1, 1, 1, T0, 3600, 1, ['x'], [2.0])
+        path.touch()
+        second = load_grid(str(path))
+        assert second.value(0, 0, 0) == 2.0
@@ -0,0 +1,104 @@
+"""Tests for heatmap.py"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from gridfile import GridFile
+from heatmap import build_heatmap
+
+
+def _hourly(start, hours, temp):
+    times = [
+        (start + timedelta(hours=h)).strftime('%Y-%m-%dT%H:00') for h in range(hours)
+    ]
+    return {
+        'time': times,
+        'temperature_2m': [temp] * hours,
+        'wind_speed_10m': [16.0] * hours,
+        'wind_gusts_10m': [0.0] * hours,
+        'weather_code': [0] * hours,
+        'precipitation': [0.0] * hours,
+        'rain': [0.0] * hours,
+        'snowfall': [0.0] * hours,
+        'snow_depth': [0.0] * hours,
+        'visibility': [10000.0] * hours,
+        'soil_temperature_0cm': [10.0] * hours,
+        'dew_point_2m': [0.0] * hours,
+    }
+
+
+class TestBuildHeatmap:
+    """Tests for build_heatmap function."""
+
+    def test_scores_every_cell_and_hour(self, mocker, tmp_path):
+        start = datetime(2026, 1, 23, 6, 0, tzinfo=timezone.utc)
+        history_start = start - timedelta(hours=24)
+        mock_fetch = mocker.patch(
+            'heatmap.fetch_hourly_forecasts',
+            side_effect=lambda coords, s, e: [
+                # Hot cells on the northern row score 2 higher than the rest
+                _hourly(history_start, 24 + 3, 40.0 if lat > 34.05 else 20.0)
+                for lat, _ in coords
+            ],
+        )
+
+        path = str(tmp_path / 'heatmap.bin')
+        build_heatmap(
+            path,
+            34.0,
+            -84.0,
+            34.1,
+            -83.9,
+            resolution=0.1,
+            hours=3,
+            start=start + timedelta(minutes=20),
+        )
+
+        grid = GridFile.open(path)
+        assert (grid.nlat, grid.nlon, grid.nt) == (2, 2, 3)
+        assert grid.t0 == start
+        assert mock_fetch.call_count == 1
+        # wind 16 km/h = 1, plus 2 for 40C heat on the northern row
+        assert grid.value(0, 0, 0) == pytest.approx(1.0)
+        assert grid.value(2, 1, 1) == pytest.approx(3.0)
+
+    def test_fetches_in_chunks(self, mocker, tmp_path):
+        start = datetime(2026, 1, 23, 6, 0, tzinfo=timezone.utc)
+        mocker.patch('heatmap.FETCH_CHUNK_SIZE', 2)
+        mock_fetch = mocker.patch(
+            'heatmap.fetch_hourly_forecasts',
+            side_effect=lambda coords, s, e: [
+                _hourly(start - timedelta(hours=24), 25, 20.0) for _ in coords
+            ],
+        )
+
+        build_heatmap(
+            str(tmp_path / 'heatmap.bin'),
+            34.0,
+            -84.0,
+            34.2,
+            -84.0,
+            resolution=0.1,
+            hours=1,
+            start=start,
+        )
+
+        # 3 lattice points in chunks of 2
+        assert mock_fetch.call_count == 2
+
+    def test_naive_start_is_utc(self, mocker, tmp_path):
+        start = datetime(2026, 1, 23, 6, 0, tzinfo=timezone.utc)
+        mocker.patch(
+            'heatmap.fetch_hourly_forecasts',
+            side_effect=lambda coords, s, e: [
+                _hourly(start - timedelta(hours=24), 25, 20.0) for _ in coords
+            ],
+        )
+
+        path = str(tmp_path / 'heatmap.bin')
+        build_heatmap(
+            path, 34.0, -84.0, 34.0, -84.0, hours=1, start=start.replace(tzinfo=None)
+        )
+
+        assert GridFile.open(path).t0 == start
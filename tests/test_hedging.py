@@ -0,0 +1,185 @@
+"""Tests for hedging.py"""
+
+import threading
+import time
+
+import pytest
+
+import hedging
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(hedging, '_budget_tokens', {})
+    yield
+    metrics.reset()
+
+
+def _warm_up(name, seconds=0.01):
+    for _ in range(hedging.MIN_SAMPLES):
+        metrics.observe(name, seconds)
+
+
+class TestHedgedCall:
+    """Tests for hedged_call function."""
+
+    def test_calls_directly_while_warming_up(self):
+        caller = []
+        result = hedging.hedged_call(
+            'upstream', lambda: caller.append(threading.current_thread()) or 'ok'
+        )
+        assert result == 'ok'
+        assert caller == [threading.current_thread()]
+        assert metrics.sample_count('upstream') == 1
+
+    def test_hedge_delay_tracks_latency_percentile(self):
+        assert hedging.hedge_delay('upstream') is None
+        _warm_up('upstream', 0.2)
+        assert hedging.hedge_delay('upstream') == pytest.approx(0.2)
+
+    def test_fast_call_is_not_hedged(self):
+        _warm_up('upstream')
+        hedging._budget_tokens['upstream'] = 5
+
+        calls = []
+        assert hedging.hedged_call('upstream', lambda: calls.append(1) or 'ok') == 'ok'
+        assert len(calls) == 1
+        assert metrics.counter('upstream.hedges') == 0
+
+    def test_slow_call_is_hedged_and_hedge_wins(self):
+        _warm_up('upstream')
+        hedging._budget_tokens['upstream'] = 5
+        release = threading.Event()
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(2)
+                return 'slow'
+            return 'fast'
+
+        start = time.perf_counter()
+        result = hedging.hedged_call('upstream', call)
+        elapsed = time.perf_counter() - start
+        release.set()
+
+        assert result == 'fast'
+        assert elapsed < 1
+        assert metrics.counter('upstream.hedges') == 1
+        assert metrics.counter('upstream.hedge_wins') == 1
+        assert metrics.snapshot()['gauges']['upstream.hedge_rate'] == 1.0
+
+    def test_hedge_rate_falls_with_unhedged_calls(self):
+        _warm_up('upstream')
+        hedging._budget_tokens['upstream'] = 5
+        release = threading.Event()
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(2)
+            return 'ok'
+
+        hedging.hedged_call('upstream', call)
+        release.set()
+        hedging.hedged_call('upstream', call)
+
+        assert metrics.snapshot()['gauges']['upstream.hedge_rate'] == 0.5
+
+    def test_queue_wait_does_not_count_toward_delay(self, monkeypatch):
+        from concurrent.futures import ThreadPoolExecutor
+
+        _warm_up('upstream')
+        hedging._budget_tokens['upstream'] = 5
+        executor = ThreadPoolExecutor(max_workers=1)
+        monkeypatch.setattr(hedging, '_executor', executor)
+        # Keep the only worker busy for several hedge delays
+        executor.submit(time.sleep, 0.3)
+        calls = []
+
+        assert hedging.hedged_call('upstream', lambda: calls.append(1) or 'ok') == 'ok'
+        assert len(calls) == 1
+        assert metrics.counter('upstream.hedges') == 0
+        executor.shutdown()
+
+    def test_calls_directly_when_every_worker_is_busy(self, monkeypatch):
+        _warm_up('upstream')
+        hedging._budget_tokens['upstream'] = 5
+        monkeypatch.setattr(hedging, '_slots', threading.BoundedSemaphore(1))
+        hedging._slots.acquire()
+        caller = []
+
+        result = hedging.hedged_call(
+            'upstream', lambda: caller.append(threading.current_thread()) or 'ok'
+        )
+
+        assert result == 'ok'
+        assert caller == [threading.current_thread()]
+        assert metrics.counter('upstream.hedge_pool_full') == 1
+
+    def test_no_hedge_without_a_free_worker(self, monkeypatch):
+        _warm_up('upstream')
+        hedging._budget_tokens['upstream'] = 5
+        monkeypatch.setattr(hedging, '_slots', threading.BoundedSemaphore(1))
+
+        def call():
+            time.sleep(0.1)
+            return 'ok'
+
+        assert hedging.hedged_call('upstream', call) == 'ok'
+        assert metrics.counter('upstream.hedges') == 0
+        assert metrics.counter('upstream.hedge_pool_full') == 1
+        assert hedging._budget_tokens['upstream'] == pytest.approx(5.05)
+
+    def test_no_hedge_without_budget(self):
+        _warm_up('upstream')
+        calls = []
+
+        def call():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'ok'
+
+        assert hedging.hedged_call('upstream', call) == 'ok'
+        assert len(calls) == 1
+        assert metrics.counter('upstream.hedges') == 0
+
+    def test_budget_limits_hedge_fraction(self):
+        for _ in range(40):
+            hedging._earn_budget('upstream')
+        # 40 requests at a 5% budget pay for two hedges
+        assert hedging._spend_budget('upstream')
+        assert hedging._spend_budget('upstream')
+        assert not hedging._spend_budget('upstream')
+
+    def test_hedge_result_used_when_primary_fails(self):
+        _warm_up('upstream')
+        hedging._budget_tokens['upstream'] = 5
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.2)
+                raise ConnectionError('primary failed')
+            return 'hedge'
+
+        assert hedging.hedged_call('upstream', call) == 'hedge'
+
+    def test_primary_error_raised_when_both_fail(self):
+        _warm_up('upstream')
+        hedging._budget_tokens['upstream'] = 5
+        calls = []
+
+        def call():
+            calls.append(1)
+            time.sleep(0.1)
+            raise ConnectionError(f'call {len(calls)} failed')
+
+        with pytest.raises(ConnectionError, match='failed'):
+            hedging.hedged_call('upstream', call)
+        assert len(calls) == 2
@@ -0,0 +1,108 @@
+"""Tests for loadtest.py"""
+
+from datetime import datetime
+
+import polyline
+import requests
+
+from loadtest import (
+    StandInUpstream,
+    city_coordinates,
+    load_test,
+    parse_mix,
+    summarize,
+    synthetic_hourly,
+)
+
+
+class TestStandInUpstream:
+    """Tests for the stand-in upstream APIs."""
+
+    def test_geocode_is_deterministic(self):
+        with StandInUpstream(latency=0) as upstream:
+            url = upstream.environment()['SAFE_TRAVELS_GEOCODE_URL']
+            data = requests.get(url, params={'address': 'Denver, CO'}).json()
+
+        location = data['results'][0]['geometry']['location']
+        assert (location['lat'], location['lng']) == city_coordinates('Denver, CO')
+
+    def test_forecast_covers_requested_hours(self):
+        with StandInUpstream(latency=0) as upstream:
+            url = upstream.environment()['SAFE_TRAVELS_OPEN_METEO_URL']
+            data = requests.get(
+                f'{url}?latitude=40.0,41.0&longitude=-105.0,-104.0'
+                '&start_hour=2026-01-22T07:00&end_hour=2026-01-23T08:00'
+            ).json()
+
+        assert len(data) == 2
+        hourly = data[0]['hourly']
+        assert hourly['time'][0] == '2026-01-22T07:00'
+        assert hourly['time'][-1] == '2026-01-23T08:00'
+        assert len(hourly['temperature_2m']) == 26
+
+    def test_routes_connect_origin_and_destination(self):
+        with StandInUpstream(latency=0) as upstream:
+            url = upstream.environment()['SAFE_TRAVELS_ROUTES_URL']
+            data = requests.post(
+                url,
+                json={
+                    'origin': {
+                        'location': {'latLng': {'latitude': 40.0, 'longitude': -105.0}}
+                    },
+                    'destination': {
+                        'location': {'latLng': {'latitude': 41.0, 'longitude': -105.0}}
+                    },
+                },
+            ).json()
+
+        route = data['routes'][0]
+        points = polyline.decode(route['polyline']['encodedPolyline'])
+        assert points[0] == (40.0, -105.0)
+        assert points[-1] == (41.0, -105.0)
+        assert 110000 < route['distanceMeters'] < 112000
+
+    def test_snow_below_freezing(self):
+        hourly = synthetic_hourly(
+            60.0, datetime(2026, 1, 23, 0), datetime(2026, 1, 23, 23)
+        )
+        assert all(
+            code == 71
+            for code, temp in zip(hourly['weather_code'], hourly['temperature_2m'])
+            if temp < 0
+        )
+
+
+class TestSummarize:
+    """Tests for load test reports."""
+
+    def test_parse_mix(self):
+        assert parse_mix('assess_route_danger=3,derive_route') == {
+            'assess_route_danger': 3.0,
+            'derive_route': 1.0,
+        }
+
+    def test_per_tool_and_overall_stats(self):
+        samples = [('derive_route', i / 1000, True) for i in range(1, 101)]
+        samples.append(('assess_route_danger', 0.5, False))
+
+        report = summarize(samples, elapsed=10.0)
+
+        assert report['overall']['requests'] == 101
+        assert report['overall']['errors'] == 1
+        assert report['overall']['throughput_rps'] == 10.1
+        derive = report['tools']['derive_route']
+        assert derive['p50_ms'] == 51.0
+        assert derive['p99_ms'] == 100.0
+        assert derive['error_rate'] == 0.0
+        assert report['tools']['assess_route_danger']['error_rate'] == 1.0
+
+
+class TestLoadTest:
+    """End-to-end run over the streamable-HTTP transport."""
+
+    def test_short_run(self):
+        report = load_test(clients=2, duration=1, upstream_latency=0)
+
+        assert report['overall']['requests'] > 0
+        assert report['overall']['errors'] == 0
+        assert set(report['tools']) <= {'assess_route_danger', 'derive_route'}
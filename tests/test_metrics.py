@@ -0,0 +1,43 @@
+"""Tests for metrics.py"""
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestMetrics:
+    """Tests for counters, gauges and timings."""
+
+    def test_counters_accumulate(self):
+        metrics.increment('calls')
+        metrics.increment('calls', 2)
+        assert metrics.counter('calls') == 3
+        assert metrics.counter('missing') == 0
+
+    def test_gauges_hold_last_value(self):
+        metrics.set_gauge('queue_depth', 4)
+        metrics.set_gauge('queue_depth', 1)
+        assert metrics.snapshot()['gauges'] == {'queue_depth': 1}
+
+    def test_percentiles(self):
+        for ms in range(1, 101):
+            metrics.observe('upstream', ms / 1000)
+        assert metrics.sample_count('upstream') == 100
+        assert metrics.percentile('upstream', 0.5) == pytest.approx(0.051)
+        assert metrics.percentile('missing', 0.5) is None
+
+        timing = metrics.snapshot()['timings_ms']['upstream']
+        assert timing == {'count': 100, 'p50': 51.0, 'p95': 96.0, 'p99': 100.0}
+
+    def test_timing_window_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(metrics, 'TIMING_WINDOW', 10)
+        for _ in range(50):
+            metrics.observe('bounded', 0.1)
+        assert metrics.sample_count('bounded') == 10
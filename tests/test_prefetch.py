@@ -0,0 +1,102 @@
+"""Tests for prefetch.py"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import metrics
+import prefetch
+
+NOW = datetime(2026, 1, 23, 5, 10, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def _empty_query_log():
+    prefetch.clear()
+    yield
+    prefetch.clear()
+
+
+def log_queries(origin, destination, hour, count, days_ago=0):
+    departure = NOW.replace(hour=hour, minute=20)
+    for _ in range(count):
+        prefetch.record_query(
+            origin, destination, departure, now=NOW - timedelta(days=days_ago)
+        )
+
+
+class TestHotCorridors:
+    """Tests for hot corridor detection."""
+
+    def test_needs_repeated_queries(self):
+        log_queries('Denver, CO', 'Vail, CO', 7, 3)
+        log_queries('Denver, CO', 'Boulder, CO', 7, 2)
+
+        hot = prefetch.hot_corridors(NOW)
+
+        assert hot == [(prefetch.Corridor('Denver, CO', 'Vail, CO', 7, False), 3)]
+
+    def test_departure_hours_are_separate_corridors(self):
+        log_queries('Denver, CO', 'Vail, CO', 7, 3)
+        log_queries('Denver, CO', 'Vail, CO', 17, 4)
+
+        hours = [corridor.hour for corridor, _ in prefetch.hot_corridors(NOW)]
+
+        assert hours == [17, 7]
+
+    def test_old_queries_are_ignored(self):
+        log_queries('Denver, CO', 'Vail, CO', 7, 5, days_ago=8)
+        assert prefetch.hot_corridors(NOW) == []
+
+
+class TestNextDeparture:
+    """Tests for next_departure."""
+
+    def test_later_today(self):
+        assert prefetch.next_departure(7, NOW) == NOW.replace(hour=7, minute=0)
+
+    def test_current_hour_still_counts(self):
+        now = NOW.replace(hour=7, minute=40)
+        assert prefetch.next_departure(7, now) == NOW.replace(hour=7, minute=0)
+
+    def test_tomorrow(self):
+        assert prefetch.next_departure(4, NOW) == datetime(
+            2026, 1, 24, 4, tzinfo=timezone.utc
+        )
+
+
+class TestPrefetcher:
+    """Tests for Prefetcher."""
+
+    def test_warms_corridors_departing_soon(self):
+        log_queries('Denver, CO', 'Vail, CO', 7, 3)
+        log_queries('Denver, CO', 'Boulder, CO', 17, 3)
+        warmed = []
+
+        count = prefetch.Prefetcher(lambda *args: warmed.append(args)).run_once(NOW)
+
+        assert count == 1
+        assert warmed == [
+            ('Denver, CO', 'Vail, CO', NOW.replace(hour=7, minute=0), False)
+        ]
+
+    def test_paces_upstream_requests(self, mocker):
+        log_queries('Denver, CO', 'Vail, CO', 7, 3)
+        sleep = mocker.patch('prefetch.time.sleep')
+
+        def warm(*args):
+            metrics.increment('open_meteo.requests', 4)
+
+        prefetch.Prefetcher(warm, rate=2.0).run_once(NOW)
+
+        assert sleep.call_args.args[0] == pytest.approx(2.0, abs=0.1)
+
+    def test_errors_do_not_stop_other_corridors(self):
+        log_queries('Denver, CO', 'Vail, CO', 7, 4)
+        log_queries('Denver, CO', 'Boulder, CO', 6, 3)
+
+        def warm(origin, destination, departure, safest):
+            if destination == 'Vail, CO':
+                raise ConnectionError('upstream down')
+
+        assert prefetch.Prefetcher(warm).run_once(NOW) == 1
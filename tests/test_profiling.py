@@ -0,0 +1,82 @@
+"""Tests for profiling.py"""
+
+import time
+import tracemalloc
+
+import pytest
+
+import profiling
+
+
+@pytest.fixture(autouse=True)
+def _no_profiles():
+    profiling.clear()
+    yield
+    profiling.clear()
+
+
+def slow_tool(seconds: float) -> str:
+    profiling.mark('setup')
+    time.sleep(seconds)
+    profiling.mark('work')
+    return 'done'
+
+
+class TestProfiled:
+    """Tests for the profiled decorator."""
+
+    def test_disabled_by_default(self, monkeypatch):
+        monkeypatch.delenv('SAFE_TRAVELS_PROFILE_MS', raising=False)
+        assert profiling.profiled(slow_tool)(0.01) == 'done'
+        assert profiling.slow_profiles() == []
+
+    def test_keeps_slow_calls(self, monkeypatch):
+        monkeypatch.setenv('SAFE_TRAVELS_PROFILE_MS', '20')
+        assert profiling.profiled(slow_tool)(0.1) == 'done'
+
+        (profile,) = profiling.slow_profiles()
+        assert profile['tool'] == 'slow_tool'
+        assert profile['duration_ms'] >= 100
+        assert profile['stages_ms']['work'] >= 100
+        assert profile['samples'] > 0
+        # Collapsed stacks are "outer;...;inner count" lines
+        stack, count = profile['collapsed_stacks'].splitlines()[0].rsplit(' ', 1)
+        assert 'test_profiling:slow_tool' in stack.split(';')
+        assert int(count) > 0
+        assert 'allocations' not in profile
+
+    def test_discards_fast_calls(self, monkeypatch):
+        monkeypatch.setenv('SAFE_TRAVELS_PROFILE_MS', '1000')
+        profiling.profiled(slow_tool)(0)
+        assert profiling.slow_profiles() == []
+
+    def test_ring_buffer_is_bounded(self, monkeypatch, mocker):
+        monkeypatch.setenv('SAFE_TRAVELS_PROFILE_MS', '0')
+        mocker.patch.object(profiling, '_profiles', profiling.deque(maxlen=3))
+        tool = profiling.profiled(slow_tool)
+        for _ in range(5):
+            tool(0)
+
+        assert len(profiling.slow_profiles()) == 3
+        assert len(profiling.slow_profiles(limit=2)) == 2
+
+    def test_tracks_allocations_when_enabled(self, monkeypatch):
+        monkeypatch.setenv('SAFE_TRAVELS_PROFILE_MS', '0')
+        monkeypatch.setenv('SAFE_TRAVELS_PROFILE_ALLOCATIONS', '1')
+
+        @profiling.profiled
+        def allocating_tool():
+            return [bytearray(1024) for _ in range(1000)]
+
+        try:
+            result = allocating_tool()
+        finally:
+            tracemalloc.stop()
+
+        allocations = profiling.slow_profiles()[0]['allocations']
+        assert allocations['net_bytes'] >= 1000 * 1024
+        assert allocations['top_sites']
+        assert len(result) == 1000
+
+    def test_mark_outside_profiled_call_is_ignored(self):
+        profiling.mark('anything')
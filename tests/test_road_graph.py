@@ -0,0 +1,162 @@
+"""Tests for road_graph.py"""
+
+import random
+
+import polyline
+import pytest
+
+from road_graph import RoadGraph, haversine_m
+
+# A small grid of roads:
+#
+#   2 ----- 3
+#   |       |
+#   0 ----- 1
+#
+# The 0-1-3 side is a fast highway, the 0-2-3 side a slower local road.
+NODES = [(34.00, -84.00), (34.00, -83.90), (34.10, -84.00), (34.10, -83.90)]
+
+
+def _graph():
+    edges = []
+    for a, b, speed in [(0, 1, 100.0), (1, 3, 100.0), (0, 2, 80.0), (2, 3, 80.0)]:
+        length = haversine_m(*NODES[a], *NODES[b])
+        edges.append((a, b, length, speed))
+        edges.append((b, a, length, speed))
+    return RoadGraph.from_edges(NODES, edges)
+
+
+class TestHaversine:
+    """Tests for haversine_m function."""
+
+    def test_one_degree_of_latitude(self):
+        assert haversine_m(34.0, -84.0, 35.0, -84.0) == pytest.approx(111195, rel=1e-3)
+
+    def test_same_point(self):
+        assert haversine_m(34.0, -84.0, 34.0, -84.0) == 0
+
+
+class TestRoadGraph:
+    """Tests for RoadGraph routing."""
+
+    def test_csr_layout(self):
+        graph = _graph()
+        assert graph.node_count == 4
+        assert graph.edge_count == 8
+        neighbours = graph.targets[graph.offsets[0] : graph.offsets[1]]
+        assert sorted(neighbours) == [1, 2]
+
+    def test_nearest_node(self):
+        graph = _graph()
+        assert graph.nearest_node(34.001, -83.901) == 1
+        assert graph.nearest_node(34.09, -84.01) == 2
+
+    def test_nearest_node_far_from_any_node(self):
+        graph = _graph()
+        assert graph.nearest_node(34.5, -83.5, max_m=100000) == 3
+
+    def test_nearest_node_beyond_snap_radius_raises(self):
+        with pytest.raises(ValueError, match='No road within 10 km'):
+            _graph().nearest_node(34.5, -83.5)
+
+    def test_nearest_node_at_high_latitude(self):
+        # Cells are 0.01 degrees each way, so at 70N a node two cells east is
+        # closer than one a cell north
+        graph = RoadGraph.from_edges([(70.0095, 65.0), (70.0, 65.0205)], [])
+        assert graph.nearest_node(70.0, 65.0, max_m=5000) == 1
+
+    def test_zero_speed_edges_are_impassable(self):
+        edges = [(0, 1, 1000.0, 0.0), (0, 2, 1000.0, 50.0), (2, 1, 1000.0, 50.0)]
+        graph = RoadGraph.from_edges(NODES[:3], edges)
+        assert graph.shortest_path(0, 1)[0] == [0, 2, 1]
+        with pytest.raises(ValueError, match='No path'):
+            RoadGraph.from_edges(NODES[:2], edges[:1]).shortest_path(0, 1)
+
+    def test_quickest_path_takes_highway(self):
+        path, distance, duration = _graph().shortest_path(0, 3)
+        assert path == [0, 1, 3]
+        assert duration == pytest.approx(distance / (100 / 3.6), rel=1e-4)
+
+    def test_danger_diverts_to_safer_road(self):
+        # The highway corner is dangerous enough to justify the slower road
+        path, _, _ = _graph().shortest_path(
+            0, 3, node_danger=lambda n: 10.0 if n == 1 else 0.0
+        )
+        assert path == [0, 2, 3]
+
+    def test_unreachable_target_raises(self):
+        graph = RoadGraph.from_edges(NODES[:2], [])
+        with pytest.raises(ValueError, match='No path'):
+            graph.shortest_path(0, 1)
+
+    def test_path_to_self(self):
+        path, distance, duration = _graph().shortest_path(2, 2)
+        assert (path, distance, duration) == ([2], 0, 0)
+
+    def test_route_matches_routes_api_contract(self):
+        response = _graph().route((34.0, -84.0), (34.1, -83.9))
+        route = response['routes'][0]
+
+        assert route['duration'].endswith('s')
+        assert int(route['duration'].rstrip('s')) > 0
+        assert route['distanceMeters'] > 0
+        points = polyline.decode(route['polyline']['encodedPolyline'])
+        assert points == [NODES[0], NODES[1], NODES[3]]
+
+    def test_route_with_danger_lookup(self):
+        def danger(lat, lon):
+            # Dangerous along the eastern highway, unknown elsewhere
+            return 10.0 if lon > -83.95 and lat < 34.05 else None
+
+        response = _graph().route((34.0, -84.0), (34.1, -83.9), danger=danger)
+        points = polyline.decode(response['routes'][0]['polyline']['encodedPolyline'])
+        assert points == [NODES[0], NODES[2], NODES[3]]
+
+    def test_from_csv_and_memory_map(self, tmp_path):
+        (tmp_path / 'nodes.csv').write_text(
+            'id,lat,lon\na,34.0,-84.0\nb,34.0,-83.9\nc,34.1,-83.9\n'
+        )
+        (tmp_path / 'edges.csv').write_text(
+            'source,target,length_m,speed_kph,oneway\n'
+            'a,b,9000,100,\n'
+            'b,c,11000,100,yes\n'
+        )
+        graph = RoadGraph.from_csv(
+            str(tmp_path / 'nodes.csv'), str(tmp_path / 'edges.csv')
+        )
+        assert graph.edge_count == 3
+
+        path = str(tmp_path / 'graph.bin')
+        graph.save(path)
+        loaded = RoadGraph.load(path)
+
+        assert loaded.shortest_path(0, 2)[0] == [0, 1, 2]
+        assert loaded.nearest_node(34.09, -83.91) == 2
+        # b-c is one way
+        with pytest.raises(ValueError):
+            loaded.shortest_path(2, 0)
+
+    def test_nearest_node_from_the_packed_cell_index(self, tmp_path):
+        rng = random.Random(7)
+        nodes = [
+            (rng.uniform(39.0, 39.5), rng.uniform(-106.0, -105.5)) for _ in range(2000)
+        ]
+        path = str(tmp_path / 'graph.bin')
+        RoadGraph.from_edges(nodes, []).save(path)
+        graph = RoadGraph.load(path)
+
+        # The lookup reads the memory-mapped index, nothing is built per process
+        assert isinstance(graph.cell_nodes, memoryview)
+        assert sorted(graph.cell_nodes) == list(range(len(nodes)))
+        for _ in range(50):
+            lat, lon = rng.uniform(39.0, 39.5), rng.uniform(-106.0, -105.5)
+            nearest = min(
+                range(len(nodes)), key=lambda n: haversine_m(lat, lon, *nodes[n])
+            )
+            assert graph.nearest_node(lat, lon) == nearest
+
+    def test_load_rejects_other_files(self, tmp_path):
+        path = tmp_path / 'graph.bin'
+        path.write_bytes(b'\0' * 64)
+        with pytest.raises(ValueError, match='Not a road graph'):
+            RoadGraph.load(str(path))
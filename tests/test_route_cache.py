@@ -0,0 +1,45 @@
+"""Tests for route_cache.py"""
+
+from datetime import datetime, timezone
+
+import route_cache
+
+
+class TestRouteCache:
+    """Tests for the geocode and route caches."""
+
+    def test_geocodes_ignore_case_and_whitespace(self):
+        route_cache.put_geocode('Denver, CO', (39.74, -104.99))
+        assert route_cache.get_geocode(' denver, co') == (39.74, -104.99)
+        assert route_cache.get_geocode('Boulder, CO') is None
+
+    def test_routes_are_keyed_by_departure_hour(self):
+        origin, destination = (39.74, -104.99), (40.01, -105.27)
+        key = route_cache.route_key(
+            origin, destination, datetime(2026, 1, 23, 7, 5, tzinfo=timezone.utc)
+        )
+        route_cache.put_route(key, {'routes': []})
+
+        same_hour = route_cache.route_key(
+            origin, destination, datetime(2026, 1, 23, 7, 55, tzinfo=timezone.utc)
+        )
+        next_hour = route_cache.route_key(
+            origin, destination, datetime(2026, 1, 23, 8, 0, tzinfo=timezone.utc)
+        )
+        safest = route_cache.route_key(
+            origin,
+            destination,
+            datetime(2026, 1, 23, 7, 5, tzinfo=timezone.utc),
+            safest=True,
+        )
+        assert route_cache.get_route(same_hour) == {'routes': []}
+        assert route_cache.get_route(next_hour) is None
+        assert route_cache.get_route(safest) is None
+
+    def test_routes_expire(self, mocker):
+        key = route_cache.route_key(
+            (39.74, -104.99), (40.01, -105.27), datetime(2026, 1, 23, 7)
+        )
+        route_cache.put_route(key, {'routes': []})
+        mocker.patch.object(route_cache._routes, 'ttl_seconds', -1)
+        assert route_cache.get_route(key) is None
@@ -9,7 +9,10 @@ from routing import (
     ensure_rfc3339_format,
     get_lat_long,
     get_route_duration_seconds,
+    initial_bearing,
     pick_equidistant_points,
+    route_headings,
+    waypoint_headings,
 )
 
 
@@ -121,6 +124,44 @@ class TestComputeRoute:
         assert 'arrivalTime' in call_args.kwargs['json']
 
 
+class TestRoutingBackends:
+    """Tests for routing backend selection in compute_route."""
+
+    def test_defaults_to_google(self, mocker):
+        mocker.patch.dict('os.environ', {}, clear=True)
+        mock_google = mocker.patch.dict(
+            'routing.ROUTING_BACKENDS', {'google': mocker.Mock(return_value={})}
+        )
+        compute_route((33.9519, -83.9880), (34.5270, -83.9801))
+        mock_google['google'].assert_called_once()
+
+    def test_unknown_backend_raises(self, mocker):
+        mocker.patch.dict('os.environ', {'SAFE_TRAVELS_ROUTING': 'carrier-pigeon'})
+        with pytest.raises(ValueError, match='Unknown routing backend'):
+            compute_route((33.9519, -83.9880), (34.5270, -83.9801))
+
+    def test_local_backend_routes_on_graph(self, mocker, tmp_path):
+        from road_graph import RoadGraph, load_road_graph
+
+        path = str(tmp_path / 'graph.bin')
+        RoadGraph.from_edges(
+            [(33.95, -83.99), (34.53, -83.98)],
+            [(0, 1, 65000.0, 78.0), (1, 0, 65000.0, 78.0)],
+        ).save(path)
+        mocker.patch.dict(
+            'os.environ',
+            {'SAFE_TRAVELS_ROUTING': 'local', 'SAFE_TRAVELS_ROAD_GRAPH': path},
+        )
+        mock_post = mocker.patch('routing.requests.post')
+
+        result = compute_route((33.9519, -83.9880), (34.5270, -83.9801))
+        load_road_graph.cache_clear()
+
+        mock_post.assert_not_called()
+        assert get_route_duration_seconds(result) == 3000
+        assert result['routes'][0]['distanceMeters'] == 65000
+
+
 class TestGetRouteDurationSeconds:
     """Tests for get_route_duration_seconds function."""
 
@@ -172,3 +213,47 @@ class TestPickEquidistantPoints:
         points = [(0, 0), (1, 1)]
         with pytest.raises(ValueError):
             pick_equidistant_points(points, n=-1)
+
+
+class TestRouteHeadings:
+    """Tests for initial_bearing and route_headings functions."""
+
+    def test_bearing_north(self):
+        assert initial_bearing((34.0, -84.0), (35.0, -84.0)) == pytest.approx(0)
+
+    def test_bearing_east(self):
+        assert initial_bearing((0.0, 0.0), (0.0, 1.0)) == pytest.approx(90)
+
+    def test_bearing_south(self):
+        assert initial_bearing((35.0, -84.0), (34.0, -84.0)) == pytest.approx(180)
+
+    def test_bearing_west(self):
+        assert initial_bearing((0.0, 1.0), (0.0, 0.0)) == pytest.approx(270)
+
+    def test_last_point_keeps_last_leg_heading(self):
+        points = [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)]
+        headings = route_headings(points)
+        assert len(headings) == 3
+        assert headings[0] == pytest.approx(0)
+        assert headings[1] == pytest.approx(90, abs=0.1)
+        assert headings[2] == headings[1]
+
+    def test_single_point(self):
+        assert route_headings([(0.0, 0.0)]) == [0.0]
+
+    def test_waypoint_headings_follow_the_polyline(self):
+        # A road heading east, then north: the chord between the waypoints at
+        # indices 0 and 2 points north-east
+        points = [(0.0, 0.0), (0.0, 0.1), (0.1, 0.1), (0.2, 0.1)]
+        headings = waypoint_headings(points, [0, 2, 3])
+        assert headings[0] == pytest.approx(90, abs=0.1)
+        assert headings[1] == pytest.approx(0, abs=0.1)
+        assert headings[2] == pytest.approx(0, abs=0.1)
+
+    def test_waypoint_headings_skip_repeated_points(self):
+        points = [(0.0, 0.0), (0.0, 0.0), (0.0, 0.1), (0.0, 0.1)]
+        assert waypoint_headings(points, [0, 3]) == [
+            pytest.approx(90),
+            pytest.approx(90),
+        ]
+        assert waypoint_headings([(1.0, 1.0)], [0]) == [0.0]
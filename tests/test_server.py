@@ -1,86 +1,14 @@
 """Tests for server.py"""
 
-from datetime import datetime, timezone
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
 
+import polyline
 import pytest
 
-from server import (
-    _compute_danger_score,
-    fetch_weather_for_waypoints,
-    weather_code_to_condition,
-)
-
-
-class TestWeatherCodeToCondition:
-    """Tests for weather_code_to_condition function."""
-
-    def test_clear_sky_codes(self):
-        assert weather_code_to_condition(0) == 'sunny'
-        assert weather_code_to_condition(1) == 'sunny'
-
-    def test_cloudy_codes(self):
-        assert weather_code_to_condition(2) == 'cloudy'
-        assert weather_code_to_condition(3) == 'cloudy'
-
-    def test_foggy_codes(self):
-        assert weather_code_to_condition(45) == 'foggy'
-        assert weather_code_to_condition(48) == 'foggy'
-
-    def test_rainy_codes(self):
-        rainy_codes = [51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82]
-        for code in rainy_codes:
-            assert weather_code_to_condition(code) == 'rainy'
-
-    def test_snowy_codes(self):
-        snowy_codes = [71, 73, 75, 77, 85, 86]
-        for code in snowy_codes:
-            assert weather_code_to_condition(code) == 'snowy'
-
-    def test_stormy_code(self):
-        assert weather_code_to_condition(95) == 'stormy'
-
-    def test_hail_codes(self):
-        assert weather_code_to_condition(96) == 'hail'
-        assert weather_code_to_condition(99) == 'hail'
-
-    def test_unknown_code_defaults_to_cloudy(self):
-        assert weather_code_to_condition(999) == 'cloudy'
-
-
-class TestComputeDangerScore:
-    """Tests for _compute_danger_score function."""
-
-    def test_safe_conditions(self):
-        score = _compute_danger_score(
-            temp_c=20.0, wind_kph=10.0, condition='sunny', gust_kph=15.0
-        )
-        # temp: 0, wind: 0.9375, condition: 0, precip: 0, vis: 0, ice: 0
-        assert score == pytest.approx(0.9375)
-
-    def test_cold_and_snowy(self):
-        score = _compute_danger_score(
-            temp_c=-10.0, wind_kph=32.0, condition='snowy', gust_kph=40.0
-        )
-        # temp: 2, wind: 2.5, condition: 3, precip: 0, vis: 0, ice: 1 (very cold)
-        assert score == pytest.approx(8.5)
-
-    def test_hot_and_stormy(self):
-        score = _compute_danger_score(
-            temp_c=40.0, wind_kph=80.0, condition='stormy', gust_kph=100.0
-        )
-        # temp: 2, wind: 6.25, condition: 6, precip: 0, vis: 0, ice: 0 (too hot)
-        # Raw sum is 14.25 but clamped to 10.0
-        assert score == pytest.approx(10.0)
-
-    def test_gust_takes_precedence_over_wind(self):
-        score_high_gust = _compute_danger_score(
-            temp_c=20.0, wind_kph=10.0, condition='sunny', gust_kph=50.0
-        )
-        score_low_gust = _compute_danger_score(
-            temp_c=20.0, wind_kph=10.0, condition='sunny', gust_kph=5.0
-        )
-        # High gust should use gust value, low gust should use wind value
-        assert score_high_gust > score_low_gust
+from server import fetch_weather_for_waypoints
 
 
 class TestFetchWeatherForWaypoints:
@@ -222,6 +150,234 @@ class TestFetchWeatherForWaypoints:
         assert 'arrival_time' in result[0]
         assert result[0]['arrival_time'] == arrival.isoformat()
 
+    def test_requests_preceding_hours_in_same_call(self, mocker):
+        mock_response = mocker.Mock()
+        mock_response.json.return_value = {
+            'hourly': {
+                'time': ['2026-01-23T07:00'],
+                'temperature_2m': [5.0],
+                'wind_speed_10m': [10.0],
+                'wind_gusts_10m': [15.0],
+                'weather_code': [0],
+                'precipitation': [0.0],
+                'rain': [0.0],
+                'snowfall': [0.0],
+                'snow_depth': [0.0],
+                'visibility': [10000.0],
+                'soil_temperature_0cm': [4.0],
+                'dew_point_2m': [2.0],
+            }
+        }
+        mock_response.raise_for_status = mocker.Mock()
+        mock_get = mocker.patch('server.requests.get', return_value=mock_response)
+
+        arrival = datetime(2026, 1, 23, 7, 0, tzinfo=timezone.utc)
+        fetch_weather_for_waypoints([(33.95, -83.98, arrival)])
+
+        assert mock_get.call_count == 1
+        assert 'start_hour=2026-01-22T07:00' in mock_get.call_args.args[0]
+
+    def test_counts_upstream_requests(self, mocker):
+        import metrics
+
+        mock_response = mocker.Mock()
+        mock_response.json.return_value = {
+            'hourly': {
+                'time': ['2026-01-23T07:00'],
+                'temperature_2m': [5.0],
+                'wind_speed_10m': [10.0],
+                'wind_gusts_10m': [15.0],
+                'weather_code': [0],
+                'precipitation': [0.0],
+                'rain': [0.0],
+                'snowfall': [0.0],
+                'snow_depth': [0.0],
+                'visibility': [10000.0],
+                'soil_temperature_0cm': [4.0],
+                'dew_point_2m': [2.0],
+            }
+        }
+        mock_response.raise_for_status = mocker.Mock()
+        mocker.patch('server.requests.get', return_value=mock_response)
+        before = metrics.counter('open_meteo.requests')
+
+        arrival = datetime(2026, 1, 23, 7, 0, tzinfo=timezone.utc)
+        fetch_weather_for_waypoints([(33.95, -83.98, arrival)])
+
+        assert metrics.counter('open_meteo.requests') == before + 1
+
+    def test_rolling_accumulations(self, mocker):
+        hours = 30
+        rain = [0.0] * hours
+        snowfall = [0.0] * hours
+        rain[2] = 4.0  # 27 hours before arrival, outside every window
+        rain[10] = 3.0  # 19 hours before arrival
+        rain[24] = 2.0  # 5 hours before arrival
+        snowfall[20] = 1.5  # 9 hours before arrival
+        snowfall[29] = None  # missing values count as zero
+        rain[29] = 6.0  # the arrival hour, scored as current rain instead
+        mock_response = mocker.Mock()
+        mock_response.json.return_value = {
+            'hourly': {
+                'time': [
+                    f'2026-01-{22 + h // 24:02d}T{h % 24:02d}:00' for h in range(hours)
+                ],
+                'temperature_2m': [0.0] * hours,
+                'wind_speed_10m': [0.0] * hours,
+                'wind_gusts_10m': [0.0] * hours,
+                'weather_code': [0] * hours,
+                'precipitation': [0.0] * hours,
+                'rain': rain,
+                'snowfall': snowfall,
+                'snow_depth': [0.0] * hours,
+                'visibility': [10000.0] * hours,
+                'soil_temperature_0cm': [0.0] * hours,
+                'dew_point_2m': [0.0] * hours,
+            }
+        }
+        mock_response.raise_for_status = mocker.Mock()
+        mocker.patch('server.requests.get', return_value=mock_response)
+
+        arrival = datetime(2026, 1, 23, 5, 0, tzinfo=timezone.utc)
+        result = fetch_weather_for_waypoints([(33.95, -83.98, arrival)])[0]
+
+        assert result['rain_mm'] == pytest.approx(6.0)
+        assert result['rain_6h_mm'] == pytest.approx(2.0)
+        assert result['rain_12h_mm'] == pytest.approx(2.0)
+        assert result['rain_24h_mm'] == pytest.approx(5.0)
+        assert result['snowfall_6h_cm'] == pytest.approx(0.0)
+        assert result['snowfall_12h_cm'] == pytest.approx(1.5)
+        assert result['snowfall_24h_cm'] == pytest.approx(1.5)
+
+    def test_answers_from_cache_with_enough_history(self, mocker):
+        times = [datetime(2026, 1, 22, 7) + timedelta(hours=h) for h in range(26)]
+        mock_response = mocker.Mock()
+        mock_response.json.return_value = {
+            'hourly': {
+                'time': [t.strftime('%Y-%m-%dT%H:00') for t in times],
+                'temperature_2m': [5.0] * 26,
+                'wind_speed_10m': [10.0] * 26,
+                'wind_gusts_10m': [15.0] * 26,
+                'weather_code': [0] * 26,
+                'precipitation': [0.0] * 26,
+                'rain': [0.0] * 26,
+                'snowfall': [0.0] * 26,
+                'snow_depth': [0.0] * 26,
+                'visibility': [10000.0] * 26,
+                'soil_temperature_0cm': [4.0] * 26,
+                'dew_point_2m': [2.0] * 26,
+            }
+        }
+        mock_response.raise_for_status = mocker.Mock()
+        mock_get = mocker.patch('server.requests.get', return_value=mock_response)
+        arrival = datetime(2026, 1, 23, 7, 0, tzinfo=timezone.utc)
+
+        first = fetch_weather_for_waypoints([(33.95, -83.98, arrival)])
+        # A nearby point in the same forecast cell
+        second = fetch_weather_for_waypoints([(33.951, -83.981, arrival)])
+
+        assert mock_get.call_count == 1
+        assert 'source' not in first[0]
+        assert second[0]['source'] == 'cache'
+        assert second[0]['temp_c'] == 5.0
+
+    def test_deadline_falls_back_to_cached_forecasts(self, mocker):
+        import requests
+
+        from deadline import Deadline
+
+        mock_response = mocker.Mock()
+        mock_response.json.return_value = {
+            'hourly': {
+                'time': ['2026-01-23T07:00'],
+                'temperature_2m': [5.0],
+                'wind_speed_10m': [10.0],
+                'wind_gusts_10m': [15.0],
+                'weather_code': [0],
+                'precipitation': [0.0],
+                'rain': [0.0],
+                'snowfall': [0.0],
+                'snow_depth': [0.0],
+                'visibility': [10000.0],
+                'soil_temperature_0cm': [4.0],
+                'dew_point_2m': [2.0],
+            }
+        }
+        mock_response.raise_for_status = mocker.Mock()
+        mock_get = mocker.patch('server.requests.get', return_value=mock_response)
+        arrival = datetime(2026, 1, 23, 7, 0, tzinfo=timezone.utc)
+        fetch_weather_for_waypoints([(33.95, -83.98, arrival)])
+
+        # The upstream now times out: the cached cell is still answered
+        mock_get.side_effect = requests.Timeout
+        result = fetch_weather_for_waypoints(
+            [(33.95, -83.98, arrival), (34.52, -83.98, arrival)], Deadline(1000)
+        )
+
+        assert result[0]['source'] == 'cache'
+        assert result[0]['temp_c'] == 5.0
+        assert result[1] is None
+        assert mock_get.call_args.kwargs['timeout'] <= 0.95
+
+    def test_grid_sampling_interpolates_lattice_points(self, mocker, monkeypatch):
+        monkeypatch.setenv('SAFE_TRAVELS_WEATHER_SAMPLING', 'grid')
+        monkeypatch.setenv('SAFE_TRAVELS_WEATHER_GRID_DEG', '0.1')
+
+        def forecasts(coords, start, end, timeout=None):
+            blocks = synthetic_forecasts(coords, start, end)
+            # Temperature varies with latitude and rises one degree an hour
+            return [
+                {
+                    **block,
+                    'temperature_2m': [lat * 10 + h for h in range(len(block['time']))],
+                }
+                for (lat, _), block in zip(coords, blocks)
+            ]
+
+        mock_forecasts = mocker.patch(
+            'server.fetch_hourly_forecasts', side_effect=forecasts
+        )
+        arrival = datetime(2026, 1, 23, 7, 30, tzinfo=timezone.utc)
+        waypoints = [(33.9 + k * 0.005, -83.95, arrival) for k in range(21)]
+
+        result = fetch_weather_for_waypoints(waypoints)
+
+        # 21 waypoints within one lattice cell need only its four corners
+        assert mock_forecasts.call_count == 1
+        assert len(mock_forecasts.call_args.args[0]) == 4
+        # Hour 24 of the block is 07:00, so 07:30 is half way to hour 25
+        assert result[10]['temp_c'] == pytest.approx(339.5 + 24.5)
+        assert result[0]['temp_c'] == pytest.approx(339.0 + 24.5)
+
+    def test_grid_sampling_ignores_waypoint_blocks_near_corners(
+        self, mocker, monkeypatch
+    ):
+        import forecast_cache
+
+        monkeypatch.setenv('SAFE_TRAVELS_WEATHER_SAMPLING', 'grid')
+        monkeypatch.setenv('SAFE_TRAVELS_WEATHER_GRID_DEG', '0.1')
+        mock_forecasts = mocker.patch(
+            'server.fetch_hourly_forecasts', side_effect=synthetic_forecasts
+        )
+        arrival = datetime(2026, 1, 23, 7, 0, tzinfo=timezone.utc)
+        # A waypoint's block in the cache cell of the lattice point (34.0, -84.0)
+        (stale,) = synthetic_forecasts(
+            [(34.01, -84.01)], arrival - timedelta(hours=24), arrival
+        )
+        forecast_cache.put(34.01, -84.01, stale)
+
+        fetch_weather_for_waypoints([(34.0, -84.0, arrival)])
+
+        assert mock_forecasts.call_args.args[0] == [(34.0, -84.0)]
+
+    def test_grid_spacing_finer_than_the_cache_is_rejected(self, monkeypatch):
+        monkeypatch.setenv('SAFE_TRAVELS_WEATHER_SAMPLING', 'grid')
+        monkeypatch.setenv('SAFE_TRAVELS_WEATHER_GRID_DEG', '0.02')
+        arrival = datetime(2026, 1, 23, 7, 0, tzinfo=timezone.utc)
+
+        with pytest.raises(ValueError, match='SAFE_TRAVELS_WEATHER_GRID_DEG'):
+            fetch_weather_for_waypoints([(34.0, -84.0, arrival)])
+
 
 class TestAssessRouteDanger:
     """Integration tests for assess_route_danger MCP tool."""
@@ -318,17 +474,16 @@ class TestAssessRouteDanger:
         ]
         mocker.patch('server.fetch_weather_for_waypoints', return_value=mock_weather)
 
-        # Mock pick_equidistant_points to return 3 points
-        mocker.patch(
-            'server.pick_equidistant_points',
-            return_value=[(33.95, -83.98), (34.10, -83.96), (34.30, -83.94)],
-        )
+        # Mock equidistant_indices to pick 3 points
+        mocker.patch('server.equidistant_indices', return_value=[0, 2, 4])
 
         # Use .fn to access the underlying function
-        result = assess_route_danger.fn(
-            origin='Grayson, GA',
-            destination='Dahlonega, GA',
-            departure_time='2026-01-23T07:00:00Z',
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin='Grayson, GA',
+                destination='Dahlonega, GA',
+                departure_time='2026-01-23T07:00:00Z',
+            )
         )
 
         assert result['origin'] == 'Grayson, GA'
@@ -338,6 +493,8 @@ class TestAssessRouteDanger:
         assert 'departure_time' in result
         assert 'arrival_time' in result
         assert result['status'] in ['SAFE', 'MODERATE', 'HAZARDOUS', 'EXTREME']
+        # 07:00 UTC is before dawn in Georgia
+        assert result['waypoints'][0]['daylight'] == 'night'
 
     def test_assess_route_danger_defaults_to_now(self, mocker):
         from server import assess_route_danger
@@ -363,7 +520,7 @@ class TestAssessRouteDanger:
         mocker.patch(
             'server.polyline.decode', return_value=[(33.95, -83.98), (34.52, -83.98)]
         )
-        mocker.patch('server.pick_equidistant_points', return_value=[(33.95, -83.98)])
+        mocker.patch('server.equidistant_indices', return_value=[0])
         mocker.patch(
             'server.fetch_weather_for_waypoints',
             return_value=[
@@ -386,10 +543,12 @@ class TestAssessRouteDanger:
         )
 
         # Use .fn to access the underlying function
-        result = assess_route_danger.fn(
-            origin='Grayson, GA',
-            destination='Dahlonega, GA',
-            # No departure_time or arrival_time provided
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin='Grayson, GA',
+                destination='Dahlonega, GA',
+                # No departure_time or arrival_time provided
+            )
         )
 
         # Should still work and return valid result
@@ -421,7 +580,7 @@ class TestAssessRouteDanger:
         mocker.patch(
             'server.polyline.decode', return_value=[(33.95, -83.98), (34.52, -83.98)]
         )
-        mocker.patch('server.pick_equidistant_points', return_value=[(33.95, -83.98)])
+        mocker.patch('server.equidistant_indices', return_value=[0])
         mocker.patch(
             'server.fetch_weather_for_waypoints',
             return_value=[
@@ -444,28 +603,231 @@ class TestAssessRouteDanger:
         )
 
         # Use .fn to access the underlying function
-        result = assess_route_danger.fn(
-            origin='Grayson, GA',
-            destination='Dahlonega, GA',
-            arrival_time='2026-01-23T10:00:00Z',
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin='Grayson, GA',
+                destination='Dahlonega, GA',
+                arrival_time='2026-01-23T10:00:00Z',
+            )
         )
 
         # Departure should be 1 hour before arrival (duration is 3600s)
         assert '2026-01-23T09:00:00' in result['departure_time']
         assert '2026-01-23T10:00:00' in result['arrival_time']
 
+    def test_assess_route_danger_with_crash_history(self, mocker, tmp_path):
+        from crash_history import CrashIndex, load_crash_index
+        from server import assess_route_danger
 
-class TestDeriveRoute:
-    """Tests for derive_route MCP tool."""
+        index_path = str(tmp_path / 'crashes.idx')
+        CrashIndex.from_records(
+            [(34.05, -83.975, 2.0), (34.15, -83.965, 1.0), (34.155, -83.965, 1.0)]
+        ).save(index_path)
+        mocker.patch.dict('os.environ', {'SAFE_TRAVELS_CRASH_INDEX': index_path})
 
-    def test_derive_route_returns_waypoints(self, mocker):
-        from server import derive_route
+        mocker.patch(
+            'server.get_lat_long',
+            side_effect=[(34.00, -83.98), (34.20, -83.96)],
+        )
+        mocker.patch(
+            'server.compute_route',
+            return_value={
+                'routes': [
+                    {
+                        'duration': '1800s',
+                        'distanceMeters': 25000,
+                        'polyline': {'encodedPolyline': 'test'},
+                    }
+                ]
+            },
+        )
+        mocker.patch(
+            'server.polyline.decode',
+            return_value=[(34.00, -83.98), (34.10, -83.97), (34.20, -83.96)],
+        )
+        mocker.patch('server.equidistant_indices', return_value=[0, 1])
+        weather = {
+            'arrival_time': '2026-01-23T12:00:00+00:00',
+            'temp_c': 20.0,
+            'wind_kph': 5.0,
+            'gust_kph': 8.0,
+            'condition': 'sunny',
+            'rain_mm': 0.0,
+            'snowfall_cm': 0.0,
+            'visibility_m': 10000.0,
+            'snow_depth_m': 0.0,
+            'soil_temp_c': 18.0,
+            'dew_point_c': 10.0,
+        }
+        mocker.patch(
+            'server.fetch_weather_for_waypoints',
+            return_value=[
+                {'lat': 34.00, 'lon': -83.98, **weather},
+                {'lat': 34.10, 'lon': -83.97, **weather},
+            ],
+        )
+
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin='A', destination='B', departure_time='2026-01-23T12:00:00Z'
+            )
+        )
+        load_crash_index.cache_clear()
+
+        assert result['waypoints'][0]['historical_crashes'] == 1
+        assert result['waypoints'][1]['historical_crashes'] == 2
+        assert result['waypoints'][1]['historical_crash_severity'] == 2.0
+
+    def test_crash_history_of_out_and_back_route(self, mocker):
+        from server import _crash_history_by_waypoint
+
+        index = mocker.Mock()
+        index.corridor_counts.return_value = [(1, 1.0), (2, 2.0), (4, 4.0), (8, 8.0)]
+        mocker.patch('server.default_crash_index', return_value=index)
+        # The third waypoint is back at the second polyline point
+        points = [
+            (34.0, -84.0),
+            (34.1, -84.0),
+            (34.2, -84.0),
+            (34.1, -84.0),
+            (34.0, -84.0),
+        ]
+
+        result = _crash_history_by_waypoint(points, [0, 2, 3])
+
+        assert result == [(3, 3.0), (4, 4.0), (8, 8.0)]
+
+    def test_assess_route_danger_samples_heatmap(self, mocker, tmp_path):
+        from gridfile import write_grid
+        from server import assess_route_danger
+
+        # Heatmap covering only the first waypoint, score 4 everywhere
+        heatmap_path = str(tmp_path / 'heatmap.bin')
+        write_grid(
+            heatmap_path,
+            33.9,
+            -84.0,
+            0.1,
+            0.1,
+            2,
+            2,
+            datetime(2026, 1, 23, 16, 0, tzinfo=timezone.utc),
+            3600,
+            3,
+            ['danger_score'],
+            [4.0] * 12,
+        )
+        mocker.patch.dict('os.environ', {'SAFE_TRAVELS_HEATMAP': heatmap_path})
 
         mocker.patch(
             'server.get_lat_long',
-            side_effect=[(33.9519, -83.9880), (34.5270, -83.9801)],
+            side_effect=[(33.95, -83.98), (34.52, -83.98)],
+        )
+        mocker.patch(
+            'server.compute_route',
+            return_value={
+                'routes': [
+                    {
+                        'duration': '3600s',
+                        'distanceMeters': 50000,
+                        'polyline': {'encodedPolyline': 'test'},
+                    }
+                ]
+            },
+        )
+        mocker.patch(
+            'server.polyline.decode', return_value=[(33.95, -83.98), (34.52, -83.98)]
+        )
+        mocker.patch('server.equidistant_indices', return_value=[0, 1])
+        mock_fetch = mocker.patch(
+            'server.fetch_weather_for_waypoints',
+            return_value=[
+                {
+                    'lat': 34.52,
+                    'lon': -83.98,
+                    'arrival_time': '2026-01-23T18:00:00+00:00',
+                    'temp_c': 20.0,
+                    'wind_kph': 0.0,
+                    'gust_kph': 0.0,
+                    'condition': 'sunny',
+                    'rain_mm': 0.0,
+                    'snowfall_cm': 0.0,
+                    'visibility_m': 10000.0,
+                    'snow_depth_m': 0.0,
+                    'soil_temp_c': 18.0,
+                    'dew_point_c': 10.0,
+                }
+            ],
+        )
+
+        # Midday in Georgia, so no darkness or glare on top of the grid score
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin='Grayson, GA',
+                destination='Dahlonega, GA',
+                departure_time='2026-01-23T17:00:00Z',
+            )
         )
 
+        # Only the waypoint outside the grid is fetched live
+        live_waypoints = mock_fetch.call_args.args[0]
+        assert [(lat, lon) for lat, lon, _ in live_waypoints] == [(34.52, -83.98)]
+        assert result['waypoints'][0]['source'] == 'heatmap'
+        assert result['waypoints'][0]['danger_score'] == 4.0
+        assert result['waypoints'][1]['source'] == 'forecast'
+        assert result['status'] == 'MODERATE'
+
+    def test_assess_route_danger_unknown_when_geocoding_times_out(self, mocker):
+        import requests
+
+        from server import assess_route_danger
+
+        mocker.patch('server.get_lat_long', side_effect=requests.Timeout)
+        mock_route = mocker.patch('server.compute_route')
+
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin='Grayson, GA', destination='Dahlonega, GA', deadline_ms=200
+            )
+        )
+
+        assert result['status'] == 'UNKNOWN'
+        assert result['complete'] is False
+        assert result['waypoints'] == []
+        assert result['departure_time'] is None
+        assert result['average_danger'] is None
+        assert result['max_danger'] is None
+        mock_route.assert_not_called()
+
+    def test_assess_route_danger_with_zero_deadline(self, mocker):
+        from server import assess_route_danger
+
+        mock_geocode = mocker.patch('server.get_lat_long')
+
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin='Grayson, GA', destination='Dahlonega, GA', deadline_ms=0
+            )
+        )
+
+        assert result['status'] == 'UNKNOWN'
+        mock_geocode.assert_not_called()
+
+    def test_status_from_unrounded_danger(self):
+        from server import _overall_assessment
+
+        assessment = _overall_assessment([1.0, 1.999], 2)
+
+        assert assessment['max_danger'] == 2.0
+        assert assessment['status'] == 'SAFE'
+
+    def test_assess_route_danger_partial_is_never_safe(self, mocker):
+        from server import assess_route_danger
+
+        mocker.patch(
+            'server.get_lat_long',
+            side_effect=[(33.95, -83.98), (34.52, -83.98)],
+        )
         mocker.patch(
             'server.compute_route',
             return_value={
@@ -473,17 +835,1268 @@ class TestDeriveRoute:
                     {
                         'duration': '3600s',
                         'distanceMeters': 50000,
-                        'polyline': {'encodedPolyline': 'test_polyline'},
+                        'polyline': {'encodedPolyline': 'test'},
                     }
                 ]
             },
         )
+        mocker.patch(
+            'server.polyline.decode', return_value=[(33.95, -83.98), (34.52, -83.98)]
+        )
+        mocker.patch('server.equidistant_indices', return_value=[0, 1])
+        mock_fetch = mocker.patch(
+            'server.fetch_weather_for_waypoints',
+            return_value=[
+                {
+                    'lat': 33.95,
+                    'lon': -83.98,
+                    'arrival_time': '2026-01-23T17:00:00+00:00',
+                    'temp_c': 20.0,
+                    'wind_kph': 0.0,
+                    'gust_kph': 0.0,
+                    'condition': 'sunny',
+                    'rain_mm': 0.0,
+                    'snowfall_cm': 0.0,
+                    'visibility_m': 10000.0,
+                    'snow_depth_m': 0.0,
+                    'soil_temp_c': 18.0,
+                    'dew_point_c': 10.0,
+                    'source': 'cache',
+                },
+                None,
+            ],
+        )
 
-        expected_points = [(33.95, -83.98), (34.10, -83.96), (34.52, -83.98)]
-        mocker.patch('server.polyline.decode', return_value=expected_points)
-        mocker.patch('server.pick_equidistant_points', return_value=expected_points)
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin='Grayson, GA',
+                destination='Dahlonega, GA',
+                departure_time='2026-01-23T17:00:00Z',
+                deadline_ms=2000,
+            )
+        )
 
-        # Use .fn to access the underlying function
-        result = derive_route.fn(origin='Grayson, GA', destination='Dahlonega, GA')
+        assert mock_fetch.call_args.args[1] is not None
+        assert result['waypoints'][0]['source'] == 'cache'
+        assert result['waypoints'][1]['source'] == 'unavailable'
+        assert result['waypoints'][1]['danger_score'] is None
+        assert result['coverage'] == 0.5
+        assert result['complete'] is False
+        # Mild weather alone would be SAFE
+        assert result['status'] == 'MODERATE'
 
-        assert result == expected_points
+
+class TestResponseFormats:
+    """Tests for the format option of assess_route_danger."""
+
+    def assess(self, mocker, response_format, **options):
+        from server import assess_route_danger
+
+        mocker.patch(
+            'server.get_lat_long',
+            side_effect=[(33.95, -83.98), (34.52, -83.98)],
+        )
+        mocker.patch(
+            'server.compute_route',
+            return_value={
+                'routes': [
+                    {
+                        'duration': '3600s',
+                        'distanceMeters': 50000,
+                        'polyline': {'encodedPolyline': 'test'},
+                    }
+                ]
+            },
+        )
+        mocker.patch(
+            'server.polyline.decode', return_value=[(33.95, -83.98), (34.52, -83.98)]
+        )
+        mocker.patch('server.equidistant_indices', return_value=[0, 1])
+        weather = {
+            'temp_c': 10.0,
+            'wind_kph': 5.0,
+            'gust_kph': 8.0,
+            'condition': 'cloudy',
+            'rain_mm': 0.0,
+            'snowfall_cm': 0.0,
+            'visibility_m': 10000.0,
+            'snow_depth_m': 0.0,
+            'soil_temp_c': 8.0,
+            'dew_point_c': 4.0,
+        }
+        mocker.patch(
+            'server.fetch_weather_for_waypoints',
+            return_value=[
+                {
+                    **weather,
+                    'lat': 33.95,
+                    'lon': -83.98,
+                    'arrival_time': '2026-01-23T17:00:00+00:00',
+                },
+                {
+                    **weather,
+                    'lat': 34.52,
+                    'lon': -83.98,
+                    'arrival_time': '2026-01-23T18:00:00+00:00',
+                    'temp_c': -2.0,
+                    'condition': 'snowy',
+                    'snowfall_cm': 2.0,
+                },
+            ],
+        )
+        return asyncio.run(
+            assess_route_danger.fn(
+                origin='Grayson, GA',
+                destination='Dahlonega, GA',
+                departure_time='2026-01-23T17:00:00Z',
+                format=response_format,
+                **options,
+            )
+        )
+
+    def test_full_is_human_readable(self, mocker):
+        result = self.assess(mocker, 'full')
+
+        assert result['waypoints'][0]['temperature'] == '50.0°F (10.0°C)'
+        assert result['waypoints'][1]['condition'] == 'snowy'
+        assert 'weather' not in result['waypoints'][0]
+
+    def test_compact_is_columnar(self, mocker):
+        full = self.assess(mocker, 'full')
+        result = self.assess(mocker, 'compact')
+
+        columns = result['waypoints']
+        assert columns['temperature'] == [10.0, -2.0]
+        assert columns['snowfall'] == [0.0, 2.0]
+        assert columns['condition'] == ['cloudy', 'snowy']
+        assert columns['danger_score'] == [
+            wp['danger_score'] for wp in full['waypoints']
+        ]
+        assert result['units']['temperature'] == 'degC'
+        assert result['status'] == full['status']
+
+    def test_summary_lists_worst_segments(self, mocker):
+        result = self.assess(mocker, 'summary')
+
+        assert 'waypoints' not in result
+        worst = result['worst_segments']
+        assert [segment['waypoint'] for segment in worst] == [1, 0]
+        assert worst[0]['condition'] == 'snowy'
+        assert worst[0]['danger_score'] == result['max_danger']
+
+    def test_unknown_format(self):
+        from server import assess_route_danger
+
+        with pytest.raises(ValueError):
+            asyncio.run(
+                assess_route_danger.fn(
+                    origin='Grayson, GA', destination='Dahlonega, GA', format='xml'
+                )
+            )
+
+
+class TestDeriveRoute:
+    """Tests for derive_route MCP tool."""
+
+    def test_derive_route_returns_waypoints(self, mocker):
+        from server import derive_route
+
+        mocker.patch(
+            'server.get_lat_long',
+            side_effect=[(33.9519, -83.9880), (34.5270, -83.9801)],
+        )
+
+        mocker.patch(
+            'server.compute_route',
+            return_value={
+                'routes': [
+                    {
+                        'duration': '3600s',
+                        'distanceMeters': 50000,
+                        'polyline': {'encodedPolyline': 'test_polyline'},
+                    }
+                ]
+            },
+        )
+
+        expected_points = [(33.95, -83.98), (34.10, -83.96), (34.52, -83.98)]
+        mocker.patch('server.polyline.decode', return_value=expected_points)
+        mocker.patch('server.pick_equidistant_points', return_value=expected_points)
+
+        # Use .fn to access the underlying function
+        result = asyncio.run(
+            derive_route.fn(origin='Grayson, GA', destination='Dahlonega, GA')
+        )
+
+        assert result == expected_points
+
+
+class TestGetSlowProfiles:
+    """Tests for get_slow_profiles MCP tool."""
+
+    def test_reports_assessment_stages(self, mocker, monkeypatch):
+        import profiling
+        from server import assess_route_danger, get_slow_profiles
+
+        monkeypatch.setenv('SAFE_TRAVELS_PROFILE_MS', '0')
+        profiling.clear()
+        mocker.patch(
+            'server.get_lat_long',
+            side_effect=[(33.95, -83.98), (34.52, -83.98)],
+        )
+        mocker.patch(
+            'server.compute_route',
+            return_value={
+                'routes': [
+                    {
+                        'duration': '3600s',
+                        'distanceMeters': 50000,
+                        'polyline': {'encodedPolyline': 'test'},
+                    }
+                ]
+            },
+        )
+        mocker.patch('server.polyline.decode', return_value=[(33.95, -83.98)])
+        mocker.patch('server.equidistant_indices', return_value=[0])
+        mocker.patch('server.fetch_weather_for_waypoints', return_value=[None])
+
+        asyncio.run(
+            assess_route_danger.fn(
+                origin='Grayson, GA',
+                destination='Dahlonega, GA',
+                departure_time='2026-01-23T17:00:00Z',
+            )
+        )
+        (profile,) = get_slow_profiles.fn()
+        profiling.clear()
+
+        assert profile['tool'] == 'assess_route_danger'
+        assert set(profile['stages_ms']) == {
+            'route',
+            'schedule',
+            'crash_history',
+            'heatmap',
+            'weather',
+            'scoring',
+        }
+
+
+def synthetic_forecasts(coords, start, end, timeout=None):
+    """Hourly blocks of mild weather covering start to end."""
+    hours = int((end - start).total_seconds() // 3600) + 1
+    first = start.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+    block = {
+        'time': [
+            (first + timedelta(hours=h)).strftime('%Y-%m-%dT%H:00')
+            for h in range(hours)
+        ],
+        'temperature_2m': [15.0] * hours,
+        'wind_speed_10m': [5.0] * hours,
+        'wind_gusts_10m': [8.0] * hours,
+        'weather_code': [1] * hours,
+        'precipitation': [0.0] * hours,
+        'rain': [0.0] * hours,
+        'snowfall': [0.0] * hours,
+        'snow_depth': [0.0] * hours,
+        'visibility': [10000.0] * hours,
+        'soil_temperature_0cm': [12.0] * hours,
+        'dew_point_2m': [5.0] * hours,
+    }
+    return [block for _ in coords]
+
+
+class TestWarmCorridor:
+    """Tests for prefetching a corridor into the caches."""
+
+    def test_assessment_after_warming_needs_no_upstream_calls(self, mocker):
+        from server import assess_route_danger, warm_corridor
+
+        mock_geocode = mocker.patch(
+            'server.get_lat_long',
+            side_effect=lambda address, timeout=None: {
+                'Grayson, GA': (33.95, -83.98),
+                'Dahlonega, GA': (34.52, -83.98),
+            }[address],
+        )
+        mock_route = mocker.patch(
+            'server.compute_route',
+            return_value={
+                'routes': [
+                    {
+                        'duration': '3600s',
+                        'distanceMeters': 50000,
+                        'polyline': {
+                            'encodedPolyline': polyline.encode(
+                                [(33.95 + k * 0.057, -83.98) for k in range(11)]
+                            )
+                        },
+                    }
+                ]
+            },
+        )
+        mock_forecasts = mocker.patch(
+            'server.fetch_hourly_forecasts', side_effect=synthetic_forecasts
+        )
+        departure = (datetime.now(timezone.utc) + timedelta(days=1)).replace(
+            minute=0, second=0, microsecond=0
+        )
+
+        warm_corridor('Grayson, GA', 'Dahlonega, GA', departure)
+        calls = (
+            mock_geocode.call_count,
+            mock_route.call_count,
+            mock_forecasts.call_count,
+        )
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin='Grayson, GA',
+                destination='Dahlonega, GA',
+                departure_time=(departure + timedelta(minutes=45)).isoformat(),
+            )
+        )
+
+        assert calls == (2, 1, 1)
+        assert mock_geocode.call_count == 2
+        assert mock_route.call_count == 1
+        assert mock_forecasts.call_count == 1
+        assert result['complete'] is True
+        assert {wp['source'] for wp in result['waypoints']} == {'cache'}
+
+
+class TestAssessItinerary:
+    """Tests for assess_itinerary MCP tool."""
+
+    def test_round_trip_with_dwell(self, mocker):
+        from server import assess_itinerary
+
+        mock_geocode = mocker.patch(
+            'server.get_lat_long',
+            side_effect=lambda address, timeout=None: {
+                'Grayson, GA': (33.95, -83.98),
+                'Dahlonega, GA': (34.52, -83.98),
+            }[address],
+        )
+
+        def route(origin, destination, *args, **kwargs):
+            line = [
+                (origin[0] + (destination[0] - origin[0]) * k / 10, -83.98)
+                for k in range(11)
+            ]
+            return {
+                'routes': [
+                    {
+                        'duration': '3600s',
+                        'distanceMeters': 63000,
+                        'polyline': {'encodedPolyline': polyline.encode(line)},
+                    }
+                ]
+            }
+
+        mock_route = mocker.patch('server.compute_route', side_effect=route)
+        mock_forecasts = mocker.patch(
+            'server.fetch_hourly_forecasts', side_effect=synthetic_forecasts
+        )
+
+        result = asyncio.run(
+            assess_itinerary.fn(
+                stops=[
+                    {'location': 'Grayson, GA'},
+                    {'location': 'Dahlonega, GA', 'dwell_minutes': 90},
+                    {'location': 'Grayson, GA'},
+                ],
+                departure_time='2026-01-23T15:00:00Z',
+            )
+        )
+
+        # Shared endpoints are geocoded once and both legs' weather is fetched
+        # in one request
+        assert mock_geocode.call_count == 2
+        assert mock_route.call_count == 2
+        assert mock_forecasts.call_count == 1
+
+        first, second = result['legs']
+        assert first['arrival_time'] == '2026-01-23T16:00:00+00:00'
+        assert second['departure_time'] == '2026-01-23T17:30:00+00:00'
+        assert second['arrival_time'] == '2026-01-23T18:30:00+00:00'
+        assert result['stops'][1]['dwell_minutes'] == 90
+        assert result['duration_minutes'] == 210
+        assert second['waypoints'][0]['lat'] == pytest.approx(34.52)
+        assert first['status'] == 'SAFE'
+        assert result['complete'] is True
+        assert result['max_danger'] == max(first['max_danger'], second['max_danger'])
+
+    def test_needs_two_stops(self):
+        from server import assess_itinerary
+
+        with pytest.raises(ValueError):
+            asyncio.run(assess_itinerary.fn(stops=[{'location': 'Grayson, GA'}]))
+
+
+class TestAdmission:
+    """Tests for admission control of assessments."""
+
+    def test_overloaded_server_rejects_assessments(self, mocker):
+        import server
+        from admission import Gate, Overloaded
+
+        mocker.patch.object(
+            server, '_assessments', Gate('assessments', max_in_flight=0, max_queue=0)
+        )
+        get_lat_long = mocker.patch('server.get_lat_long')
+
+        with pytest.raises(Overloaded, match='retry'):
+            asyncio.run(
+                server.assess_route_danger.fn(
+                    origin='Denver, CO', destination='Vail, CO'
+                )
+            )
+        with pytest.raises(Overloaded):
+            asyncio.run(
+                server.assess_itinerary.fn(stops=[{'location': 'A'}, {'location': 'B'}])
+            )
+        get_lat_long.assert_not_called()
+
+    def test_deadline_includes_queue_wait(self, mocker):
+        import server
+        from admission import Gate
+
+        mocker.patch.object(
+            server, '_assessments', Gate('assessments', max_in_flight=1, max_queue=1)
+        )
+        budgets = []
+
+        def assess(*args):
+            deadline = args[5]
+            if deadline is not None:
+                budgets.append(deadline.expires_at - time.monotonic())
+            time.sleep(0.2)
+
+        mocker.patch('server._assess_route_danger', side_effect=assess)
+
+        async def run():
+            await asyncio.gather(
+                server.assess_route_danger.fn(origin='A', destination='B'),
+                server.assess_route_danger.fn(
+                    origin='A', destination='B', deadline_ms=1000
+                ),
+            )
+
+        asyncio.run(run())
+        # The second call was queued behind the first for about 0.2s
+        assert budgets[0] < 0.9
+
+    def test_concurrent_calls_through_the_client(self, mocker):
+        from fastmcp import Client
+
+        import server
+        from admission import Gate
+
+        mocker.patch.object(
+            server,
+            '_assessments',
+            Gate('assessments', max_in_flight=2, max_queue=1, max_queue_wait=5),
+        )
+
+        def assess(*args):
+            time.sleep(0.3)
+            return {'status': 'SAFE'}
+
+        mocker.patch('server._assess_route_danger', side_effect=assess)
+
+        async def run():
+            async with Client(server.mcp) as client:
+                return await asyncio.gather(
+                    *(
+                        client.call_tool(
+                            'assess_route_danger',
+                            {'origin': 'A', 'destination': 'B'},
+                            raise_on_error=False,
+                        )
+                        for _ in range(4)
+                    )
+                )
+
+        started = time.monotonic()
+        results = asyncio.run(run())
+        elapsed = time.monotonic() - started
+
+        # Two calls run at once and one waits its turn, without blocking the
+        # event loop; the fourth finds the queue full
+        errors = [result for result in results if result.is_error]
+        assert len(errors) == 1
+        assert 'overloaded' in errors[0].content[0].text
+        assert [r.data for r in results if not r.is_error] == [{'status': 'SAFE'}] * 3
+        assert elapsed < 0.85
+
+
+def synthetic_ensemble(coords, start, end, timeout=None):
+    """Ensemble blocks of four members: half of them bring heavy snow to the
+    second location."""
+    hours = int((end - start).total_seconds() // 3600) + 1
+    first = start.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+    blocks = []
+    for i in range(len(coords)):
+        block = {
+            'time': [
+                (first + timedelta(hours=h)).strftime('%Y-%m-%dT%H:00')
+                for h in range(hours)
+            ]
+        }
+        for m, suffix in enumerate(('', '_member01', '_member02', '_member03')):
+            snow = i == 1 and m % 2 == 1
+            block[f'temperature_2m{suffix}'] = [-2.0 if snow else 10.0] * hours
+            block[f'wind_speed_10m{suffix}'] = [5.0] * hours
+            block[f'wind_gusts_10m{suffix}'] = [8.0] * hours
+            block[f'weather_code{suffix}'] = [75 if snow else 1] * hours
+            block[f'rain{suffix}'] = [0.0] * hours
+            block[f'snowfall{suffix}'] = [3.0 if snow else 0.0] * hours
+            block[f'dew_point_2m{suffix}'] = [-3.0 if snow else 4.0] * hours
+        blocks.append(block)
+    return blocks
+
+
+class TestEnsemble:
+    """Tests for hazard probabilities from ensemble forecasts."""
+
+    def test_probabilities_per_waypoint_and_route(self, mocker):
+        mocker.patch('server.fetch_ensemble_forecasts', side_effect=synthetic_ensemble)
+        result = TestResponseFormats().assess(mocker, 'full', ensemble=True)
+
+        assert result['ensemble_members'] == 4
+        assert [wp['p_hazardous'] for wp in result['waypoints']] == [0.0, 0.5]
+        assert [wp['p_extreme'] for wp in result['waypoints']] == [0.0, 0.5]
+        assert result['p_hazardous'] == 0.5
+
+    def test_compact_has_probability_columns(self, mocker):
+        mocker.patch('server.fetch_ensemble_forecasts', side_effect=synthetic_ensemble)
+        result = TestResponseFormats().assess(mocker, 'compact', ensemble=True)
+
+        assert result['waypoints']['p_hazardous'] == [0.0, 0.5]
+        assert result['units']['p_hazardous'] == '0-1'
+
+    def test_missing_member_temperatures_are_left_out(self, mocker):
+        def partial_ensemble(coords, start, end, timeout=None):
+            blocks = synthetic_ensemble(coords, start, end, timeout)
+            # No member reaches the first location, one snowy member is missing
+            # at the second
+            for suffix in ('', '_member01', '_member02', '_member03'):
+                key = f'temperature_2m{suffix}'
+                blocks[0][key] = [None] * len(blocks[0][key])
+            blocks[1]['temperature_2m_member01'] = [None] * len(blocks[1]['time'])
+            return blocks
+
+        mocker.patch('server.fetch_ensemble_forecasts', side_effect=partial_ensemble)
+        result = TestResponseFormats().assess(mocker, 'full', ensemble=True)
+
+        assert [wp['p_hazardous'] for wp in result['waypoints']] == [None, 0.333]
+        assert result['p_hazardous'] == 0.333
+
+    def test_ensemble_is_skipped_past_the_deadline(self, mocker):
+        from deadline import DeadlineExceeded
+
+        mocker.patch(
+            'server.fetch_ensemble_forecasts', side_effect=DeadlineExceeded('late')
+        )
+        result = TestResponseFormats().assess(mocker, 'full', ensemble=True)
+
+        assert 'p_hazardous' not in result
+        assert 'p_hazardous' not in result['waypoints'][0]
+        assert result['status'] != 'UNKNOWN'
+
+
+class TestArchive:
+    """Tests for archiving fetched data for backtesting."""
+
+    def test_fetched_forecasts_routes_and_geocodes_are_archived(
+        self, mocker, monkeypatch, tmp_path
+    ):
+        import server
+        from archive import default_archive
+
+        monkeypatch.setenv('SAFE_TRAVELS_ARCHIVE', str(tmp_path))
+        mocker.patch('server.get_lat_long', return_value=(39.74, -104.99))
+        route = {
+            'routes': [{'duration': '3600s', 'polyline': {'encodedPolyline': 'abc'}}]
+        }
+        mocker.patch('server.compute_route', return_value=route)
+        mocker.patch('server.fetch_hourly_forecasts', side_effect=synthetic_forecasts)
+
+        coords = server._geocode('Denver, CO')
+        server._cached_route(coords, (39.64, -106.37), '2026-01-23T07:00:00Z', None)
+        server.fetch_weather_for_waypoints(
+            [(39.74, -104.99, datetime(2026, 1, 23, 7, tzinfo=timezone.utc))]
+        )
+        # Archiving happens in the background
+        server._archive_executor.submit(lambda: None).result()
+
+        store = default_archive()
+        assert store.geocodes() == {'denver, co': (39.74, -104.99)}
+        assert len(store.routes()) == 1
+        assert store.get_forecast(39.74, -104.99)['temperature_2m'][0] == 15.0
+
+    def test_writes_beyond_the_queue_are_dropped(self, mocker, monkeypatch, tmp_path):
+        import threading
+
+        import metrics
+        import server
+
+        monkeypatch.setenv('SAFE_TRAVELS_ARCHIVE', str(tmp_path))
+        mocker.patch.object(server, '_archive_slots', threading.BoundedSemaphore(1))
+        release = threading.Event()
+        metrics.reset()
+
+        # The first write holds the only slot until the disk catches up
+        put_geocode = mocker.patch(
+            'archive.Archive.put_geocode', side_effect=lambda *args: release.wait(5)
+        )
+        server._archive('put_geocode', 'Denver, CO', (39.74, -104.99))
+        server._archive('put_geocode', 'Vail, CO', (39.64, -106.37))
+        release.set()
+        server._archive_executor.submit(lambda: None).result()
+        server._archive('put_geocode', 'Aspen, CO', (39.19, -106.82))
+        server._archive_executor.submit(lambda: None).result()
+
+        assert metrics.counter('archive.dropped') == 1
+        assert [call.args[0] for call in put_geocode.call_args_list] == [
+            'Denver, CO',
+            'Aspen, CO',
+        ]
+
+
+class TestAlerts:
+    """Tests for official weather alerts along a route."""
+
+    def test_alerts_are_listed_and_escalate_status(self, monkeypatch, mocker, tmp_path):
+        feature = {
+            'type': 'Feature',
+            'id': 'winter-storm',
+            'geometry': {
+                'type': 'Polygon',
+                'coordinates': [
+                    [[-84.5, 34.3], [-83.5, 34.3], [-83.5, 34.8], [-84.5, 34.8]]
+                ],
+            },
+            'properties': {'event': 'Winter Storm Warning', 'severity': 'Severe'},
+        }
+        (tmp_path / 'alerts.geojson').write_text(json.dumps(feature))
+        monkeypatch.setenv('SAFE_TRAVELS_ALERTS', str(tmp_path))
+
+        result = TestResponseFormats().assess(mocker, 'full')
+
+        assert 'alerts' not in result['waypoints'][0]
+        assert result['waypoints'][1]['alerts'] == ['Winter Storm Warning']
+        assert result['alerts'][0]['event'] == 'Winter Storm Warning'
+        assert result['alerts'][0]['waypoints'] == [1]
+        assert result['status'] in ('HAZARDOUS', 'EXTREME')
+
+    def test_compact_has_alerts_column(self, monkeypatch, mocker, tmp_path):
+        (tmp_path / 'alerts.geojson').write_text(
+            json.dumps(
+                {
+                    'type': 'Feature',
+                    'geometry': {
+                        'type': 'Polygon',
+                        'coordinates': [[[-85, 33], [-83, 33], [-83, 34], [-85, 34]]],
+                    },
+                    'properties': {'event': 'Dense Fog Advisory', 'severity': 'Minor'},
+                }
+            )
+        )
+        monkeypatch.setenv('SAFE_TRAVELS_ALERTS', str(tmp_path))
+
+        result = TestResponseFormats().assess(mocker, 'compact')
+
+        assert result['waypoints']['alerts'] == [['Dense Fog Advisory'], []]
+
+
+class TestGazetteer:
+    """Tests for labeling waypoints with nearby places and roads."""
+
+    def test_waypoints_are_labeled(self, monkeypatch, mocker, tmp_path):
+        path = tmp_path / 'places.csv'
+        path.write_text(
+            'name,lat,lon,kind\n'
+            'Grayson,33.89,-83.96,place\n'
+            'Dahlonega,34.53,-83.98,place\n'
+            'US-19,34.52,-83.981,road\n'
+        )
+        monkeypatch.setenv('SAFE_TRAVELS_GAZETTEER', str(path))
+
+        full = TestResponseFormats().assess(mocker, 'full')
+        compact = TestResponseFormats().assess(mocker, 'compact')
+        summary = TestResponseFormats().assess(mocker, 'summary')
+
+        assert full['waypoints'][0]['place'] == 'Grayson'
+        assert full['waypoints'][0]['road'] is None
+        assert compact['waypoints']['place'] == ['Grayson', 'Dahlonega']
+        assert compact['waypoints']['road'] == [None, 'US-19']
+        assert summary['worst_segments'][0]['place'] == 'Dahlonega'
+
+
+class TestClimatology:
+    """Tests for scoring waypoints beyond the forecast horizon."""
+
+    @pytest.fixture
+    def climatology_path(self, monkeypatch, tmp_path):
+        from climatology import VARIABLES
+        from gridfile import write_grid
+
+        # Snowy at -4°C all year round, in one step
+        typical = {
+            'temp_c': -4.0,
+            'wind_kph': 10.0,
+            'gust_kph': 20.0,
+            'rain_mm': 0.0,
+            'snowfall_cm': 0.4,
+            'snow_depth_m': 0.1,
+            'visibility_m': 5000.0,
+            'soil_temp_c': -1.0,
+            'dew_point_c': -5.0,
+            'p_rain': 0.0,
+            'p_snow': 0.6,
+            'p_fog': 0.0,
+        }
+        path = str(tmp_path / 'climatology.bin')
+        values = [typical[name] for name in VARIABLES] * 2 * 2 * 4
+        write_grid(
+            path,
+            39.0,
+            -107.0,
+            1.0,
+            1.0,
+            2,
+            4,
+            datetime(2024, 1, 1, tzinfo=timezone.utc),
+            366 * 24 * 3600 - 3600,
+            2,
+            VARIABLES,
+            values,
+        )
+        monkeypatch.setenv('SAFE_TRAVELS_CLIMATOLOGY', path)
+        return path
+
+    def test_far_waypoints_use_climatology(self, mocker, climatology_path):
+        fetch = mocker.patch(
+            'server.fetch_hourly_forecasts', side_effect=synthetic_forecasts
+        )
+        now = datetime.now(timezone.utc)
+        waypoints = [
+            (39.7, -105.0, now + timedelta(hours=2)),
+            (39.6, -106.4, now + timedelta(days=30)),
+        ]
+
+        near, far = fetch_weather_for_waypoints(waypoints)
+
+        assert fetch.call_count == 1
+        assert fetch.call_args.args[0] == [(39.7, -105.0)]
+        assert near['temp_c'] == 15.0
+        assert far['source'] == 'climatology'
+        assert far['temp_c'] == pytest.approx(-4.0)
+        assert far['condition'] == 'snowy'
+
+    def test_assessment_is_marked_climatological(self, mocker, climatology_path):
+        from server import assess_route_danger
+
+        fetch = mocker.patch('server.fetch_hourly_forecasts')
+        mocker.patch(
+            'server.get_lat_long', side_effect=[(39.74, -104.99), (39.64, -106.37)]
+        )
+        mocker.patch(
+            'server.compute_route',
+            return_value={
+                'routes': [
+                    {
+                        'duration': '7200s',
+                        'polyline': {
+                            'encodedPolyline': polyline.encode(
+                                [(39.74, -104.99), (39.64, -106.37)]
+                            )
+                        },
+                    }
+                ]
+            },
+        )
+        departure = datetime.now(timezone.utc) + timedelta(days=40)
+
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin='Denver, CO',
+                destination='Vail, CO',
+                departure_time=departure.isoformat(),
+            )
+        )
+
+        fetch.assert_not_called()
+        assert result['climatological'] is True
+        assert {wp['source'] for wp in result['waypoints']} == {'climatology'}
+        assert result['status'] in ('HAZARDOUS', 'EXTREME')
+
+
+class TestLocalWeather:
+    """Tests for assessing from locally pulled forecast grids."""
+
+    def test_weather_needs_no_upstream_calls(self, mocker, monkeypatch, tmp_path):
+        from weather_providers import pull_forecast_grids
+
+        run = datetime(2026, 1, 23, 6, tzinfo=timezone.utc)
+        pull_forecast_grids(
+            str(tmp_path),
+            39.0,
+            -106.5,
+            40.0,
+            -104.5,
+            resolution=0.5,
+            hours=12,
+            start=run,
+            provider=mocker.Mock(hourly_forecasts=synthetic_forecasts),
+        )
+        monkeypatch.setenv('SAFE_TRAVELS_WEATHER_PROVIDER', 'local')
+        monkeypatch.setenv('SAFE_TRAVELS_WEATHER_GRIDS', str(tmp_path))
+        get = mocker.patch('server.requests.get')
+
+        results = fetch_weather_for_waypoints(
+            [
+                (39.74, -104.99, run + timedelta(hours=1)),
+                (39.64, -106.37, run + timedelta(hours=3)),
+            ]
+        )
+
+        get.assert_not_called()
+        assert [record['temp_c'] for record in results] == pytest.approx([15.0, 15.0])
+        assert results[0]['condition'] == 'sunny'
+
+
+def snowy_evening_forecasts(coords, start, end, timeout=None):
+    """Mild hourly blocks that turn to heavy snow from 2026-01-23T20:00."""
+    blocks = synthetic_forecasts(coords, start, end)
+    block = {name: list(values) for name, values in blocks[0].items()}
+    for h, label in enumerate(block['time']):
+        if label >= '2026-01-23T20:00':
+            block['temperature_2m'][h] = -4.0
+            block['weather_code'][h] = 75
+            block['snowfall'][h] = 3.0
+            block['visibility'][h] = 300.0
+    return [block for _ in coords]
+
+
+class TestSessions:
+    """Tests for assessment sessions and rescore_session."""
+
+    @pytest.fixture(autouse=True)
+    def _no_sessions(self):
+        import sessions
+
+        sessions.clear()
+        yield
+        sessions.clear()
+
+    def assess(self, mocker, **options):
+        from server import assess_route_danger
+
+        mocker.patch(
+            'server.get_lat_long',
+            side_effect=lambda address, timeout=None: {
+                'Grayson, GA': (33.95, -83.98),
+                'Dahlonega, GA': (34.52, -83.98),
+            }[address],
+        )
+        mocker.patch(
+            'server.compute_route',
+            return_value={
+                'routes': [
+                    {
+                        'duration': '3600s',
+                        'distanceMeters': 50000,
+                        'polyline': {
+                            'encodedPolyline': polyline.encode(
+                                [(33.95 + k * 0.057, -83.98) for k in range(11)]
+                            )
+                        },
+                    }
+                ]
+            },
+        )
+        mock_forecasts = mocker.patch(
+            'server.fetch_hourly_forecasts', side_effect=snowy_evening_forecasts
+        )
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin='Grayson, GA',
+                destination='Dahlonega, GA',
+                departure_time='2026-01-23T15:00:00Z',
+                **options,
+            )
+        )
+        return result, mock_forecasts
+
+    def test_assessment_is_answered_from_session_forecasts(self, mocker):
+        result, mock_forecasts = self.assess(mocker, session=True)
+
+        assert result['session_id']
+        assert result['status'] == 'SAFE'
+        assert mock_forecasts.call_count == 1
+
+    def test_no_session_by_default(self, mocker):
+        result, _ = self.assess(mocker)
+        assert 'session_id' not in result
+
+    def test_rescore_later_departure_without_fetching(self, mocker):
+        from server import rescore_session
+
+        result, mock_forecasts = self.assess(mocker, session=True)
+        mocker.patch('server.get_lat_long', side_effect=AssertionError)
+        mocker.patch('server.compute_route', side_effect=AssertionError)
+
+        later = rescore_session.fn(
+            result['session_id'], departure_time='2026-01-23T20:00:00Z'
+        )
+
+        assert mock_forecasts.call_count == 1
+        assert later['session_id'] == result['session_id']
+        assert later['departure_time'] == '2026-01-23T20:00:00+00:00'
+        assert later['arrival_time'] == '2026-01-23T21:00:00+00:00'
+        assert later['complete'] is True
+        assert later['max_danger'] > result['max_danger']
+        assert later['status'] != 'SAFE'
+
+    def test_rescore_keeps_departure_and_matches_assessment(self, mocker):
+        from server import rescore_session
+
+        result, _ = self.assess(mocker, session=True)
+        again = rescore_session.fn(result['session_id'])
+
+        assert again['departure_time'] == result['departure_time']
+        assert again['max_danger'] == result['max_danger']
+        assert [wp['danger_score'] for wp in again['waypoints']] == [
+            wp['danger_score'] for wp in result['waypoints']
+        ]
+
+    def test_rescore_by_arrival_time(self, mocker):
+        from server import rescore_session
+
+        result, _ = self.assess(mocker, session=True)
+        earlier = rescore_session.fn(
+            result['session_id'], arrival_time='2026-01-23T14:00:00Z', format='summary'
+        )
+
+        assert earlier['departure_time'] == '2026-01-23T13:00:00+00:00'
+        assert 'worst_segments' in earlier
+
+    def test_rescore_with_an_offset_departure_reads_the_utc_hour(self, mocker):
+        from server import rescore_session
+
+        result, _ = self.assess(mocker, session=True)
+        offset = rescore_session.fn(
+            result['session_id'], departure_time='2026-01-23T15:00:00-05:00'
+        )
+        utc = rescore_session.fn(
+            result['session_id'], departure_time='2026-01-23T20:00:00Z'
+        )
+
+        assert offset['max_danger'] == utc['max_danger'] > result['max_danger']
+        assert [wp['danger_score'] for wp in offset['waypoints']] == [
+            wp['danger_score'] for wp in utc['waypoints']
+        ]
+
+    def test_session_chunks_are_fetched_concurrently(self, mocker):
+        import threading
+
+        from deadline import Deadline
+        from server import DEADLINE_CHUNK_SIZE, _session_forecasts
+
+        # Each chunk waits for the other: fetched one after another, both fail
+        both_started = threading.Barrier(2, timeout=5)
+
+        def forecasts(coords, start, end, timeout=None):
+            both_started.wait()
+            return synthetic_forecasts(coords, start, end)
+
+        mocker.patch('server.fetch_hourly_forecasts', side_effect=forecasts)
+        arrival = datetime(2026, 1, 23, 15, 0, tzinfo=timezone.utc)
+        waypoints = [
+            (33.95 + k * 0.1, -83.98, arrival) for k in range(2 * DEADLINE_CHUNK_SIZE)
+        ]
+
+        blocks = _session_forecasts(waypoints, Deadline(10000))
+
+        assert blocks is not None
+        assert all(block is not None for block in blocks)
+
+    def test_waypoints_moved_beyond_the_forecasts_are_unavailable(self, mocker):
+        from server import rescore_session
+
+        result, _ = self.assess(mocker, session=True)
+        later = rescore_session.fn(
+            result['session_id'], departure_time='2026-01-24T15:00:00Z'
+        )
+
+        assert later['coverage'] == 0.0
+        assert later['status'] == 'UNKNOWN'
+
+    def test_unknown_session(self):
+        from server import rescore_session
+
+        with pytest.raises(ValueError):
+            rescore_session.fn('no-such-session')
+
+
+class TestSpeculativeWeather:
+    """Tests for fetching corridor forecasts while the route is computed."""
+
+    def assess(self, mocker, route_points, speculate=True):
+        from server import assess_route_danger
+
+        if speculate:
+            mocker.patch.dict('os.environ', {'SAFE_TRAVELS_SPECULATIVE_WEATHER': '1'})
+        mocker.patch(
+            'server.get_lat_long',
+            side_effect=lambda address, timeout=None: {
+                'Grayson, GA': (33.95, -83.98),
+                'Dahlonega, GA': (34.52, -83.98),
+            }[address],
+        )
+        mocker.patch(
+            'server.compute_route',
+            return_value={
+                'routes': [
+                    {
+                        'duration': '3600s',
+                        'distanceMeters': 80000,
+                        'polyline': {'encodedPolyline': polyline.encode(route_points)},
+                    }
+                ]
+            },
+        )
+        mock_forecasts = mocker.patch(
+            'server.fetch_hourly_forecasts', side_effect=synthetic_forecasts
+        )
+        result = asyncio.run(
+            assess_route_danger.fn(
+                origin='Grayson, GA',
+                destination='Dahlonega, GA',
+                departure_time='2026-01-23T15:00:00Z',
+            )
+        )
+        return result, mock_forecasts
+
+    def test_straight_route_is_answered_from_speculation(self, mocker):
+        import metrics
+
+        hits = metrics.counter('speculation.hits')
+        straight = [(33.95 + k * 0.057, -83.98) for k in range(11)]
+        result, mock_forecasts = self.assess(mocker, straight)
+
+        assert mock_forecasts.call_count == 1
+        assert result['complete'] is True
+        assert {wp['source'] for wp in result['waypoints']} == {'cache'}
+        assert metrics.counter('speculation.hits') - hits == len(result['waypoints'])
+
+    def test_waypoints_off_the_straight_line_are_fetched(self, mocker):
+        import metrics
+
+        hits = metrics.counter('speculation.hits')
+        misses = metrics.counter('speculation.misses')
+        detour = [
+            (33.95, -83.98),
+            (34.1, -84.4),
+            (34.3, -84.6),
+            (34.45, -84.4),
+            (34.52, -83.98),
+        ]
+        result, mock_forecasts = self.assess(mocker, detour)
+
+        assert mock_forecasts.call_count == 2
+        assert result['complete'] is True
+        sources = [wp['source'] for wp in result['waypoints']]
+        assert sources[0] == sources[-1] == 'cache'
+        assert 'forecast' in sources
+        assert metrics.counter('speculation.hits') - hits == 2
+        assert metrics.counter('speculation.misses') - misses > 0
+
+    def test_no_speculation_for_cached_routes(self, mocker):
+        straight = [(33.95 + k * 0.057, -83.98) for k in range(11)]
+        self.assess(mocker, straight)
+        import forecast_cache
+
+        forecast_cache.clear()
+
+        result, mock_forecasts = self.assess(mocker, straight)
+
+        assert mock_forecasts.call_count == 1
+        assert {wp['source'] for wp in result['waypoints']} == {'forecast'}
+
+    def test_disabled_by_default(self, mocker):
+        straight = [(33.95 + k * 0.057, -83.98) for k in range(11)]
+        result, mock_forecasts = self.assess(mocker, straight, speculate=False)
+
+        assert mock_forecasts.call_count == 1
+        assert {wp['source'] for wp in result['waypoints']} == {'forecast'}
+
+
+class TestVehicleProfiles:
+    """Tests for scoring routes for several vehicle profiles."""
+
+    def test_scores_every_profile(self, mocker):
+        result = TestResponseFormats().assess(
+            mocker, 'full', vehicle_profiles=['car', 'truck', 'motorcycle']
+        )
+
+        for waypoint in result['waypoints']:
+            assert waypoint['vehicle_scores']['car'] == waypoint['danger_score']
+        # Only the wind of the mild waypoint counts, which trucks weigh double
+        mild = result['waypoints'][0]['vehicle_scores']
+        assert mild['truck'] == 2 * mild['car'] > mild['motorcycle'] > mild['car']
+        assert result['waypoints'][1]['vehicle_scores']['motorcycle'] == 10.0
+        assert result['vehicles']['car']['max_danger'] == result['max_danger']
+        assert result['vehicles']['car']['status'] == result['status']
+        assert (
+            result['vehicles']['truck']['average_danger']
+            > result['vehicles']['car']['average_danger']
+        )
+
+    def test_compact_and_summary(self, mocker):
+        compact = TestResponseFormats().assess(
+            mocker, 'compact', vehicle_profiles=['car', 'truck']
+        )
+        summary = TestResponseFormats().assess(
+            mocker, 'summary', vehicle_profiles=['car', 'truck']
+        )
+
+        columns = compact['waypoints']['vehicle_scores']
+        assert columns['car'] == compact['waypoints']['danger_score']
+        assert len(columns['truck']) == 2
+        assert set(summary['worst_segments'][0]['vehicle_scores']) == {'car', 'truck'}
+
+    def test_heatmap_waypoints_are_not_scored(self):
+        from server import _score_waypoints, _vehicle_assessments
+
+        when = datetime(2026, 1, 23, 17, 0, tzinfo=timezone.utc)
+        weather = {
+            'lat': 34.52,
+            'lon': -83.98,
+            'arrival_time': when.isoformat(),
+            'temp_c': 20.0,
+            'wind_kph': 30.0,
+            'gust_kph': 40.0,
+            'condition': 'sunny',
+            'rain_mm': 0.0,
+            'snowfall_cm': 0.0,
+            'visibility_m': 10000.0,
+            'snow_depth_m': 0.0,
+            'soil_temp_c': 18.0,
+            'dew_point_c': 10.0,
+        }
+
+        results, danger_scores, vehicle_scores = _score_waypoints(
+            [(33.95, -83.98, when), (34.52, -83.98, when)],
+            [(35.0, 180.0)] * 2,
+            [0.0, 0.0],
+            None,
+            [4.0, None],
+            iter([weather]),
+            ['car', 'truck'],
+        )
+        vehicles = _vehicle_assessments(vehicle_scores, len(results))
+
+        # A heatmap score can't be weighed by component, so it isn't guessed
+        assert results[0]['vehicle_scores'] == {'car': None, 'truck': None}
+        assert len(danger_scores) == 2
+        assert vehicle_scores['truck'] == [2 * vehicle_scores['car'][0]]
+        assert vehicles['truck']['coverage'] == 0.5
+        assert not vehicles['truck']['complete']
+
+    def test_not_scored_by_default(self, mocker):
+        result = TestResponseFormats().assess(mocker, 'full')
+
+        assert 'vehicles' not in result
+        assert 'vehicle_scores' not in result['waypoints'][0]
+
+    def test_unknown_profile(self):
+        from server import assess_route_danger
+
+        with pytest.raises(ValueError):
+            asyncio.run(
+                assess_route_danger.fn(
+                    origin='Grayson, GA',
+                    destination='Dahlonega, GA',
+                    vehicle_profiles=['spaceship'],
+                )
+            )
+
+    def test_rescore_session_for_a_truck(self, mocker):
+        from server import rescore_session
+
+        sessions = TestSessions()
+        result, mock_forecasts = sessions.assess(mocker, session=True)
+
+        truck = rescore_session.fn(
+            result['session_id'],
+            departure_time='2026-01-23T20:00:00Z',
+            vehicle_profiles=['car', 'truck'],
+        )
+
+        assert mock_forecasts.call_count == 1
+        assert truck['vehicles']['car']['max_danger'] == truck['max_danger']
+        assert truck['vehicles']['truck']['max_danger'] >= truck['max_danger']
+
+
+class TestDangerTiles:
+    """Tests for the danger tile HTTP route."""
+
+    def client(self, mocker, tmp_path):
+        from starlette.testclient import TestClient
+
+        from gridfile import write_grid
+        from server import mcp
+
+        path = str(tmp_path / 'heatmap.bin')
+        write_grid(
+            path,
+            36.9,
+            -109.1,
+            0.1,
+            0.1,
+            43,
+            72,
+            datetime(2026, 1, 23, 12, tzinfo=timezone.utc),
+            3600,
+            2,
+            ['danger_score'],
+            [3.0] * (2 * 43 * 72),
+        )
+        mocker.patch.dict('os.environ', {'SAFE_TRAVELS_HEATMAP': path})
+        return TestClient(mcp.http_app())
+
+    def test_png_tile(self, mocker, tmp_path):
+        response = self.client(mocker, tmp_path).get(
+            '/tiles/8/51/97.png', params={'time': '2026-01-23T13:00:00Z'}
+        )
+
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'image/png'
+        assert response.content.startswith(b'\x89PNG')
+        assert 'max-age' in response.headers['cache-control']
+
+    def test_geojson_tile(self, mocker, tmp_path):
+        response = self.client(mocker, tmp_path).get(
+            '/tiles/8/51/97.geojson', params={'time': '2026-01-23T12:00:00Z'}
+        )
+
+        assert response.status_code == 200
+        features = response.json()['features']
+        assert {f['properties']['danger_score'] for f in features} == {3.0}
+
+    def test_errors(self, mocker, tmp_path):
+        client = self.client(mocker, tmp_path)
+
+        assert client.get('/tiles/8/51/97.png').status_code == 404
+        assert client.get('/tiles/8/51/97.svg').status_code == 400
+        assert client.get('/tiles/1/5/0.png').status_code == 400
+
+    def test_no_heatmap(self):
+        from starlette.testclient import TestClient
+
+        from server import mcp
+
+        response = TestClient(mcp.http_app()).get('/tiles/0/0/0.png')
+        assert response.status_code == 404
@@ -0,0 +1,58 @@
+"""Tests for sessions.py"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+import sessions
+
+
+def make_session(origin='Denver, CO'):
+    return sessions.Session(
+        origin=origin,
+        destination='Vail, CO',
+        safest_route=False,
+        points=[(39.74, -104.99), (39.64, -106.37)],
+        waypoint_coords=[(39.74, -104.99), (39.64, -106.37)],
+        waypoint_indices=[0, 1],
+        departure=datetime(2026, 1, 23, 7, tzinfo=timezone.utc),
+        duration_seconds=7200,
+        forecasts=[{'time': []}, {'time': []}],
+        crash_history=None,
+    )
+
+
+@pytest.fixture(autouse=True)
+def _no_sessions():
+    sessions.clear()
+    yield
+    sessions.clear()
+
+
+class TestSessions:
+    """Tests for the in-memory session store."""
+
+    def test_round_trip(self):
+        session = make_session()
+        session_id = sessions.create(session)
+        assert sessions.get(session_id) is session
+        assert sessions.get('unknown') is None
+
+    def test_ids_are_distinct(self):
+        assert sessions.create(make_session()) != sessions.create(make_session())
+
+    def test_expires_after_ttl(self, mocker):
+        session_id = sessions.create(make_session())
+        mocker.patch('sessions.TTL_SECONDS', -1)
+        assert sessions.get(session_id) is None
+
+    def test_evicts_least_recently_used(self, mocker):
+        mocker.patch('sessions.MAX_SESSIONS', 2)
+        first = sessions.create(make_session('A'))
+        second = sessions.create(make_session('B'))
+        sessions.get(first)
+        third = sessions.create(make_session('C'))
+
+        assert sessions.get(first).origin == 'A'
+        assert sessions.get(second) is None
+        assert sessions.get(third).origin == 'C'
@@ -0,0 +1,72 @@
+"""Tests for solar.py"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from solar import solar_positions
+
+
+class TestSolarPositions:
+    """Tests for solar_positions function."""
+
+    def test_high_sun_at_equinox_noon_on_equator(self):
+        # Solar noon at the prime meridian on the March equinox
+        waypoints = [(0.0, 0.0, datetime(2026, 3, 20, 12, 7, tzinfo=timezone.utc))]
+        elevation, _ = solar_positions(waypoints)[0]
+        assert elevation > 85
+
+    def test_sun_below_horizon_at_midnight(self):
+        # Denver at local midnight (07:00 UTC) in January
+        waypoints = [(39.74, -104.98, datetime(2026, 1, 23, 7, 0, tzinfo=timezone.utc))]
+        elevation, _ = solar_positions(waypoints)[0]
+        assert elevation < -30
+
+    def test_morning_sun_is_in_the_east(self):
+        # Atlanta around 09:00 local time (14:00 UTC) in January
+        waypoints = [(33.75, -84.39, datetime(2026, 1, 23, 14, 0, tzinfo=timezone.utc))]
+        elevation, azimuth = solar_positions(waypoints)[0]
+        assert 0 < elevation < 30
+        assert 100 < azimuth < 160
+
+    def test_evening_sun_is_in_the_west(self):
+        # Atlanta around 16:30 local time (21:30 UTC) in January
+        waypoints = [
+            (33.75, -84.39, datetime(2026, 1, 23, 21, 30, tzinfo=timezone.utc))
+        ]
+        elevation, azimuth = solar_positions(waypoints)[0]
+        assert 0 < elevation < 30
+        assert 200 < azimuth < 260
+
+    def test_naive_datetime_treated_as_utc(self):
+        aware = datetime(2026, 6, 1, 18, 0, tzinfo=timezone.utc)
+        naive = aware.replace(tzinfo=None)
+        assert solar_positions([(40.0, -100.0, naive)]) == pytest.approx(
+            solar_positions([(40.0, -100.0, aware)])
+        )
+
+    def test_offset_datetime_converted_to_utc(self):
+        utc = datetime(2026, 6, 1, 18, 0, tzinfo=timezone.utc)
+        eastern = utc.astimezone(timezone(timedelta(hours=-4)))
+        assert solar_positions([(40.0, -100.0, eastern)]) == pytest.approx(
+            solar_positions([(40.0, -100.0, utc)])
+        )
+
+    def test_returns_one_position_per_waypoint(self):
+        start = datetime(2026, 1, 23, 12, 0, tzinfo=timezone.utc)
+        waypoints = [
+            (34.0 + i * 0.1, -84.0, start + timedelta(minutes=10 * i))
+            for i in range(10)
+        ]
+        assert len(solar_positions(waypoints)) == 10
+
+    def test_century_years_are_not_leap_years(self):
+        from solar import _fractional_year
+
+        # 2100 has 365 days, so December 31 ends the year like in 2026
+        assert _fractional_year(datetime(2100, 12, 31, 12)) == pytest.approx(
+            _fractional_year(datetime(2026, 12, 31, 12))
+        )
+        assert _fractional_year(datetime(2000, 12, 31, 12)) == pytest.approx(
+            _fractional_year(datetime(2024, 12, 31, 12))
+        )
@@ -0,0 +1,205 @@
+"""Tests for tiles.py"""
+
+import math
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import tiles
+from gridfile import load_grid, write_grid
+
+T0 = datetime(2026, 1, 23, 12, tzinfo=timezone.utc)
+# Tile 8/51/97 lies inside the heatmap below
+TILE = (8, 51, 97)
+
+
+@pytest.fixture
+def heatmap_path(tmp_path):
+    """A 0.1 degree heatmap over western Colorado: danger 1 in the first hour,
+    8 in the second, with a missing cell."""
+    nlat, nlon = 43, 72
+    values = [1.0] * (nlat * nlon) + [8.0] * (nlat * nlon)
+    values[0] = math.nan
+    path = str(tmp_path / 'heatmap.bin')
+    write_grid(
+        path, 36.9, -109.1, 0.1, 0.1, nlat, nlon, T0, 3600, 2, ['danger_score'], values
+    )
+    return path
+
+
+def decode_png(data: bytes) -> tuple[int, int, bytes]:
+    """Width, height and palette indices of a palette PNG without filters."""
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    offset, idat = 8, b''
+    while offset < len(data):
+        (length,) = struct.unpack_from('>I', data, offset)
+        kind = data[offset + 4 : offset + 8]
+        body = data[offset + 8 : offset + 8 + length]
+        if kind == b'IHDR':
+            width, height = struct.unpack_from('>II', body)
+        elif kind == b'IDAT':
+            idat += body
+        offset += 12 + length
+    raw = zlib.decompress(idat)
+    rows = [raw[r * (width + 1) + 1 : (r + 1) * (width + 1)] for r in range(height)]
+    return width, height, b''.join(rows)
+
+
+class TestRendering:
+    """Tests for rendering tiles from a heatmap."""
+
+    def test_tile_bounds(self):
+        assert tiles.tile_bounds(0, 0, 0) == pytest.approx(
+            (-85.0511, -180.0, 85.0511, 180.0), abs=1e-4
+        )
+        south, west, north, east = tiles.tile_bounds(*TILE)
+        assert south < north and west < east
+        assert -109.1 < west and east < -101.9
+
+    def test_png_colors_scores(self, heatmap_path):
+        grid = load_grid(heatmap_path)
+        _, _, calm = decode_png(tiles.render_png(grid, 0, *TILE))
+        width, height, stormy = decode_png(tiles.render_png(grid, 1, *TILE))
+
+        assert (width, height) == (tiles.TILE_SIZE, tiles.TILE_SIZE)
+        assert set(calm) == {1 + int(1.0 * tiles.LEVELS / 10)}
+        assert set(stormy) == {1 + int(8.0 * tiles.LEVELS / 10)}
+
+    def test_png_is_transparent_outside_the_heatmap(self, heatmap_path):
+        grid = load_grid(heatmap_path)
+        _, _, pixels = decode_png(tiles.render_png(grid, 0, 0, 0, 0))
+
+        assert pixels.count(0) > 0.99 * len(pixels)
+        assert set(pixels) - {0}
+
+    def test_geojson_cells(self, heatmap_path):
+        grid = load_grid(heatmap_path)
+        south, west, north, east = tiles.tile_bounds(*TILE)
+
+        cells = tiles.render_geojson(grid, 1, *TILE)['features']
+
+        assert cells
+        assert {cell['properties']['danger_score'] for cell in cells} == {8.0}
+        for cell in cells:
+            for lon, lat in cell['geometry']['coordinates'][0]:
+                assert west <= lon <= east and south <= lat <= north
+
+    def test_geojson_skips_missing_cells(self, heatmap_path):
+        grid = load_grid(heatmap_path)
+        cells = tiles.render_geojson(grid, 0, 0, 0, 0)['features']
+        assert len(cells) == 43 * 72 - 1
+
+    def test_nearest_step(self, heatmap_path):
+        grid = load_grid(heatmap_path)
+        assert tiles.nearest_step(grid, T0 + timedelta(minutes=20)) == 0
+        assert tiles.nearest_step(grid, T0 + timedelta(minutes=50)) == 1
+        assert tiles.nearest_step(grid, T0 + timedelta(hours=3)) is None
+        assert tiles.nearest_step(grid, T0 - timedelta(hours=1)) is None
+
+
+class TestTileServer:
+    """Tests for cached and prerendered tiles."""
+
+    def test_repeated_tiles_are_cached(self, heatmap_path, mocker):
+        server = tiles.TileServer(heatmap_path)
+        render = mocker.spy(tiles, 'render_png')
+
+        first = server.tile(*TILE, T0)
+        server.wait_for_prerendering()
+        calls = render.call_count
+        second = server.tile(*TILE, T0 + timedelta(minutes=10))
+
+        assert second is first
+        assert render.call_count == calls
+
+    def test_neighbors_are_prerendered(self, heatmap_path, mocker):
+        server = tiles.TileServer(heatmap_path)
+        z, x, y = TILE
+        server.tile(z, x, y, T0)
+        server.wait_for_prerendering()
+        render = mocker.spy(tiles, 'render_png')
+
+        for dx, dy in ((-1, -1), (0, 1), (1, 0)):
+            server.tile(z, x + dx, y + dy, T0)
+
+        assert render.call_count == 0
+
+    def test_hours_and_formats_are_cached_separately(self, heatmap_path):
+        server = tiles.TileServer(heatmap_path)
+
+        png = server.tile(*TILE, T0)
+        later = server.tile(*TILE, T0 + timedelta(hours=1))
+        cells = server.tile(*TILE, T0, 'geojson')
+
+        assert later != png
+        assert cells['type'] == 'FeatureCollection'
+
+    def test_new_run_empties_the_cache(self, heatmap_path):
+        server = tiles.TileServer(heatmap_path)
+        first = server.tile(*TILE, T0)
+        nlat, nlon = 43, 72
+        write_grid(
+            heatmap_path,
+            36.9,
+            -109.1,
+            0.1,
+            0.1,
+            nlat,
+            nlon,
+            T0 + timedelta(hours=1),
+            3600,
+            1,
+            ['danger_score'],
+            [5.0] * (nlat * nlon),
+        )
+
+        second = server.tile(*TILE, T0 + timedelta(hours=1))
+
+        assert second != first
+        _, _, pixels = decode_png(second)
+        assert set(pixels) == {1 + int(5.0 * tiles.LEVELS / 10)}
+
+    def test_older_runs_do_not_replace_newer_ones(self):
+        cache = tiles.TileCache()
+        cache.put((2.0, T0), TILE, b'new')
+        cache.put((1.0, T0), TILE, b'old')
+
+        assert cache.get((2.0, T0), TILE) == b'new'
+        assert cache.is_stale((1.0, T0))
+        assert not cache.is_stale((2.0, T0))
+
+    def test_prerendering_is_bounded_and_skips_stale_runs(
+        self, heatmap_path, mocker, monkeypatch
+    ):
+        import threading
+
+        import metrics
+
+        metrics.reset()
+        monkeypatch.setattr(tiles, 'MAX_PRERENDER', 3)
+        server = tiles.TileServer(heatmap_path)
+        release = threading.Event()
+        server._executor.submit(release.wait, 5)
+
+        server.tile(*TILE, T0)
+        # A newer run arrives while the neighbors are still queued
+        server.cache.put((math.inf, T0), TILE, b'newer')
+        render = mocker.spy(server, '_render')
+        release.set()
+        server.wait_for_prerendering()
+
+        assert metrics.counter('tiles.prerender_dropped') == 5
+        assert render.call_count == 0
+
+    def test_outside_the_heatmap_hours(self, heatmap_path):
+        server = tiles.TileServer(heatmap_path)
+        assert server.tile(*TILE, T0 + timedelta(days=1)) is None
+
+    def test_invalid_requests(self, heatmap_path):
+        server = tiles.TileServer(heatmap_path)
+        with pytest.raises(ValueError):
+            server.tile(2, 4, 0, T0)
+        with pytest.raises(ValueError):
+            server.tile(*TILE, T0, 'svg')
@@ -0,0 +1,36 @@
+"""Tests for trips.py"""
+
+import json
+
+from trips import read_trips
+
+
+def write_jsonl(path, records):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+
+
+class TestReadTrips:
+    """Tests for streaming trips from input files."""
+
+    def test_jsonl_ids_default_to_line_number(self, tmp_path):
+        path = tmp_path / 'trips.jsonl'
+        write_jsonl(
+            path,
+            [
+                {'id': 'a', 'origin': 'Denver, CO', 'destination': 'Vail, CO'},
+                {'origin': 'Boulder, CO', 'destination': 'Aspen, CO'},
+            ],
+        )
+        trips = list(read_trips(str(path)))
+        assert [trip['id'] for trip in trips] == ['a', '2']
+
+    def test_csv_drops_empty_columns(self, tmp_path):
+        path = tmp_path / 'trips.csv'
+        path.write_text(
+            'id,origin,destination,departure_time\n'
+            '7,Denver CO,Vail CO,\n'
+            '8,Boulder CO,Aspen CO,2026-01-23T08:00:00Z\n'
+        )
+        trips = list(read_trips(str(path)))
+        assert trips[0] == {'id': '7', 'origin': 'Denver CO', 'destination': 'Vail CO'}
+        assert trips[1]['departure_time'] == '2026-01-23T08:00:00Z'
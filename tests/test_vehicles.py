@@ -0,0 +1,59 @@
+"""Tests for vehicles.py"""
+
+import json
+
+import pytest
+
+import vehicles
+
+
+class TestVehicleProfiles:
+    """Tests for vehicle profile weights and matrix scoring."""
+
+    def test_car_weighs_every_component_once(self):
+        weights = vehicles.weight_matrix(['car'])
+        assert weights == [[1.0]] * len(vehicles.COMPONENTS)
+
+    def test_weight_matrix_is_components_by_profiles(self):
+        weights = vehicles.weight_matrix(['car', 'truck'])
+        wind = vehicles.COMPONENTS.index('wind')
+
+        assert len(weights) == len(vehicles.COMPONENTS)
+        assert weights[wind] == [1.0, 2.0]
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError):
+            vehicles.weight_matrix(['spaceship'])
+
+    def test_score_matrix(self):
+        components = [
+            [0, 0, 2.0, 0, 0, 0, 0, 0],
+            [2.0, 1.0, 0, 1.0, 0, 0, 0, 0.5],
+        ]
+        weights = vehicles.weight_matrix(['car', 'truck', 'motorcycle'])
+
+        scores = vehicles.score_matrix(components, weights)
+
+        assert scores[0] == [2.0, 4.0, 3.0]
+        assert scores[1][0] == 4.5
+        assert scores[1][2] == pytest.approx(2.0 * 1.5 + 1.0 * 1.5 + 1.0 * 2.0 + 0.5)
+
+    def test_scores_are_capped(self):
+        weights = vehicles.weight_matrix(['motorcycle'])
+        assert vehicles.score_matrix([[8.0] * 8], weights) == [[vehicles.MAX_SCORE]]
+
+    def test_profiles_from_file(self, tmp_path, monkeypatch):
+        path = tmp_path / 'profiles.json'
+        path.write_text(json.dumps({'bus': {'wind': 1.5}, 'truck': {'wind': 3.0}}))
+        monkeypatch.setenv('SAFE_TRAVELS_VEHICLE_PROFILES', str(path))
+
+        weights = vehicles.weight_matrix(['bus', 'truck', 'car'])
+
+        assert weights[vehicles.COMPONENTS.index('wind')] == [1.5, 3.0, 1.0]
+        assert weights[vehicles.COMPONENTS.index('ice')] == [1.0, 1.0, 1.0]
+
+    def test_unknown_component_in_file(self, tmp_path):
+        path = tmp_path / 'profiles.json'
+        path.write_text(json.dumps({'bus': {'cupholders': 2.0}}))
+        with pytest.raises(ValueError):
+            vehicles.load_profiles(str(path))
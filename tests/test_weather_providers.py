@@ -0,0 +1,211 @@
+"""Tests for weather_providers.py"""
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import weather_providers
+from gridfile import GridFile
+from weather_providers import (
+    HISTORY_HOURS,
+    HOURLY_VARIABLES,
+    LocalGridProvider,
+    OpenMeteoProvider,
+    default_provider,
+    pull_forecast_grids,
+)
+
+RUN = datetime(2026, 1, 23, 6, tzinfo=timezone.utc)
+
+
+class FakeProvider:
+    """Temperature 10 * lat + lon + hours since the run, snow north of 39.5."""
+
+    def __init__(self):
+        self.calls = []
+
+    def hourly_forecasts(self, coords, start, end, timeout=None):
+        self.calls.append(list(coords))
+        hours = int((end - start) / timedelta(hours=1)) + 1
+        times = [start + timedelta(hours=h) for h in range(hours)]
+        blocks = []
+        for lat, lon in coords:
+            block = {name: [0.0] * hours for name in HOURLY_VARIABLES}
+            block['time'] = [t.strftime('%Y-%m-%dT%H:00') for t in times]
+            block['temperature_2m'] = [
+                10 * lat + lon + (t - RUN) / timedelta(hours=1) for t in times
+            ]
+            block['weather_code'] = [71 if lat > 39.5 else 1] * hours
+            block['visibility'] = [None] * hours
+            blocks.append(block)
+        return blocks
+
+
+@pytest.fixture
+def grids(tmp_path):
+    path = str(tmp_path / 'grids')
+    pull_forecast_grids(
+        path,
+        39.0,
+        -106.0,
+        40.0,
+        -105.0,
+        resolution=0.25,
+        hours=6,
+        tile_deg=0.5,
+        start=RUN + timedelta(minutes=20),
+        provider=FakeProvider(),
+    )
+    return path
+
+
+class TestOpenMeteoProvider:
+    """Tests for fetching forecasts from Open-Meteo."""
+
+    def test_requests_every_variable(self, mocker):
+        response = mocker.Mock()
+        response.json.return_value = {'hourly': {'time': ['2026-01-23T06:00']}}
+        get = mocker.patch('weather_providers.requests.get', return_value=response)
+
+        blocks = OpenMeteoProvider('http://forecast').hourly_forecasts(
+            [(39.0, -105.0)], RUN, RUN + timedelta(hours=2)
+        )
+
+        url = get.call_args.args[0]
+        assert url.startswith('http://forecast?latitude=39.0&longitude=-105.0')
+        assert f'hourly={",".join(HOURLY_VARIABLES)}' in url
+        assert 'start_hour=2026-01-23T06:00&end_hour=2026-01-23T08:00' in url
+        assert blocks == [{'time': ['2026-01-23T06:00']}]
+
+
+class TestPullForecastGrids:
+    """Tests for pulling a model run into tiled grid files."""
+
+    def test_tiles_share_edges(self, grids):
+        assert set(os.listdir(grids)) == {
+            '39.0_-106.0.grid',
+            '39.0_-105.5.grid',
+            '39.5_-106.0.grid',
+            '39.5_-105.5.grid',
+        }
+        grid = GridFile.open(os.path.join(grids, '39.5_-105.5.grid'))
+        assert (grid.nlat, grid.nlon) == (3, 3)
+        assert grid.lat1 == pytest.approx(40.0)
+        assert grid.nt == HISTORY_HOURS + 6
+        assert grid.t0 == RUN - timedelta(hours=HISTORY_HOURS)
+
+
+class TestLocalGridProvider:
+    """Tests for serving forecasts from local grids."""
+
+    def test_interpolates_between_cells(self, grids):
+        provider = LocalGridProvider(grids, fallback=FakeProvider())
+
+        (block,) = provider.hourly_forecasts(
+            [(39.125, -105.375)], RUN - timedelta(hours=2), RUN + timedelta(hours=3)
+        )
+
+        assert block['time'][0] == '2026-01-23T04:00'
+        assert block['time'][-1] == '2026-01-23T09:00'
+        assert block['temperature_2m'][2] == pytest.approx(10 * 39.125 - 105.375)
+        assert block['temperature_2m'][5] == pytest.approx(10 * 39.125 - 105.375 + 3)
+        assert block['weather_code'] == [1] * 6
+        assert block['visibility'] == [None] * 6
+        assert set(block) == {'time', *HOURLY_VARIABLES}
+
+    def test_nearest_cell(self, grids):
+        provider = LocalGridProvider(grids, interpolate=False, fallback=FakeProvider())
+
+        (block,) = provider.hourly_forecasts([(39.6, -105.4)], RUN, RUN)
+
+        assert block['temperature_2m'] == [pytest.approx(10 * 39.5 - 105.5)]
+        assert block['weather_code'] == [1]
+
+    def test_trims_hours_before_the_grid(self, grids):
+        provider = LocalGridProvider(grids, fallback=FakeProvider())
+
+        (block,) = provider.hourly_forecasts(
+            [(39.5, -105.5)], RUN - timedelta(days=3), RUN
+        )
+
+        assert len(block['time']) == HISTORY_HOURS + 1
+
+    def test_falls_back_outside_the_grids(self, grids):
+        fallback = FakeProvider()
+        provider = LocalGridProvider(grids, fallback=fallback)
+
+        blocks = provider.hourly_forecasts(
+            [(39.5, -105.5), (45.0, -100.0), (39.5, -105.5)],
+            RUN,
+            RUN + timedelta(hours=2),
+        )
+        assert fallback.calls == [[(45.0, -100.0)]]
+        assert blocks[1]['temperature_2m'][0] == pytest.approx(350.0)
+
+        # Past the last hour of the grids
+        provider.hourly_forecasts([(39.5, -105.5)], RUN, RUN + timedelta(hours=10))
+        assert fallback.calls[-1] == [(39.5, -105.5)]
+
+    def test_serves_many_waypoints_quickly(self, grids):
+        provider = LocalGridProvider(grids, fallback=FakeProvider())
+        coords = [(39.0 + i / 100, -106.0 + i / 100) for i in range(100)]
+
+        started = time.perf_counter()
+        blocks = provider.hourly_forecasts(
+            coords, RUN - timedelta(hours=HISTORY_HOURS), RUN + timedelta(hours=5)
+        )
+        elapsed = time.perf_counter() - started
+
+        assert all(len(block['time']) == HISTORY_HOURS + 6 for block in blocks)
+        assert elapsed < 0.5
+
+    def test_tile_for(self, grids):
+        provider = LocalGridProvider(grids, fallback=FakeProvider())
+
+        assert provider.tile_for(39.6, -105.9).lat0 == pytest.approx(39.5)
+        assert provider.tile_for(39.6, -105.9).lon0 == pytest.approx(-106.0)
+        assert provider.tile_for(39.5, -105.5).lon0 == pytest.approx(-105.5)
+        assert provider.tile_for(38.9, -105.9) is None
+        assert provider.tile_for(39.6, -106.1) is None
+
+    def test_opens_tiles_once_per_directory_change(self, grids, mocker):
+        provider = LocalGridProvider(grids, fallback=FakeProvider())
+        load_grid = mocker.spy(weather_providers, 'load_grid')
+
+        for _ in range(3):
+            provider.hourly_forecasts([(39.6, -105.4), (39.1, -105.9)], RUN, RUN)
+        assert load_grid.call_count == 4
+
+        # As when a newer run is renamed into the directory
+        stat = os.stat(grids)
+        os.utime(grids, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        provider.hourly_forecasts([(39.6, -105.4)], RUN, RUN)
+        assert load_grid.call_count == 8
+
+
+class TestDefaultProvider:
+    """Tests for choosing the weather provider."""
+
+    def test_open_meteo_by_default(self, monkeypatch):
+        monkeypatch.delenv('SAFE_TRAVELS_WEATHER_PROVIDER', raising=False)
+
+        assert isinstance(default_provider(), OpenMeteoProvider)
+
+    def test_local(self, monkeypatch, grids):
+        monkeypatch.setenv('SAFE_TRAVELS_WEATHER_PROVIDER', 'local')
+        monkeypatch.setenv('SAFE_TRAVELS_WEATHER_GRIDS', grids)
+        monkeypatch.setenv('SAFE_TRAVELS_WEATHER_GRID_LOOKUP', 'nearest')
+
+        provider = default_provider()
+
+        assert isinstance(provider, LocalGridProvider)
+        assert provider.interpolate is False
+        assert default_provider() is provider
+
+    def test_unknown(self, monkeypatch):
+        monkeypatch.setenv('SAFE_TRAVELS_WEATHER_PROVIDER', 'carrier-pigeon')
+
+        with pytest.raises(ValueError):
+            weather_providers.default_provider()
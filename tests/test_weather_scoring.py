@@ -0,0 +1,118 @@
+"""Tests for weather_scoring.py"""
+
+import pytest
+
+from weather_scoring import _compute_danger_score, weather_code_to_condition
+
+
+class TestWeatherCodeToCondition:
+    """Tests for weather_code_to_condition function."""
+
+    def test_clear_sky_codes(self):
+        assert weather_code_to_condition(0) == 'sunny'
+        assert weather_code_to_condition(1) == 'sunny'
+
+    def test_cloudy_codes(self):
+        assert weather_code_to_condition(2) == 'cloudy'
+        assert weather_code_to_condition(3) == 'cloudy'
+
+    def test_foggy_codes(self):
+        assert weather_code_to_condition(45) == 'foggy'
+        assert weather_code_to_condition(48) == 'foggy'
+
+    def test_rainy_codes(self):
+        rainy_codes = [51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82]
+        for code in rainy_codes:
+            assert weather_code_to_condition(code) == 'rainy'
+
+    def test_snowy_codes(self):
+        snowy_codes = [71, 73, 75, 77, 85, 86]
+        for code in snowy_codes:
+            assert weather_code_to_condition(code) == 'snowy'
+
+    def test_stormy_code(self):
+        assert weather_code_to_condition(95) == 'stormy'
+
+    def test_hail_codes(self):
+        assert weather_code_to_condition(96) == 'hail'
+        assert weather_code_to_condition(99) == 'hail'
+
+    def test_unknown_code_defaults_to_cloudy(self):
+        assert weather_code_to_condition(999) == 'cloudy'
+
+
+class TestComputeDangerScore:
+    """Tests for _compute_danger_score function."""
+
+    def test_safe_conditions(self):
+        score = _compute_danger_score(
+            temp_c=20.0, wind_kph=10.0, condition='sunny', gust_kph=15.0
+        )
+        # temp: 0, wind: 0.9375, condition: 0, precip: 0, vis: 0, ice: 0
+        assert score == pytest.approx(0.9375)
+
+    def test_cold_and_snowy(self):
+        score = _compute_danger_score(
+            temp_c=-10.0, wind_kph=32.0, condition='snowy', gust_kph=40.0
+        )
+        # temp: 2, wind: 2.5, condition: 3, precip: 0, vis: 0, ice: 1 (very cold)
+        assert score == pytest.approx(8.5)
+
+    def test_hot_and_stormy(self):
+        score = _compute_danger_score(
+            temp_c=40.0, wind_kph=80.0, condition='stormy', gust_kph=100.0
+        )
+        # temp: 2, wind: 6.25, condition: 6, precip: 0, vis: 0, ice: 0 (too hot)
+        # Raw sum is 14.25 but clamped to 10.0
+        assert score == pytest.approx(10.0)
+
+    def test_gust_takes_precedence_over_wind(self):
+        score_high_gust = _compute_danger_score(
+            temp_c=20.0, wind_kph=10.0, condition='sunny', gust_kph=50.0
+        )
+        score_low_gust = _compute_danger_score(
+            temp_c=20.0, wind_kph=10.0, condition='sunny', gust_kph=5.0
+        )
+        # High gust should use gust value, low gust should use wind value
+        assert score_high_gust > score_low_gust
+
+    def test_recent_snowfall_increases_score(self):
+        dry = _compute_danger_score(temp_c=-2.0, wind_kph=0.0, condition='sunny')
+        after_storm = _compute_danger_score(
+            temp_c=-2.0,
+            wind_kph=0.0,
+            condition='sunny',
+            snowfall_6h_cm=5.0,
+            snowfall_12h_cm=8.0,
+            snowfall_24h_cm=10.0,
+        )
+        assert after_storm > dry
+
+    def test_night_increases_score(self):
+        day = _compute_danger_score(
+            temp_c=20.0, wind_kph=0.0, condition='sunny', sun_elevation=30.0
+        )
+        night = _compute_danger_score(
+            temp_c=20.0, wind_kph=0.0, condition='sunny', sun_elevation=-20.0
+        )
+        assert day == 0
+        assert night == pytest.approx(1.5)
+
+    def test_sun_glare_needs_heading(self):
+        without_heading = _compute_danger_score(
+            temp_c=20.0,
+            wind_kph=0.0,
+            condition='sunny',
+            sun_elevation=5.0,
+            sun_azimuth=90.0,
+        )
+        with_heading = _compute_danger_score(
+            temp_c=20.0,
+            wind_kph=0.0,
+            condition='sunny',
+            sun_elevation=5.0,
+            sun_azimuth=90.0,
+            heading=90.0,
+        )
+        assert without_heading == 0
+        assert with_heading > 0
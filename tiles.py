@@ -0,0 +1,363 @@
+"""Map tiles of forecast danger for dashboards.
+
+Tiles follow the XYZ (web mercator) scheme used by slippy maps. They are
+rendered from the danger heatmap (see heatmap.py), whose scores were computed
+once per forecast run for every lattice cell and hour, so rendering never
+fetches or scores any weather. Each tile is a PNG with a translucent color per
+half point of danger score, or GeoJSON polygons of the lattice cells in it.
+
+Rendered tiles are cached per heatmap run, hour, zoom and position, and a new
+run empties the cache. After rendering a tile, its eight neighbors are rendered
+in the background, so a dashboard panning across the map mostly gets cached
+tiles. At most MAX_PRERENDER tiles wait to be prerendered; neighbors beyond
+that, and queued ones whose run has been replaced, are skipped.
+"""
+
+import math
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import metrics
+from gridfile import GridFile, load_grid
+
+TILE_SIZE = 256
+MAX_TILES = 4000
+MAX_PRERENDER = 64
+FORMATS = ('png', 'geojson')
+# Palette index 0 is transparent (no data); index k colors scores in
+# [(k - 1) / 2, k / 2), up to LEVELS
+LEVELS = 20
+# Danger score and color the palette is interpolated between
+COLOR_STOPS = (
+    (0.0, (26, 152, 80)),
+    (2.0, (255, 221, 87)),
+    (5.0, (253, 141, 60)),
+    (10.0, (189, 0, 38)),
+)
+OPACITY = 170
+
+
+def _color(score: float) -> tuple[int, int, int]:
+    for (s0, c0), (s1, c1) in zip(COLOR_STOPS, COLOR_STOPS[1:]):
+        if score <= s1:
+            f = (score - s0) / (s1 - s0)
+            return tuple(round(a + (b - a) * f) for a, b in zip(c0, c1))
+    return COLOR_STOPS[-1][1]
+
+
+_PALETTE = bytes(
+    [0, 0, 0]
+    + [v for k in range(1, LEVELS + 1) for v in _color((k - 0.5) * 10 / LEVELS)]
+)
+_ALPHA = bytes([0] + [OPACITY] * LEVELS)
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """(south, west, north, east) of a tile in degrees."""
+    n = 2**z
+    return (
+        _tile_lat(y + 1, n),
+        x / n * 360 - 180,
+        _tile_lat(y, n),
+        (x + 1) / n * 360 - 180,
+    )
+
+
+def _tile_lat(y: float, n: int) -> float:
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+
+def check_tile(z: int, x: int, y: int) -> None:
+    """Raise ValueError unless z/x/y is a valid tile."""
+    if not 0 <= z <= 22 or not 0 <= x < 2**z or not 0 <= y < 2**z:
+        raise ValueError(f'No such tile: {z}/{x}/{y}')
+
+
+def _png(width: int, height: int, pixels: bytearray) -> bytes:
+    """Encode palette indices as a PNG with the danger palette."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack('>I', len(data))
+            + kind
+            + data
+            + struct.pack('>I', zlib.crc32(kind + data))
+        )
+
+    # Each row starts with filter type 0 (none)
+    raw = b''.join(
+        b'\0' + pixels[row * width : (row + 1) * width] for row in range(height)
+    )
+    return b''.join(
+        (
+            b'\x89PNG\r\n\x1a\n',
+            chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0)),
+            chunk(b'PLTE', _PALETTE),
+            chunk(b'tRNS', _ALPHA),
+            chunk(b'IDAT', zlib.compress(raw, 6)),
+            chunk(b'IEND', b''),
+        )
+    )
+
+
+def _axis(
+    coords: list[float], origin: float, spacing: float, count: int
+) -> list[tuple[int, float] | None]:
+    """Lower lattice index and weight of the next index for each coordinate,
+    or None outside the lattice."""
+    result = []
+    for coord in coords:
+        f = (coord - origin) / spacing
+        # Allow for rounding error on the lattice edges
+        if not -1e-6 <= f <= count - 1 + 1e-6:
+            result.append(None)
+            continue
+        f = min(max(f, 0.0), count - 1)
+        i = min(int(f), max(count - 2, 0))
+        result.append((i, f - i))
+    return result
+
+
+def _lerp(a: float, b: float, w: float) -> float:
+    """Interpolate between two values, skipping a missing one."""
+    if a != a:
+        return b
+    if b != b:
+        return a
+    return a + (b - a) * w
+
+
+def render_png(grid: GridFile, step: int, z: int, x: int, y: int) -> bytes:
+    """A PNG tile of the heatmap's danger scores at one time step."""
+    n = 2**z
+    lons = [(x + (px + 0.5) / TILE_SIZE) / n * 360 - 180 for px in range(TILE_SIZE)]
+    lats = [_tile_lat(y + (py + 0.5) / TILE_SIZE, n) for py in range(TILE_SIZE)]
+    columns = _axis(lons, grid.lon0, grid.dlon, grid.nlon)
+    rows = _axis(lats, grid.lat0, grid.dlat, grid.nlat)
+
+    nvars = len(grid.variables)
+    v = grid.variables.index('danger_score')
+    lattice_rows: dict[int, list[float]] = {}
+
+    def lattice_row(i: int) -> list[float]:
+        if i not in lattice_rows:
+            start = (step * grid.nlat + i) * grid.nlon * nvars + v
+            values = grid.values[start : start + grid.nlon * nvars : nvars]
+            lattice_rows[i] = list(values)
+        return lattice_rows[i]
+
+    pixels = bytearray(TILE_SIZE * TILE_SIZE)
+    for py, row in enumerate(rows):
+        if row is None:
+            continue
+        i, wi = row
+        lower = lattice_row(i)
+        upper = lattice_row(i + 1) if wi else lower
+        # Interpolate the lattice rows once, then along the row per pixel
+        between = [_lerp(a, b, wi) for a, b in zip(lower, upper)]
+        offset = py * TILE_SIZE
+        for px, column in enumerate(columns):
+            if column is None:
+                continue
+            j, wj = column
+            score = _lerp(between[j], between[j + 1], wj) if wj else between[j]
+            if score == score:
+                pixels[offset + px] = 1 + min(int(score * LEVELS / 10), LEVELS - 1)
+    return _png(TILE_SIZE, TILE_SIZE, pixels)
+
+
+def render_geojson(grid: GridFile, step: int, z: int, x: int, y: int) -> dict:
+    """A GeoJSON FeatureCollection of the lattice cells in a tile, each a
+    polygon with its danger score at one time step."""
+    south, west, north, east = tile_bounds(z, x, y)
+    i_range = range(
+        max(math.floor((south - grid.lat0) / grid.dlat - 0.5), 0),
+        min(math.ceil((north - grid.lat0) / grid.dlat + 0.5), grid.nlat - 1) + 1,
+    )
+    j_range = range(
+        max(math.floor((west - grid.lon0) / grid.dlon - 0.5), 0),
+        min(math.ceil((east - grid.lon0) / grid.dlon + 0.5), grid.nlon - 1) + 1,
+    )
+    features = []
+    for i in i_range:
+        lat = grid.lat0 + i * grid.dlat
+        s, n = max(lat - grid.dlat / 2, south), min(lat + grid.dlat / 2, north)
+        for j in j_range:
+            lon = grid.lon0 + j * grid.dlon
+            w, e = max(lon - grid.dlon / 2, west), min(lon + grid.dlon / 2, east)
+            score = grid.value(step, i, j, grid.variables.index('danger_score'))
+            if s >= n or w >= e or score != score:
+                continue
+            features.append(
+                {
+                    'type': 'Feature',
+                    'geometry': {
+                        'type': 'Polygon',
+                        # GeoJSON positions are [lon, lat]
+                        'coordinates': [[[w, s], [e, s], [e, n], [w, n], [w, s]]],
+                    },
+                    'properties': {'danger_score': round(score, 2)},
+                }
+            )
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def nearest_step(grid: GridFile, when: datetime) -> int | None:
+    """The grid's time step nearest to a time, or None outside the grid."""
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    f = (when - grid.t0).total_seconds() / grid.dt_seconds
+    step = round(f)
+    if not 0 <= step < grid.nt or abs(f - step) > 0.5:
+        return None
+    return step
+
+
+class TileCache:
+    """Rendered tiles of one heatmap run, least recently used evicted first.
+
+    Runs must be ordered oldest to newest. Tiles of a run older than the
+    cached one, e.g. rendered while the heatmap was being replaced, are
+    ignored.
+    """
+
+    def __init__(self, max_tiles: int = MAX_TILES):
+        self.max_tiles = max_tiles
+        self._lock = threading.Lock()
+        self._run = None
+        self._tiles: OrderedDict[tuple, bytes | dict] = OrderedDict()
+
+    def get(self, run, key: tuple) -> bytes | dict | None:
+        with self._lock:
+            if run != self._run:
+                return None
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+            return tile
+
+    def put(self, run, key: tuple, tile: bytes | dict) -> None:
+        with self._lock:
+            if self._run is not None and run < self._run:
+                return
+            if run != self._run:
+                # A new forecast run makes every cached tile stale
+                self._tiles.clear()
+                self._run = run
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+
+    def __contains__(self, item: tuple) -> bool:
+        run, key = item
+        with self._lock:
+            return run == self._run and key in self._tiles
+
+    def is_stale(self, run) -> bool:
+        """Whether a newer run has been cached since."""
+        with self._lock:
+            return self._run is not None and run < self._run
+
+
+class TileServer:
+    """Danger tiles rendered from a heatmap grid file."""
+
+    def __init__(self, path: str, max_tiles: int = MAX_TILES):
+        self.path = path
+        self.cache = TileCache(max_tiles)
+        self._pending: set[tuple] = set()
+        self._pending_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tiles')
+
+    def _render(self, grid: GridFile, key: tuple) -> bytes | dict:
+        z, x, y, step, fmt = key
+        if fmt == 'geojson':
+            return render_geojson(grid, step, z, x, y)
+        return render_png(grid, step, z, x, y)
+
+    def tile(
+        self, z: int, x: int, y: int, when: datetime, fmt: str = 'png'
+    ) -> bytes | dict | None:
+        """A tile at the heatmap hour nearest to `when`.
+
+        Returns:
+            PNG bytes or a GeoJSON dict, or None if `when` is outside the
+            heatmap
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f'Unknown tile format: {fmt} (expected one of {FORMATS})')
+        check_tile(z, x, y)
+        grid = load_grid(self.path)
+        step = nearest_step(grid, when)
+        if step is None:
+            return None
+        # The run is identified by the grid file's modification time and start,
+        # so later runs compare greater
+        run = (os.stat(self.path).st_mtime, grid.t0)
+        key = (z, x, y, step, fmt)
+
+        tile = self.cache.get(run, key)
+        if tile is not None:
+            metrics.increment('tiles.hits')
+            return tile
+        metrics.increment('tiles.misses')
+        tile = self._render(grid, key)
+        self.cache.put(run, key, tile)
+        self._prerender_neighbors(grid, run, key)
+        return tile
+
+    def _prerender_neighbors(self, grid: GridFile, run, key: tuple) -> None:
+        z, x, y, step, fmt = key
+        n = 2**z
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                # Tiles wrap around the antimeridian but not the poles
+                neighbor = (z, (x + dx) % n, y + dy, step, fmt)
+                if not 0 <= y + dy < n or neighbor == key:
+                    continue
+                if (run, neighbor) in self.cache:
+                    continue
+                with self._pending_lock:
+                    if neighbor in self._pending:
+                        continue
+                    if len(self._pending) >= MAX_PRERENDER:
+                        metrics.increment('tiles.prerender_dropped')
+                        continue
+                    self._pending.add(neighbor)
+                self._executor.submit(self._prerender, grid, run, neighbor)
+
+    def _prerender(self, grid: GridFile, run, key: tuple) -> None:
+        try:
+            # The tile may have been requested, or the heatmap replaced, while
+            # it was queued
+            if (run, key) in self.cache or self.cache.is_stale(run):
+                metrics.increment('tiles.prerender_skipped')
+                return
+            self.cache.put(run, key, self._render(grid, key))
+            metrics.increment('tiles.prerendered')
+        finally:
+            with self._pending_lock:
+                self._pending.discard(key)
+
+    def wait_for_prerendering(self) -> None:
+        """Block until queued prerendering is done (for tests and benchmarks)."""
+        self._executor.submit(lambda: None).result()
+
+
+_servers: dict[str, TileServer] = {}
+
+
+def default_tile_server() -> TileServer | None:
+    """The tile server for the heatmap in SAFE_TRAVELS_HEATMAP, if any."""
+    path = os.environ.get('SAFE_TRAVELS_HEATMAP')
+    if not path or not os.path.exists(path):
+        return None
+    if path not in _servers:
+        _servers[path] = TileServer(path)
+    return _servers[path]
@@ -0,0 +1,24 @@
+"""Trip files shared by the batch and backtest commands.
+
+Trips are JSONL or CSV, one per line or row, with an id that defaults to the
+line or row number.
+"""
+
+import csv
+import json
+from typing import Iterator
+
+
+def read_trips(path: str) -> Iterator[dict]:
+    """Stream trips from a JSONL or CSV file, giving each a string id."""
+    with open(path, newline='') as f:
+        if path.endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for number, trip in enumerate(rows, start=1):
+            trip = {
+                key: value for key, value in trip.items() if value not in ('', None)
+            }
+            trip['id'] = str(trip.get('id', number))
+            yield trip
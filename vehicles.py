@@ -0,0 +1,121 @@
+"""Vehicle profiles for danger scoring.
+
+A danger score is the sum of several components (the weather condition,
+temperature, wind, precipitation, visibility, black ice, road residue from
+recent precipitation and light), capped at MAX_SCORE. Weather hurts some
+vehicles more than others: crosswinds push high-sided trucks around, and rain,
+cold and ice matter far more on a motorcycle. A profile weighs each component
+for a class of vehicle. Passenger cars weigh every component 1, which gives the
+plain danger score.
+
+Profiles can be replaced or added with a JSON file named by
+SAFE_TRAVELS_VEHICLE_PROFILES, mapping profile names to weights by component;
+components left out weigh 1:
+
+    {"bus": {"wind": 1.5, "ice": 1.5}, "truck": {"wind": 2.5}}
+
+All profiles are scored at once, as the product of a waypoints x components
+matrix and a components x profiles weight matrix.
+"""
+
+import json
+import os
+from functools import lru_cache
+
+COMPONENTS = (
+    'weather',
+    'temperature',
+    'wind',
+    'precipitation',
+    'visibility',
+    'ice',
+    'residual',
+    'light',
+)
+MAX_SCORE = 10.0
+
+DEFAULT_PROFILES: dict[str, dict[str, float]] = {
+    'car': {},
+    # High-sided: crosswinds and gusts, and long stopping distances on ice
+    'truck': {'wind': 2.0, 'ice': 1.3, 'residual': 1.2},
+    # Exposed rider, two contact patches
+    'motorcycle': {
+        'weather': 1.5,
+        'temperature': 1.5,
+        'wind': 1.5,
+        'precipitation': 2.0,
+        'visibility': 1.3,
+        'ice': 2.0,
+        'residual': 1.5,
+    },
+}
+
+
+def _validate(profiles: dict[str, dict[str, float]]) -> None:
+    for name, weights in profiles.items():
+        unknown = set(weights) - set(COMPONENTS)
+        if unknown:
+            raise ValueError(
+                f'Unknown components in vehicle profile {name}: {sorted(unknown)} '
+                f'(expected some of {COMPONENTS})'
+            )
+
+
+@lru_cache(maxsize=None)
+def load_profiles(path: str) -> dict[str, dict[str, float]]:
+    """The default profiles updated with those in a JSON file."""
+    with open(path) as f:
+        profiles = json.load(f)
+    _validate(profiles)
+    return {**DEFAULT_PROFILES, **profiles}
+
+
+def default_profiles() -> dict[str, dict[str, float]]:
+    """The profiles configured by SAFE_TRAVELS_VEHICLE_PROFILES, or the
+    defaults."""
+    path = os.environ.get('SAFE_TRAVELS_VEHICLE_PROFILES')
+    if not path:
+        return DEFAULT_PROFILES
+    return load_profiles(path)
+
+
+def check_profiles(names: list[str]) -> None:
+    """Raise ValueError unless every name is a configured profile."""
+    profiles = default_profiles()
+    for name in names:
+        if name not in profiles:
+            raise ValueError(
+                f'Unknown vehicle profile: {name} (expected one of {list(profiles)})'
+            )
+
+
+def weight_matrix(names: list[str]) -> list[list[float]]:
+    """Components x profiles weights of the named profiles."""
+    check_profiles(names)
+    profiles = default_profiles()
+    return [
+        [profiles[name].get(component, 1.0) for name in names]
+        for component in COMPONENTS
+    ]
+
+
+def score_matrix(
+    components: list[list[float]], weights: list[list[float]]
+) -> list[list[float]]:
+    """Danger scores of every waypoint for every profile.
+
+    Args:
+        components: Waypoints x components, in COMPONENTS order
+        weights: Components x profiles, from weight_matrix()
+
+    Returns:
+        Waypoints x profiles scores, capped at MAX_SCORE
+    """
+    columns = list(zip(*weights))
+    return [
+        [
+            min(sum(value * weight for value, weight in zip(row, column)), MAX_SCORE)
+            for column in columns
+        ]
+        for row in components
+    ]
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""Sources of hourly weather forecasts.
+
+A weather provider returns hourly forecast series for a list of locations,
+each in the shape of an Open-Meteo `hourly` block (a 'time' list of hour labels
+and one list per variable in HOURLY_VARIABLES), the shape the forecast cache,
+archive and grid sampling all work with. Providers are selected by name with
+SAFE_TRAVELS_WEATHER_PROVIDER:
+
+- open_meteo (default): the Open-Meteo forecast API
+- local: forecast grids in SAFE_TRAVELS_WEATHER_GRIDS, pulled once per model run
+  for the whole service area, so assessments need no upstream calls. Locations
+  outside the grids are fetched from Open-Meteo.
+
+The local directory holds one grid file (see gridfile.py) per tile of the
+service area, with the Open-Meteo variables on a lattice of cells for each
+hour. Values are taken from the nearest cell or interpolated between the four
+cells around each location (SAFE_TRAVELS_WEATHER_GRID_LOOKUP=nearest or
+interpolate, the default). Pull the grids from cron after each model run:
+
+Usage:
+    weather_providers.py DIRECTORY SOUTH WEST NORTH EAST [--resolution 0.1]
+        [--hours 48] [--tile 2.0]
+"""
+
+import argparse
+import math
+import os
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Protocol
+
+import requests
+
+import metrics
+from gridfile import GridFile, load_grid, write_grid
+from hedging import hedged_call
+
+OPEN_METEO_URL = os.environ.get(
+    'SAFE_TRAVELS_OPEN_METEO_URL', 'https://api.open-meteo.com/v1/forecast'
+)
+HOURLY_VARIABLES = (
+    'temperature_2m',
+    'wind_speed_10m',
+    'wind_gusts_10m',
+    'weather_code',
+    'precipitation',
+    'rain',
+    'snowfall',
+    'snow_depth',
+    'visibility',
+    'soil_temperature_0cm',
+    'dew_point_2m',
+)
+
+DEFAULT_RESOLUTION = 0.1
+DEFAULT_HOURS = 48
+DEFAULT_TILE_DEG = 2.0
+# Hours of history kept before each model run, for rolling accumulations
+HISTORY_HOURS = 24
+# Lattice points per Open-Meteo request when pulling grids
+PULL_CHUNK_SIZE = 100
+GRID_SUFFIX = '.grid'
+
+
+def _utc(when: datetime) -> datetime:
+    return when.replace(tzinfo=timezone.utc) if when.tzinfo is None else when
+
+
+def _hour_label(when: datetime) -> str:
+    return when.strftime('%Y-%m-%dT%H:00')
+
+
+class WeatherProvider(Protocol):
+    def hourly_forecasts(
+        self,
+        coords: list[tuple[float, float]],
+        start: datetime,
+        end: datetime,
+        timeout: float | None = None,
+    ) -> list[dict]:
+        """Hourly forecast series for each location from start to end (UTC).
+
+        Args:
+            coords: List of (lat, lon) tuples
+            start: First hour to include
+            end: Last hour to include
+            timeout: Optional timeout in seconds for upstream calls
+
+        Returns:
+            An Open-Meteo shaped `hourly` block for each location, in order
+        """
+        ...
+
+
+class OpenMeteoProvider:
+    """Forecasts from the Open-Meteo API."""
+
+    def __init__(self, url: str = OPEN_METEO_URL):
+        self.url = url
+
+    def hourly_forecasts(
+        self,
+        coords: list[tuple[float, float]],
+        start: datetime,
+        end: datetime,
+        timeout: float | None = None,
+    ) -> list[dict]:
+        lats = ','.join(str(c[0]) for c in coords)
+        lons = ','.join(str(c[1]) for c in coords)
+
+        url = (
+            f'{self.url}?'
+            f'latitude={lats}&longitude={lons}'
+            f'&hourly={",".join(HOURLY_VARIABLES)}'
+            f'&start_hour={_hour_label(start)}&end_hour={_hour_label(end)}'
+        )
+        response = hedged_call('open_meteo', requests.get, url, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+
+        # Handle single vs multiple locations (API returns dict vs list)
+        if isinstance(data, dict) and 'hourly' in data:
+            data = [data]
+
+        return [d['hourly'] for d in data]
+
+
+class LocalGridProvider:
+    """Forecasts from a directory of grid files, one per tile."""
+
+    def __init__(
+        self,
+        path: str,
+        interpolate: bool = True,
+        fallback: WeatherProvider | None = None,
+    ):
+        self.path = path
+        self.interpolate = interpolate
+        self.fallback = fallback if fallback is not None else OpenMeteoProvider()
+        # Directory mtime, tiles by origin, and the sorted origin latitudes
+        # and longitudes
+        self._index: tuple[int, dict, list[float], list[float]] = (
+            -1,
+            {},
+            [],
+            [],
+        )
+
+    def _tiles(self) -> tuple[dict, list[float], list[float]]:
+        # Tiles are replaced by renaming them into the directory, which
+        # changes its mtime, so the tiles are only reopened when it does
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._index[0]:
+            tiles = {}
+            for entry in os.scandir(self.path):
+                origin = _tile_origin(entry.name)
+                if origin is not None:
+                    tiles[origin] = load_grid(entry.path)
+            self._index = (
+                mtime,
+                tiles,
+                sorted({lat for lat, _ in tiles}),
+                sorted({lon for _, lon in tiles}),
+            )
+        return self._index[1:]
+
+    def tiles(self) -> list[GridFile]:
+        """The grid files in the directory, reopened as they are replaced."""
+        return list(self._tiles()[0].values())
+
+    def tile_for(self, lat: float, lon: float) -> GridFile | None:
+        """The tile whose origin is nearest south-west of a location, if any."""
+        tiles, lats, lons = self._tiles()
+        i = bisect_right(lats, lat) - 1
+        j = bisect_right(lons, lon) - 1
+        if i < 0 or j < 0:
+            return None
+        return tiles.get((lats[i], lons[j]))
+
+    def _block(
+        self, grid: GridFile, lat: float, lon: float, start: datetime, end: datetime
+    ) -> dict | None:
+        """Hourly block for a location from one grid, or None if the grid
+        doesn't cover the location up to the end hour."""
+        if not grid.contains(lat, lon, end):
+            return None
+        step = timedelta(seconds=grid.dt_seconds)
+        first = max(0, math.ceil((_utc(start) - grid.t0) / step))
+        last = min(grid.nt - 1, int((_utc(end) - grid.t0) / step))
+
+        fi = (lat - grid.lat0) / grid.dlat
+        fj = (lon - grid.lon0) / grid.dlon
+        if self.interpolate:
+            i0 = min(max(int(fi), 0), max(grid.nlat - 2, 0))
+            j0 = min(max(int(fj), 0), max(grid.nlon - 2, 0))
+            wi, wj = fi - i0, fj - j0
+            corners = [
+                (i0 + di, j0 + dj, weight)
+                for di, w_i in ((0, 1 - wi), (1, wi))
+                for dj, w_j in ((0, 1 - wj), (1, wj))
+                if (weight := w_i * w_j) > 0
+                and i0 + di < grid.nlat
+                and j0 + dj < grid.nlon
+            ]
+        else:
+            i = min(max(round(fi), 0), grid.nlat - 1)
+            j = min(max(round(fj), 0), grid.nlon - 1)
+            corners = [(i, j, 1.0)]
+
+        # Series of one variable at one cell are strided slices of the grid
+        nvars = len(grid.variables)
+        stride = grid.nlat * grid.nlon * nvars
+        lo, hi = first * stride, (last + 1) * stride
+
+        def series(i: int, j: int, v: int) -> list[float]:
+            offset = (i * grid.nlon + j) * nvars + v
+            return grid.values[lo + offset : hi : stride].tolist()
+
+        block: dict = {
+            'time': [_hour_label(grid.time_at(step)) for step in range(first, last + 1)]
+        }
+        for name in HOURLY_VARIABLES:
+            block[name] = [None] * len(block['time'])
+        for v, name in enumerate(grid.variables):
+            if name not in block:
+                continue
+            columns = [series(i, j, v) for i, j, _ in corners]
+            weights = [weight for _, _, weight in corners]
+            values = []
+            for xs in zip(*columns):
+                total = present = 0.0
+                for x, weight in zip(xs, weights):
+                    if not math.isnan(x):
+                        total += x * weight
+                        present += weight
+                values.append(total / present if present else None)
+            block[name] = values
+        # Weather codes are categories, so they come from the nearest cell
+        if 'weather_code' in grid.variables:
+            i, j, _ = max(corners, key=lambda corner: corner[2])
+            block['weather_code'] = [
+                None if math.isnan(x) else int(x)
+                for x in series(i, j, grid.variables.index('weather_code'))
+            ]
+        return block
+
+    def hourly_forecasts(
+        self,
+        coords: list[tuple[float, float]],
+        start: datetime,
+        end: datetime,
+        timeout: float | None = None,
+    ) -> list[dict]:
+        blocks: list[dict | None] = []
+        for lat, lon in coords:
+            grid = self.tile_for(lat, lon)
+            blocks.append(
+                self._block(grid, lat, lon, start, end) if grid is not None else None
+            )
+
+        outside = [i for i, block in enumerate(blocks) if block is None]
+        metrics.increment('local_weather.points', len(coords) - len(outside))
+        if outside:
+            metrics.increment('local_weather.fallbacks', len(outside))
+            fetched = self.fallback.hourly_forecasts(
+                [coords[i] for i in outside], start, end, timeout
+            )
+            for i, block in zip(outside, fetched):
+                blocks[i] = block
+        return blocks
+
+
+def _tile_origin(name: str) -> tuple[float, float] | None:
+    """(lat0, lon0) of a tile from its file name, as written by
+    pull_forecast_grids(), or None for other files."""
+    if not name.endswith(GRID_SUFFIX):
+        return None
+    try:
+        lat0, lon0 = name[: -len(GRID_SUFFIX)].split('_')
+        return float(lat0), float(lon0)
+    except ValueError:
+        return None
+
+
+def pull_forecast_grids(
+    path: str,
+    south: float,
+    west: float,
+    north: float,
+    east: float,
+    resolution: float = DEFAULT_RESOLUTION,
+    hours: int = DEFAULT_HOURS,
+    tile_deg: float = DEFAULT_TILE_DEG,
+    start: datetime | None = None,
+    provider: WeatherProvider | None = None,
+) -> list[str]:
+    """Fetch a forecast run for a bounding box into tiled grid files.
+
+    Each tile is written atomically, so a server reading the directory sees
+    either the previous run or the new one.
+
+    Args:
+        path: Output directory
+        south, west, north, east: Bounding box of the service area in degrees
+        resolution: Lattice spacing in degrees
+        hours: Forecast hours to cover, after HISTORY_HOURS of history
+        tile_deg: Tile size in degrees
+        start: First forecast hour (defaults to the current hour, UTC)
+        provider: Where to fetch from (defaults to Open-Meteo)
+
+    Returns:
+        Paths of the tiles written
+    """
+    if start is None:
+        start = datetime.now(timezone.utc)
+    start = start.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    first = start - timedelta(hours=HISTORY_HOURS)
+    nt = HISTORY_HOURS + hours
+    provider = provider or OpenMeteoProvider()
+    os.makedirs(path, exist_ok=True)
+
+    # Cells per tile side; neighboring tiles share their edge cells so every
+    # point of the box can be interpolated within one tile
+    per_tile = max(1, round(tile_deg / resolution))
+    nlat_total = int(math.floor((north - south) / resolution + 1e-9)) + 1
+    nlon_total = int(math.floor((east - west) / resolution + 1e-9)) + 1
+    written = []
+    for i0 in range(0, max(nlat_total - 1, 1), per_tile):
+        for j0 in range(0, max(nlon_total - 1, 1), per_tile):
+            nlat = min(per_tile + 1, nlat_total - i0)
+            nlon = min(per_tile + 1, nlon_total - j0)
+            lat0 = round(south + i0 * resolution, 4)
+            lon0 = round(west + j0 * resolution, 4)
+            coords = [
+                (round(lat0 + i * resolution, 4), round(lon0 + j * resolution, 4))
+                for i in range(nlat)
+                for j in range(nlon)
+            ]
+
+            # [hour][lat][lon][variable], missing values stay NaN
+            nvars = len(HOURLY_VARIABLES)
+            values = array('f', [math.nan]) * (nt * nlat * nlon * nvars)
+            for chunk_start in range(0, len(coords), PULL_CHUNK_SIZE):
+                chunk = coords[chunk_start : chunk_start + PULL_CHUNK_SIZE]
+                blocks = provider.hourly_forecasts(
+                    chunk, first, first + timedelta(hours=nt - 1)
+                )
+                for cell, hourly in enumerate(blocks, start=chunk_start):
+                    if _hour_label(first) not in hourly['time']:
+                        continue
+                    offset = hourly['time'].index(_hour_label(first))
+                    for step in range(min(nt, len(hourly['time']) - offset)):
+                        base = (step * nlat * nlon + cell) * nvars
+                        for v, name in enumerate(HOURLY_VARIABLES):
+                            x = hourly[name][offset + step]
+                            if x is not None:
+                                values[base + v] = x
+
+            tile_path = os.path.join(path, f'{lat0}_{lon0}{GRID_SUFFIX}')
+            write_grid(
+                tile_path,
+                lat0,
+                lon0,
+                resolution,
+                resolution,
+                nlat,
+                nlon,
+                first,
+                3600,
+                nt,
+                HOURLY_VARIABLES,
+                values,
+            )
+            written.append(tile_path)
+    return written
+
+
+# Weather providers by name, selected with SAFE_TRAVELS_WEATHER_PROVIDER
+_providers: dict[tuple, WeatherProvider] = {}
+
+
+def default_provider() -> WeatherProvider:
+    """The weather provider configured by the environment."""
+    name = os.environ.get('SAFE_TRAVELS_WEATHER_PROVIDER', 'open_meteo')
+    if name == 'open_meteo':
+        key = (name, OPEN_METEO_URL)
+        if key not in _providers:
+            _providers[key] = OpenMeteoProvider()
+    elif name == 'local':
+        path = os.environ['SAFE_TRAVELS_WEATHER_GRIDS']
+        lookup = os.environ.get('SAFE_TRAVELS_WEATHER_GRID_LOOKUP', 'interpolate')
+        if lookup not in ('nearest', 'interpolate'):
+            raise ValueError(f'Unknown weather grid lookup: {lookup}')
+        key = (name, path, lookup)
+        if key not in _providers:
+            _providers[key] = LocalGridProvider(path, lookup == 'interpolate')
+    else:
+        raise ValueError(f'Unknown weather provider: {name}')
+    return _providers[key]
+
+
+def fetch_hourly_forecasts(
+    coords: list[tuple[float, float]],
+    start: datetime,
+    end: datetime,
+    timeout: float | None = None,
+) -> list[dict]:
+    """Fetch hourly forecast series for several locations from the configured
+    provider.
+
+    Args:
+        coords: List of (lat, lon) tuples
+        start: First hour to include
+        end: Last hour to include
+        timeout: Optional request timeout in seconds
+
+    Returns:
+        The Open-Meteo `hourly` block for each location, in order
+    """
+    return default_provider().hourly_forecasts(coords, start, end, timeout)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pull forecast grids')
+    parser.add_argument('directory')
+    parser.add_argument('south', type=float)
+    parser.add_argument('west', type=float)
+    parser.add_argument('north', type=float)
+    parser.add_argument('east', type=float)
+    parser.add_argument('--resolution', type=float, default=DEFAULT_RESOLUTION)
+    parser.add_argument('--hours', type=int, default=DEFAULT_HOURS)
+    parser.add_argument('--tile', type=float, default=DEFAULT_TILE_DEG)
+    args = parser.parse_args()
+
+    pull_forecast_grids(
+        args.directory,
+        args.south,
+        args.west,
+        args.north,
+        args.east,
+        resolution=args.resolution,
+        hours=args.hours,
+        tile_deg=args.tile,
+    )
@@ -0,0 +1,219 @@
+"""Danger scores of hourly weather.
+
+Turns an hour of an Open-Meteo `hourly` block into a weather record, and a
+weather record into the components of its danger score (see vehicles.py). The
+server and the offline jobs (heatmap.py, backtest.py) score weather the same
+way through these functions.
+"""
+
+from danger_assessment import (
+    black_ice_risk,
+    darkness_severity,
+    precipitation_severity,
+    road_residual_severity,
+    sun_glare_severity,
+    temperature_severity,
+    visibility_severity,
+    weather_conditions_severity,
+    wind_severity,
+)
+
+# Hours of history requested before the first waypoint, for rolling accumulations
+PRECIP_HISTORY_HOURS = 24
+ACCUMULATION_WINDOWS = (6, 12, 24)
+
+
+def danger_status(max_danger: float) -> str:
+    """Overall safety status for the worst danger score on a route."""
+    if max_danger < 2:
+        return 'SAFE'
+    elif max_danger < 5:
+        return 'MODERATE'
+    elif max_danger < 10:
+        return 'HAZARDOUS'
+    else:
+        return 'EXTREME'
+
+
+def weather_code_to_condition(code: int) -> str:
+    """Map Open-Meteo weather codes to condition strings."""
+    if code in [0, 1]:
+        return 'sunny'
+    if code in [2, 3]:
+        return 'cloudy'
+    if code in [45, 48]:
+        return 'foggy'
+    if code in [51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82]:
+        return 'rainy'
+    if code in [71, 73, 75, 77, 85, 86]:
+        return 'snowy'
+    if code == 95:
+        return 'stormy'
+    if code in [96, 99]:
+        return 'hail'
+    return 'cloudy'
+
+
+def running_sums(values: list[float | None]) -> list[float]:
+    """Prefix sums of an hourly series, treating missing values as zero."""
+    sums = [0.0]
+    total = 0.0
+    for v in values:
+        total += v or 0.0
+        sums.append(total)
+    return sums
+
+
+def weather_at_hour(
+    hourly: dict, idx: int, rain_sums: list[float], snow_sums: list[float]
+) -> dict:
+    """Weather record for one hour of an Open-Meteo hourly block.
+
+    Args:
+        hourly: Open-Meteo hourly block for one location
+        idx: Index of the hour to extract
+        rain_sums: Running sums of hourly['rain'] from running_sums()
+        snow_sums: Running sums of hourly['snowfall'] from running_sums()
+    """
+    # Rolling accumulations over the hours before this one, whose own
+    # precipitation is scored separately
+    end = idx
+    accumulations = {}
+    for hours in ACCUMULATION_WINDOWS:
+        start = max(0, end - hours)
+        accumulations[f'rain_{hours}h_mm'] = rain_sums[end] - rain_sums[start]
+        accumulations[f'snowfall_{hours}h_cm'] = snow_sums[end] - snow_sums[start]
+
+    return {
+        'temp_c': hourly['temperature_2m'][idx],
+        'wind_kph': hourly['wind_speed_10m'][idx],
+        'gust_kph': hourly['wind_gusts_10m'][idx],
+        'condition': weather_code_to_condition(hourly['weather_code'][idx]),
+        'precipitation_mm': hourly['precipitation'][idx] or 0.0,
+        'rain_mm': hourly['rain'][idx] or 0.0,
+        'snowfall_cm': hourly['snowfall'][idx] or 0.0,
+        'snow_depth_m': hourly['snow_depth'][idx] or 0.0,
+        'visibility_m': hourly['visibility'][idx] or 10000.0,
+        'soil_temp_c': hourly['soil_temperature_0cm'][idx],
+        'dew_point_c': hourly['dew_point_2m'][idx],
+        **accumulations,
+    }
+
+
+def _light_modifier(
+    sun_elevation: float | None,
+    sun_azimuth: float | None = None,
+    heading: float | None = None,
+) -> float:
+    """Darkness and sun-glare severity, if the sun position is known."""
+    if sun_elevation is None:
+        return 0.0
+    modifier = darkness_severity(sun_elevation)
+    if sun_azimuth is not None and heading is not None:
+        modifier += sun_glare_severity(sun_elevation, sun_azimuth, heading)
+    return modifier
+
+
+def _danger_components(
+    temp_c: float,
+    wind_kph: float,
+    condition: str,
+    gust_kph: float = 0.0,
+    rain_mm: float = 0.0,
+    snowfall_cm: float = 0.0,
+    visibility_m: float = 10000.0,
+    soil_temp_c: float | None = None,
+    dew_point_c: float | None = None,
+    sun_elevation: float | None = None,
+    sun_azimuth: float | None = None,
+    heading: float | None = None,
+    rain_6h_mm: float = 0.0,
+    rain_12h_mm: float = 0.0,
+    rain_24h_mm: float = 0.0,
+    snowfall_6h_cm: float = 0.0,
+    snowfall_12h_cm: float = 0.0,
+    snowfall_24h_cm: float = 0.0,
+) -> list[float]:
+    """Components of the danger score, in vehicles.COMPONENTS order.
+
+    Light modifiers (darkness and sun glare) are only applied when the sun
+    position, and for glare the travel heading, are provided.
+    """
+    weather_modifier = weather_conditions_severity.get(condition.lower(), 0.0)
+    temp_modifier = temperature_severity(temp_c)
+    wind_modifier = wind_severity(wind_kph)
+    gust_modifier = wind_severity(gust_kph)
+    precip_modifier = precipitation_severity(rain_mm, snowfall_cm)
+    vis_modifier = visibility_severity(visibility_m)
+    ice_modifier = black_ice_risk(temp_c, soil_temp_c, dew_point_c)
+    residual_modifier = road_residual_severity(
+        rain_6h_mm,
+        rain_12h_mm,
+        rain_24h_mm,
+        snowfall_6h_cm,
+        snowfall_12h_cm,
+        snowfall_24h_cm,
+        temp_c,
+    )
+
+    light_modifier = _light_modifier(sun_elevation, sun_azimuth, heading)
+
+    max_wind_modifier = max(gust_modifier, wind_modifier)
+
+    return [
+        weather_modifier,
+        temp_modifier,
+        max_wind_modifier,
+        precip_modifier,
+        vis_modifier,
+        ice_modifier,
+        residual_modifier,
+        light_modifier,
+    ]
+
+
+def _compute_danger_score(*args, **kwargs) -> float:
+    """Compute danger score from weather conditions.
+
+    Takes the arguments of _danger_components() and sums the components.
+    """
+    return min(sum(_danger_components(*args, **kwargs)), 10.0)
+
+
+def weather_components(
+    wd: dict,
+    sun_elevation: float | None = None,
+    sun_azimuth: float | None = None,
+    heading: float | None = None,
+) -> list[float]:
+    """Components of the danger score for a weather record."""
+    return _danger_components(
+        temp_c=wd['temp_c'],
+        wind_kph=wd['wind_kph'],
+        condition=wd['condition'],
+        gust_kph=wd['gust_kph'],
+        rain_mm=wd['rain_mm'],
+        snowfall_cm=wd['snowfall_cm'],
+        visibility_m=wd['visibility_m'],
+        soil_temp_c=wd['soil_temp_c'],
+        dew_point_c=wd['dew_point_c'],
+        sun_elevation=sun_elevation,
+        sun_azimuth=sun_azimuth,
+        heading=heading,
+        rain_6h_mm=wd.get('rain_6h_mm', 0.0),
+        rain_12h_mm=wd.get('rain_12h_mm', 0.0),
+        rain_24h_mm=wd.get('rain_24h_mm', 0.0),
+        snowfall_6h_cm=wd.get('snowfall_6h_cm', 0.0),
+        snowfall_12h_cm=wd.get('snowfall_12h_cm', 0.0),
+        snowfall_24h_cm=wd.get('snowfall_24h_cm', 0.0),
+    )
+
+
+def score_weather(
+    wd: dict,
+    sun_elevation: float | None = None,
+    sun_azimuth: float | None = None,
+    heading: float | None = None,
+) -> float:
+    """Compute the danger score for a weather record."""
+    return min(sum(weather_components(wd, sun_elevation, sun_azimuth, heading)), 10.0)